@@ -52,6 +52,13 @@ parser.add_argument(
     "--failfast", help="Fail on first error", action="store_true", default=False
 )
 
+parser.add_argument(
+    "--streaming",
+    help="Stream batches through processors, only waiting at batching steps",
+    action="store_true",
+    default=False,
+)
+
 parser.add_argument("-m", "--monitor", action="store_true", default=False)
 parser.add_argument(
     "--emailrecipients",
@@ -73,6 +80,11 @@ parser.add_argument(
     default=48.0,
     help="Time, in hours, to wait before ceasing monitoring for new images",
 )
+parser.add_argument(
+    "--dithertimeouthours",
+    default=1.0,
+    help="Time, in hours, to wait for the rest of an incomplete dither set",
+)
 parser.add_argument(
     "--rawdir",
     default=RAW_IMG_SUB_DIR,
@@ -124,6 +136,7 @@ with tempfile.TemporaryDirectory(dir=TEMP_DIR) as temp_dir_path:
             email_sender=args.emailsender,
             email_recipients=EMAIL_RECIPIENTS,
             raw_dir=args.rawdir,
+            dither_timeout_hours=args.dithertimeouthours,
         )
         monitor.process_realtime()
 
@@ -160,6 +173,7 @@ with tempfile.TemporaryDirectory(dir=TEMP_DIR) as temp_dir_path:
 
         batches, errorstack = pipe.reduce_images(
             catch_all_errors=not args.failfast,
+            streaming=args.streaming,
         )
 
         processors = pipe.get_latest_configuration()
@@ -4,4 +4,5 @@ Base classes for the catalog system.
 
 from mirar.catalog.base.base_catalog import BaseCatalog, BaseMultiBackendCatalog
 from mirar.catalog.base.base_xmatch_catalog import BaseXMatchCatalog
+from mirar.catalog.base.catalog_cache import CatalogTileCache
 from mirar.catalog.base.errors import CatalogError
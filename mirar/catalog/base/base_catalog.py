@@ -2,18 +2,25 @@
 Module for Catalog base class
 """
 
+import copy
 import logging
 from abc import ABC
 from pathlib import Path
 from typing import Type
 
 import astropy.table
+from astropy.io import fits
 
+from mirar.catalog.base.catalog_cache import (
+    CATALOG_TILE_CACHE_DIR,
+    DEFAULT_NSIDE,
+    CatalogTileCache,
+)
 from mirar.catalog.base.errors import CatalogCacheError
 from mirar.data import Image
 from mirar.data.utils import get_image_center_wcs_coords
 from mirar.paths import BASE_NAME_KEY, REF_CAT_PATH_KEY
-from mirar.utils.ldac_tools import save_table_as_ldac
+from mirar.utils.ldac_tools import convert_table_to_ldac
 
 logger = logging.getLogger(__name__)
 
@@ -52,9 +59,23 @@ class BaseCatalog(ABCatalog, ABC):
         Users need to add this to the image header themselves. e.g. For winter,
         we use a CustomImageModifer to add this key to the header, as our catalogs are
         cached by field-id, subdet-id and filter.
+        tile_cache_dir: Directory for a local cache of catalog tiles
+        (see :class:`~mirar.catalog.base.catalog_cache.CatalogTileCache`),
+        shared between images. Defaults to the CATALOG_TILE_CACHE_DIR
+        environment variable, or no tile cache if that is not set.
+        tile_cache_nside: HEALPix nside of the cached tiles
     """
 
-    def __init__(
+    # Attributes which do not change the catalog rows, so are not used to
+    # distinguish between cached catalogs
+    tile_cache_ignore_keys = [
+        "search_radius_arcmin",
+        "cache_catalog_locally",
+        "catalog_cachepath_key",
+        "tile_cache",
+    ]
+
+    def __init__(  # pylint: disable=too-many-arguments
         self,
         *args,
         min_mag: float,
@@ -62,6 +83,8 @@ class BaseCatalog(ABCatalog, ABC):
         filter_name: str,
         cache_catalog_locally: bool = False,
         catalog_cachepath_key: str = REF_CAT_PATH_KEY,
+        tile_cache_dir: str | Path | None = CATALOG_TILE_CACHE_DIR,
+        tile_cache_nside: int = DEFAULT_NSIDE,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
@@ -71,6 +94,10 @@ class BaseCatalog(ABCatalog, ABC):
         self.cache_catalog_locally = cache_catalog_locally
         self.catalog_cachepath_key = catalog_cachepath_key
 
+        self.tile_cache = None
+        if tile_cache_dir is not None:
+            self.tile_cache = CatalogTileCache(tile_cache_dir, nside=tile_cache_nside)
+
     def get_catalog(self, ra_deg: float, dec_deg: float) -> astropy.table.Table:
         """
         Returns a catalog centered on ra/dec
@@ -81,28 +108,84 @@ class BaseCatalog(ABCatalog, ABC):
         """
         raise NotImplementedError()
 
-    def write_catalog(self, image: Image, output_dir: str | Path) -> Path:
+    def is_tile_cacheable(self) -> bool:
         """
-        Generates a custom catalog for an image
+        Whether the catalog can be stored in a tile cache, i.e. whether the rows
+        returned by get_catalog depend only on the position and catalog settings.
+        Child classes can override this.
 
-        :param image: Image
-        :param output_dir: output directory for catalog
-        :return: path of catalog
+        :return: boolean
         """
-        if isinstance(output_dir, str):
-            output_dir = Path(output_dir)
-        ra_deg, dec_deg = get_image_center_wcs_coords(image, origin=1)
+        return self.search_radius_arcmin > 0
 
-        base_name = Path(image[BASE_NAME_KEY]).with_suffix(".ldac").name
+    def get_tile_cache_tag(self) -> dict:
+        """
+        Get a dictionary of the catalog settings, used to distinguish between
+        catalogs in the tile cache
 
-        cat = self.get_catalog(ra_deg=ra_deg, dec_deg=dec_deg)
+        :return: Dictionary of settings
+        """
+        tag = {
+            "abbreviation": self.abbreviation,
+            "catalog": f"{self.__class__.__module__}.{self.__class__.__name__}",
+        }
+        for key, value in sorted(vars(self).items()):
+            if key in self.tile_cache_ignore_keys:
+                continue
+            if isinstance(value, (str, int, float, bool, list, tuple, dict)) or (
+                value is None
+            ):
+                tag[key] = value
+        return tag
 
-        output_path = self.get_output_path(output_dir, base_name)
-        output_path.unlink(missing_ok=True)
+    def get_catalog_cone(
+        self, ra_deg: float, dec_deg: float, radius_deg: float
+    ) -> astropy.table.Table:
+        """
+        Returns a catalog centered on ra/dec, with a given search radius
 
-        logger.debug(f"Saving catalog to {output_path}")
+        :param ra_deg: RA
+        :param dec_deg: Dec
+        :param radius_deg: Search radius in degrees
+        :return: Catalog
+        """
+        catalog = copy.copy(self)
+        catalog.search_radius_arcmin = radius_deg * 60.0
+        return catalog.get_catalog(ra_deg=ra_deg, dec_deg=dec_deg)
+
+    def get_cached_catalog(self, ra_deg: float, dec_deg: float) -> astropy.table.Table:
+        """
+        Returns a catalog centered on ra/dec, using the tile cache if available
+
+        :param ra_deg: RA
+        :param dec_deg: Dec
+        :return: Catalog
+        """
+        if (self.tile_cache is None) or (not self.is_tile_cacheable()):
+            return self.get_catalog(ra_deg=ra_deg, dec_deg=dec_deg)
 
-        save_table_as_ldac(cat, output_path)
+        return self.tile_cache.query(
+            ra_deg=ra_deg,
+            dec_deg=dec_deg,
+            radius_deg=self.search_radius_arcmin / 60.0,
+            tag=self.get_tile_cache_tag(),
+            fetch_f=self.get_catalog_cone,
+        )
+
+    def get_ldac_catalog(self, image: Image) -> fits.HDUList:
+        """
+        Generates a custom catalog for an image, as an in-memory FITS_LDAC HDUList.
+        If local caching is enabled, the catalog is also saved to the path
+        in the image header.
+
+        :param image: Image
+        :return: FITS_LDAC HDUList of the catalog
+        """
+        ra_deg, dec_deg = get_image_center_wcs_coords(image, origin=1)
+
+        cat = self.get_cached_catalog(ra_deg=ra_deg, dec_deg=dec_deg)
+
+        hdulist = convert_table_to_ldac(cat)
 
         if self.cache_catalog_locally:
             if self.catalog_cachepath_key not in image.header:
@@ -114,7 +197,32 @@ class BaseCatalog(ABCatalog, ABC):
             catalog_save_path = Path(image[self.catalog_cachepath_key])
             catalog_save_path.unlink(missing_ok=True)
             logger.debug(f"Saving catalog to {catalog_save_path}")
-            save_table_as_ldac(cat, catalog_save_path)
+            hdulist.writeto(catalog_save_path, overwrite=True)
+
+        return hdulist
+
+    def write_catalog(self, image: Image, output_dir: str | Path) -> Path:
+        """
+        Generates a custom catalog for an image, and saves it
+        (e.g. for external software such as scamp)
+
+        :param image: Image
+        :param output_dir: output directory for catalog
+        :return: path of catalog
+        """
+        if isinstance(output_dir, str):
+            output_dir = Path(output_dir)
+
+        base_name = Path(image[BASE_NAME_KEY]).with_suffix(".ldac").name
+
+        hdulist = self.get_ldac_catalog(image)
+
+        output_path = self.get_output_path(output_dir, base_name)
+        output_path.unlink(missing_ok=True)
+
+        logger.debug(f"Saving catalog to {output_path}")
+
+        hdulist.writeto(output_path, overwrite=True)
 
         return output_path
 
@@ -73,6 +73,10 @@ class BaseGaia2Mass(BaseCatalog, ABC):
             if val is None:
                 self.acceptable_ph_quals[filt] = ["A", "B", "C"]
 
+    def is_tile_cacheable(self) -> bool:
+        # Trimming depends on the image catalog
+        return super().is_tile_cacheable() & (not self.trim)
+
     def convert_to_ab_mag(self, src_list: astropy.table.Table) -> astropy.table.Table:
         """
         Convert 2MASS magnitudes to AB magnitudes
@@ -0,0 +1,387 @@
+"""
+Module for a local cache of reference catalogs, partitioned into HEALPix tiles.
+
+Without a cache, every image needs a new query to Vizier, TAP or Kowalski for its
+reference catalog, even when the same field is observed every night. A
+:class:`~mirar.catalog.base.catalog_cache.CatalogTileCache` instead stores the rows
+returned by a catalog in one parquet file per HEALPix tile (nested scheme), in a
+directory specific to the catalog and its settings (magnitude limits, filter etc.).
+
+A cone query is answered from the local tiles whenever every tile overlapping the
+cone is already cached. Otherwise, a single query is made to the catalog for a cone
+enclosing only the missing tiles, and the rows are split into tiles and saved.
+
+The cache can be enabled for all catalogs via an environment variable:
+
+.. code-block:: bash
+
+    export CATALOG_TILE_CACHE_DIR=/path/to/cache
+"""
+
+import hashlib
+import json
+import logging
+import os
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+
+import astropy.units as u
+import numpy as np
+from astropy.coordinates import SkyCoord
+from astropy.table import Table, vstack
+
+from mirar.catalog.base.errors import CatalogCacheError
+
+logger = logging.getLogger(__name__)
+
+CATALOG_TILE_CACHE_DIR: str | None = os.getenv("CATALOG_TILE_CACHE_DIR")
+
+DEFAULT_NSIDE = 1024
+
+# Upper bound on the ratio of the maximum angular diameter of a HEALPix pixel
+# to the pixel resolution (the true ratio is ~2.05, for elongated polar pixels)
+MAX_PIXEL_DIAMETER_FACTOR = 2.2
+
+EMPTY_TILE_SUFFIX = ".empty"
+TILE_SUFFIX = ".parquet"
+
+
+def ang2pix_nest(  # pylint: disable=too-many-locals
+    nside: int, ra_deg: np.ndarray, dec_deg: np.ndarray
+) -> np.ndarray:
+    """
+    Get the HEALPix pixel index (nested scheme) for positions on the sky
+
+    :param nside: HEALPix nside (a power of 2)
+    :param ra_deg: RA values in degrees
+    :param dec_deg: Dec values in degrees
+    :return: Array of pixel indices
+    """
+    if (nside < 1) or (nside & (nside - 1)) != 0:
+        raise CatalogCacheError(f"HEALPix nside must be a power of 2, not {nside}")
+
+    ra_deg = np.atleast_1d(np.asarray(ra_deg, dtype=float))
+    dec_deg = np.atleast_1d(np.asarray(dec_deg, dtype=float))
+
+    z = np.sin(np.radians(dec_deg))
+    za = np.abs(z)
+    tt = np.mod(np.radians(ra_deg), 2.0 * np.pi) / (0.5 * np.pi)
+
+    face = np.zeros(z.shape, dtype=np.int64)
+    ix = np.zeros(z.shape, dtype=np.int64)
+    iy = np.zeros(z.shape, dtype=np.int64)
+
+    # Equatorial region
+    eq = za <= 2.0 / 3.0
+    temp1 = nside * (0.5 + tt[eq])
+    temp2 = nside * z[eq] * 0.75
+    jp = (temp1 - temp2).astype(np.int64)
+    jm = (temp1 + temp2).astype(np.int64)
+    ifp = jp // nside
+    ifm = jm // nside
+    face[eq] = np.where(ifp == ifm, ifp | 4, np.where(ifp < ifm, ifp, ifm + 8))
+    ix[eq] = jm & (nside - 1)
+    iy[eq] = nside - (jp & (nside - 1)) - 1
+
+    # Polar caps
+    pol = ~eq
+    ntt = np.minimum(tt[pol].astype(np.int64), 3)
+    tp = tt[pol] - ntt
+    tmp = nside * np.sqrt(3.0 * (1.0 - za[pol]))
+    jp = np.minimum((tp * tmp).astype(np.int64), nside - 1)
+    jm = np.minimum(((1.0 - tp) * tmp).astype(np.int64), nside - 1)
+    north = z[pol] >= 0
+    face[pol] = np.where(north, ntt, ntt + 8)
+    ix[pol] = np.where(north, nside - jm - 1, jp)
+    iy[pol] = np.where(north, nside - jp - 1, jm)
+
+    # Interleave the bits of ix and iy
+    pix = np.zeros(z.shape, dtype=np.int64)
+    for bit in range(int(nside).bit_length() - 1):
+        pix |= ((ix >> bit) & 1) << (2 * bit)
+        pix |= ((iy >> bit) & 1) << (2 * bit + 1)
+
+    return face * nside**2 + pix
+
+
+def get_pixel_resolution_deg(nside: int) -> float:
+    """
+    Get the approximate size of a HEALPix pixel
+
+    :param nside: HEALPix nside
+    :return: Pixel resolution in degrees
+    """
+    return float(np.degrees(np.sqrt(np.pi / 3.0) / nside))
+
+
+def angular_distance_deg(
+    ra_deg: float, dec_deg: float, ra_array: np.ndarray, dec_array: np.ndarray
+) -> np.ndarray:
+    """
+    Get the angular distance between a position and an array of positions
+
+    :param ra_deg: RA of position
+    :param dec_deg: Dec of position
+    :param ra_array: RA values
+    :param dec_array: Dec values
+    :return: Distances in degrees
+    """
+    ra1, dec1 = np.radians(ra_deg), np.radians(dec_deg)
+    ra2, dec2 = np.radians(ra_array), np.radians(dec_array)
+    hav = (
+        np.sin((dec2 - dec1) / 2.0) ** 2
+        + np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2.0) ** 2
+    )
+    return np.degrees(2.0 * np.arcsin(np.sqrt(np.clip(hav, 0.0, 1.0))))
+
+
+class CatalogTileCache:
+    """
+    Local cache of catalog rows, stored in HEALPix tiles
+    """
+
+    def __init__(self, cache_dir: str | Path, nside: int = DEFAULT_NSIDE):
+        self.cache_dir = Path(cache_dir)
+        self.nside = nside
+        # Check nside is valid
+        ang2pix_nest(nside, 0.0, 0.0)
+
+        self.resolution_deg = get_pixel_resolution_deg(nside)
+        self.max_diameter_deg = MAX_PIXEL_DIAMETER_FACTOR * self.resolution_deg
+
+    def __str__(self):
+        return f"<A catalog tile cache, with path {self.cache_dir}>"
+
+    def get_tile_dir(self, tag: dict) -> Path:
+        """
+        Get the directory of tiles for a catalog, with the given settings.
+        The settings are saved alongside the tiles.
+
+        :param tag: Dictionary of catalog settings (name, filter, mag limits etc.)
+        :return: Directory path
+        """
+        tag_str = json.dumps(tag, sort_keys=True, default=str)
+        tag_hash = hashlib.sha1(tag_str.encode()).hexdigest()[:16]
+
+        name = str(tag.get("abbreviation", "catalog"))
+
+        tile_dir = self.cache_dir.joinpath(name, f"nside{self.nside}_{tag_hash}")
+        if not tile_dir.exists():
+            tile_dir.mkdir(parents=True, exist_ok=True)
+            tile_dir.joinpath("tag.json").write_text(tag_str, encoding="utf8")
+
+        return tile_dir
+
+    def get_cone_samples(
+        self, ra_deg: float, dec_deg: float, radius_deg: float
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get a grid of positions covering a cone (and a margin of one pixel),
+        dense enough that every tile overlapping the cone contains a position
+
+        :param ra_deg: RA of cone centre
+        :param dec_deg: Dec of cone centre
+        :param radius_deg: Radius of cone in degrees
+        :return: RA and Dec of positions
+        """
+        step = self.resolution_deg / 4.0
+        max_radius = radius_deg + self.resolution_deg
+
+        seps = [0.0]
+        pas = [0.0]
+        for sep in np.arange(step, max_radius + step, step):
+            n_angles = max(6, int(np.ceil(2.0 * np.pi * sep / step)))
+            seps.extend([sep] * n_angles)
+            pas.extend(np.linspace(0.0, 360.0, n_angles, endpoint=False))
+
+        centre = SkyCoord(ra=ra_deg * u.deg, dec=dec_deg * u.deg)
+        samples = centre.directional_offset_by(
+            np.array(pas) * u.deg, np.array(seps) * u.deg
+        )
+        return samples.ra.deg, samples.dec.deg
+
+    def get_fetch_cone(
+        self,
+        ra_deg: float,
+        dec_deg: float,
+        sample_ra: np.ndarray,
+        sample_dec: np.ndarray,
+    ) -> tuple[float, float, float]:
+        """
+        Get a cone which fully contains every tile with a sample position.
+        Every point in a tile is within one pixel diameter of a sample in it, so the
+        cone encloses all samples plus this margin. The cone is centred on either
+        the samples or the original query, whichever gives a smaller radius.
+
+        :param ra_deg: RA of original query
+        :param dec_deg: Dec of original query
+        :param sample_ra: RA of sample positions in missing tiles
+        :param sample_dec: Dec of sample positions in missing tiles
+        :return: RA, Dec and radius (in degrees) of cone
+        """
+        vec = np.array(
+            SkyCoord(ra=sample_ra * u.deg, dec=sample_dec * u.deg).cartesian.xyz
+        ).mean(axis=1)
+        centre = SkyCoord(x=vec[0], y=vec[1], z=vec[2], representation_type="cartesian")
+
+        cones = [
+            (float(centre.spherical.lon.deg), float(centre.spherical.lat.deg)),
+            (ra_deg, dec_deg),
+        ]
+        radii = [
+            float(
+                np.max(angular_distance_deg(cone_ra, cone_dec, sample_ra, sample_dec))
+                + self.max_diameter_deg
+            )
+            for cone_ra, cone_dec in cones
+        ]
+        best = int(np.argmin(radii))
+        return cones[best][0], cones[best][1], radii[best]
+
+    @staticmethod
+    def get_tile_path(tile_dir: Path, pixel: int) -> Path | None:
+        """
+        Get the path of a cached tile, or None if it is not cached
+
+        :param tile_dir: Directory of tiles
+        :param pixel: HEALPix pixel
+        :return: Path of tile, or None
+        """
+        for suffix in [TILE_SUFFIX, EMPTY_TILE_SUFFIX]:
+            path = tile_dir.joinpath(f"{pixel}{suffix}")
+            if path.exists():
+                return path
+        return None
+
+    def save_tiles(self, tile_dir: Path, pixels: np.ndarray, table: Table):
+        """
+        Split a table into tiles, and save them. Tiles without rows are recorded,
+        so they are not queried again.
+
+        :param tile_dir: Directory of tiles
+        :param pixels: Pixels to save
+        :param table: Table of catalog rows, covering all the pixels
+        :return: None
+        """
+        row_pixels = np.array([], dtype=np.int64)
+        if len(table) > 0:
+            row_pixels = ang2pix_nest(
+                self.nside, np.array(table["ra"]), np.array(table["dec"])
+            )
+
+        for pixel in pixels:
+            mask = row_pixels == pixel
+            path = tile_dir.joinpath(f"{pixel}{TILE_SUFFIX}")
+            if not np.any(mask):
+                path = path.with_suffix(EMPTY_TILE_SUFFIX)
+
+            # Write to a temporary file first, so partial tiles are never read
+            temp_path = path.with_name(f".{uuid.uuid4().hex}{path.name}")
+            try:
+                if np.any(mask):
+                    table[mask].write(temp_path, format="parquet", overwrite=True)
+                else:
+                    temp_path.touch()
+                temp_path.replace(path)
+            except (TypeError, ValueError, OSError) as exc:
+                temp_path.unlink(missing_ok=True)
+                logger.warning(f"Could not save tile {path} to {self}: {exc}")
+                return
+
+    def query(  # pylint: disable=too-many-arguments,too-many-locals
+        self,
+        ra_deg: float,
+        dec_deg: float,
+        radius_deg: float,
+        tag: dict,
+        fetch_f: Callable[[float, float, float], Table],
+    ) -> Table:
+        """
+        Get all catalog rows within a cone, only fetching the tiles which
+        are not already cached
+
+        :param ra_deg: RA of cone centre
+        :param dec_deg: Dec of cone centre
+        :param radius_deg: Radius of cone in degrees
+        :param tag: Dictionary of catalog settings
+        :param fetch_f: Function to query the catalog for a cone (ra, dec, radius)
+        :return: Table of catalog rows
+        """
+        tile_dir = self.get_tile_dir(tag)
+
+        sample_ra, sample_dec = self.get_cone_samples(ra_deg, dec_deg, radius_deg)
+        sample_pixels = ang2pix_nest(self.nside, sample_ra, sample_dec)
+        pixels = np.unique(sample_pixels)
+
+        missing = np.array(
+            [x for x in pixels if self.get_tile_path(tile_dir, x) is None],
+            dtype=np.int64,
+        )
+
+        fetched = None
+
+        if len(missing) > 0:
+            mask = np.isin(sample_pixels, missing)
+            fetch_ra, fetch_dec, fetch_radius = self.get_fetch_cone(
+                ra_deg, dec_deg, sample_ra[mask], sample_dec[mask]
+            )
+
+            logger.debug(
+                f"Fetching {len(missing)}/{len(pixels)} missing tiles for "
+                f"{tag.get('abbreviation')}, with a radius of "
+                f"{fetch_radius * 60.:.2f} arcmin"
+            )
+
+            fetched = fetch_f(fetch_ra, fetch_dec, fetch_radius)
+
+            if (len(fetched) > 0) and not {"ra", "dec"}.issubset(fetched.colnames):
+                err = (
+                    f"Catalog {tag.get('abbreviation')} has no 'ra'/'dec' columns, "
+                    f"so it cannot be cached. Available columns: {fetched.colnames}"
+                )
+                logger.error(err)
+                raise CatalogCacheError(err)
+
+            self.save_tiles(tile_dir, missing, fetched)
+
+        else:
+            logger.debug(
+                f"Using {len(pixels)} cached tiles for {tag.get('abbreviation')}"
+            )
+
+        tables = []
+        for pixel in pixels:
+            path = self.get_tile_path(tile_dir, pixel)
+            if path is None:
+                # Tile could not be saved, so use the fetched rows directly
+                if (fetched is not None) and (len(fetched) > 0):
+                    tables.append(
+                        fetched[
+                            ang2pix_nest(
+                                self.nside,
+                                np.array(fetched["ra"]),
+                                np.array(fetched["dec"]),
+                            )
+                            == pixel
+                        ]
+                    )
+            elif path.suffix == TILE_SUFFIX:
+                tables.append(Table.read(path, format="parquet"))
+
+        tables = [x for x in tables if len(x) > 0]
+
+        if len(tables) == 0:
+            return Table()
+
+        table = vstack(tables, metadata_conflicts="silent")
+
+        dist = angular_distance_deg(
+            ra_deg, dec_deg, np.array(table["ra"]), np.array(table["dec"])
+        )
+        table = table[dist <= radius_deg]
+
+        logger.debug(
+            f"Found {len(table)} sources in {tag.get('abbreviation')} from {self}"
+        )
+        return table
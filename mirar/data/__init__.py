@@ -3,5 +3,5 @@
 
 from mirar.data.base_data import DataBatch, DataBlock, Dataset
 from mirar.data.cache import cache
-from mirar.data.image_data import Image, ImageBatch
+from mirar.data.image_data import Image, ImageBatch, LazyImage, SharedImage
 from mirar.data.source_data import SourceBatch, SourceTable
@@ -4,6 +4,8 @@ Central module for handling the cache, currently used only for storing image dat
 
 import logging
 import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
 import numpy as np
@@ -12,11 +14,27 @@ logger = logging.getLogger(__name__)
 
 USE_CACHE: bool = os.getenv("USE_WINTER_CACHE", "true") in ["true", "True", True]
 
+NPY_CACHE_BACKEND = "npy"
+MEMMAP_CACHE_BACKEND = "memmap"
+cache_backends = [NPY_CACHE_BACKEND, MEMMAP_CACHE_BACKEND]
+
+CACHE_BACKEND: str = os.getenv("WINTER_CACHE_BACKEND", NPY_CACHE_BACKEND).lower()
+
+# Maximum size (in bytes) of image data to keep in RAM in front of the cache files
+CACHE_RAM_BYTES: int = int(os.getenv("WINTER_CACHE_RAM_BYTES", "0"))
+
 
 class CacheError(Exception):
     """Error Relating to cache"""
 
 
+if CACHE_BACKEND not in cache_backends:
+    raise CacheError(
+        f"Unrecognised cache backend '{CACHE_BACKEND}'. "
+        f"Please set WINTER_CACHE_BACKEND to one of {cache_backends}."
+    )
+
+
 class Cache:
     """
     A cache object for storing temporary data
@@ -63,3 +81,157 @@ class Cache:
 
 
 cache = Cache()
+
+
+def save_cache_file(path: Path, data: np.ndarray):
+    """
+    Write an array to a cache (.npy) file.
+
+    The data is written to a temporary file which then replaces the cache file,
+    so any existing memmap views of the old data remain valid.
+
+    :param path: Path of cache file
+    :param data: Array to write
+    :return: None
+    """
+    temp_path = path.with_name(f"{path.stem}_{threading.get_ident()}.tmp")
+    with open(temp_path, "wb") as temp_file:
+        np.save(temp_file, data, allow_pickle=False)
+    os.replace(temp_path, path)
+
+
+class MemoryCache:
+    """
+    A bounded, size-aware, least-recently-used store of arrays held in RAM,
+    sitting in front of the on-disk cache files.
+
+    Arrays are keyed by their cache path. Arrays which have been updated
+    but not yet written to disk are marked as dirty, and are only written
+    ('spilled') to their cache file when evicted.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_RAM_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Path, tuple[np.ndarray, bool]] = OrderedDict()
+        self._lock = threading.RLock()
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def is_enabled(self) -> bool:
+        """
+        Whether the memory cache is enabled
+
+        :return: boolean
+        """
+        return self.max_bytes > 0
+
+    def get(self, path: Path) -> np.ndarray | None:
+        """
+        Get a copy of the array stored for a path, if present
+
+        :param path: Cache path
+        :return: Copy of array, or None if the array is not held in RAM
+        """
+        with self._lock:
+            if path not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(path)
+            return self._entries[path][0].copy()
+
+    def put(self, path: Path, data: np.ndarray, dirty: bool = True) -> bool:
+        """
+        Store a copy of an array in RAM, evicting older arrays if required.
+
+        :param path: Cache path
+        :param data: Array to store
+        :param dirty: Whether the array still needs to be written to the cache file
+        :return: Whether the array was stored (arrays larger than the limit are not)
+        """
+        with self._lock:
+            self._remove(path)
+
+            if data.nbytes > self.max_bytes:
+                return False
+
+            self._entries[path] = (np.array(data, copy=True), dirty)
+            self.n_bytes += data.nbytes
+
+            while self.n_bytes > self.max_bytes:
+                self._evict()
+
+        return True
+
+    def flush(self, path: Path):
+        """
+        Write an array to its cache file if it is dirty, keeping it in RAM
+
+        :param path: Cache path
+        :return: None
+        """
+        with self._lock:
+            if path in self._entries:
+                data, dirty = self._entries[path]
+                if dirty:
+                    save_cache_file(path, data)
+                    self._entries[path] = (data, False)
+
+    def remove(self, path: Path):
+        """
+        Remove an array from RAM, without writing it to disk
+
+        :param path: Cache path
+        :return: None
+        """
+        with self._lock:
+            self._remove(path)
+
+    def _remove(self, path: Path):
+        """
+        Remove an entry. The lock must already be held.
+
+        :param path: Cache path
+        :return: None
+        """
+        if path in self._entries:
+            data, _ = self._entries.pop(path)
+            self.n_bytes -= data.nbytes
+
+    def _evict(self):
+        """
+        Evict the least-recently-used entry, writing it to disk if dirty.
+        The lock is held while writing, so the file is complete before
+        anyone can look for it after a cache miss.
+
+        :return: None
+        """
+        path, (data, dirty) = self._entries.popitem(last=False)
+        self.n_bytes -= data.nbytes
+        self.evictions += 1
+        if dirty:
+            save_cache_file(path, data)
+
+    def get_stats(self) -> dict:
+        """
+        Get the usage statistics for the memory cache
+
+        :return: Dictionary of statistics
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "n_entries": len(self._entries),
+                "n_bytes": self.n_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def __str__(self):
+        return f"A memory cache, with stats {self.get_stats()}"
+
+
+ram_cache = MemoryCache()
@@ -0,0 +1,344 @@
+"""
+Module for a persistent, cross-night store of master calibration images
+(e.g. master biases, darks, flats or skies).
+
+By default, a :class:`~mirar.processors.base_processor.ProcessorWithCache` only
+looks for a previously-made master image in the calibration directory of the night
+being processed. A :class:`~mirar.data.calibration_store.CalibrationStore` instead
+keeps a copy of every master image it is given in a single directory per instrument,
+with an SQLite index recording:
+
+* a hash of the content of the input images used to make the master
+* the filter, exposure time and detector of the input images
+* any other header values used to match the master to science images, including
+  the fields of any :class:`~mirar.processors.utils.cal_hunter.CalRequirement`
+  registered with the store
+* a validity window, centred on the time of the input images
+
+A master can then be reused on later nights, either if exactly the same input images
+are found again (e.g. by :class:`~mirar.processors.utils.cal_hunter.CalHunter`), or
+if no input images are available but a valid master with matching header values is.
+Masters are only ever matched to images from the same detector.
+"""
+
+import hashlib
+import json
+import logging
+import shutil
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from astropy.io.fits import Header
+from astropy.time import Time
+
+from mirar.data.image_data import Image
+from mirar.paths import (
+    BASE_NAME_KEY,
+    EXPTIME_KEY,
+    FILTER_KEY,
+    PROC_HISTORY_KEY,
+    RAW_IMG_KEY,
+    TIME_KEY,
+    base_output_dir,
+)
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_STORE_DIR = "calibration_store"
+CALIBRATION_STORE_INDEX = "index.sqlite"
+DEFAULT_DETECTOR_KEY = "BOARD_ID"
+
+
+def get_header_mjd(header: Header) -> float:
+    """
+    Get the MJD of an image from its header, or the current MJD if unavailable
+
+    :param header: Image header
+    :return: MJD
+    """
+    try:
+        return float(Time(header[TIME_KEY]).mjd)
+    except (KeyError, ValueError):
+        return float(Time.now().mjd)
+
+
+class CalibrationStore:
+    """
+    Persistent store of master calibration images, indexed in SQLite
+    """
+
+    def __init__(
+        self,
+        instrument: str,
+        output_dir: Path = base_output_dir,
+        detector_key: str = DEFAULT_DETECTOR_KEY,
+    ):
+        self.store_dir = Path(output_dir).joinpath(instrument, CALIBRATION_STORE_DIR)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.store_dir.joinpath(CALIBRATION_STORE_INDEX)
+        self.detector_key = detector_key
+        self.requirements: dict[str, dict[str, list[str]]] = {}
+        self._lock = threading.Lock()
+        self.create_index()
+
+    def __str__(self):
+        return f"<A calibration store, with path {self.store_dir}>"
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Open a new connection to the index.
+        A new connection is used for each operation, so the store is thread-safe.
+
+        :return: SQLite connection
+        """
+        return sqlite3.connect(self.index_path, timeout=60.0)
+
+    def create_index(self):
+        """
+        Create the index table, if it does not already exist
+
+        :return: None
+        """
+        with closing(self.connect()) as conn:
+            with conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS masters (
+                        cal_type TEXT NOT NULL,
+                        input_hash TEXT NOT NULL,
+                        path TEXT NOT NULL,
+                        filter TEXT,
+                        exptime REAL,
+                        detector TEXT,
+                        match_values TEXT NOT NULL,
+                        obs_mjd REAL NOT NULL,
+                        valid_from REAL NOT NULL,
+                        valid_until REAL NOT NULL,
+                        created TEXT NOT NULL,
+                        PRIMARY KEY (cal_type, input_hash)
+                    )
+                    """
+                )
+
+    def get_detector(self, header: Header) -> str | None:
+        """
+        Get the detector of an image, using the detector key of the store
+
+        :param header: Image header
+        :return: Detector, or None if the header does not specify one
+        """
+        if self.detector_key in header:
+            return str(header[self.detector_key])
+        return None
+
+    def get_input_hash(self, images: list[Image]) -> str:
+        """
+        Get a hash identifying the input images used to make a master.
+
+        The hash covers the name, processing history, filter, exposure time and
+        detector of each image, along with the path, size and modification time
+        of its raw file, so reprocessed or re-transferred raw files with the same
+        names do not map to a stale master. Only if the raw file is not available
+        is the pixel data hashed instead.
+
+        :param images: Input images
+        :return: Hash
+        """
+        image_hashes = []
+        for image in images:
+            header = image.get_header()
+            image_hash = hashlib.sha1()
+            for key in [BASE_NAME_KEY, PROC_HISTORY_KEY, FILTER_KEY, EXPTIME_KEY]:
+                image_hash.update(f"{key}={header.get(key)};".encode())
+            image_hash.update(f"detector={self.get_detector(header)};".encode())
+
+            raw_path = Path(str(header.get(RAW_IMG_KEY, "")))
+            if raw_path.is_file():
+                stat = raw_path.stat()
+                image_hash.update(
+                    f"{raw_path.resolve()};{stat.st_size};{stat.st_mtime_ns}".encode()
+                )
+            else:
+                logger.debug(
+                    f"Raw file {raw_path} not found, so hashing the image data instead"
+                )
+                image_hash.update(np.ascontiguousarray(image.get_data()).view(np.uint8))
+
+            image_hashes.append(image_hash.hexdigest())
+
+        return hashlib.sha1("".join(sorted(image_hashes)).encode()).hexdigest()
+
+    def register_requirement(
+        self, cal_type: str, required_field: str, required_values: str | list[str]
+    ):
+        """
+        Register a requirement on masters of a given type, e.g. from a
+        :class:`~mirar.processors.utils.cal_hunter.CalRequirement`.
+        The required field is then recorded for every new master of that type.
+
+        :param cal_type: Type of calibration (e.g. 'flat')
+        :param required_field: Header key
+        :param required_values: Accepted values of the header key
+        :return: None
+        """
+        if isinstance(required_values, str):
+            required_values = [required_values]
+        values = self.requirements.setdefault(cal_type, {}).setdefault(
+            required_field, []
+        )
+        for value in required_values:
+            if str(value) not in values:
+                values.append(str(value))
+
+    def get_requirements(self, cal_type: str) -> dict[str, list[str]]:
+        """
+        Get the requirements registered for a given type of calibration
+
+        :param cal_type: Type of calibration (e.g. 'flat')
+        :return: dictionary of header keys and accepted values
+        """
+        return dict(self.requirements.get(cal_type, {}))
+
+    def get_store_path(self, cal_type: str, file_name: str) -> Path:
+        """
+        Get the path where a master image is kept in the store
+
+        :param cal_type: Type of calibration (e.g. 'flat')
+        :param file_name: Name of the master image
+        :return: Path
+        """
+        path = self.store_dir.joinpath(cal_type, file_name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def add(  # pylint: disable=too-many-arguments,too-many-locals
+        self,
+        cal_type: str,
+        input_hash: str,
+        master_path: Path,
+        input_headers: list[Header],
+        match_keys: list[str] | None = None,
+        validity_days: float = 30.0,
+    ) -> Path:
+        """
+        Add a master image to the store, copying it into the store directory if needed
+
+        :param cal_type: Type of calibration (e.g. 'flat')
+        :param input_hash: Hash of the input images used to make the master,
+            from :meth:`get_input_hash`
+        :param master_path: Path of the saved master image
+        :param input_headers: Headers of the input images used to make the master
+        :param match_keys: Header keys to use for matching the master to images,
+            in addition to the filter, exposure time and any registered keys
+        :param validity_days: Half-width of the validity window, in days
+        :return: Path of master image in the store
+        """
+        master_path = Path(master_path)
+        store_path = self.get_store_path(cal_type, master_path.name)
+
+        if master_path.resolve() != store_path.resolve():
+            shutil.copyfile(master_path, store_path)
+
+        header = input_headers[0]
+
+        match_values = {}
+        all_keys = (
+            [FILTER_KEY, EXPTIME_KEY]
+            + list(match_keys or [])
+            + list(self.get_requirements(cal_type))
+        )
+        for key in all_keys:
+            if key in header:
+                match_values[key] = str(header[key])
+
+        obs_mjd = float(np.mean([get_header_mjd(x) for x in input_headers]))
+
+        exptime = header.get(EXPTIME_KEY)
+        detector = self.get_detector(header)
+
+        with self._lock, closing(self.connect()) as conn:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO masters VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                    (
+                        cal_type,
+                        input_hash,
+                        store_path.as_posix(),
+                        match_values.get(FILTER_KEY),
+                        float(exptime) if exptime is not None else None,
+                        detector,
+                        json.dumps(match_values),
+                        obs_mjd,
+                        obs_mjd - validity_days,
+                        obs_mjd + validity_days,
+                        datetime.now().isoformat(),
+                    ),
+                )
+
+        logger.debug(f"Added {cal_type} master {store_path} to {self}")
+
+        return store_path
+
+    def find_by_hash(self, cal_type: str, input_hash: str) -> Path | None:
+        """
+        Find a master image made from exactly the same input images
+
+        :param cal_type: Type of calibration (e.g. 'flat')
+        :param input_hash: Hash of the input images
+        :return: Path of master image, or None
+        """
+        with closing(self.connect()) as conn:
+            row = conn.execute(
+                "SELECT path FROM masters WHERE cal_type = ? AND input_hash = ?",
+                (cal_type, input_hash),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        path = Path(row[0])
+        if not path.exists():
+            logger.warning(f"Master {path} is in {self}, but the file is missing.")
+            return None
+
+        return path
+
+    def find_matching(
+        self,
+        cal_type: str,
+        match_values: dict[str, str],
+        mjd: float,
+        detector: str | None = None,
+    ) -> Path | None:
+        """
+        Find the valid master image closest in time, from the same detector
+        and with matching header values. Ties are broken by the newest master.
+
+        :param cal_type: Type of calibration (e.g. 'flat')
+        :param match_values: Header values which must match
+        :param mjd: MJD at which the master must be valid
+        :param detector: Detector of the images, from :meth:`get_detector`
+        :return: Path of master image, or None
+        """
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                "SELECT path, match_values FROM masters "
+                "WHERE cal_type = ? AND detector IS ? "
+                "AND valid_from <= ? AND valid_until >= ? "
+                "ORDER BY ABS(obs_mjd - ?), created DESC",
+                (cal_type, detector, mjd, mjd, mjd),
+            ).fetchall()
+
+        for path, stored_values in rows:
+            stored_values = json.loads(stored_values)
+            if all(
+                stored_values.get(key) == str(val) for key, val in match_values.items()
+            ):
+                if Path(path).exists():
+                    return Path(path)
+
+        return None
@@ -51,6 +51,45 @@ You can change this via an environment variable.
 
     export USE_WINTER_CACHE = false
 
+By default, every call to `get_data()` in cache mode reads the full npy file from
+disk, and every call to `set_data()` rewrites it. You can instead select the
+**memmap** cache backend:
+
+.. code-block:: bash
+
+    export WINTER_CACHE_BACKEND = memmap
+
+In that case, `get_data()` returns a copy-on-write `numpy.memmap` of the cache file.
+Pixels are only paged in from disk when they are actually read, and repeated calls
+share the same page cache rather than allocating a fresh array each time.
+If a processor modifies the returned array, only the modified pages are copied
+into private memory, so the cache file itself is never altered in place.
+New data passed to `set_data()` is written to a fresh file, which then atomically
+replaces the old one, so any views which are still held remain valid.
+
+Finally, you can keep the most recently used images in RAM, in front of the
+cache files, by setting a memory limit (in bytes):
+
+.. code-block:: bash
+
+    export WINTER_CACHE_RAM_BYTES = 4000000000
+
+Images are then only written to their cache file once they are evicted to stay
+within that limit. The hit/miss/eviction statistics are available via
+`mirar.data.cache.ram_cache.get_stats()`.
+
+Raw images can also be opened lazily, as a
+:class:`~mirar.data.image_data.LazyImage`. In that case only the header is read
+when the image is opened, and the pixel data is only read (and converted to
+the working dtype, see :mod:`mirar.data.precision`) the first time `get_data()`
+is called. Processors which only need the header, such as selectors or batchers,
+then never read the pixel data at all.
+
+Finally, an image can be shared without copying its pixel data, as a
+:class:`~mirar.data.image_data.SharedImage`. This reads the data of a source image
+until it is modified, so e.g. the realtime monitor can hand the same calibration
+images to every reduction.
+
 See :doc:`usage` for more information about selecting cache mode,
 and setting the output data directory.
 """
@@ -58,16 +97,27 @@ and setting the output data directory.
 import copy
 import hashlib
 import logging
+import os
+import shutil
 import threading
+import uuid
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 
 import numpy as np
 from astropy.io.fits import Header
 from astropy.time import Time
 
 from mirar.data.base_data import DataBatch, DataBlock
-from mirar.data.cache import USE_CACHE, cache
+from mirar.data.cache import (
+    CACHE_BACKEND,
+    MEMMAP_CACHE_BACKEND,
+    USE_CACHE,
+    cache,
+    ram_cache,
+    save_cache_file,
+)
+from mirar.data.precision import WORKING_DTYPE, get_working_dtype, limit_precision
 
 logger = logging.getLogger(__name__)
 
@@ -80,13 +130,23 @@ class Image(DataBlock):
     This class serves as input for
     :class:`~mirar.processors.base_processor.BaseImageProcessor` and
     :class:`~mirar.processors.base_processor.BaseCandidateGenerator` processors.
+
+    Floating-point data is never stored with more precision than the working dtype
+    of the image (see :mod:`mirar.data.precision`).
     """
 
     cache_files = []
 
-    def __init__(self, data: np.ndarray, header: Header):
+    def __init__(
+        self,
+        data: np.ndarray,
+        header: Header,
+        dtype: Optional[np.dtype | type | str] = None,
+    ):
         self._data = None
         self.header = header
+        self.dtype = None if dtype is None else get_working_dtype(dtype)
+        self.handoff_path = None
         super().__init__()
         if USE_CACHE:
             self.cache_path = self.get_cache_path()
@@ -103,10 +163,28 @@ class Image(DataBlock):
 
         :return: unique cache file path
         """
-        base = "".join([str(Time.now()), self.get_name(), str(threading.get_ident())])
+        base = "".join(
+            [
+                str(Time.now()),
+                self.get_name(),
+                str(os.getpid()),
+                str(threading.get_ident()),
+                uuid.uuid4().hex,
+            ]
+        )
         name = f"{hashlib.sha1(base.encode()).hexdigest()}.npy"
         return cache.get_cache_dir().joinpath(name)
 
+    def get_working_dtype(self) -> np.dtype:
+        """
+        Get the working dtype of the image
+
+        :return: working dtype
+        """
+        if self.dtype is None:
+            return WORKING_DTYPE
+        return self.dtype
+
     def set_data(self, data: np.ndarray):
         """
         Set the data with cache
@@ -114,6 +192,7 @@ class Image(DataBlock):
         :param data: Updated image data
         :return: None
         """
+        data = limit_precision(data, self.get_working_dtype())
         if USE_CACHE:
             self.set_cache_data(data)
         else:
@@ -126,7 +205,11 @@ class Image(DataBlock):
         :param data: Updated image data
         :return: None
         """
-        np.save(self.cache_path.as_posix(), data, allow_pickle=False)
+        if ram_cache.is_enabled():
+            if ram_cache.put(self.cache_path, data, dirty=True):
+                return
+
+        save_cache_file(self.cache_path, data)
 
     def set_ram_data(self, data: np.ndarray):
         """
@@ -163,7 +246,34 @@ class Image(DataBlock):
 
         :return: image data (numpy array)
         """
-        return np.load(self.cache_path.as_posix(), allow_pickle=True)
+        if ram_cache.is_enabled():
+            data = ram_cache.get(self.cache_path)
+            if data is not None:
+                return data
+
+        if CACHE_BACKEND == MEMMAP_CACHE_BACKEND:
+            return self.get_memmap_data()
+
+        data = np.load(self.cache_path.as_posix(), allow_pickle=True)
+        if ram_cache.is_enabled():
+            ram_cache.put(self.cache_path, data, dirty=False)
+        return data
+
+    def get_memmap_data(self, read_only: bool = False) -> np.memmap:
+        """
+        Get the image data from cache, as a memory-mapped array.
+
+        By default the array is copy-on-write, so it can be modified freely
+        without changing the cache file. If read_only is True, any attempt
+        to modify the array will raise an error instead.
+
+        :param read_only: Whether to return a read-only view
+        :return: image data (numpy memmap)
+        """
+        # Any newer data held in RAM must be on disk before mapping the file
+        ram_cache.flush(self.cache_path)
+        mmap_mode = "r" if read_only else "c"
+        return np.load(self.cache_path.as_posix(), mmap_mode=mmap_mode)
 
     def get_ram_data(self) -> np.ndarray:
         """
@@ -206,22 +316,336 @@ class Image(DataBlock):
 
     def __del__(self):
         if self.cache_path is not None:
+            ram_cache.remove(self.cache_path)
             self.cache_path.unlink(missing_ok=True)
             self.cache_files.remove(self.cache_path)
 
+    def prepare_handoff(self, link: bool = True) -> Optional[Path]:
+        """
+        Prepare to send the image to another process, without pickling its data.
+
+        If `link` is True, the cache file is hard-linked to a new cache path.
+        The image itself is unaffected, and the caller must call
+        :meth:`release_handoff` once the receiver has finished, whether or not
+        the image was ever unpickled. Otherwise, the cache file itself is handed
+        over, and the image gives up ownership of it (e.g. for results which are
+        no longer needed by the sender).
+
+        The next time the image is pickled, the unpickled image owns the handoff
+        path. Without a handoff, the pixel data is pickled instead.
+
+        :param link: Whether to link the cache file, rather than hand it over
+        :return: Path owned by the unpickled image, or None
+        """
+        if (self.cache_path is None) or (self.handoff_path is not None):
+            return self.handoff_path
+
+        ram_cache.flush(self.cache_path)
+
+        if link:
+            self.handoff_path = self.get_cache_path()
+            try:
+                os.link(self.cache_path, self.handoff_path)
+            except OSError:
+                shutil.copyfile(self.cache_path, self.handoff_path)
+        else:
+            ram_cache.remove(self.cache_path)
+            self.cache_files.remove(self.cache_path)
+            self.handoff_path = self.cache_path
+            self.cache_path = None
+
+        return self.handoff_path
+
+    def release_handoff(self):
+        """
+        Release a handoff made with :meth:`prepare_handoff`, deleting the linked
+        cache file unless it is now owned by an image in this process
+
+        :return: None
+        """
+        if self.handoff_path is None:
+            return
+        if (self.handoff_path != self.cache_path) and (
+            self.handoff_path not in self.cache_files
+        ):
+            self.handoff_path.unlink(missing_ok=True)
+        self.handoff_path = None
+
+    def __getstate__(self) -> dict:
+        """
+        Get the state of the image for pickling, e.g. to send it to another process.
+
+        In cache mode, if a handoff has been prepared with :meth:`prepare_handoff`,
+        the pixel data is not pickled. Instead, the unpickled image owns the
+        handoff path. Otherwise, the pixel data is pickled, and the unpickled
+        image writes its own cache file. Pickling never creates files, so
+        pickles which are never unpickled do not leave anything in the cache.
+
+        :return: state dictionary
+        """
+        state = self.__dict__.copy()
+        state["handoff_path"] = None
+        if self.handoff_path is not None:
+            state["cache_path"] = self.handoff_path
+        elif self.cache_path is not None:
+            state["cache_path"] = None
+            state["_data"] = np.asarray(self.get_data())
+        return state
+
+    def __setstate__(self, state: dict):
+        """
+        Restore the state of a pickled image
+
+        :param state: state dictionary
+        :return: None
+        """
+        self.__dict__.update(state)
+        if self.cache_path is not None:
+            self.cache_files.append(self.cache_path)
+        elif USE_CACHE and (self._data is not None):
+            data, self._data = self._data, None
+            self.cache_path = self.get_cache_path()
+            self.cache_files.append(self.cache_path)
+            self.set_data(data)
+
     def __deepcopy__(self, memo):
+        data = self.get_data()
+        # In cache mode, get_data never returns the stored array itself,
+        # and the new image writes its own cache file, so no copy is needed
+        if not USE_CACHE:
+            data = copy.deepcopy(data)
         new = type(self)(
-            data=copy.deepcopy(self.get_data()), header=copy.deepcopy(self.get_header())
+            data=data, header=copy.deepcopy(self.get_header()), dtype=self.dtype
         )
         return new
 
     def __copy__(self):
         new = type(self)(
-            data=self.get_data().__copy__(), header=self.get_header().__copy__()
+            data=self.get_data().__copy__(),
+            header=self.get_header().__copy__(),
+            dtype=self.dtype,
         )
         return new
 
 
+class LazyImage(Image):
+    """
+    A subclass of :class:`~mirar.data.image_data.Image`, for which only the
+    header is held up front. The pixel data is only loaded, by calling `loader`,
+    the first time it is needed.
+
+    The loader should be picklable (e.g. a :func:`functools.partial` of a
+    module-level function), so that unloaded images can be sent to other processes.
+    """
+
+    def __init__(
+        self,
+        header: Header,
+        loader: Callable[[], np.ndarray],
+        dtype: Optional[np.dtype | type | str] = None,
+    ):
+        self.loader = loader
+        super().__init__(data=None, header=header, dtype=dtype)
+
+    def is_loaded(self) -> bool:
+        """
+        Check whether the pixel data has been loaded
+
+        :return: boolean
+        """
+        return self.loader is None
+
+    def load(self):
+        """
+        Load the pixel data, if this has not already been done
+
+        :return: None
+        """
+        if not self.is_loaded():
+            logger.debug(f"Loading pixel data for {self.get_name()}")
+            self.set_data(self.loader())
+
+    def set_data(self, data: np.ndarray | None):
+        """
+        Set the data, after which the loader is no longer used
+
+        :param data: Updated image data
+        :return: None
+        """
+        if (data is None) and (not self.is_loaded()):
+            # No data yet, so nothing to store until it is loaded
+            return
+        self.loader = None
+        super().set_data(data)
+
+    def get_data(self) -> np.ndarray:
+        self.load()
+        return super().get_data()
+
+    def get_memmap_data(self, read_only: bool = False) -> np.memmap:
+        self.load()
+        return super().get_memmap_data(read_only=read_only)
+
+    def prepare_handoff(self, link: bool = True) -> Optional[Path]:
+        if not self.is_loaded():
+            # There is no cache file yet, so there is nothing to hand over
+            return None
+        return super().prepare_handoff(link=link)
+
+    def __getstate__(self) -> dict:
+        if self.is_loaded():
+            return super().__getstate__()
+
+        # There is no cache file yet, so the receiver just needs its own path
+        state = self.__dict__.copy()
+        state["handoff_path"] = None
+        if self.cache_path is not None:
+            state["cache_path"] = self.get_cache_path()
+        return state
+
+    def __deepcopy__(self, memo):
+        if self.is_loaded():
+            data = self.get_data()
+            if not USE_CACHE:
+                data = copy.deepcopy(data)
+            return Image(
+                data=data, header=copy.deepcopy(self.get_header()), dtype=self.dtype
+            )
+        return LazyImage(
+            header=copy.deepcopy(self.get_header()),
+            loader=self.loader,
+            dtype=self.dtype,
+        )
+
+    def __copy__(self):
+        if self.is_loaded():
+            return Image(
+                data=self.get_data().__copy__(),
+                header=self.get_header().__copy__(),
+                dtype=self.dtype,
+            )
+        return LazyImage(
+            header=self.get_header().__copy__(), loader=self.loader, dtype=self.dtype
+        )
+
+
+class SharedImage(Image):
+    """
+    A subclass of :class:`~mirar.data.image_data.Image`, which shares the pixel
+    data of a source image until it is modified (copy-on-write).
+
+    The header is copied, but the data is read directly from the source image.
+    In cache mode, that means from the cache file of the source (as a copy-on-write
+    memmap for the memmap backend), so no data is copied until it is used.
+    Without a cache, the data is copied the first time it is read. Once new
+    data is set, the image stores it independently, like any other image.
+
+    The source image is referenced by each shared image, so it (and its cache
+    file) remains available for as long as any shared image still needs it.
+    The source image itself should not be modified while it is shared.
+    """
+
+    def __init__(self, source: Image, header: Optional[Header] = None):
+        if header is None:
+            header = source.get_header().copy()
+        self.source = source
+        super().__init__(data=None, header=header, dtype=source.dtype)
+        if self.cache_path is not None:
+            # Not used until the image has its own data
+            self.cache_files.remove(self.cache_path)
+            self.cache_path = None
+
+    def is_shared(self) -> bool:
+        """
+        Check whether the pixel data is still shared with the source image
+
+        :return: boolean
+        """
+        return self.source is not None
+
+    def set_data(self, data: np.ndarray | None):
+        """
+        Set the data, after which it is no longer shared with the source image
+
+        :param data: Updated image data
+        :return: None
+        """
+        if (data is None) and self.is_shared():
+            # Still sharing the source data, so nothing to store
+            return
+        if self.is_shared():
+            self.source = None
+            if USE_CACHE:
+                self.cache_path = self.get_cache_path()
+                self.cache_files.append(self.cache_path)
+        super().set_data(data)
+
+    def get_data(self) -> np.ndarray:
+        if not self.is_shared():
+            return super().get_data()
+
+        if not USE_CACHE:
+            data = np.array(self.source.get_data())
+            self.set_data(data)
+            return data
+
+        data = self.source.get_memmap_data()
+        if CACHE_BACKEND != MEMMAP_CACHE_BACKEND:
+            data = np.array(data)
+        return data
+
+    def get_memmap_data(self, read_only: bool = False) -> np.memmap:
+        if self.is_shared():
+            return self.source.get_memmap_data(read_only=read_only)
+        return super().get_memmap_data(read_only=read_only)
+
+    def __deepcopy__(self, memo):
+        if self.is_shared():
+            return SharedImage(self.source, header=copy.deepcopy(self.get_header()))
+        data = self.get_data()
+        if not USE_CACHE:
+            data = copy.deepcopy(data)
+        return Image(
+            data=data, header=copy.deepcopy(self.get_header()), dtype=self.dtype
+        )
+
+    def __copy__(self):
+        if self.is_shared():
+            return SharedImage(self.source, header=self.get_header().__copy__())
+        return Image(
+            data=self.get_data().__copy__(),
+            header=self.get_header().__copy__(),
+            dtype=self.dtype,
+        )
+
+
+def prepare_handoffs(batch: DataBatch, link: bool = True):
+    """
+    Prepare the images of a batch to be sent to another process,
+    see :meth:`~mirar.data.image_data.Image.prepare_handoff`
+
+    :param batch: Batch to send
+    :param link: Whether to link the cache files, rather than hand them over
+    :return: None
+    """
+    for block in batch:
+        if isinstance(block, Image):
+            block.prepare_handoff(link=link)
+
+
+def release_handoffs(batch: DataBatch):
+    """
+    Release the handoffs of the images of a batch,
+    see :meth:`~mirar.data.image_data.Image.release_handoff`
+
+    :param batch: Batch which was sent
+    :return: None
+    """
+    for block in batch:
+        if isinstance(block, Image):
+            block.release_handoff()
+
+
 class ImageBatch(DataBatch):
     """
     A subclass of :class:`~mirar.data.base_data.DataBatch`,
@@ -0,0 +1,111 @@
+"""
+Module for the floating-point precision (working dtype) of image data.
+
+By default, raw images are converted to float64 when they are opened.
+The working dtype can instead be set to float32, which halves the memory used
+for image data, the size of the cache, and the size of the temporary files
+passed to external software such as SExtractor and Swarp:
+
+.. code-block:: bash
+
+    export WINTER_WORKING_DTYPE = float32
+
+Individual instruments can also opt in to a working dtype, by passing `dtype`
+when opening raw images (see :func:`mirar.io.open_raw_image`).
+
+An :class:`~mirar.data.image_data.Image` never stores floating-point data with
+more precision than its working dtype, so the output of each processor is
+converted back automatically. Steps which need extra precision, such as stacking
+or ZOGY, should upcast locally with :func:`upcast`.
+"""
+
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FLOAT32_DTYPE = "float32"
+FLOAT64_DTYPE = "float64"
+working_dtypes = [FLOAT32_DTYPE, FLOAT64_DTYPE]
+
+
+class PrecisionError(Exception):
+    """Error relating to the working dtype"""
+
+
+def get_working_dtype(dtype: Optional[np.dtype | type | str] = None) -> np.dtype:
+    """
+    Get a working dtype, defaulting to the one set by the environment
+
+    :param dtype: Working dtype (or None to use the default)
+    :return: Working dtype
+    """
+    if dtype is None:
+        dtype = os.getenv("WINTER_WORKING_DTYPE", FLOAT64_DTYPE).lower()
+
+    dtype = np.dtype(dtype)
+    if dtype.name not in working_dtypes:
+        err = (
+            f"Unrecognised working dtype '{dtype}'. "
+            f"Please select one of {working_dtypes}."
+        )
+        logger.error(err)
+        raise PrecisionError(err)
+    return dtype
+
+
+WORKING_DTYPE: np.dtype = get_working_dtype()
+
+
+def to_working_dtype(
+    data: np.ndarray, dtype: Optional[np.dtype | type | str] = None
+) -> np.ndarray:
+    """
+    Convert raw data to the working dtype
+
+    :param data: Raw data
+    :param dtype: Working dtype (or None to use the default)
+    :return: New array of the data in the working dtype
+    """
+    if dtype is None:
+        dtype = WORKING_DTYPE
+    return np.asarray(data).astype(get_working_dtype(dtype))
+
+
+def limit_precision(
+    data: Optional[np.ndarray], dtype: Optional[np.dtype | type | str] = None
+) -> Optional[np.ndarray]:
+    """
+    Reduce the precision of floating-point data to the working dtype, if needed.
+    Other data (e.g. integers or booleans) is returned unchanged.
+
+    :param data: Data
+    :param dtype: Working dtype (or None to use the default)
+    :return: Data with at most the precision of the working dtype
+    """
+    if dtype is None:
+        dtype = WORKING_DTYPE
+    else:
+        dtype = get_working_dtype(dtype)
+
+    if (
+        isinstance(data, np.ndarray)
+        and np.issubdtype(data.dtype, np.floating)
+        and (data.dtype.itemsize > dtype.itemsize)
+    ):
+        return data.astype(dtype)
+    return data
+
+
+def upcast(data: np.ndarray) -> np.ndarray:
+    """
+    Get float64 data, for steps which need extra precision.
+    Data that is already float64 is returned without copying.
+
+    :param data: Data
+    :return: float64 data
+    """
+    return np.asarray(data, dtype=np.float64)
@@ -10,4 +10,11 @@ from mirar.data.utils.coords import (
     get_xy_from_wcs,
     write_regions_file,
 )
+from mirar.data.utils.cutouts import (
+    CutoutError,
+    CutoutExtractor,
+    check_cutout_positions,
+    make_cutout_stack,
+)
 from mirar.data.utils.plot_image import plot_fits_image
+from mirar.data.utils.stacking import FrameStacker, get_stack_source
@@ -0,0 +1,182 @@
+"""
+Module for extracting cutouts (stamps) of many sources from a set of images.
+
+Each image is opened once (memory-mapped where possible), and the stamps of all
+sources are sliced from it in a single pass. Stamps beyond the edge of an image
+are padded with zeros. Encoding stamps (e.g. to compressed bytes for alerts)
+can be done on a pool of worker threads.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+from astropy.io import fits
+
+from mirar.data.image_data import Image
+from mirar.data.utils.compress import encode_img
+from mirar.data.utils.stacking import get_stack_source
+from mirar.errors import ProcessorError
+from mirar.paths import max_n_cpu
+
+logger = logging.getLogger(__name__)
+
+
+class CutoutError(ProcessorError):
+    """
+    Error raised when cutout generation fails
+    """
+
+
+def check_cutout_positions(
+    image_shape: tuple[int, int], x_pos: np.ndarray, y_pos: np.ndarray
+):
+    """
+    Check that cutout positions are within an image
+
+    :param image_shape: shape of the image
+    :param x_pos: x coordinates of the centers of the cutouts
+    :param y_pos: y coordinates of the centers of the cutouts
+    :return: None
+    """
+    y_image_size, x_image_size = image_shape
+    outside = (
+        (x_pos < 0) | (x_pos > x_image_size) | (y_pos < 0) | (y_pos > y_image_size)
+    )
+    if np.any(outside):
+        bad_positions = list(zip(x_pos[outside], y_pos[outside]))
+        raise CutoutError(f"Cutout positions {bad_positions} are outside the image")
+
+
+def make_cutout_stack(
+    data: np.ndarray, x_pos: np.ndarray, y_pos: np.ndarray, half_size: int
+) -> np.ndarray:
+    """
+    Function to make cutouts of many sources from a single image at once.
+    Cutouts are padded with zeros beyond the edges of the image,
+    as in :func:`~mirar.processors.photometry.utils.make_cutouts`.
+
+    Only the pixels within the cutouts are read, so the image can be
+    a memory-mapped array.
+
+    :param data: 2D numpy array of the image
+    :param x_pos: integer x coordinates of the centers of the cutouts
+    :param y_pos: integer y coordinates of the centers of the cutouts
+    :param half_size: half_size of the square cutouts
+    :return: 3D numpy array of cutouts, with shape (n_src, 2*half_size+1, 2*half_size+1)
+    """
+    x_pos = np.atleast_1d(np.asarray(x_pos, dtype=int))
+    y_pos = np.atleast_1d(np.asarray(y_pos, dtype=int))
+    check_cutout_positions(np.shape(data), x_pos, y_pos)
+
+    y_image_size, x_image_size = np.shape(data)
+
+    offsets = np.arange(-half_size, half_size + 1)
+    rows = y_pos[:, None] + offsets[None, :]
+    cols = x_pos[:, None] + offsets[None, :]
+    valid_rows = (rows >= 0) & (rows < y_image_size)
+    valid_cols = (cols >= 0) & (cols < x_image_size)
+
+    cutouts = data[
+        np.clip(rows, 0, y_image_size - 1)[:, :, None],
+        np.clip(cols, 0, x_image_size - 1)[:, None, :],
+    ]
+    valid = valid_rows[:, :, None] & valid_cols[:, None, :]
+    return np.where(valid, cutouts, np.zeros((), dtype=cutouts.dtype))
+
+
+class CutoutExtractor:
+    """
+    Class to extract cutouts of many sources from a set of images,
+    opening each image only once.
+
+    Images can be given as paths of FITS files (which are memory-mapped),
+    :class:`~mirar.data.image_data.Image` objects, or numpy arrays.
+    """
+
+    def __init__(
+        self,
+        images: list[str | Path | Image | np.ndarray],
+        half_size: int,
+        max_workers: int = max_n_cpu,
+    ):
+        self.images = images
+        self.half_size = half_size
+        self.max_workers = max(int(max_workers), 1)
+        self._data = [None] * len(images)
+
+    def get_image_data(self, index: int) -> np.ndarray:
+        """
+        Get the data of an image, opening it on first use
+
+        :param index: index of the image
+        :return: 2D (possibly memory-mapped) array of image data
+        """
+        if self._data[index] is None:
+            image = self.images[index]
+            if isinstance(image, Image):
+                data = get_stack_source(image)
+            elif isinstance(image, np.ndarray):
+                data = image
+            else:
+                logger.debug(f"Memory-mapping {image} for cutouts")
+                data = fits.getdata(image, memmap=True)
+            self._data[index] = data
+        return self._data[index]
+
+    def get_cutouts(self, x_pos: np.ndarray, y_pos: np.ndarray) -> list[np.ndarray]:
+        """
+        Get cutouts of all sources from each image
+
+        :param x_pos: integer x coordinates of the sources
+        :param y_pos: integer y coordinates of the sources
+        :return: for each image, 3D array of cutouts with shape (n_src, h, w)
+        """
+        return [
+            make_cutout_stack(
+                self.get_image_data(i), x_pos, y_pos, half_size=self.half_size
+            )
+            for i in range(len(self.images))
+        ]
+
+    def encode_cutouts(
+        self,
+        cutouts: list[np.ndarray],
+        encoder: Callable[[np.ndarray], object] = encode_img,
+    ) -> list[list]:
+        """
+        Encode stamps on a pool of worker threads
+
+        :param cutouts: for each image, 3D array of cutouts
+        :param encoder: function to encode a single 2D stamp
+        :return: for each image, list of encoded stamps
+        """
+        stamps = [stamp for image_cutouts in cutouts for stamp in image_cutouts]
+
+        if (self.max_workers == 1) | (len(stamps) < 2):
+            encoded = [encoder(stamp) for stamp in stamps]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                encoded = list(executor.map(encoder, stamps))
+
+        n_src = [len(x) for x in cutouts]
+        splits = np.cumsum(n_src)[:-1]
+        return [list(x) for x in np.split(np.array(encoded, dtype=object), splits)]
+
+    def get_encoded_cutouts(
+        self,
+        x_pos: np.ndarray,
+        y_pos: np.ndarray,
+        encoder: Callable[[np.ndarray], object] = encode_img,
+    ) -> list[list]:
+        """
+        Get encoded cutouts of all sources from each image
+
+        :param x_pos: integer x coordinates of the sources
+        :param y_pos: integer y coordinates of the sources
+        :param encoder: function to encode a single 2D stamp
+        :return: for each image, list of encoded stamps
+        """
+        return self.encode_cutouts(self.get_cutouts(x_pos, y_pos), encoder=encoder)
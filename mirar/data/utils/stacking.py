@@ -0,0 +1,213 @@
+"""
+Module for combining many frames into a single master frame (e.g. a master flat),
+without holding a full (n_frames, nx, ny) cube in memory.
+
+Frames are combined in tiles of rows. Each tile is read directly from the
+image cache (as a memory-mapped npy file), so only one tile of each frame needs
+to be in memory at once. Tiles can be combined in parallel, and in a reduced
+working precision (e.g. float32).
+"""
+
+import logging
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from astropy.stats import sigma_clip
+
+from mirar.data.cache import USE_CACHE
+from mirar.data.image_data import Image
+from mirar.errors import ProcessorError
+from mirar.paths import max_n_cpu
+
+logger = logging.getLogger(__name__)
+
+MEDIAN_COMBINE = "median"
+SIGMA_CLIPPED_MEAN_COMBINE = "sigma_clipped_mean"
+MINMAX_REJECTION_COMBINE = "minmax"
+combine_methods = [
+    MEDIAN_COMBINE,
+    SIGMA_CLIPPED_MEAN_COMBINE,
+    MINMAX_REJECTION_COMBINE,
+]
+
+DEFAULT_MAX_TILE_BYTES = 256 * 1024**2
+
+
+class StackingError(ProcessorError):
+    """
+    Error raised when frames cannot be combined
+    """
+
+
+def get_stack_source(image: Image) -> np.ndarray:
+    """
+    Get an array for the image data which can be sliced into tiles, without
+    loading the full image into memory (in cache mode).
+
+    :param image: Image
+    :return: (read-only) array of image data
+    """
+    if USE_CACHE:
+        return image.get_memmap_data(read_only=True)
+    return image.get_data()
+
+
+class FrameStacker:
+    """
+    Class to combine frames, one tile of rows at a time.
+
+    The supported combine methods are:
+     * 'median': nan-median of all frames
+     * 'sigma_clipped_mean': mean after iterative sigma clipping around the median
+     * 'minmax': mean after rejecting the n_low lowest and n_high highest values
+    """
+
+    def __init__(
+        self,
+        combine_method: str = MEDIAN_COMBINE,
+        dtype: type = np.float64,
+        max_tile_bytes: int = DEFAULT_MAX_TILE_BYTES,
+        n_threads: int = max_n_cpu,
+        sigma: float = 3.0,
+        max_iters: int = 5,
+        n_low: int = 1,
+        n_high: int = 1,
+    ):
+        if combine_method not in combine_methods:
+            err = (
+                f"Unrecognised combine method '{combine_method}'. "
+                f"Please select one of {combine_methods}."
+            )
+            logger.error(err)
+            raise StackingError(err)
+
+        self.combine_method = combine_method
+        self.dtype = np.dtype(dtype)
+        self.max_tile_bytes = max_tile_bytes
+        self.n_threads = n_threads
+        self.sigma = sigma
+        self.max_iters = max_iters
+        self.n_low = n_low
+        self.n_high = n_high
+
+    def __str__(self):
+        return (
+            f"<A {self.__class__.__name__} using {self.combine_method} "
+            f"combination in {self.dtype}>"
+        )
+
+    def get_tile_rows(self, shape: tuple[int, int], n_frames: int) -> int:
+        """
+        Get the number of rows per tile, to stay within the maximum tile size
+
+        :param shape: Shape of each frame
+        :param n_frames: Number of frames
+        :return: Number of rows
+        """
+        row_bytes = shape[1] * n_frames * self.dtype.itemsize
+        return int(max(1, min(shape[0], self.max_tile_bytes // row_bytes)))
+
+    def combine_cube(self, cube: np.ndarray) -> np.ndarray:
+        """
+        Combine a cube of frames along the first axis
+
+        :param cube: (n_frames, n_rows, ny) array
+        :return: (n_rows, ny) array
+        """
+        with warnings.catch_warnings():
+            # All-nan pixels are expected, and give nan
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+
+            if self.combine_method == MEDIAN_COMBINE:
+                return np.nanmedian(cube, axis=0)
+
+            if self.combine_method == SIGMA_CLIPPED_MEAN_COMBINE:
+                clipped = sigma_clip(
+                    cube,
+                    sigma=self.sigma,
+                    maxiters=self.max_iters,
+                    axis=0,
+                    masked=False,
+                    copy=False,
+                )
+                return np.nanmean(clipped, axis=0)
+
+            # Min/max rejection: nan values are sorted to the end
+            cube = np.sort(cube, axis=0)
+            n_valid = np.sum(~np.isnan(cube), axis=0)
+            index = np.arange(cube.shape[0]).reshape(-1, 1, 1)
+            keep = (index >= self.n_low) & (index < n_valid - self.n_high)
+            return np.nanmean(np.where(keep, cube, np.nan), axis=0)
+
+    def combine(
+        self,
+        frames: list[np.ndarray],
+        scales: list[float] | None = None,
+        masks: list[np.ndarray | None] | None = None,
+    ) -> np.ndarray:
+        """
+        Combine frames into a single frame.
+
+        Frames (and masks) only need to support slicing by rows, so memory-mapped
+        arrays (see :func:`~mirar.data.utils.stacking.get_stack_source`) are only
+        read one tile at a time.
+
+        :param frames: Frames to combine
+        :param scales: Optional values to divide each frame by before combining
+        :param masks: Optional masks for each frame, where 0 is masked
+        :return: Combined frame
+        """
+        n_frames = len(frames)
+
+        if n_frames == 0:
+            err = "No frames to combine"
+            logger.error(err)
+            raise StackingError(err)
+
+        shape = frames[0].shape
+
+        for frame in frames:
+            if frame.shape != shape:
+                err = f"Cannot combine frames of shapes {shape} and {frame.shape}"
+                logger.error(err)
+                raise StackingError(err)
+
+        if scales is None:
+            scales = [1.0] * n_frames
+
+        if masks is None:
+            masks = [None] * n_frames
+
+        combined = np.empty(shape, dtype=self.dtype)
+
+        tile_rows = self.get_tile_rows(shape, n_frames)
+
+        def combine_tile(row_min: int):
+            row_max = min(row_min + tile_rows, shape[0])
+            cube = np.empty((n_frames, row_max - row_min, shape[1]), dtype=self.dtype)
+            for i, frame in enumerate(frames):
+                cube[i] = frame[row_min:row_max]
+                if masks[i] is not None:
+                    cube[i][masks[i][row_min:row_max] == 0] = np.nan
+                if scales[i] != 1.0:
+                    cube[i] /= scales[i]
+            combined[row_min:row_max] = self.combine_cube(cube)
+
+        row_starts = range(0, shape[0], tile_rows)
+
+        logger.debug(
+            f"Combining {n_frames} frames with {self.combine_method}, "
+            f"in {len(row_starts)} tiles of {tile_rows} rows"
+        )
+
+        n_threads = max(1, min(self.n_threads, len(row_starts)))
+
+        if n_threads == 1:
+            for row_min in row_starts:
+                combine_tile(row_min)
+        else:
+            with ThreadPoolExecutor(max_workers=n_threads) as executor:
+                list(executor.map(combine_tile, row_starts))
+
+        return combined
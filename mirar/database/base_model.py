@@ -4,6 +4,7 @@ Module to define PSQL database tables using sqlalchemy
 
 import logging
 from datetime import date
+from functools import lru_cache
 from typing import Any, ClassVar, Type
 
 import pandas as pd
@@ -13,16 +14,17 @@ from pydantic import (
     ConfigDict,
     Field,
     FieldValidationInfo,
+    TypeAdapter,
     field_validator,
     model_validator,
 )
 from sqlalchemy import Column, Table, inspect
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import IntegrityError, ProgrammingError
 
 from mirar.database.constants import POSTGRES_DUPLICATE_PROTOCOLS
 from mirar.database.constraints import DBQueryConstraints
 from mirar.database.transactions import select_from_table
-from mirar.database.transactions.insert import _insert_in_table
+from mirar.database.transactions.insert import _bulk_insert_in_table, _insert_in_table
 from mirar.database.transactions.update import _update_database_entry
 from mirar.errors import ProcessorError
 
@@ -35,6 +37,18 @@ class DatabaseUpdateError(ProcessorError):
     """
 
 
+@lru_cache
+def get_list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """
+    Get a (cached) TypeAdapter to validate a list of entries for a model
+    in a single call
+
+    :param model: pydantic model
+    :return: TypeAdapter for list of model
+    """
+    return TypeAdapter(list[model])
+
+
 class PydanticBase(BaseModel):
     """
     Base code pydantic model (no extra colunns!)
@@ -269,6 +283,206 @@ class BaseDB(PydanticBase):
         """
         self._update_entry(update_keys)
 
+    @classmethod
+    def validate_entries(cls, entries: list[dict] | pd.DataFrame) -> list["BaseDB"]:
+        """
+        Validate many entries at once
+
+        :param entries: list of dictionaries, or dataframe, of entries
+        :return: list of validated models
+        """
+        if isinstance(entries, pd.DataFrame):
+            entries = entries.to_dict(orient="records")
+        return get_list_adapter(cls).validate_python(entries)
+
+    @classmethod
+    def supports_bulk_insert(cls) -> bool:
+        """
+        Check whether entries can be inserted in bulk. Bulk insertion bypasses
+        insert_entry and update_entry, so by default it is only supported if
+        neither has been overridden. Child classes which override either should
+        move any per-entry logic to prepare_bulk_entries, and override this.
+
+        :return: boolean
+        """
+        return (cls.insert_entry is BaseDB.insert_entry) & (
+            cls.update_entry is BaseDB.update_entry
+        )
+
+    @classmethod
+    def prepare_bulk_entries(cls, entries: list["BaseDB"]) -> list["BaseDB"]:
+        """
+        Prepare validated entries for bulk insertion.
+        Child classes can override this.
+
+        :param entries: validated entries
+        :return: entries to insert
+        """
+        return entries
+
+    @classmethod
+    def insert_entries(
+        cls,
+        entries: list[dict] | pd.DataFrame,
+        duplicate_protocol: str,
+        returning_key_names: str | list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Validate and insert many entries into the corresponding sql database,
+        using a single statement where possible. Duplicates are handled
+        following the duplicate_protocol, as for insert_entry.
+
+        If bulk insertion is not possible (e.g. insert_entry is overridden,
+        or there is no unique key in the data), entries are inserted one by one.
+
+        :param entries: list of dictionaries, or dataframe, of entries
+        :param duplicate_protocol: protocol to follow if duplicate entry is found
+        :param returning_key_names: names of the keys to return
+        :return: dataframe of returned keys, with one row per entry, in order
+        """
+        assert duplicate_protocol in POSTGRES_DUPLICATE_PROTOCOLS
+
+        models = cls.validate_entries(entries)
+
+        if len(models) == 0:
+            return pd.DataFrame()
+
+        if returning_key_names is None:
+            returning_key_names = models[0].get_primary_key()
+
+        if not isinstance(returning_key_names, list):
+            returning_key_names = [returning_key_names]
+
+        conflict_key = None
+        unique_keys = models[0].get_available_unique_keys()
+        if len(unique_keys) > 0:
+            conflict_key = unique_keys[0].name
+
+        if (not cls.supports_bulk_insert()) | (
+            (duplicate_protocol != "fail") & (conflict_key is None)
+        ):
+            logger.debug(f"Cannot bulk insert into {cls.__name__}, inserting singly")
+            return cls._insert_entries_singly(
+                models, duplicate_protocol, returning_key_names
+            )
+
+        models = cls.prepare_bulk_entries(models)
+        new_entries = get_list_adapter(cls).dump_python(models)
+
+        try:
+            res = _bulk_insert_in_table(
+                new_entries=new_entries,
+                sql_table=cls.sql_model,
+                returning_keys=returning_key_names,
+                duplicate_protocol=duplicate_protocol,
+                conflict_key=conflict_key,
+            )
+        except IntegrityError as exc:
+            if not isinstance(exc.orig, errors.UniqueViolation):
+                raise exc
+
+            if duplicate_protocol == "fail":
+                err = (
+                    f"Duplicate error, at least one of {len(models)} entries "
+                    f"already exists in {cls.sql_model.__tablename__}."
+                )
+                logger.error(err)
+                raise errors.UniqueViolation from exc
+
+            # e.g. a conflict on a different unique key
+            logger.debug(f"Bulk insert failed ({exc}), inserting singly")
+            return cls._insert_entries_singly(
+                models, duplicate_protocol, returning_key_names
+            )
+        except ProgrammingError as exc:
+            if not isinstance(exc.orig, errors.CardinalityViolation):
+                raise exc
+            # The same entry appears twice in the batch
+            logger.debug(f"Bulk insert failed ({exc}), inserting singly")
+            return cls._insert_entries_singly(
+                models, duplicate_protocol, returning_key_names
+            )
+
+        if duplicate_protocol == "fail":
+            assert len(res) == len(models)
+            return res
+
+        return cls._match_returned_entries(
+            res, new_entries, conflict_key, returning_key_names
+        )
+
+    @classmethod
+    def _insert_entries_singly(
+        cls,
+        models: list["BaseDB"],
+        duplicate_protocol: str,
+        returning_key_names: list[str],
+    ) -> pd.DataFrame:
+        """
+        Insert validated entries one by one
+
+        :param models: validated entries
+        :param duplicate_protocol: protocol to follow if duplicate entry is found
+        :param returning_key_names: names of the keys to return
+        :return: dataframe of returned keys, with one row per entry, in order
+        """
+        rows = []
+        for model in models:
+            res = model.insert_entry(
+                duplicate_protocol=duplicate_protocol,
+                returning_key_names=returning_key_names,
+            )
+            assert len(res) == 1
+            rows.append(res.loc[0])
+        return pd.DataFrame(rows).reset_index(drop=True)
+
+    @classmethod
+    def _match_returned_entries(
+        cls,
+        res: pd.DataFrame,
+        new_entries: list[dict],
+        conflict_key: str,
+        returning_key_names: list[str],
+    ) -> pd.DataFrame:
+        """
+        Match the rows returned from a bulk insert to the entries,
+        selecting any existing rows which were not returned
+
+        :param res: returned rows, including the conflict key
+        :param new_entries: entries which were inserted
+        :param conflict_key: unique key used to match rows
+        :param returning_key_names: names of the keys to return
+        :return: dataframe of returned keys, with one row per entry, in order
+        """
+        entry_keys = [x[conflict_key] for x in new_entries]
+
+        missing = list(set(entry_keys) - set(res[conflict_key]))
+
+        if len(missing) > 0:
+            existing = select_from_table(
+                sql_table=cls.sql_model,
+                db_constraints=DBQueryConstraints(
+                    columns=[conflict_key],
+                    accepted_values=[missing],
+                    comparison_types=["in"],
+                ),
+                output_columns=list(
+                    dict.fromkeys(returning_key_names + [conflict_key])
+                ),
+            )
+            res = pd.concat([res, existing], ignore_index=True)
+
+        res = res.drop_duplicates(subset=[conflict_key]).set_index(conflict_key)
+
+        if not set(entry_keys).issubset(res.index):
+            raise ValueError(
+                f"No results found for some entries in {cls.sql_model.__tablename__}"
+            )
+
+        res = res.loc[entry_keys].reset_index()
+
+        return res[returning_key_names]
+
     @classmethod
     def _exists(cls, values, keys: str | list = None) -> bool:
         """
@@ -4,7 +4,17 @@ Module for DBQueryConstraints to carefully specify postgres query constraints
 
 import numpy as np
 
-POSTGRES_ACCEPTED_COMPARISONS = ["=", "<", ">", "<=", ">=", "between", "<>", "!="]
+POSTGRES_ACCEPTED_COMPARISONS = [
+    "=",
+    "<",
+    ">",
+    "<=",
+    ">=",
+    "between",
+    "<>",
+    "!=",
+    "in",
+]
 
 
 class DBQueryConstraints:
@@ -51,7 +61,9 @@ class DBQueryConstraints:
     def add_constraint(
         self,
         column: str,
-        accepted_values: str | int | float | tuple[float, float] | tuple[int, int],
+        accepted_values: (
+            str | int | float | tuple[float, float] | tuple[int, int] | list
+        ),
         comparison_type: str = "=",
     ):
         """
@@ -69,6 +81,10 @@ class DBQueryConstraints:
                 isinstance(accepted_values, tuple), len(accepted_values) == 2
             )
 
+        if comparison_type == "in":
+            assert isinstance(accepted_values, (list, tuple))
+            assert len(accepted_values) > 0
+
         self.columns.append(column)
         self.accepted_values.append(accepted_values)
         self.comparison_types.append(comparison_type)
@@ -142,6 +158,9 @@ class DBQueryConstraints:
                     f"{column.lower()} between {self.accepted_values[i][0]} "
                     f"and {self.accepted_values[i][1]}"
                 )
+            elif self.comparison_types[i] == "in":
+                values = ", ".join(f"'{x}'" for x in self.accepted_values[i])
+                constraints.append(f"{column.lower()} in ({values})")
             else:
                 constraints.append(
                     f"{column.lower()} {self.comparison_types[i]} "
@@ -1,8 +1,29 @@
 """
 Util functions for database interactions
+
+Engines are shared across the whole process. The first call to
+:func:`~mirar.database.engine.get_engine` for a given database, user, host, port
+and schema creates an engine with a bounded, thread-safe connection pool, and
+later calls reuse it. Connections are therefore only opened (and authenticated)
+once, rather than for every query.
+
+The pool size can be configured via environment variables:
+
+.. code-block:: bash
+
+    export DB_POOL_SIZE = 8
+    export DB_MAX_OVERFLOW = 8
+
+All engines are disposed when the process exits, or by calling
+:func:`~mirar.database.engine.dispose_engines`.
 """
 
-from sqlalchemy import URL, Engine, NullPool, create_engine
+import atexit
+import logging
+import os
+import threading
+
+from sqlalchemy import URL, Engine, QueuePool, create_engine
 
 from mirar.database.credentials import (
     DB_HOSTNAME,
@@ -11,9 +32,22 @@ from mirar.database.credentials import (
     DB_SCHEMA,
     DB_USER,
 )
+from mirar.paths import max_n_cpu
 
+logger = logging.getLogger(__name__)
 
-def get_engine(
+DB_POOL_SIZE_KEY = "DB_POOL_SIZE"
+DB_MAX_OVERFLOW_KEY = "DB_MAX_OVERFLOW"
+
+DB_POOL_SIZE = int(os.getenv(DB_POOL_SIZE_KEY, str(max_n_cpu)))
+DB_MAX_OVERFLOW = int(os.getenv(DB_MAX_OVERFLOW_KEY, str(max_n_cpu)))
+
+_engines: dict[tuple, Engine] = {}
+_engines_lock = threading.Lock()
+_engines_pid = os.getpid()
+
+
+def get_engine(  # pylint: disable=too-many-arguments
     db_name: str,
     db_user: str = DB_USER,
     db_password: str = DB_PASSWORD,
@@ -22,7 +56,51 @@ def get_engine(
     db_schema: str = DB_SCHEMA,
 ) -> Engine:
     """
-    Function to create a postgres engine
+    Function to get a postgres engine, creating it if it does not already exist
+
+    :param db_user: User for db
+    :param db_password: password for db
+    :param db_name: name of db
+    :param db_hostname: hostname of db
+    :param db_port: port of db
+    :param db_schema: schema of db
+    :return: sqlalchemy engine
+    """
+    global _engines_pid  # pylint: disable=global-statement,invalid-name
+
+    key = (db_name, db_user, db_password, db_hostname, str(db_port), db_schema)
+
+    with _engines_lock:
+        # Pooled connections must not be shared with a forked child process
+        if _engines_pid != os.getpid():
+            for engine in _engines.values():
+                engine.dispose(close=False)
+            _engines.clear()
+            _engines_pid = os.getpid()
+
+        if key not in _engines:
+            _engines[key] = create_pooled_engine(
+                db_name=db_name,
+                db_user=db_user,
+                db_password=db_password,
+                db_hostname=db_hostname,
+                db_port=db_port,
+                db_schema=db_schema,
+            )
+
+        return _engines[key]
+
+
+def create_pooled_engine(  # pylint: disable=too-many-arguments
+    db_name: str,
+    db_user: str = DB_USER,
+    db_password: str = DB_PASSWORD,
+    db_hostname: str = DB_HOSTNAME,
+    db_port: int = DB_PORT,
+    db_schema: str = DB_SCHEMA,
+) -> Engine:
+    """
+    Function to create a new postgres engine, with a connection pool
 
     :param db_user: User for db
     :param db_password: password for db
@@ -42,9 +120,52 @@ def get_engine(
         database=db_name,
     )
 
+    logger.debug(
+        f"Creating engine for {db_user}@{db_hostname}:{db_port}/{db_name}, "
+        f"with a pool size of {DB_POOL_SIZE}"
+    )
+
     return create_engine(
         url_object,
         future=True,
-        poolclass=NullPool,
+        poolclass=QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
         connect_args={"options": f"-csearch_path={db_schema}"},
     )
+
+
+def get_pool_stats() -> dict[str, dict[str, int]]:
+    """
+    Get the connection pool statistics for every engine
+
+    :return: Dictionary of pool statistics, keyed by engine
+    """
+    stats = {}
+    with _engines_lock:
+        for key, engine in _engines.items():
+            db_name, db_user, _, db_hostname, db_port, db_schema = key
+            pool = engine.pool
+            stats[f"{db_user}@{db_hostname}:{db_port}/{db_name} ({db_schema})"] = {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            }
+    return stats
+
+
+def dispose_engines():
+    """
+    Dispose of all engines, closing any pooled connections
+
+    :return: None
+    """
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+atexit.register(dispose_engines)
@@ -7,5 +7,6 @@ from mirar.database.transactions.select import (
     check_table_exists,
     is_populated,
     select_from_table,
+    select_from_table_batch,
 )
 from mirar.database.transactions.update import _update_database_entry
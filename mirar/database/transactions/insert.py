@@ -7,6 +7,7 @@ from typing import Type
 
 import pandas as pd
 from sqlalchemy import Insert, column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from mirar.database.base_table import BaseTable
 from mirar.database.constants import POSTGRES_DUPLICATE_PROTOCOLS
@@ -50,3 +51,65 @@ def _insert_in_table(
         conn.commit()
 
     return pd.DataFrame(res.fetchall())
+
+
+def _bulk_insert_in_table(
+    new_entries: list[dict],
+    sql_table: Type[BaseTable],
+    returning_keys: list[str],
+    duplicate_protocol: str = "fail",
+    conflict_key: str | None = None,
+) -> pd.DataFrame:
+    """
+    Export many entries to a database table, with a single INSERT statement
+    (batched by sqlalchemy into multi-row VALUES) inside one transaction.
+
+    With duplicate_protocol 'fail', any duplicate raises an error and nothing is
+    inserted, and the returned rows are in the same order as the entries.
+    With 'replace', duplicates on conflict_key are updated with the new values,
+    and with 'ignore' they are left unchanged (and not returned).
+    For 'replace' and 'ignore', the conflict_key is always returned, so rows
+    can be matched to entries.
+
+    :param new_entries: list of dictionaries to export
+    :param sql_table: table of DB to export to
+    :param returning_keys: keys to return
+    :param duplicate_protocol: protocol to follow if duplicate entry is found
+    :param conflict_key: unique column used to detect duplicates
+    :return: dataframe of returned keys
+    """
+
+    assert duplicate_protocol in POSTGRES_DUPLICATE_PROTOCOLS
+
+    stmt = pg_insert(sql_table)
+
+    if duplicate_protocol == "fail":
+        stmt = stmt.returning(
+            *[column(x) for x in returning_keys], sort_by_parameter_order=True
+        )
+
+    else:
+        assert conflict_key is not None
+
+        if duplicate_protocol == "replace":
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[conflict_key],
+                set_={
+                    key: stmt.excluded[key]
+                    for key in new_entries[0].keys()
+                    if key != conflict_key
+                },
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[conflict_key])
+
+        returning_keys = list(dict.fromkeys(returning_keys + [conflict_key]))
+        stmt = stmt.returning(*[column(x) for x in returning_keys])
+
+    engine = get_engine(db_name=sql_table.db_name)
+
+    with engine.begin() as conn:
+        res = conn.execute(stmt, new_entries)
+        rows = res.fetchall()
+
+    return pd.DataFrame(rows, columns=returning_keys)
@@ -3,12 +3,14 @@ Module to select database entries
 """
 
 import pandas as pd
-from sqlalchemy import Select, text
+from sqlalchemy import Select, literal, text, union_all
 
 from mirar.database.base_table import BaseTable
 from mirar.database.constraints import DBQueryConstraints
 from mirar.database.engine import get_engine
 
+BATCH_INDEX_COLUMN = "_batch_query_index"
+
 
 def run_select(
     query: Select,
@@ -62,6 +64,64 @@ def select_from_table(
     return res
 
 
+def select_from_table_batch(
+    db_constraints: list[DBQueryConstraints],
+    sql_table: BaseTable,
+    output_columns: list[str] | None = None,
+    max_num_results: int | None = None,
+) -> list[pd.DataFrame]:
+    """
+    Select database entries for many sets of constraints in a single query.
+
+    Each set of constraints becomes one subquery (with its own limit), and the
+    subqueries are combined with UNION ALL. The results are then split back into
+    one dataframe per set of constraints, equivalent to calling
+    :func:`~mirar.database.transactions.select.select_from_table` for each.
+
+    :param db_constraints: list of database query constraints
+    :param sql_table: database SQL table
+    :param output_columns: columns to output (default: all)
+    :param max_num_results: maximum number of results per set of constraints
+    :return: list of results, one per set of constraints
+    """
+    if len(db_constraints) == 0:
+        return []
+
+    queries = []
+    for i, constraints in enumerate(db_constraints):
+        query = Select(sql_table, literal(i).label(BATCH_INDEX_COLUMN)).where(
+            text(constraints.parse_constraints())
+        )
+        if max_num_results is not None:
+            query = query.limit(max_num_results)
+        queries.append(query)
+
+    if len(queries) == 1:
+        query = queries[0]
+    else:
+        query = union_all(*queries)
+
+    res = run_select(query=query, sql_table=sql_table)
+
+    grouped = dict(tuple(res.groupby(BATCH_INDEX_COLUMN)))
+    empty = res.iloc[0:0].drop(columns=[BATCH_INDEX_COLUMN])
+
+    results = []
+    for i in range(len(db_constraints)):
+        if i not in grouped:
+            results.append(empty.copy())
+            continue
+
+        single_res = (
+            grouped[i].drop(columns=[BATCH_INDEX_COLUMN]).reset_index(drop=True)
+        )
+        if output_columns is not None:
+            single_res = single_res[output_columns]
+        results.append(single_res)
+
+    return results
+
+
 def check_table_exists(
     sql_table: BaseTable,
 ) -> bool:
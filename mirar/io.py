@@ -7,14 +7,16 @@ All opening/writing of fits files should run via this script.
 import copy
 import logging
 import warnings
+from functools import partial
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Optional
 
 import numpy as np
 from astropy.io import fits
 from astropy.utils.exceptions import AstropyUserWarning, AstropyWarning
 
-from mirar.data import Image
+from mirar.data import Image, LazyImage
+from mirar.data.precision import limit_precision, to_working_dtype
 from mirar.errors.exceptions import ProcessorError
 from mirar.paths import BASE_NAME_KEY, LATEST_SAVE_KEY, RAW_IMG_KEY, core_fields
 
@@ -78,6 +80,7 @@ def save_to_path(
     path: str | Path,
     overwrite: bool = True,
     compress: bool = False,
+    dtype: Optional[np.dtype | type | str] = None,
 ):
     """
     Function to save an image with <data> and <header> to <path>.
@@ -88,8 +91,11 @@ def save_to_path(
     :param overwrite: boolean variable opn whether to overwrite of an
         image exists at <path>. Defaults to True.
     :param compress: boolean variable on whether to compress the image
+    :param dtype: working dtype, limiting the precision of floating-point data
+        (default from :mod:`mirar.data.precision`)
     :return: None
     """
+    data = limit_precision(data, dtype)
     if compress:
         img = create_compressed_fits(data, header=header)
     else:
@@ -170,6 +176,55 @@ def open_fits(path: str | Path) -> tuple[np.ndarray, fits.Header]:
     return data, header
 
 
+def open_fits_header(path: str | Path) -> fits.Header:
+    """
+    Function to open only the header of a fits file saved to <path>,
+    without reading the image data
+
+    :param path: path of fits file
+    :return: image header
+    """
+    if isinstance(path, str):
+        path = Path(path)
+
+    with fits.open(path, memmap=True) as img:
+        compressed = [
+            x for x in img if isinstance(x, fits.hdu.compressed.compressed.CompImageHDU)
+        ]
+
+        if len(compressed) > 0:
+            header = compressed[0].header.copy()
+        else:
+            hdu = img[0]
+            hdu.verify("silentfix+ignore")
+            header = hdu.header.copy()  # pylint: disable=no-member
+
+    if BASE_NAME_KEY not in header:
+        header[BASE_NAME_KEY] = Path(path).name
+
+    if RAW_IMG_KEY not in header.keys():
+        header[RAW_IMG_KEY] = path.as_posix()
+
+    return header
+
+
+def open_raw_image_data(
+    path: str | Path,
+    open_f: Callable[[str | Path], tuple[np.ndarray, fits.Header]] = open_fits,
+    dtype: Optional[np.dtype | type | str] = None,
+) -> np.ndarray:
+    """
+    Function to open only the data of a raw image, in the working dtype
+
+    :param path: path of raw image
+    :param open_f: function to open the raw image
+    :param dtype: working dtype (default from :mod:`mirar.data.precision`)
+    :return: image data
+    """
+    data, _ = open_f(path)
+    return to_working_dtype(data, dtype)
+
+
 def save_fits(
     image: Image,
     path: str | Path,
@@ -191,18 +246,21 @@ def save_fits(
     if header is not None:
         header[LATEST_SAVE_KEY] = path.as_posix()
     logger.debug(f"Saving to {path.as_posix()}")
-    save_to_path(data, header, path, compress=compress)
+    save_to_path(data, header, path, compress=compress, dtype=image.get_working_dtype())
 
 
 def open_raw_image(
     path: str | Path,
     open_f: Callable[[str | Path], tuple[np.ndarray, fits.Header]] = open_fits,
+    dtype: Optional[np.dtype | type | str] = None,
 ) -> Image:
     """
     Function to open a raw image as an Image object
 
     :param path: path of raw image
     :param open_f: function to open the raw image
+    :param dtype: working dtype of the image
+        (default from :mod:`mirar.data.precision`)
     :return: Image object
     """
     if isinstance(path, str):
@@ -210,7 +268,35 @@ def open_raw_image(
 
     data, header = open_f(path)
 
-    new_img = Image(data.astype(np.float64), header)
+    new_img = Image(to_working_dtype(data, dtype), header, dtype=dtype)
+
+    check_image_has_core_fields(new_img)
+
+    return new_img
+
+
+def open_lazy_raw_image(
+    path: str | Path, dtype: Optional[np.dtype | type | str] = None
+) -> LazyImage:
+    """
+    Function to open a raw image as a LazyImage object. Only the header is read,
+    and the data is read the first time it is needed.
+
+    :param path: path of raw image
+    :param dtype: working dtype of the image
+        (default from :mod:`mirar.data.precision`)
+    :return: LazyImage object
+    """
+    if isinstance(path, str):
+        path = Path(path)
+
+    header = open_fits_header(path)
+
+    new_img = LazyImage(
+        header=header,
+        loader=partial(open_raw_image_data, path, dtype=dtype),
+        dtype=dtype,
+    )
 
     check_image_has_core_fields(new_img)
 
@@ -319,6 +405,7 @@ def open_mef_image(
         [str | Path], tuple[fits.Header, list[np.ndarray], list[fits.Header]]
     ] = open_mef_fits,
     extension_key: str | None = None,
+    dtype: Optional[np.dtype | type | str] = None,
 ) -> list[Image]:
     """
     Function to open a raw image as an Image object
@@ -326,6 +413,8 @@ def open_mef_image(
     :param path: path of raw image
     :param open_f: function to open the raw image
     :param extension_key: key to use to number the MEF frames
+    :param dtype: working dtype of the images
+        (default from :mod:`mirar.data.precision`)
     :return: Image object
     """
 
@@ -337,12 +426,16 @@ def open_mef_image(
         extension_key=extension_key,
     )
 
-    ext_data_list = [x.astype(np.float64) for x in ext_data_list]
+    ext_data_list = [to_working_dtype(x, dtype) for x in ext_data_list]
     split_images_list = []
 
     for i, ext_data in enumerate(ext_data_list):
         single_header = ext_header_list[i]
-        image = Image(data=copy.deepcopy(ext_data), header=copy.deepcopy(single_header))
+        image = Image(
+            data=copy.deepcopy(ext_data),
+            header=copy.deepcopy(single_header),
+            dtype=dtype,
+        )
         check_image_has_core_fields(image)
 
         split_images_list.append(image)
@@ -10,19 +10,26 @@ import sys
 import threading
 import time
 from pathlib import Path
-from queue import Queue
+from queue import Empty, Queue
 from threading import Thread
 from typing import Optional
 
 import numpy as np
 from astropy import units as u
 from astropy.time import Time
-from watchdog.events import FileSystemEventHandler
+from watchdog.events import FileCreatedEvent, FileSystemEventHandler
 from watchdog.observers import Observer
 
-from mirar.data import Dataset, Image, ImageBatch
+from mirar.data import Dataset, Image, ImageBatch, SharedImage
 from mirar.errors import ErrorReport, ErrorStack, ImageNotFoundError, ProcessorError
-from mirar.io import check_file_is_complete
+from mirar.monitor.calibration_registry import CalibrationRegistry
+from mirar.monitor.completeness import FILE_TRANSFER_TIMEOUT_S, FileCompletenessChecker
+from mirar.monitor.dither_scheduler import (
+    DITHER_SET_TIMEOUT_HOURS,
+    DitherSet,
+    DitherSetScheduler,
+    has_dither_keys,
+)
 from mirar.paths import (
     DITHER_N_KEY,
     MAX_DITHER_KEY,
@@ -45,6 +52,7 @@ from mirar.processors.utils.cal_hunter import (
     find_required_cals,
     update_requirements,
 )
+from mirar.processors.utils.header_index import HeaderIndex
 from mirar.processors.utils.image_loader import ImageLoader
 from mirar.utils.send_email import send_gmail
 
@@ -56,18 +64,46 @@ class ImageTimeoutError(ProcessorError):
 
 
 class NewImageHandler(FileSystemEventHandler):
-    """Class to watch a directory, and add newly-created files to a queue."""
+    """
+    Class to watch a directory, and add newly-created files to a queue.
+
+    Each file is only queued once, whether it is first seen when it is created,
+    closed after writing, or moved into the directory. Close and move events
+    are passed to the completeness checker, so that workers waiting on that
+    file can start processing immediately.
+    """
 
-    def __init__(self, queue):
+    def __init__(self, queue, completeness: Optional[FileCompletenessChecker] = None):
         FileSystemEventHandler.__init__(self)
         self.queue = queue
+        if completeness is None:
+            completeness = FileCompletenessChecker()
+        self.completeness = completeness
+
+    def add_file(self, path: str, closed: bool = False):
+        """
+        Add a file to the queue, if it has not already been queued
+
+        :param path: path of the file
+        :param closed: whether the file has been closed/moved into place
+        :return: None
+        """
+        if closed:
+            self.completeness.mark_closed(path)
+        if self.completeness.claim(path):
+            self.queue.put(FileCreatedEvent(path))
 
     def on_created(self, event):
         if event.event_type == "created":
-            self.queue.put(event)
+            self.add_file(event.src_path)
 
+    def on_closed(self, event):
+        if not event.is_directory:
+            self.add_file(event.src_path, closed=True)
 
-FILE_TRANSFER_TIMEOUT_S = 60.0
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.add_file(event.dest_path, closed=True)
 
 
 class Monitor:
@@ -91,6 +127,8 @@ class Monitor:
         log_level: str = "INFO",
         raw_dir: str = RAW_IMG_SUB_DIR,
         base_raw_img_dir: Path = base_raw_dir,
+        header_index: Optional[HeaderIndex] = None,
+        dither_timeout_hours: float = DITHER_SET_TIMEOUT_HOURS,
     ):
         logger.info(f"Software version: {PACKAGE_NAME}=={__version__}")
 
@@ -172,31 +210,33 @@ class Monitor:
         self.midway_postprocess_complete = False
         self.latest_csv_log = None
 
-        # Queue images that should be processed together
-        self.queued_images = []
-        self.queue_t = None
+        # Collect images that should be processed together
+        self.dither_scheduler = DitherSetScheduler(timeout_hours=dither_timeout_hours)
 
         self.processed_science_images = []
         self.processed_cal_images = []
         self.failed_images = []
 
+        self.completeness = FileCompletenessChecker()
+
         # default to "pipeline default cal requirements"
 
         if cal_requirements is None:
             cal_requirements = self.pipeline.default_cal_requirements
 
-        self.archival_cals = ImageBatch()
-        self.new_cals = ImageBatch()
+        self.calibrations = CalibrationRegistry()
         self.cal_requirements = copy.deepcopy(cal_requirements)
 
         if cal_requirements is not None:
             try:
-                self.archival_cals = find_required_cals(
+                archival_cals = find_required_cals(
                     latest_dir=str(self.raw_image_directory),
                     night=night,
                     open_f=self.pipeline.unpack_raw_image,
                     requirements=cal_requirements,
+                    header_index=header_index,
                 )
+                self.calibrations.replace([], archival_cals)
             except ImageNotFoundError as exc:
                 err = "No CalHunter images found. Will need to rely on nightly data."
                 logger.error(err)
@@ -206,13 +246,34 @@ class Monitor:
                     )
                 )
 
+    @property
+    def new_cals(self) -> ImageBatch:
+        """
+        Calibration images taken tonight. These are shared, and must not be modified.
+
+        :return: batch of images
+        """
+        return self.calibrations.get_new_cals()
+
+    @property
+    def archival_cals(self) -> ImageBatch:
+        """
+        Archival calibration images which are still required.
+        These are shared, and must not be modified.
+
+        :return: batch of images
+        """
+        return self.calibrations.get_archival_cals()
+
     def get_cals(self) -> ImageBatch:
         """
-        Returns a copy of the calibration images (new and archival)
+        Returns shared views of the calibration images (new and archival).
+        Only the headers are copied, so the views are cheap to create, and can be
+        processed without changing the registered calibration images.
 
-        :return:
+        :return: batch of calibration images
         """
-        return copy.deepcopy(self.new_cals + self.archival_cals)
+        return self.calibrations.get_views()
 
     def update_cals(self, new_calibration_image: Image):
         """
@@ -223,25 +284,34 @@ class Monitor:
         :param new_calibration_image: new image
         :return: None
         """
-        self.new_cals.append(new_calibration_image)
-        cal_requirements = copy.deepcopy(self.cal_requirements)
-        cal_requirements = [
-            x
-            for x in update_requirements(cal_requirements, self.new_cals)
-            if not x.success
-        ]
-
-        cal_requirements = update_requirements(cal_requirements, self.archival_cals)
-        new_archival_cals = ImageBatch()
-
-        for archival_cal in self.archival_cals:
-            for req in cal_requirements:
-                for batch in req.data.values():
-                    if archival_cal in batch:
-                        if archival_cal not in new_archival_cals:
-                            new_archival_cals.append(archival_cal)
-
-        self.archival_cals = new_archival_cals
+
+        def add_calibration_image(
+            current_new_cals: tuple[Image, ...],
+            current_archival_cals: tuple[Image, ...],
+        ) -> tuple[list[Image], list[Image]]:
+            new_cals = ImageBatch(list(current_new_cals) + [new_calibration_image])
+            archival_cals = ImageBatch(list(current_archival_cals))
+
+            cal_requirements = copy.deepcopy(self.cal_requirements)
+            cal_requirements = [
+                x
+                for x in update_requirements(cal_requirements, new_cals)
+                if not x.success
+            ]
+
+            cal_requirements = update_requirements(cal_requirements, archival_cals)
+            new_archival_cals = []
+
+            for archival_cal in archival_cals:
+                for req in cal_requirements:
+                    for batch in req.data.values():
+                        if archival_cal in batch:
+                            if archival_cal not in new_archival_cals:
+                                new_archival_cals.append(archival_cal)
+
+            return new_cals.get_batch(), new_archival_cals
+
+        self.calibrations.update(add_calibration_image)
 
     def summarise_errors(
         self,
@@ -351,7 +421,7 @@ class Monitor:
         # setup watchdog to monitor directory for trigger files
         logger.info(f"Watching {self.raw_image_directory}")
 
-        event_handler = NewImageHandler(monitor_queue)
+        event_handler = NewImageHandler(monitor_queue, self.completeness)
         observer = Observer()
         observer.schedule(event_handler, path=str(self.raw_image_directory))
         observer.start()
@@ -363,6 +433,7 @@ class Monitor:
             logger.info("No longer waiting for new images.")
             observer.stop()
             observer.join()
+            self.process_dither_sets(self.dither_scheduler.pop_all())
             self.postprocess()
             logger.info(f"Saving log to {self.log_path}")
 
@@ -422,6 +493,60 @@ class Monitor:
             self.errorstack += errorstack
             self.update_error_log()
 
+    def reduce_batch(self, img_batch: ImageBatch, paths: list[str], is_science: bool):
+        """
+        Reduce a batch of loaded images, alongside the calibration images
+
+        :param img_batch: images to reduce
+        :param paths: raw files the images were loaded from
+        :param is_science: whether the images are science images
+        :return: None
+        """
+        all_img = img_batch + self.get_cals()
+
+        msg = (
+            f"Reducing {paths[-1]} "
+            f"on thread {threading.get_ident()}, "
+            f"alongside {len(paths) - 1} other dither images "
+            f"(science={is_science})"
+        )
+        print(msg)
+        logger.info(msg)
+
+        _, errorstack = self.pipeline.reduce_images(
+            dataset=Dataset(all_img),
+            selected_configurations=self.realtime_configurations,
+            catch_all_errors=True,
+        )
+        self.errorstack += errorstack
+        self.update_error_log()
+
+        if is_science:
+            self.processed_science_images += paths
+        else:
+            self.processed_cal_images += paths
+
+    def process_dither_sets(self, dither_sets: list[DitherSet]):
+        """
+        Reduce dither sets which are ready, from the frames which have already
+        been loaded
+
+        :param dither_sets: dither sets to reduce
+        :return: None
+        """
+        for dither_set in dither_sets:
+            try:
+                self.reduce_batch(
+                    dither_set.images,
+                    paths=dither_set.paths,
+                    is_science=dither_set.is_science(),
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                err_report = ErrorReport(exc, "monitor", contents=dither_set.paths)
+                self.errorstack.add_report(err_report)
+                self.update_error_log()
+                self.failed_images += dither_set.paths
+
     def process_load_queue(self, queue: Queue):
         """This is the worker thread function. It is run as a daemon
         threads that only exit when the main thread ends.
@@ -443,156 +568,76 @@ class Monitor:
                         )
                         self.summarise_errors(errorstack=self.errorstack)
 
-            if not queue.empty():
-                event = queue.get()
-
-                if event.src_path[-5:] == ".fits":
-                    # Verify that file transfer is complete, useful for rsync latency
+            try:
+                event = queue.get(timeout=1.0)
+            except Empty:
+                self.process_dither_sets(self.dither_scheduler.pop_expired())
+                continue
+
+            if event.src_path[-5:] == ".fits":
+                # Verify that file transfer is complete, useful for rsync latency
+
+                transfer_done = self.completeness.wait_until_complete(event.src_path)
+
+                if not transfer_done:
+                    # If a corrupt image comes in, give up eventually
+                    err = (
+                        f"File {event.src_path} has not been fully "
+                        f"transferred after {FILE_TRANSFER_TIMEOUT_S} seconds. "
+                        f"It is probably corrupted. Skipping this file."
+                    )
+                    logger.error(err)
+                    try:
+                        raise ImageTimeoutError(err)
+                    except ImageTimeoutError as exc:
+                        err_report = ErrorReport(
+                            exc, "monitor", contents=[event.src_path]
+                        )
+                        self.errorstack.add_report(err_report)
+                    self.failed_images.append(event.src_path)
 
-                    transfer_done = False
-                    t_start = Time.now()
+                if transfer_done:
+                    try:
+                        # Start processing
+                        img_batch = self.pipeline.load_raw_image(event.src_path)
 
-                    while not transfer_done:
-                        transfer_done = check_file_is_complete(event.src_path)
+                        is_science = img_batch[0][OBSCLASS_KEY] == "science"
 
-                        wait = (Time.now() - t_start).to(u.second).value
+                        if not is_science:
+                            for img in img_batch:
+                                self.update_cals(img)
+                            # Process views, so the registered images are unchanged
+                            img_batch = ImageBatch([SharedImage(x) for x in img_batch])
 
-                        # If a corrupt image comes in, give up eventually
-                        if wait > FILE_TRANSFER_TIMEOUT_S:
-                            err = (
-                                f"File {event.src_path} has not been fully "
-                                f"transferred after 60 seconds. "
-                                f"It is probably corrupted. Skipping this file."
-                            )
-                            logger.error(err)
-                            try:
-                                raise ImageTimeoutError(err)
-                            except ImageTimeoutError as exc:
-                                err_report = ErrorReport(
-                                    exc, "monitor", contents=[event.src_path]
-                                )
-                                self.errorstack.add_report(err_report)
-                            self.failed_images.append(event.src_path)
-                            break
+                        img = img_batch[-1]
 
-                        if not transfer_done:
+                        if has_dither_keys(img):
                             msg = (
-                                f"Seems like the file {event.src_path} is not "
-                                f"fully transferred. Waited for {wait:.1f} seconds so far, "
-                                f"and will time out after {FILE_TRANSFER_TIMEOUT_S} s. "
-                                f"Will try again."
+                                f"Image {event.src_path} is dither number "
+                                f"{img[DITHER_N_KEY]} of {img[MAX_DITHER_KEY]}"
                             )
+                            print(msg)
                             logger.info(msg)
-                            # self.update_error_log()
-                            time.sleep(3)
-
-                    if transfer_done:
-                        try:
-                            # Start processing
-                            img_batch = self.pipeline.load_raw_image(event.src_path)
-
-                            is_science = img_batch[0][OBSCLASS_KEY] == "science"
-
-                            if not is_science:
-                                for img in img_batch:
-                                    self.update_cals(img)
-
-                            else:
-                                # Start clock with first science image
-                                if self.queue_t is None:
-                                    self.queue_t = Time.now()
-
-                            sci_img_batch = img_batch + self.get_cals()
-                            load_queue = list(self.queued_images)
 
-                            img = img_batch[-1]
-
-                            if (DITHER_N_KEY in img.keys()) & (
-                                MAX_DITHER_KEY in img.keys()
-                            ):
-                                msg = (
-                                    f"Image {event.src_path} is dither number "
-                                    f"{img[DITHER_N_KEY]} of {img[MAX_DITHER_KEY]}"
-                                )
-                                print(msg)
-                                logger.info(msg)
-                                # self.update_error_log()
-
-                                # If you have a new dither set, just process
-                                if np.logical_and(
-                                    int(img[DITHER_N_KEY]) == 1,
-                                    len(self.queued_images) > 0,
-                                ):
-                                    if img[MAX_DITHER_KEY] > 1:
-                                        sci_img_batch = ImageBatch([])
-                                        self.queued_images = [event.src_path]
-                                        logger.info(
-                                            f"Adding {event.src_path} to queue. "
-                                            f"It has dither number {img[DITHER_N_KEY]}."
-                                            f"The previous dither set was incomplete. "
-                                            f"Processing these {len(sci_img_batch)} "
-                                            f"images now."
-                                        )
-                                        # self.update_error_log()
-
-                                elif img[DITHER_N_KEY] != img[MAX_DITHER_KEY]:
-                                    if (Time.now() - self.queue_t) < (1.0 * u.hour):
-                                        self.queued_images.append(event.src_path)
-                                        sci_img_batch = None
-                                        logger.info(
-                                            f"Added {event.src_path} to queue. "
-                                            f"It has dither number {img[DITHER_N_KEY]}. "
-                                            f"Waiting for dither {img[MAX_DITHER_KEY]}."
-                                            f"Time since last image: "
-                                            f"{(Time.now() - self.queue_t).to('hour'):.3f}"
-                                            f" hours. There are "
-                                            f"{len(self.queued_images)} images"
-                                            f" in the queue."
-                                        )
-                                        # self.update_error_log()
-                                    else:
-                                        self.queued_images = []
-
-                            if sci_img_batch is not None:
-                                self.queue_t = Time.now()
-
-                                all_img = sci_img_batch + self.get_cals()
-
-                                for x in load_queue:
-                                    all_img += self.pipeline.load_raw_image(x)
-
-                                msg = (
-                                    f"Reducing {event.src_path} "
-                                    f"on thread {threading.get_ident()}, "
-                                    f"alongside {len(load_queue)} queue images"
-                                    f"(science={is_science})"
+                            self.process_dither_sets(
+                                self.dither_scheduler.add_images(
+                                    event.src_path, img_batch
                                 )
-                                print(msg)
-                                logger.info(msg)
-                                # self.update_error_log()
-
-                                _, errorstack = self.pipeline.reduce_images(
-                                    dataset=Dataset(all_img),
-                                    selected_configurations=self.realtime_configurations,
-                                    catch_all_errors=True,
-                                )
-                                self.errorstack += errorstack
-                                self.update_error_log()
-
-                                if is_science:
-                                    self.processed_science_images.append(event.src_path)
-                                else:
-                                    self.processed_cal_images.append(event.src_path)
-
-                        # RS: Please forgive me for this coding sin
-                        # I just want the monitor to never crash
-                        except Exception as exc:  # pylint: disable=broad-except
-                            err_report = ErrorReport(
-                                exc, "monitor", contents=[event.src_path]
                             )
-                            self.errorstack.add_report(err_report)
-                            self.update_error_log()
-                            self.failed_images.append(event.src_path)
 
-            else:
-                time.sleep(1)
+                        else:
+                            self.reduce_batch(
+                                img_batch, paths=[event.src_path], is_science=is_science
+                            )
+
+                    # RS: Please forgive me for this coding sin
+                    # I just want the monitor to never crash
+                    except Exception as exc:  # pylint: disable=broad-except
+                        err_report = ErrorReport(
+                            exc, "monitor", contents=[event.src_path]
+                        )
+                        self.errorstack.add_report(err_report)
+                        self.update_error_log()
+                        self.failed_images.append(event.src_path)
+
+            self.completeness.finish(event.src_path)
@@ -0,0 +1,112 @@
+"""
+Module for the shared calibration images of the realtime
+:class:`~mirar.monitor.base_monitor.Monitor`.
+
+Each incoming science image is reduced alongside all current calibration images.
+Rather than copying every calibration image for each reduction, the registry hands
+out :class:`~mirar.data.image_data.SharedImage` views, which only copy the header.
+Pixel data is read from the registered images (or their cache files) when needed,
+and only copied if a processor modifies it.
+
+The registered images are held as an immutable snapshot, which is replaced
+atomically when the calibration images are updated. A reduction therefore always
+sees a consistent set of calibration images, and images which are replaced stay
+available until the last view of them is released.
+"""
+
+import logging
+import threading
+from typing import Callable
+
+from mirar.data import Image, ImageBatch, SharedImage
+
+logger = logging.getLogger(__name__)
+
+
+class CalibrationRegistry:
+    """
+    Registry of calibration images shared between realtime reductions
+    """
+
+    def __init__(self):
+        self._new_cals: tuple[Image, ...] = ()
+        self._archival_cals: tuple[Image, ...] = ()
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        new_cals, archival_cals = self.get_snapshot()
+        return len(new_cals) + len(archival_cals)
+
+    def __str__(self):
+        new_cals, archival_cals = self.get_snapshot()
+        return (
+            f"<A calibration registry with {len(new_cals)} new and "
+            f"{len(archival_cals)} archival images>"
+        )
+
+    def get_snapshot(self) -> tuple[tuple[Image, ...], tuple[Image, ...]]:
+        """
+        Get the current registered images. These must not be modified.
+
+        :return: new calibration images, archival calibration images
+        """
+        with self._lock:
+            return self._new_cals, self._archival_cals
+
+    def get_new_cals(self) -> ImageBatch:
+        """
+        Get the registered new calibration images. These must not be modified.
+
+        :return: batch of new calibration images
+        """
+        return ImageBatch(list(self.get_snapshot()[0]))
+
+    def get_archival_cals(self) -> ImageBatch:
+        """
+        Get the registered archival calibration images. These must not be modified.
+
+        :return: batch of archival calibration images
+        """
+        return ImageBatch(list(self.get_snapshot()[1]))
+
+    def replace(self, new_cals: list[Image], archival_cals: list[Image]):
+        """
+        Atomically replace the registered calibration images
+
+        :param new_cals: new calibration images
+        :param archival_cals: archival calibration images
+        :return: None
+        """
+        new_cals, archival_cals = tuple(new_cals), tuple(archival_cals)
+        with self._lock:
+            self._new_cals, self._archival_cals = new_cals, archival_cals
+        logger.debug(f"Updated calibration images: {self}")
+
+    def update(
+        self,
+        update_f: Callable[
+            [tuple[Image, ...], tuple[Image, ...]], tuple[list[Image], list[Image]]
+        ],
+    ):
+        """
+        Update the registered calibration images with a function of the current
+        ones. Updates are applied one at a time, so none are lost, while views
+        can still be taken from the previous snapshot until the update is complete.
+
+        :param update_f: function taking the current new and archival calibration
+            images, and returning the updated ones
+        :return: None
+        """
+        with self._update_lock:
+            self.replace(*update_f(*self.get_snapshot()))
+
+    def get_views(self) -> ImageBatch:
+        """
+        Get shared views of all registered calibration images (new, then archival),
+        which can be processed without changing the registered images
+
+        :return: batch of shared images
+        """
+        new_cals, archival_cals = self.get_snapshot()
+        return ImageBatch([SharedImage(x) for x in new_cals + archival_cals])
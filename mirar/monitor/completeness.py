@@ -0,0 +1,237 @@
+"""
+Module for detecting when newly-arrived raw files are complete, for the
+realtime :class:`~mirar.monitor.base_monitor.Monitor`.
+
+On Linux, the watchdog observer uses inotify, and reports when a file is closed
+after writing (IN_CLOSE_WRITE) or moved into the directory (IN_MOVED_TO, e.g. at
+the end of an rsync transfer). A file is then processed as soon as those
+events arrive. On filesystems without inotify (e.g. network mounts, or other
+operating systems), no such events are reported, so files are instead polled
+with exponential back-off until their size is stable.
+
+In both cases, a file is only accepted when the FITS headers are complete, and
+the file is at least as long as the data described by the NAXIS* keywords.
+Only the headers are read, so the pixel data is never decoded.
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from astropy.io import fits
+
+logger = logging.getLogger(__name__)
+
+FITS_BLOCK_SIZE = 2880
+FITS_CARD_SIZE = 80
+
+FILE_TRANSFER_TIMEOUT_S = 60.0
+MIN_POLL_INTERVAL_S = 0.05
+MAX_POLL_INTERVAL_S = 2.0
+
+
+def get_hdu_data_size(header: fits.Header) -> int:
+    """
+    Get the size (in bytes, without padding) of the data of an HDU,
+    from the BITPIX, NAXIS*, PCOUNT and GCOUNT keywords
+
+    :param header: header of the HDU
+    :return: size of the data
+    """
+    n_axis = int(header.get("NAXIS", 0))
+    if n_axis == 0:
+        return 0
+
+    axes = [int(header.get(f"NAXIS{i + 1}", 0)) for i in range(n_axis)]
+    # Random groups have NAXIS1 = 0, which is not part of the data shape
+    if header.get("GROUPS", False) & (axes[0] == 0):
+        axes = axes[1:]
+
+    n_values = int(header.get("GCOUNT", 1)) * (
+        int(header.get("PCOUNT", 0)) + int(np.prod(axes, dtype=np.int64))
+    )
+    return abs(int(header["BITPIX"])) // 8 * n_values
+
+
+def read_fits_header(file_obj, file_size: int) -> Optional[bytes]:
+    """
+    Read the raw bytes of a FITS header, starting at the current file position
+
+    :param file_obj: open file
+    :param file_size: size of the file
+    :return: header bytes (a whole number of blocks), or None if the header
+        is incomplete
+    """
+    header_bytes = b""
+    while file_obj.tell() + FITS_BLOCK_SIZE <= file_size:
+        block = file_obj.read(FITS_BLOCK_SIZE)
+        header_bytes += block
+        for i in range(0, FITS_BLOCK_SIZE, FITS_CARD_SIZE):
+            if block[i : i + 8] == b"END     ":
+                return header_bytes
+    return None
+
+
+def get_expected_fits_size(path: str | Path) -> Optional[int]:
+    """
+    Get the minimum size a FITS file should have, given its headers.
+    Only the headers are read.
+
+    :param path: path of the file
+    :return: expected size (in bytes), or None if the headers are incomplete
+        or invalid
+    """
+    try:
+        file_size = os.path.getsize(path)
+        with open(path, "rb") as file_obj:
+            offset, data_end, n_hdu, n_extensions = 0, 0, 0, 0
+            while (n_hdu == 0) | (offset < file_size):
+                file_obj.seek(offset)
+                header_bytes = read_fits_header(file_obj, file_size)
+                if header_bytes is None:
+                    return None
+
+                header = fits.Header.fromstring(header_bytes.decode("ascii"))
+                if n_hdu == 0:
+                    if "SIMPLE" not in header:
+                        return None
+                    if header.get("EXTEND", False):
+                        n_extensions = int(header.get("NEXTEND", 0))
+
+                data_size = get_hdu_data_size(header)
+                data_end = offset + len(header_bytes) + data_size
+                n_blocks = int(np.ceil(data_size / FITS_BLOCK_SIZE))
+                offset += len(header_bytes) + n_blocks * FITS_BLOCK_SIZE
+                n_hdu += 1
+    except (OSError, ValueError, KeyError, UnicodeDecodeError):
+        return None
+
+    # Extensions which have not arrived yet
+    if n_hdu < n_extensions + 1:
+        return None
+
+    # The final block need not be padded for the data to be readable
+    return data_end
+
+
+def check_fits_complete(path: str | Path) -> bool:
+    """
+    Check whether a FITS file is complete, from its headers and size
+
+    :param path: path of the file
+    :return: boolean
+    """
+    expected_size = get_expected_fits_size(path)
+    if expected_size is None:
+        return False
+    return os.path.getsize(path) >= expected_size
+
+
+class FileCompletenessChecker:
+    """
+    Class to track new files, and wait for them to be complete.
+
+    Files are registered once (see :meth:`claim`), so that the several
+    filesystem events for the same file (created, closed, moved) only lead to
+    it being processed once. Close/move events wake up any worker waiting
+    on that file immediately.
+    """
+
+    def __init__(
+        self,
+        timeout: float = FILE_TRANSFER_TIMEOUT_S,
+        min_poll_interval: float = MIN_POLL_INTERVAL_S,
+        max_poll_interval: float = MAX_POLL_INTERVAL_S,
+    ):
+        self.timeout = timeout
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self._claimed = set()
+        self._closed = {}
+        self._lock = threading.Lock()
+
+    def _get_closed_event(self, path: str) -> threading.Event:
+        with self._lock:
+            if path not in self._closed:
+                self._closed[path] = threading.Event()
+            return self._closed[path]
+
+    def claim(self, path: str) -> bool:
+        """
+        Register a new file
+
+        :param path: path of the file
+        :return: True if the file is new, False if it was already registered
+        """
+        with self._lock:
+            if path in self._claimed:
+                return False
+            self._claimed.add(path)
+            return True
+
+    def mark_closed(self, path: str):
+        """
+        Record that a file has been closed after writing, or moved into place
+
+        :param path: path of the file
+        :return: None
+        """
+        self._get_closed_event(path).set()
+
+    def finish(self, path: str):
+        """
+        Stop tracking a file once it has been processed.
+        It stays registered, so later events for it are ignored.
+
+        :param path: path of the file
+        :return: None
+        """
+        with self._lock:
+            self._closed.pop(path, None)
+
+    def wait_until_complete(self, path: str) -> bool:
+        """
+        Wait until a file is complete, or the timeout is reached.
+
+        A file is complete once its FITS headers and data length are valid, and
+        either it has been closed/moved, or its size is stable between two polls.
+
+        :param path: path of the file
+        :return: True if the file is complete, False if the timeout was reached
+        """
+        closed_event = self._get_closed_event(path)
+        t_start = time.monotonic()
+        poll_interval = self.min_poll_interval
+        last_size = None
+
+        while True:
+            closed = closed_event.is_set()
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = None
+
+            if (size is not None) and check_fits_complete(path):
+                if closed | (size == last_size):
+                    logger.debug(
+                        f"File {path} is complete after "
+                        f"{time.monotonic() - t_start:.3f} s"
+                    )
+                    return True
+            last_size = size
+
+            remaining = self.timeout - (time.monotonic() - t_start)
+            if remaining <= 0:
+                return False
+
+            wait = min(poll_interval, remaining)
+            if closed:
+                # Closed, but not yet valid (e.g. it will be written again)
+                time.sleep(wait)
+            else:
+                closed_event.wait(wait)
+            poll_interval = min(2.0 * poll_interval, self.max_poll_interval)
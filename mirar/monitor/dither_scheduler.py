@@ -0,0 +1,193 @@
+"""
+Module for scheduling the reduction of dither sets in the realtime
+:class:`~mirar.monitor.base_monitor.Monitor`.
+
+Images of a dither sequence should be reduced together. Rather than re-loading
+each frame from disk once the final dither arrives, the scheduler keeps the
+frames which have already been loaded (with their data in the image cache),
+grouped by the header keys identifying a dither set. A set is dispatched as
+soon as all of its expected dithers have arrived.
+
+Sets which are never completed (e.g. because an exposure was aborted) are
+dispatched once no new frame has arrived for a configurable timeout, or once
+a new sequence with the same group keys begins.
+"""
+
+import logging
+import threading
+import time
+from typing import Optional
+
+from mirar.data import Image, ImageBatch
+from mirar.paths import DITHER_N_KEY, MAX_DITHER_KEY, OBSCLASS_KEY, TARGET_KEY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DITHER_GROUP_KEYS = (OBSCLASS_KEY, TARGET_KEY, MAX_DITHER_KEY)
+DITHER_SET_TIMEOUT_HOURS = 1.0
+
+
+def has_dither_keys(image: Image) -> bool:
+    """
+    Check whether an image is part of a dither sequence
+
+    :param image: image
+    :return: boolean
+    """
+    return (DITHER_N_KEY in image.keys()) & (MAX_DITHER_KEY in image.keys())
+
+
+class DitherSet:
+    """
+    Class for the frames of a single dither sequence which have arrived so far
+    """
+
+    def __init__(self, key: tuple, n_dithers: int):
+        self.key = key
+        self.n_dithers = n_dithers
+        self.paths = []
+        self.images = ImageBatch()
+        self.dither_numbers = set()
+        self.t_last = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __str__(self):
+        return (
+            f"<Dither set {self.key}, with dithers "
+            f"{sorted(self.dither_numbers)} of {self.n_dithers}>"
+        )
+
+    def add(self, path: str, img_batch: ImageBatch):
+        """
+        Add the images loaded from a raw file
+
+        :param path: path of the raw file
+        :param img_batch: images loaded from the file
+        :return: None
+        """
+        self.paths.append(path)
+        self.images += img_batch
+        self.dither_numbers.add(int(img_batch[-1][DITHER_N_KEY]))
+        self.t_last = time.monotonic()
+
+    def is_complete(self) -> bool:
+        """
+        Check whether all expected dithers have arrived
+
+        :return: boolean
+        """
+        return set(range(1, self.n_dithers + 1)).issubset(self.dither_numbers)
+
+    def is_science(self) -> bool:
+        """
+        Check whether the set contains science images
+
+        :return: boolean
+        """
+        return self.images[0][OBSCLASS_KEY] == "science"
+
+
+class DitherSetScheduler:
+    """
+    Class to collect loaded frames into dither sets, and decide when each set
+    should be reduced
+    """
+
+    def __init__(
+        self,
+        group_keys: tuple[str, ...] = DEFAULT_DITHER_GROUP_KEYS,
+        timeout_hours: float = DITHER_SET_TIMEOUT_HOURS,
+    ):
+        self.group_keys = group_keys
+        self.timeout = float(timeout_hours) * 3600.0
+        self._sets: dict[tuple, DitherSet] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sets)
+
+    def get_group_key(self, image: Image) -> tuple:
+        """
+        Get the key of the dither set an image belongs to
+
+        :param image: image
+        :return: tuple of header values
+        """
+        return tuple(
+            str(image[key]) if key in image.keys() else None for key in self.group_keys
+        )
+
+    def _pop_expired(self, now: Optional[float] = None) -> list[DitherSet]:
+        if now is None:
+            now = time.monotonic()
+        expired = [
+            key
+            for key, dither_set in self._sets.items()
+            if (now - dither_set.t_last) > self.timeout
+        ]
+        return [self._sets.pop(key) for key in expired]
+
+    def add_images(self, path: str, img_batch: ImageBatch) -> list[DitherSet]:
+        """
+        Add the images loaded from a new raw file, and return any dither sets which
+        are now ready to be reduced. This includes the set of the new file if it is
+        complete, and any incomplete sets which have been superseded or timed out.
+
+        :param path: path of the raw file
+        :param img_batch: images loaded from the file
+        :return: list of dither sets to reduce
+        """
+        image = img_batch[-1]
+        key = self.get_group_key(image)
+        dither_n = int(image[DITHER_N_KEY])
+
+        with self._lock:
+            ready = self._pop_expired()
+
+            dither_set = self._sets.get(key)
+            if (dither_set is not None) and (dither_n in dither_set.dither_numbers):
+                # A new sequence has begun, so the previous one is incomplete
+                ready.append(self._sets.pop(key))
+                dither_set = None
+
+            if dither_set is None:
+                dither_set = DitherSet(key, n_dithers=int(image[MAX_DITHER_KEY]))
+                self._sets[key] = dither_set
+
+            dither_set.add(path, img_batch)
+
+            if dither_set.is_complete():
+                ready.append(self._sets.pop(key))
+
+        for x in ready:
+            if not x.is_complete():
+                logger.warning(f"Dither set is incomplete: {x}")
+
+        return ready
+
+    def pop_expired(self) -> list[DitherSet]:
+        """
+        Get the incomplete dither sets which have not received a new frame within
+        the timeout
+
+        :return: list of dither sets to reduce
+        """
+        with self._lock:
+            expired = self._pop_expired()
+        for x in expired:
+            logger.warning(f"Dither set timed out before completion: {x}")
+        return expired
+
+    def pop_all(self) -> list[DitherSet]:
+        """
+        Get all remaining dither sets, e.g. when the monitor stops
+
+        :return: list of dither sets to reduce
+        """
+        with self._lock:
+            remaining = list(self._sets.values())
+            self._sets = {}
+        return remaining
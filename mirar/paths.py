@@ -67,6 +67,19 @@ else:
 TEMP_DIR = base_output_dir.joinpath(f"{PACKAGE_NAME}_temp")
 TEMP_DIR.mkdir(exist_ok=True)
 
+# Fast scratch space (ideally tmpfs) for temporary input files of external software
+_scratch_dir = os.getenv("SCRATCH_DIR")
+
+if _scratch_dir is None:
+    _shm_dir = Path("/dev/shm")
+    if _shm_dir.is_dir() and os.access(_shm_dir, os.W_OK):
+        SCRATCH_DIR = _shm_dir
+    else:
+        SCRATCH_DIR = TEMP_DIR
+else:
+    SCRATCH_DIR = Path(_scratch_dir)
+    SCRATCH_DIR.mkdir(parents=True, exist_ok=True)
+
 RAW_IMG_SUB_DIR = "raw"
 CAL_OUTPUT_SUB_DIR = "calibration"
 
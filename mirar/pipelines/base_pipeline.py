@@ -13,14 +13,17 @@ The pipeline will process data using a chosen list of these individual
 import copy
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
 import numpy as np
+from tqdm.auto import tqdm
 
-from mirar.data import Dataset, Image, ImageBatch
+from mirar.data import DataBatch, Dataset, Image, ImageBatch
 from mirar.errors import ErrorStack
-from mirar.paths import get_output_path
+from mirar.paths import get_output_path, max_n_cpu
 from mirar.processors.base_processor import BaseProcessor
 from mirar.processors.utils.error_annotator import ErrorStackAnnotator
 
@@ -252,20 +255,28 @@ class Pipeline:
 
         return flowchart
 
-    def reduce_images(
+    def reduce_images(  # pylint: disable=too-many-arguments
         self,
         dataset: Optional[Dataset] = None,
         output_error_path: Optional[str] = None,
         catch_all_errors: bool = True,
         selected_configurations: Optional[str | list[str]] = None,
+        streaming: bool = False,
     ) -> tuple[Dataset, ErrorStack]:
         """
         Function to process a given dataset.
 
+        By default, each processor is applied to the entire dataset before the next
+        processor is started. In streaming mode, each batch instead flows through
+        consecutive processors independently, and the pipeline only synchronises
+        at processors which need the whole dataset (e.g. batchers).
+        See :func:`~mirar.pipelines.base_pipeline.Pipeline.stream_images`.
+
         :param dataset: dataset to process (can  be empty)
         :param output_error_path: optional path to write error summary
         :param catch_all_errors: Either catch errors, or just immediately raise them
         :param selected_configurations: Configuration to use
+        :param streaming: Whether to stream batches through the processors
         :return: Post-processing dataset and summary of errors caught
         """
 
@@ -293,6 +304,14 @@ class Pipeline:
 
             processors = self.set_configuration(configuration)
 
+            if streaming:
+                dataset, new_err_stack = self.stream_images(
+                    dataset, processors, catch_all_errors=catch_all_errors
+                )
+                err_stack += new_err_stack
+                all_processors += processors
+                continue
+
             for i, processor in enumerate(processors):
                 logger.info(
                     f"Applying '{processor.__class__} to {len(dataset)} batches "
@@ -324,6 +343,168 @@ class Pipeline:
         )
         return dataset, err_stack
 
+    @staticmethod
+    def get_streaming_segments(
+        processors: list[BaseProcessor],
+    ) -> list[list[BaseProcessor]]:
+        """
+        Splits a list of processors into segments. Each segment is either a single
+        processor, or a run of consecutive streamable processors which batches
+        can flow through independently.
+
+        :param processors: Processors to split
+        :return: list of processor segments
+        """
+        segments = []
+        current = []
+
+        for processor in processors:
+            if processor.is_streamable():
+                current.append(processor)
+            else:
+                if len(current) > 0:
+                    segments.append(current)
+                    current = []
+                segments.append([processor])
+
+        if len(current) > 0:
+            segments.append(current)
+
+        return segments
+
+    @staticmethod
+    def stream_images(
+        dataset: Dataset,
+        processors: list[BaseProcessor],
+        catch_all_errors: bool = True,
+    ) -> tuple[Dataset, ErrorStack]:
+        """
+        Function to process a dataset in streaming mode.
+
+        Consecutive streamable processors are grouped into segments. Within a
+        segment, each batch is passed through all processors by a single worker,
+        without waiting for other batches. Processors which are not streamable
+        (see :func:`~mirar.processors.base_processor.BaseProcessor.is_streamable`)
+        are applied to the whole dataset as usual. Within a segment, all
+        processors use threads, and the number of batches each processor handles
+        at once is still limited by its max_n_cpu.
+
+        :param dataset: dataset to process
+        :param processors: processors to apply
+        :param catch_all_errors: Either catch errors, or just immediately raise them
+        :return: Post-processing dataset and summary of errors caught
+        """
+        err_stack = ErrorStack()
+
+        n_steps = 0
+
+        for segment in Pipeline.get_streaming_segments(processors):
+            first_step = n_steps + 1
+            n_steps += len(segment)
+
+            if len(segment) == 1:
+                processor = segment[0]
+                logger.info(
+                    f"Applying '{processor.__class__} to {len(dataset)} batches "
+                    f"(Step {n_steps}/{len(processors)})"
+                )
+                logger.info(f"[{str(processor)}]")
+                dataset, new_err_stack = processor.base_apply(dataset)
+            else:
+                logger.info(
+                    f"Streaming {len(dataset)} batches through "
+                    f"{[x.__class__.__name__ for x in segment]} "
+                    f"(Steps {first_step}-{n_steps}/{len(processors)})"
+                )
+                dataset, new_err_stack = Pipeline.stream_segment(dataset, segment)
+
+            err_stack += new_err_stack
+
+            if np.logical_and(not catch_all_errors, len(err_stack.reports) > 0):
+                raise err_stack.reports[0].error
+
+            if len(dataset) == 0:
+                logger.error(
+                    f"No images left in dataset. "
+                    f"Terminating early, after step {n_steps}/{len(processors)} "
+                    f"({segment[-1].__class__.__name__})."
+                )
+                break
+
+        return dataset, err_stack
+
+    @staticmethod
+    def stream_segment(  # pylint: disable=too-many-locals
+        dataset: Dataset, processors: list[BaseProcessor]
+    ) -> tuple[Dataset, ErrorStack]:
+        """
+        Function to stream each batch of a dataset through a segment of
+        streamable processors. The output order of batches is preserved,
+        and the processing statistics of each processor are updated.
+
+        :param dataset: dataset to process
+        :param processors: streamable processors to apply
+        :return: Post-processing dataset and summary of errors caught
+        """
+        lock = threading.Lock()
+        semaphores = [threading.BoundedSemaphore(x.max_n_cpu) for x in processors]
+        reports = [[] for _ in processors]
+        n_input = [[0, 0] for _ in processors]
+        n_output = [[0, 0] for _ in processors]
+
+        def stream_batch(batch: DataBatch) -> DataBatch | None:
+            for k, processor in enumerate(processors):
+                with lock:
+                    n_input[k][0] += 1
+                    n_input[k][1] += len(batch)
+
+                with semaphores[k]:
+                    batch, report = processor.safe_apply(batch)
+
+                if report is not None:
+                    with lock:
+                        reports[k].append(report)
+
+                if batch is None:
+                    return None
+
+                new_dataset = processor.update_dataset(Dataset([batch]))
+
+                if len(new_dataset) == 0:
+                    return None
+
+                batch = new_dataset[0]
+
+                with lock:
+                    n_output[k][0] += 1
+                    n_output[k][1] += len(batch)
+
+            return batch
+
+        results = []
+
+        if len(dataset) > 0:
+            n_workers = min(max_n_cpu, len(dataset))
+            with tqdm(total=len(dataset), position=0, leave=False) as progress:
+                with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                    for result in executor.map(stream_batch, dataset):
+                        results.append(result)
+                        progress.update(1)
+
+        err_stack = ErrorStack()
+
+        for k, processor in enumerate(processors):
+            processor.latest_n_input_batches, processor.latest_n_input_blocks = n_input[
+                k
+            ]
+            processor.latest_n_output_batches, processor.latest_n_output_blocks = (
+                n_output[k]
+            )
+            processor.latest_error_stack = ErrorStack(reports[k])
+            err_stack += processor.latest_error_stack
+
+        return Dataset([x for x in results if x is not None]), err_stack
+
     def postprocess_configuration(
         self,
         errorstack: ErrorStack,
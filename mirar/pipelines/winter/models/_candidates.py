@@ -369,3 +369,39 @@ class Candidate(BaseDB):
             duplicate_protocol=duplicate_protocol,
             returning_key_names=returning_key_names,
         )
+
+    @classmethod
+    def supports_bulk_insert(cls) -> bool:
+        return True
+
+    @classmethod
+    def prepare_bulk_entries(cls, entries: list["Candidate"]) -> list["Candidate"]:
+        """
+        Replace any program not found in the database with the default program,
+        using a single query for all entries
+
+        :param entries: validated entries
+        :return: entries to insert
+        """
+        prognames = list({x.progname for x in entries})
+
+        prog_match = select_from_table(
+            DBQueryConstraints(
+                columns=["progname"],
+                accepted_values=[prognames],
+                comparison_types=["in"],
+            ),
+            sql_table=Program.sql_model,
+            output_columns=["progname"],
+        )
+        known = set(prog_match["progname"]) if not prog_match.empty else set()
+
+        for entry in entries:
+            if entry.progname not in known:
+                logger.debug(
+                    f"Program {entry.progname} not found in database. "
+                    f"Using default program {default_program.progname}"
+                )
+                entry.progname = default_program.progname
+
+        return entries
@@ -2,11 +2,18 @@
 Module to run
 :func:`~mirar.processors.astromatic.sextractor.sourceextractor.run_sextractor_single
  as a processor.
+
+All images of a batch are extracted concurrently with
+:func:`~mirar.processors.astromatic.sextractor.sourceextractor.run_sextractor_batch`.
+Unless the temporary files are to be cached, the input images and weights are
+written to a per-batch scratch directory (on tmpfs where available, see
+`SCRATCH_DIR`), which is removed once the batch is complete.
 """
 
 import logging
 import os
-import shutil
+import tempfile
+from functools import partial
 from pathlib import Path
 from typing import Callable, Optional
 
@@ -20,12 +27,17 @@ from mirar.paths import (
     BASE_NAME_KEY,
     LATEST_WEIGHT_SAVE_KEY,
     PSFEX_CAT_KEY,
+    SCRATCH_DIR,
     get_output_dir,
     get_temp_path,
 )
 from mirar.processors.astromatic.sextractor.sourceextractor import (
+    MAX_SEXTRACTOR_PROCESSES,
+    get_sextractor_params,
     parse_checkimage,
+    run_sextractor_batch,
     run_sextractor_single,
+    validate_sextractor_files,
 )
 from mirar.processors.base_processor import (
     BaseImageProcessor,
@@ -88,6 +100,7 @@ class Sextractor(BaseImageProcessor):  # pylint: disable=too-many-instance-attri
         use_psfex: bool = False,
         psf_path: Optional[str] = None,
         catalog_purifier: Callable[[Table, Image], Table] = None,
+        max_processes: int = MAX_SEXTRACTOR_PROCESSES,
     ):
         """
         :param output_sub_dir: subdirectory to output sextractor files
@@ -110,6 +123,8 @@ class Sextractor(BaseImageProcessor):  # pylint: disable=too-many-instance-attri
         for key in header
         :param catalog_purifier: If not None, will apply this function to the
         Sextractor catalog before saving
+        :param max_processes: maximum number of concurrent sextractor processes
+        for each batch
         """
         # pylint: disable=too-many-arguments
         super().__init__()
@@ -130,6 +145,7 @@ class Sextractor(BaseImageProcessor):  # pylint: disable=too-many-instance-attri
         self.use_psfex = use_psfex
         self.psf_path = psf_path
         self.catalog_purifier = catalog_purifier
+        self.max_processes = max_processes
 
         if isinstance(self.checkimage_name, str):
             self.checkimage_name = [self.checkimage_name]
@@ -166,13 +182,7 @@ class Sextractor(BaseImageProcessor):  # pylint: disable=too-many-instance-attri
             f"required params {required_psf_params}"
         )
 
-        with open(sextractor_param_path, "rb") as param_file:
-            sextractor_params = [
-                x.strip().decode() for x in param_file.readlines() if len(x.strip()) > 0
-            ]
-            sextractor_params = [
-                x.split("(")[0] for x in sextractor_params if x[0] not in ["#"]
-            ]
+        sextractor_params = get_sextractor_params(sextractor_param_path)
 
         for param in required_psf_params:
             param_found = param in sextractor_params
@@ -198,41 +208,69 @@ class Sextractor(BaseImageProcessor):  # pylint: disable=too-many-instance-attri
                 logger.error(err)
                 raise PrerequisiteError(err)
 
-    def _apply_to_images(  # pylint: disable=too-many-locals, too-many-branches
-        self, batch: ImageBatch
-    ) -> ImageBatch:
-        sextractor_out_dir = self.get_sextractor_output_dir()
-        sextractor_out_dir.mkdir(parents=True, exist_ok=True)
+    def run_sextractor_job(
+        self, image: Image, temp_dir: Path, sextractor_kwargs: dict
+    ) -> tuple[Path, list[str]]:
+        """
+        Write the temporary input files for an image, and run sextractor on it
 
-        for image in batch:
-            if self.gain is None and "GAIN" in image.keys():
-                self.gain = image["GAIN"]
+        :param image: image
+        :param temp_dir: directory for the temporary input files
+        :param sextractor_kwargs: other arguments for `run_sextractor_single`
+        :return: path of the output catalog, names of the checkimages
+        """
+        temp_path = get_temp_path(temp_dir, image[BASE_NAME_KEY])
 
-            temp_path = get_temp_path(sextractor_out_dir, image[BASE_NAME_KEY])
+        temp_files = []
 
+        try:
             if not temp_path.exists():
                 self.save_fits(image, temp_path)
 
-            temp_files = [temp_path]
+            temp_files.append(temp_path)
 
             weight_path = None
 
             if LATEST_WEIGHT_SAVE_KEY in image.keys():
-                image_weight_path = sextractor_out_dir.joinpath(
+                image_weight_path = self.get_sextractor_output_dir().joinpath(
                     image[LATEST_WEIGHT_SAVE_KEY]
                 )
-                temp_weight_path = get_temp_path(
-                    sextractor_out_dir, image[LATEST_WEIGHT_SAVE_KEY]
-                )
                 if image_weight_path.exists():
-                    shutil.copyfile(image_weight_path, temp_weight_path)
-                    weight_path = temp_weight_path
-                    temp_files.append(weight_path)
+                    # Sextractor only reads the weight image, so it need not be copied
+                    weight_path = image_weight_path
 
             if weight_path is None:
                 weight_path = self.save_mask_image(image, temp_path)
                 temp_files.append(weight_path)
 
+            return run_sextractor_single(
+                img=temp_path, weight_image=weight_path, **sextractor_kwargs
+            )
+
+        finally:
+            logger.debug(f"Cache save is {self.cache}")
+            if not self.cache:
+                for temp_file in temp_files:
+                    temp_file.unlink(missing_ok=True)
+                    logger.debug(f"Deleted temporary file {temp_file}")
+
+    def _apply_to_images(  # pylint: disable=too-many-locals, too-many-branches
+        self, batch: ImageBatch
+    ) -> ImageBatch:
+        sextractor_out_dir = self.get_sextractor_output_dir()
+        sextractor_out_dir.mkdir(parents=True, exist_ok=True)
+
+        validate_sextractor_files(
+            self.config, self.parameters_name, self.filter_name, self.starnnw_name
+        )
+        self.check_psf_prerequisite()
+
+        jobs = []
+
+        for image in batch:
+            if self.gain is None and "GAIN" in image.keys():
+                self.gain = image["GAIN"]
+
             if self.use_psfex:
                 if PSFEX_CAT_KEY in image.keys():
                     self.psf_path = Path(image[PSFEX_CAT_KEY])
@@ -244,7 +282,6 @@ class Sextractor(BaseImageProcessor):  # pylint: disable=too-many-instance-attri
                         f"the header, or specify the path manually using psf_name "
                         f"argument"
                     )
-            self.check_psf_prerequisite()
 
             output_cat = sextractor_out_dir.joinpath(
                 image[BASE_NAME_KEY].replace(".fits", ".cat")
@@ -258,29 +295,47 @@ class Sextractor(BaseImageProcessor):  # pylint: disable=too-many-instance-attri
 
             logger.debug(f"Sextractor checkimage name is {checkimage_name}")
 
-            output_cat, checkimage_name = run_sextractor_single(
-                img=temp_path,
-                config=self.config,
-                output_dir=sextractor_out_dir,
-                parameters_name=self.parameters_name,
-                filter_name=self.filter_name,
-                starnnw_name=self.starnnw_name,
-                saturation=self.saturation,
-                weight_image=weight_path,
-                verbose_type=self.verbose_type,
-                checkimage_name=checkimage_name,
-                checkimage_type=self.checkimage_type,
-                gain=self.gain,
-                psf_name=self.psf_path,
-                catalog_name=output_cat,
+            sextractor_kwargs = {
+                "config": self.config,
+                "output_dir": sextractor_out_dir,
+                "parameters_name": self.parameters_name,
+                "filter_name": self.filter_name,
+                "starnnw_name": self.starnnw_name,
+                "saturation": self.saturation,
+                "verbose_type": self.verbose_type,
+                "checkimage_name": checkimage_name,
+                "checkimage_type": self.checkimage_type,
+                "gain": self.gain,
+                "psf_name": self.psf_path,
+                "catalog_name": output_cat,
+            }
+            jobs.append((image, sextractor_kwargs))
+
+        if self.cache:
+            # Temporary files are kept alongside the output
+            scratch_dir = None
+            temp_dir = sextractor_out_dir
+        else:
+            scratch_dir = (
+                tempfile.TemporaryDirectory(  # pylint: disable=consider-using-with
+                    dir=SCRATCH_DIR, prefix="sextractor_"
+                )
             )
+            temp_dir = Path(scratch_dir.name)
+
+        try:
+            results = run_sextractor_batch(
+                [
+                    partial(self.run_sextractor_job, image, temp_dir, kwargs)
+                    for image, kwargs in jobs
+                ],
+                max_workers=self.max_processes,
+            )
+        finally:
+            if scratch_dir is not None:
+                scratch_dir.cleanup()
 
-            logger.debug(f"Cache save is {self.cache}")
-            if not self.cache:
-                for temp_file in temp_files:
-                    temp_file.unlink()
-                    logger.debug(f"Deleted temporary file {temp_file}")
-
+        for image, (output_cat, checkimage_name) in zip(batch, results):
             if self.catalog_purifier is not None:
                 output_catalog = get_table_from_ldac(output_cat)
                 clean_catalog = self.catalog_purifier(output_catalog, image)
@@ -1,13 +1,22 @@
 """
 Module to run source extractor
+
+Many images can be processed at once with :func:`run_sextractor_batch`, which runs
+several extractions concurrently. The total number of source extractor processes
+is limited by a shared budget (`MAX_N_CPU` by default), however many batches
+are running at the same time.
 """
 
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional, TypeVar
 
 from mirar.data.utils import write_regions_file
+from mirar.paths import max_n_cpu
 from mirar.processors.astromatic.config import astromatic_config_dir
 from mirar.utils import ExecutionError, execute
 from mirar.utils.ldac_tools import get_table_from_ldac
@@ -33,6 +42,85 @@ class SextractorError(ExecutionError):
 
 LOCAL_SEXTRACTOR = True
 
+# Limit on the number of concurrent sextractor processes, shared by all batches
+MAX_SEXTRACTOR_PROCESSES = max_n_cpu
+sextractor_process_budget = threading.BoundedSemaphore(MAX_SEXTRACTOR_PROCESSES)
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=32)
+def _parse_sextractor_params(
+    parameters_path: str, _mtime_ns: int, _size: int
+) -> tuple[str, ...]:
+    with open(parameters_path, "rb") as param_file:
+        sextractor_params = [
+            x.strip().decode() for x in param_file.readlines() if len(x.strip()) > 0
+        ]
+    return tuple(x.split("(")[0] for x in sextractor_params if x[0] not in ["#"])
+
+
+def get_sextractor_params(parameters_path: str | Path) -> tuple[str, ...]:
+    """
+    Get the names of the parameters in a sextractor parameter file.
+    Each file is only parsed once, unless it changes.
+
+    :param parameters_path: path of the parameter file
+    :return: parameter names
+    """
+    stat = os.stat(parameters_path)
+    return _parse_sextractor_params(
+        str(parameters_path), stat.st_mtime_ns, stat.st_size
+    )
+
+
+@lru_cache(maxsize=32)
+def _validate_sextractor_files(paths: tuple[str, ...]):
+    missing = [x for x in paths if not os.path.isfile(x)]
+    if len(missing) > 0:
+        err = f"Sextractor configuration files not found: {missing}"
+        logger.error(err)
+        raise SextractorError(err)
+
+
+def validate_sextractor_files(*paths: Optional[str | Path]):
+    """
+    Check that sextractor configuration files (config, parameter, filter and
+    starnnw files) exist. Files which have been validated once are not checked again.
+
+    :param paths: paths of configuration files, None values are ignored
+    :return: None
+    """
+    _validate_sextractor_files(tuple(str(x) for x in paths if x is not None))
+
+
+def run_sextractor_batch(
+    jobs: list[Callable[[], T]], max_workers: int = MAX_SEXTRACTOR_PROCESSES
+) -> list[T]:
+    """
+    Run many sextractor jobs concurrently. Each job should write any
+    temporary input files, and then run source extractor (e.g. via
+    :func:`run_sextractor_single`). At most `max_workers` jobs of a batch are run
+    at once, and jobs also wait for the shared process budget, so that temporary
+    files only exist for the jobs which are running.
+
+    :param jobs: functions running a single sextractor job each
+    :param max_workers: maximum number of concurrent jobs for this batch
+    :return: results of each job, in order
+    """
+
+    def run_job(job: Callable[[], T]) -> T:
+        with sextractor_process_budget:
+            return job()
+
+    n_workers = max(min(int(max_workers), len(jobs)), 1)
+
+    if n_workers == 1:
+        return [run_job(job) for job in jobs]
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        return list(executor.map(run_job, jobs))
+
 
 # Functions to parse commands and generate appropriate sextractor files
 
@@ -130,10 +218,11 @@ def run_sextractor(images: str | list, output_dir: str, *args, **kwargs):
         run_sextractor_single(img, output_dir, *args, **kwargs)
 
 
-def run_sextractor_single(  # pylint: disable=too-many-arguments
+def run_sextractor_single(  # pylint: disable=too-many-arguments,too-many-branches
     img: str | Path,
     output_dir: str | Path,
     catalog_name: Optional[Path] = None,
+    catalog_type: Optional[str] = None,
     config: str = default_config_path,
     parameters_name: str = default_param_path,
     filter_name: str = default_filter_name,
@@ -154,6 +243,8 @@ def run_sextractor_single(  # pylint: disable=too-many-arguments
         img: The image to run sextractor on
         output_dir: The directory to output the catalog to
         catalog_name: The name of the catalog to output.
+        catalog_type: The type of the catalog to output (e.g. 'FITS_LDAC').
+        Leave to None to use the value in the config file.
         config:  path to sextractor config file
         parameters_name: path to sextractor parameter file
         filter_name: path to sextractor filter file
@@ -186,6 +277,9 @@ def run_sextractor_single(  # pylint: disable=too-many-arguments
         f"-VERBOSE_TYPE {verbose_type} "
     )
 
+    if catalog_type is not None:
+        cmd += f"-CATALOG_TYPE {catalog_type} "
+
     if saturation is not None:
         cmd += f"-SATUR_LEVEL {saturation} "
 
@@ -217,7 +311,7 @@ def run_sextractor_single(  # pylint: disable=too-many-arguments
     if psf_name is not None:
         cmd += f" -PSF_NAME {psf_name}"
     try:
-        execute(cmd, output_dir)
+        execute(cmd, output_dir, shell=False)
     except ExecutionError as exc:
         raise SextractorError(exc) from exc
 
@@ -423,24 +423,21 @@ def autoastrometry(
         header["CD2_1"] = math.sin(rot) * cd11 + math.cos(rot) * cd21
         header["CD2_2"] = math.sin(rot) * cd12 + math.cos(rot) * cd22
         # ...the coordinates (so we don't have to resex)
-        for img_src in img_src_list:
-            # do all of them, though this is not necessary
-            img_src.rotate(median_pa, cra, cdec)
+        # do all of them, though this is not necessary
+        img_src_list.rotate(median_pa, cra, cdec)
 
     else:
         if abs(sky_offset_pa) > 1.0:
             logger.warning(" (WARNING: image appears rotated, may produce bad shift)")
         logger.debug("  Skipping rotation correction ")
 
-    im_ra_offset = []
-    im_dec_offset = []
-    for i, x in enumerate(primary_match_img):
-        im_ra_offset.append(
-            img_src_list[x].ra_deg - ref_src_list[primary_match_ref[i]].ra_deg
-        )
-        im_dec_offset.append(
-            img_src_list[x].dec_deg - ref_src_list[primary_match_ref[i]].dec_deg
-        )
+    im_ra_offset = (
+        img_src_list.ra_deg[primary_match_img] - ref_src_list.ra_deg[primary_match_ref]
+    )
+    im_dec_offset = (
+        img_src_list.dec_deg[primary_match_img]
+        - ref_src_list.dec_deg[primary_match_ref]
+    )
 
     ra_offset = -median(im_ra_offset)
     dec_offset = -median(im_dec_offset)
@@ -502,8 +499,8 @@ def autoastrometry(
             for i, src_idx in enumerate(primary_match_img):
                 ref_idx = primary_match_ref[i]
                 outmatch.write(
-                    f"{img_src_list[src_idx].x} {img_src_list[src_idx].y} "
-                    f"{ref_src_list[ref_idx].ra_deg} {ref_src_list[ref_idx].dec_deg}\n"
+                    f"{img_src_list.x[src_idx]} {img_src_list.y[src_idx]} "
+                    f"{ref_src_list.ra_deg[ref_idx]} {ref_src_list.dec_deg[ref_idx]}\n"
                 )
 
     logger.debug(f"Finished deriving astrometry for {filename}")
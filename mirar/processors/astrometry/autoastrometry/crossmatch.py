@@ -8,14 +8,14 @@ import os
 from typing import Optional
 
 import numpy as np
+from scipy.spatial import cKDTree
 
 from mirar.processors.astrometry.autoastrometry.sources import (
-    BaseSource,
-    SextractorSource,
+    SourceTable,
     distance,
+    normalise_position_angle,
     pixel_distance,
     position_angle,
-    quickdistance,
 )
 from mirar.processors.astrometry.autoastrometry.utils import median, mode, stdev, unique
 
@@ -24,10 +24,164 @@ logger = logging.getLogger(__name__)
 FAST_MATCH = False
 SHOW_MATCH = False
 
+# Relative padding for pre-selection, so rounding never excludes a valid pair
+PRESELECT_PAD = 1.0e-6
+
+
+def get_pair_distances(  # pylint: disable=too-many-locals
+    ra_deg: np.ndarray,
+    dec_deg: np.ndarray,
+    ra_scale: float,
+    min_rad: float,
+    max_rad: float,
+) -> tuple[list[np.ndarray], list[np.ndarray]]:
+    """
+    Find all pairs of sources separated by more than min_rad and less than max_rad,
+    using the same Cartesian-approximation distance as
+    :func:`~mirar.processors.astrometry.autoastrometry.sources.quickdistance`.
+
+    Candidate pairs are found with a KD-tree, so not every pair of sources
+    is compared.
+
+    :param ra_deg: ra of sources (degrees)
+    :param dec_deg: dec of sources (degrees)
+    :param ra_scale: cos(declination), used to scale ra offsets
+    :param min_rad: min radius (arcsec)
+    :param max_rad: max radius (arcsec)
+    :return: for each source, the distances to its pairs (arcsec)
+        and the indices of its pairs, both ordered by index
+    """
+    n_src = len(ra_deg)
+
+    if n_src < 2:
+        return [np.array([])] * n_src, [np.array([], dtype=int)] * n_src
+
+    search_rad = max_rad * (1.0 + PRESELECT_PAD) + PRESELECT_PAD
+
+    pairs = []
+    ra_options = [ra_deg]
+    if np.ptp(ra_deg) > 180.0:
+        # Pairs across ra=0 are only close after wrapping
+        ra_options.append(np.mod(ra_deg + 180.0, 360.0))
+
+    for ra_values in ra_options:
+        coords = np.column_stack([ra_values * ra_scale * 3600.0, dec_deg * 3600.0])
+        pairs.append(cKDTree(coords).query_pairs(r=search_rad, output_type="ndarray"))
+
+    pairs = np.concatenate(pairs).reshape(-1, 2)
+
+    # Distances are not quite symmetric (for ra wrapping), so check both orders
+    index_i = np.concatenate([pairs[:, 0], pairs[:, 1]]).astype(int)
+    index_j = np.concatenate([pairs[:, 1], pairs[:, 0]]).astype(int)
+    pair_keys = np.unique(index_i * n_src + index_j)
+    index_i, index_j = pair_keys // n_src, pair_keys % n_src
+
+    ddec = dec_deg[index_j] - dec_deg[index_i]
+    dra = ra_deg[index_j] - ra_deg[index_i]
+
+    mask = (np.abs(ddec) <= max_rad) & (ra_scale * np.abs(dra) <= max_rad)
+
+    dra = np.where(dra > 180, 360 - dra, dra)
+    dists = 3600 * np.sqrt(ddec**2 + (ra_scale * dra) ** 2)
+
+    mask &= (min_rad < dists) & (dists < max_rad)
+
+    index_i, index_j, dists = index_i[mask], index_j[mask], dists[mask]
+
+    # Pair keys are sorted, so pairs are ordered by index_i and then index_j
+    split = np.searchsorted(index_i, np.arange(1, n_src))
+    return np.split(dists, split), np.split(index_j, split)
+
+
+def get_pair_position_angles(
+    src_list: SourceTable, pair_ids: list[np.ndarray]
+) -> list[np.ndarray]:
+    """
+    Calculate the (spherical) position angle from each source to each of its
+    pairs, using
+    :func:`~mirar.processors.astrometry.autoastrometry.sources.position_angle`
+
+    :param src_list: sources
+    :param pair_ids: for each source, the indices of its pairs
+    :return: for each source, the position angles to its pairs (degrees)
+    """
+    if len(src_list) == 0:
+        return []
+
+    n_pairs = [len(x) for x in pair_ids]
+    index_i = np.repeat(np.arange(len(src_list)), n_pairs)
+    index_j = np.concatenate(pair_ids + [np.array([], dtype=int)]).astype(int)
+
+    pa_deg = position_angle(src_list[index_i], src_list[index_j])
+
+    return np.split(pa_deg, np.cumsum(n_pairs)[:-1])
+
+
+def get_distance_matrix(src_list: SourceTable, indices: list[int]) -> np.ndarray:
+    """
+    Calculate the great circle distance between every pair of selected sources,
+    using :func:`~mirar.processors.astrometry.autoastrometry.sources.distance`
+
+    :param src_list: sources
+    :param indices: indices of selected sources
+    :return: (n, n) array of distances (arcsec)
+    """
+    selected = src_list[np.asarray(indices, dtype=int)]
+    return distance(selected[:, None], selected[None, :])
+
+
+class DistanceHistogram:  # pylint: disable=too-few-public-methods
+    """
+    Sorted pair distances for each source in a list, used to quickly find
+    sources with many pair distances matching those of another source
+    """
+
+    def __init__(self, src_dists: list[np.ndarray], tolerance: float):
+        self.tolerance = tolerance
+
+        n_dists = np.array([len(x) for x in src_dists], dtype=int)
+        self.valid = np.nonzero(n_dists >= 2)[0]
+
+        dists = np.concatenate(src_dists + [np.array([])])
+        groups = np.repeat(np.arange(len(src_dists)), n_dists)
+
+        # Offset each source's distances, so all can be searched together
+        max_dist = np.max(dists) if len(dists) > 0 else 0.0
+        self.span = 2.0 * (max_dist + 1.0)
+        self.keys = np.sort(groups * self.span + dists)
+        self.max_dist = max_dist
+
+    def get_candidates(self, dists: np.ndarray, req_match: int) -> np.ndarray:
+        """
+        Get the sources which might have at least req_match of the given distances
+        matching within tolerance. This is a (slight) superset of the true matches,
+        which should be confirmed with the exact ratio test.
+
+        :param dists: pair distances of a source
+        :param req_match: minimum number of matches needed
+        :return: indices of candidate sources, in increasing order
+        """
+        if (req_match <= 0) | (len(self.valid) == 0):
+            return self.valid
+
+        lower = dists / (1.0 + self.tolerance) * (1.0 - PRESELECT_PAD)
+        if self.tolerance < 1.0:
+            upper = dists / (1.0 - self.tolerance) * (1.0 + PRESELECT_PAD)
+        else:
+            upper = np.full(len(dists), np.inf)
+        upper = np.minimum(upper, self.max_dist + 0.5)
+
+        offsets = (self.valid * self.span)[:, None]
+        low_index = np.searchsorted(self.keys, offsets + lower[None, :], side="left")
+        high_index = np.searchsorted(self.keys, offsets + upper[None, :], side="right")
+
+        n_matches = np.sum(high_index > low_index, axis=1)
+        return self.valid[n_matches >= req_match]
+
 
 def distance_match(
-    img_src_list: list[SextractorSource],
-    ref_src_list: list[BaseSource],
+    img_src_list: SourceTable,
+    ref_src_list: SourceTable,
     base_output_path: str,
     max_rad: float = 180.0,
     min_rad: float = 10.0,
@@ -72,61 +226,24 @@ def distance_match(
     if unc_pa is None:
         unc_pa = 720.0
 
-    dec_list = []
-    for src in img_src_list:
-        dec_list.append(src.dec_rad)
-    median_dec_rad = median(dec_list)  # faster distance computation
+    median_dec_rad = median(img_src_list.dec_rad)  # faster distance computation
     ra_scale = np.cos(median_dec_rad)  # will mess up meridian crossings, however
 
-    # Calculate all the distances
-
-    # In image catalog:
-    img_src_dists = []
-    img_src_match_ids = []
-    for i, src in enumerate(img_src_list):
-        distances = []
-        distances_j_index = []
-        for j, src2 in enumerate(img_src_list):
-            if i == j:
-                continue
-
-            if abs(src.dec_deg - src2.dec_deg) > max_rad:
-                continue
-            if ra_scale * abs(src.ra_deg - src2.ra_deg) > max_rad:
-                continue
-
-            dist = quickdistance(src, src2, ra_scale)
-
-            if min_rad < dist < max_rad:
-                distances.append(dist)
-                distances_j_index.append(j)
-
-        img_src_dists.append(distances)
-        img_src_match_ids.append(distances_j_index)
-
-    # In reference catalog:
-    ref_src_dists = []
-    ref_src_match_ids = []
-    for i, src in enumerate(ref_src_list):
-        distances = []
-        distances_j_index = []
-        for j, src2 in enumerate(ref_src_list):
-            if i == j:
-                continue
-
-            if abs(src.dec_deg - src2.dec_deg) > max_rad:
-                continue
-            if ra_scale * abs(src.ra_deg - src2.ra_deg) > max_rad:
-                continue
-
-            dist = quickdistance(src, src2, ra_scale)
-
-            if min_rad < dist < max_rad:
-                distances.append(dist)
-                distances_j_index.append(j)
-
-        ref_src_dists.append(distances)
-        ref_src_match_ids.append(distances_j_index)
+    # Calculate all the distances, in the image and reference catalogs
+    img_src_dists, img_src_match_ids = get_pair_distances(
+        img_src_list.ra_deg,
+        img_src_list.dec_deg,
+        ra_scale=ra_scale,
+        min_rad=min_rad,
+        max_rad=max_rad,
+    )
+    ref_src_dists, ref_src_match_ids = get_pair_distances(
+        ref_src_list.ra_deg,
+        ref_src_list.dec_deg,
+        ra_scale=ra_scale,
+        min_rad=min_rad,
+        max_rad=max_rad,
+    )
 
     # Now look for matches in the reference catalog to distances in the image catalog.
 
@@ -140,74 +257,56 @@ def distance_match(
     primary_match_img = []
     primary_match_ref = []
 
+    # Position angles from each source to each of its pairs
+    img_src_pas = get_pair_position_angles(img_src_list, img_src_match_ids)
+    ref_src_pas = get_pair_position_angles(ref_src_list, ref_src_match_ids)
+
+    ref_histogram = DistanceHistogram(ref_src_dists, tolerance=tolerance)
+
     for img_i, img_dist_array in enumerate(img_src_dists):
         if len(img_dist_array) < 2:
             continue
 
-        for ref_i, ref_dist_array in enumerate(ref_src_dists):
-            if len(ref_dist_array) < 2:
-                continue
-
-            match = 0
-            img_match_in = []
-            ref_match_in = []
-
-            for img_j, img_src_dist in enumerate(img_dist_array):
-                new_match = 1
+        for ref_i in ref_histogram.get_candidates(img_dist_array, req_match):
+            ref_dist_array = ref_src_dists[ref_i]
 
-                for ref_j, ref_src_dist in enumerate(ref_dist_array):
-                    if abs((img_src_dist / ref_src_dist) - 1.0) < tolerance:
-                        match += new_match
-
-                        # further matches before the next
-                        # img_j loop indicate degeneracies
-                        new_match = 0
-
-                        img_match_in.append(img_src_match_ids[img_i][img_j])
-                        ref_match_in.append(ref_src_match_ids[ref_i][ref_j])
+            # Further matches for the same img_j indicate degeneracies
+            is_match = (
+                np.abs((img_dist_array[:, None] / ref_dist_array[None, :]) - 1.0)
+                < tolerance
+            )
+            match = int(np.sum(np.any(is_match, axis=1)))
+            img_j, ref_j = np.nonzero(is_match)
 
             if match >= req_match:
-                dpa = []
                 # Here, dpa[n] is the mean rotation of the PA from
                 # the primary star of this match to the stars in its match
                 # RELATIVE TO those same angles for those same stars
                 # in the catalog.  Therefore it is a robust measurement of the rotation.
-
-                for i, match_index in enumerate(img_match_in):
-                    ddpa = position_angle(
-                        img_src_list[img_i], img_src_list[match_index]
-                    ) - position_angle(
-                        ref_src_list[ref_i], ref_src_list[ref_match_in[i]]
-                    )
-                    while ddpa > 200.0:
-                        ddpa -= 360.0
-                    while ddpa < -160.0:
-                        ddpa += 360.0
-                    dpa.append(ddpa)
+                dpa = normalise_position_angle(
+                    img_src_pas[img_i][img_j] - ref_src_pas[ref_i][ref_j]
+                )
 
                 # If user was confident the initial PA was right, remove bad PA'src
                 # right away
-                for i in range(len(img_match_in) - 1, -1, -1):
-                    if abs(dpa[i]) > unc_pa:
-                        del img_match_in[i]
-                        del ref_match_in[i]
-                        del dpa[i]
+                keep = np.abs(dpa) <= unc_pa
+                img_j, ref_j, dpa = img_j[keep], ref_j[keep], dpa[keep]
 
-                if len(img_match_in) < 2:
+                if len(dpa) < 2:
                     continue
 
-                mode_dpa = mode(dpa)
+                mode_dpa = mode(dpa.tolist())
 
                 # Remove deviant matches by PA
-                for i in range(len(img_match_in) - 1, -1, -1):
-                    if abs(dpa[i] - mode_dpa) > pa_tolerance:
-                        del img_match_in[i]
-                        del ref_match_in[i]
-                        del dpa[i]
+                keep = np.abs(dpa - mode_dpa) <= pa_tolerance
+                img_j, ref_j = img_j[keep], ref_j[keep]
 
-                if len(img_match_in) < 2:
+                if len(img_j) < 2:
                     continue
 
+                img_match_in = img_src_match_ids[img_i][img_j].tolist()
+                ref_match_in = ref_src_match_ids[ref_i][ref_j].tolist()
+
                 n_degeneracies = (
                     len(img_match_in)
                     - len(unique(img_match_in))
@@ -322,22 +421,16 @@ def distance_match(
         if len(primary_match_img) == 0:
             break
 
-        for i, img_i in enumerate(primary_match_img):
-            for j, img_j in enumerate(primary_match_img):
-                if i == j:
-                    continue
-
-                ref_i = primary_match_ref[i]
-                ref_j = primary_match_ref[j]
+        img_dist = get_distance_matrix(img_src_list, primary_match_img)
+        ref_dist = get_distance_matrix(ref_src_list, primary_match_ref)
 
-                img_dist_ij = distance(img_src_list[img_i], img_src_list[img_j])
-                ref_dist_ij = distance(ref_src_list[ref_i], ref_src_list[ref_j])
+        # (occasionally will get divide by zero)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            is_bad = np.abs((img_dist / ref_dist) - 1.0) > tolerance
+        np.fill_diagonal(is_bad, False)
 
-                try:
-                    if abs((img_dist_ij / ref_dist_ij) - 1.0) > tolerance:
-                        n_dist_flags[i] += 1
-                except ZeroDivisionError:  # (occasionally will get divide by zero)
-                    pass
+        for i, n_bad in enumerate(np.sum(is_bad, axis=1)):
+            n_dist_flags[i] += int(n_bad)
 
         # delete bad clusters
         n_test_matches = len(primary_match_img)
@@ -361,19 +454,16 @@ def distance_match(
         return [], [], []
 
     # check the pixel scale while we're at it
-    pix_scale_list = []
     if len(primary_match_img) >= 2:
-        for i in range(len(primary_match_img) - 1):
-            for j in range(i + 1, len(primary_match_img)):
-                img_i = primary_match_img[i]
-                ref_i = primary_match_ref[i]
-                img_j = primary_match_img[j]
-                ref_j = primary_match_ref[j]
-
-                pix_scale_list.append(
-                    distance(ref_src_list[ref_i], ref_src_list[ref_j])
-                    / pixel_distance(img_src_list[img_i], img_src_list[img_j])
-                )
+        img_matched = img_src_list[np.array(primary_match_img)]
+        pix_dist = pixel_distance(img_matched[:, None], img_matched[None, :])
+        ref_dist = get_distance_matrix(ref_src_list, primary_match_ref)
+
+        upper_i, upper_j = np.triu_indices(len(primary_match_img), k=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pix_scale_list = (
+                ref_dist[upper_i, upper_j] / pix_dist[upper_i, upper_j]
+            ).tolist()
 
         pix_scale = median(pix_scale_list)
         pix_scale_std = stdev(pix_scale_list)
@@ -426,12 +516,12 @@ def distance_match(
             )
             out.write("image\n")
             for i, img_i in enumerate(primary_match_img):
-                for j, img_j in enumerate(img_match[i]):
+                for img_j in img_match[i]:
                     out.write(
-                        f"line({img_src_list[img_i].x:.3f},"
-                        f"{img_src_list[img_i].y:.3f},"
-                        f"{img_src_list[img_j].x:.3f},"
-                        f"{img_src_list[img_j].y:.3f}) # line=0 0\n"
+                        f"line({img_src_list.x[img_i]:.3f},"
+                        f"{img_src_list.y[img_i]:.3f},"
+                        f"{img_src_list.x[img_j]:.3f},"
+                        f"{img_src_list.y[img_j]:.3f}) # line=0 0\n"
                     )
 
         match_lines_wcs = os.path.splitext(base_output_path)[0] + ".matchlines.wcs.reg"
@@ -447,12 +537,12 @@ def distance_match(
             )
             out.write("fk5\n")
             for i, ref_i in enumerate(primary_match_ref):
-                for j, ref_j in enumerate(ref_match[i]):
+                for ref_j in ref_match[i]:
                     out.write(
-                        f"line({ref_src_list[ref_i].ra_deg:.5f},"
-                        f"{ref_src_list[ref_i].dec_deg:.5f},"
-                        f"{ref_src_list[ref_j].ra_deg:.5f},"
-                        f"{ref_src_list[ref_j].dec_deg:.5f}) # line=0 0\n"
+                        f"line({ref_src_list.ra_deg[ref_i]:.5f},"
+                        f"{ref_src_list.dec_deg[ref_i]:.5f},"
+                        f"{ref_src_list.ra_deg[ref_j]:.5f},"
+                        f"{ref_src_list.dec_deg[ref_j]:.5f}) # line=0 0\n"
                     )
 
     # future project: if not enough, go to the secondary offsets
@@ -460,24 +550,45 @@ def distance_match(
     return primary_match_img, primary_match_ref, mpa
 
 
+def remove_close_pairs(src_list: SourceTable, min_sep: float) -> SourceTable:
+    """
+    Remove the fainter source of each pair closer than min_sep
+
+    :param src_list: sources
+    :param min_sep: minimum separation (arcsec)
+    :return: sources without close pairs
+    """
+    keep = np.ones(len(src_list), dtype=bool)
+    for i in range(len(src_list) - 1):
+        dist = distance(src_list[i], src_list[i + 1 :])
+        close = np.nonzero(dist < min_sep)[0] + i + 1
+        if len(close) == 0:
+            continue
+        fainter = src_list.mag[i] > src_list.mag[close]
+        keep[close[~fainter]] = False
+        if np.any(fainter):
+            keep[i] = False
+    return src_list[keep]
+
+
 def crosscheck_source_lists(
-    img_src_list: list[SextractorSource],
+    img_src_list: SourceTable,
     n_img: int,
     img_density: float,
-    ref_src_list: list[BaseSource],
+    ref_src_list: SourceTable,
     n_ref: int,
     ref_density: float,
     box_size_arcsec: float,
     area_sq_min: float,
-) -> tuple[list[SextractorSource], int, float, list[BaseSource], int, float]:
+) -> tuple[SourceTable, int, float, SourceTable, int, float]:
     """
     Compares detected sources in image and reference, and trims so they are
     of comparable density
 
-    :param img_src_list: list of image sources
+    :param img_src_list: table of image sources
     :param n_img: number of image sources
     :param img_density: img source density
-    :param ref_src_list: list of reference images
+    :param ref_src_list: table of reference sources
     :param n_ref: number of reference sources
     :param ref_density: ref source density
     :param box_size_arcsec: radius of search box
@@ -518,33 +629,7 @@ def crosscheck_source_lists(
     # Remove fainter object in close pairs for both lists
     min_sep = 3
 
-    delete_list = []
-    for i, src in enumerate(img_src_list):
-        for j, src2 in enumerate(img_src_list[i + 1 :]):
-            dist = distance(src, src2)
-            if dist < min_sep:
-                if src.mag > src2.mag:
-                    delete_list.append(i)
-                else:
-                    delete_list.append(i + j + 1)
-
-    delete_list = unique(delete_list)
-    delete_list.reverse()
-    for del_index in delete_list:
-        del img_src_list[del_index]
-
-    for i, src in enumerate(ref_src_list):
-        for j, src2 in enumerate(ref_src_list[i + 1 :]):
-            dist = distance(src, src2)
-            if dist < min_sep:
-                if src.mag > src2.mag:
-                    delete_list.append(i)
-                else:
-                    delete_list.append(i + j + 1)
-
-    delete_list = unique(delete_list)
-    delete_list.reverse()
-    for del_index in delete_list:
-        del ref_src_list[del_index]
+    img_src_list = remove_close_pairs(img_src_list, min_sep=min_sep)
+    ref_src_list = remove_close_pairs(ref_src_list, min_sep=min_sep)
 
     return img_src_list, n_img, img_density, ref_src_list, n_ref, ref_density
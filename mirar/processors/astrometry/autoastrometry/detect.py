@@ -7,6 +7,7 @@ import os
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
 from astropy.io import fits
 
 from mirar.paths import SEXTRACTOR_HEADER_KEY
@@ -21,12 +22,8 @@ from mirar.processors.astromatic.sextractor.sourceextractor import (
     run_sextractor_single,
 )
 from mirar.processors.astrometry.autoastrometry.errors import AstrometrySourceError
-from mirar.processors.astrometry.autoastrometry.sources import (
-    SextractorSource,
-    compare_mag,
-)
+from mirar.processors.astrometry.autoastrometry.sources import SourceTable
 from mirar.processors.astrometry.autoastrometry.utils import median, mode
-from mirar.utils.ldac_tools import get_table_from_ldac
 
 logger = logging.getLogger(__name__)
 
@@ -48,7 +45,7 @@ def get_img_src_list(
     config_path: str = default_config_path,
     output_catalog: Optional[str | Path] = None,
     write_crosscheck_files: bool = False,
-) -> list[SextractorSource]:
+) -> SourceTable:
     """
     Run sextractor on an image, and then extract all the sources
 
@@ -65,7 +62,7 @@ def get_img_src_list(
     :param config_path: sextractor config path
     :param output_catalog: output path
     :param write_crosscheck_files: boolean to write additional crosscheck files
-    :return: list of sextractor sources
+    :return: table of sextractor sources
     """
 
     if output_catalog is None:
@@ -83,14 +80,7 @@ def get_img_src_list(
 
     if sextractor_catalog_path is not None:
         logger.info("Using existing sextractor catalog")
-        output_catalog = sextractor_catalog_path
-        output_catalog_table = get_table_from_ldac(output_catalog)
-        output_catalog_table.write(
-            output_catalog.replace(".cat", ".ascii.cat"),
-            format="ascii.ecsv",
-            overwrite=True,
-        )
-        output_catalog = output_catalog.replace(".cat", ".ascii.cat")
+        src_table = SourceTable.from_ldac(sextractor_catalog_path)
     else:
         run_sextractor_single(
             img=img_path,
@@ -98,20 +88,20 @@ def get_img_src_list(
             config=config_path,
             saturation=saturation,
             catalog_name=output_catalog,
+            catalog_type="FITS_LDAC",
             parameters_name=default_param_path,
             filter_name=default_conv_path,
             starnnw_name=default_starnnw_path,
         )
 
-    # Read in the sextractor catalog
-    with open(output_catalog, "rb") as cat:
-        catlines = [x.replace(b"\x00", b"").decode() for x in cat.readlines()][1:]
+        # Read in the sextractor catalog
+        src_table = SourceTable.from_ldac(output_catalog)
 
-    # Delete the sextractor catalog again, if not requested
-    if not write_crosscheck_files:
-        os.remove(output_catalog)
+        # Delete the sextractor catalog again, if not requested
+        if not write_crosscheck_files:
+            os.remove(output_catalog)
 
-    if len(catlines) == 0:
+    if len(src_table) == 0:
         logger.error("Sextractor catalog is empty: try a different catalog?")
         raise ValueError
 
@@ -120,64 +110,34 @@ def get_img_src_list(
     max_x = nx_pix - border  # This should be generalized
     max_y = ny_pix - border
 
-    n_src_init = 0
-    n_src_pass = 0
-    src_list = []
+    n_src_init = len(src_table)
+
+    # Initial filtering, recording only the first reason for rejecting each source
+    reject_cuts = [
+        ("ellip", src_table.ellip > max_ellip),
+        ("min fwhm", src_table.fwhm < min_fwhm),
+        ("max fwhm", src_table.fwhm > max_fwhm),
+        ("min val", src_table.x < min_x),
+        ("min y", src_table.y < min_y),
+        ("max val", src_table.x > max_x),
+        ("max y", src_table.y > max_y),
+        ("corner", src_table.x + src_table.y < corner),
+        ("corner", src_table.x + (ny_pix - src_table.y) < corner),
+        ("corner", (nx_pix - src_table.x) < corner),
+        ("corner", (nx_pix - src_table.x) + (ny_pix - src_table.y) < corner),
+    ]
+    if saturation is not None:
+        # this will likely overdo it for very deep fields.
+        reject_cuts.append(("saturation", src_table.flag > 0))
 
     rejects = []
+    keep = np.ones(n_src_init, dtype=bool)
+    for reason, cut in reject_cuts:
+        rejects += [reason] * int(np.sum(keep & cut))
+        keep &= ~cut
 
-    for line in catlines:
-        if line[0] == "#":
-            continue
-
-        # TODO : make more generic to skip column names
-        if line[0] == "X":
-            continue
-
-        src = SextractorSource(line)  # process the line into an object
-        n_src_init += 1
-
-        # Initial filtering
-        if src.ellip > max_ellip:
-            rejects.append("ellip")
-            continue
-        if src.fwhm < min_fwhm:
-            rejects.append("min fwhm")
-            continue
-        if src.fwhm > max_fwhm:
-            rejects.append("max fwhm")
-            continue
-        if src.x < min_x:
-            rejects.append("min val")
-            continue
-        if src.y < min_y:
-            rejects.append("min y")
-            continue
-        if src.x > max_x:
-            rejects.append("max val")
-            continue
-        if src.y > max_y:
-            rejects.append("max y")
-            continue
-        if src.x + src.y < corner:
-            rejects.append("corner")
-            continue
-        if src.x + (ny_pix - src.y) < corner:
-            rejects.append("corner")
-            continue
-        if (nx_pix - src.x) < corner:
-            rejects.append("corner")
-            continue
-        if (nx_pix - src.x) + (ny_pix - src.y) < corner:
-            rejects.append("corner")
-            continue
-        if saturation is not None:
-            if src.flag > 0:
-                rejects.append("saturation")
-                continue  # this will likely overdo it for very deep fields.
-
-        src_list.append(src)
-        n_src_pass += 1
+    src_list = src_table[keep]
+    n_src_pass = len(src_list)
 
     if n_src_pass == 0:
         reject_stats = [(x, rejects.count(x)) for x in list(set(rejects))]
@@ -205,27 +165,22 @@ def get_img_src_list(
                     1  # what I really want is a general analytic expression for
                 )
 
-            remove_list = []  # the 99.99% prob. threshold for value of n for >=n out
-            val_list = [getattr(src, variable) for src in src_list]
-            mode_val = mode(
-                val_list
-            )  # of N total sources to land in the same bin (of NX total bins)
-            for j, val in enumerate(val_list):
-                if (val > mode_val - 1) & (val < mode_val + 1):
-                    remove_list.append(j)
-
-            remove_list.reverse()
-            if len(remove_list) > val_thresh:
-                for k in remove_list:
-                    del src_list[k]
-                    ct_bad_col += 1
+            # the 99.99% prob. threshold for value of n for >=n out
+            # of N total sources to land in the same bin (of NX total bins)
+            val_list = getattr(src_list, variable)
+            mode_val = mode(val_list.tolist())
+            remove = (val_list > mode_val - 1) & (val_list < mode_val + 1)
+
+            if np.sum(remove) > val_thresh:
+                src_list = src_list[~remove]
+                ct_bad_col += int(np.sum(remove))
 
     if ct_bad_col > 0:
         rejects += ["bad columns" for _ in range(ct_bad_col)]
 
     # Remove galaxies and cosmic rays
 
-    fwhm_list = [src.fwhm for src in src_list]
+    fwhm_list = src_list.fwhm.tolist()
 
     if len(fwhm_list) > 5:
         fwhm_list.sort()
@@ -243,14 +198,10 @@ def get_img_src_list(
 
     # Might also be good to screen for false detections created by bad columns/rows
 
-    n_good = 0
-    good_src_list = []
-    for src in src_list:
-        if src.fwhm > refined_min_fwhm:
-            good_src_list.append(src)
-            n_good += 1
-        else:
-            rejects.append("refined min fwhm")
+    good = src_list.fwhm > refined_min_fwhm
+    rejects += ["refined min fwhm"] * int(np.sum(~good))
+    good_src_list = src_list[good]
+    n_good = len(good_src_list)
 
     if n_good == 0:
         reject_stats = [(x, rejects.count(x)) for x in list(set(rejects))]
@@ -263,7 +214,7 @@ def get_img_src_list(
         raise AstrometrySourceError(err)
 
     # Sort by magnitude
-    good_src_list.sort(key=compare_mag)
+    good_src_list = good_src_list.sort_by_mag()
 
     logger.debug(
         f"{n_good} objects detected in image {img_path} "
@@ -11,10 +11,7 @@ import ephem
 import numpy as np
 from astropy.io import fits
 
-from mirar.processors.astrometry.autoastrometry.sources import (
-    BaseSource,
-    SextractorSource,
-)
+from mirar.processors.astrometry.autoastrometry.sources import SourceTable
 from mirar.processors.astrometry.autoastrometry.utils import dec_str_2_deg, ra_str_2_deg
 
 logger = logging.getLogger(__name__)
@@ -295,24 +292,26 @@ def parse_header(
     return nxpix, nypix, cd11, cd12, cd21, cd22, crpix1, crpix2, cra, cdec
 
 
-def write_text_file(file_path: str, src_list: list[BaseSource]):
+def write_text_file(file_path: str, src_list: SourceTable):
     """
-    Write a text file with a list of sources
+    Write a text file with a table of sources
 
     :param file_path: Output file
-    :param src_list: List of sources
+    :param src_list: Table of sources
     :return: None
     """
     logger.debug(f"Saving text file to {file_path}")
 
     with open(file_path, "w", encoding="utf8") as out:
-        for src in src_list:
-            out.write(f"{src.ra_deg:11.7f} {src.dec_deg:11.7f} {src.mag:5.2f}\n")
+        for ra_deg, dec_deg, mag in zip(
+            src_list.ra_deg, src_list.dec_deg, src_list.mag
+        ):
+            out.write(f"{ra_deg:11.7f} {dec_deg:11.7f} {mag:5.2f}\n")
 
 
 def write_region_file(
     file_path: str,
-    src_list: list[BaseSource],
+    src_list: SourceTable,
     color: str = "green",
     system: Optional[str] = None,
 ):
@@ -320,7 +319,7 @@ def write_region_file(
     Write a region file
 
     :param file_path: Output path
-    :param src_list: List of sources
+    :param src_list: Table of sources
     :param color: Colour to use
     :param system: system to use (default wcs)
     :return:
@@ -344,23 +343,25 @@ def write_region_file(
 
         if system == "wcs":
             out.write("fk5\n")
-            for i, src in enumerate(src_list):
+            for i, (ra_deg, dec_deg) in enumerate(
+                zip(src_list.ra_deg, src_list.dec_deg)
+            ):
                 out.write(
-                    f"point({src.ra_deg:.7f},{src.dec_deg:.7f}) "
+                    f"point({ra_deg:.7f},{dec_deg:.7f}) "
                     f"# point=boxcircle text={{{i + 1}}}\n"
                 )
         elif system == "img":
             out.write("image\n")
-            for i, src in enumerate(src_list):
+            for i, (x_pix, y_pix) in enumerate(zip(src_list.x, src_list.y)):
                 out.write(
-                    f"point({src.x:.3f},{src.y:.3f}) "
+                    f"point({x_pix:.3f},{y_pix:.3f}) "
                     f"# point=boxcircle text={{{i + 1}}}\n"
                 )
 
 
 def export_src_lists(
-    img_src_list: list[SextractorSource],
-    ref_src_list: list[BaseSource],
+    img_src_list: SourceTable,
+    ref_src_list: SourceTable,
     base_output_path: str,
 ):
     """
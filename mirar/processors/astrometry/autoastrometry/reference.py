@@ -17,7 +17,7 @@ from mirar.processors.astrometry.autoastrometry.errors import (
     AstrometryReferenceError,
     AstrometryURLError,
 )
-from mirar.processors.astrometry.autoastrometry.sources import BaseSource, compare_mag
+from mirar.processors.astrometry.autoastrometry.sources import SourceTable
 from mirar.processors.astrometry.autoastrometry.utils import dec_str_2_deg, ra_str_2_deg
 
 logger = logging.getLogger(__name__)
@@ -31,7 +31,7 @@ def get_catalog(
     min_mag: float = 8.0,
     max_mag: Optional[float] = None,
     max_pm: float = 60.0,
-) -> list[BaseSource]:
+) -> SourceTable:
     """
     Get a reference catalog around ra/dec, with radius
 
@@ -42,7 +42,7 @@ def get_catalog(
     :param min_mag: min mag of sources
     :param max_mag: max mag of sources
     :param max_pm: max pm
-    :return: list of reference sources
+    :return: table of reference sources
     """
     # Get catalog from USNO
 
@@ -84,7 +84,7 @@ def get_catalog(
             "or no solution. Decrease the search radius."
         )
 
-    cat_list = []
+    cat_ras, cat_decs, cat_mags = [], [], []
 
     for line in cat_lines:
         inline = line.strip()
@@ -146,10 +146,11 @@ def get_catalog(
         if abs(pm_ra) > max_pm or abs(pm_dec) > max_pm:
             continue
 
-        source = BaseSource(ra, dec, mag)  # process the line into an object
-        cat_list.append(source)
+        cat_ras.append(ra)
+        cat_decs.append(dec)
+        cat_mags.append(mag)
 
-    cat_list.sort(key=compare_mag)
+    cat_list = SourceTable.from_columns(cat_ras, cat_decs, cat_mags).sort_by_mag()
 
     return cat_list
 
@@ -162,7 +163,7 @@ def get_catalog_astroquery(
     min_mag: float = 8.0,
     max_mag: Optional[float] = None,
     max_pm: float = 60.0,
-) -> list[BaseSource]:
+) -> SourceTable:
     """
     Get a reference catalogue using astroquery, around ra/dec
 
@@ -173,7 +174,7 @@ def get_catalog_astroquery(
     :param min_mag: min mag of stars
     :param max_mag: max mag of stars
     :param max_pm: max pm
-    :return: list of reference stars
+    :return: table of reference stars
     """
 
     ra_col_key = dec_col_key = mag_col_key = catalog_str = pm_ra_key = pm_dec_key = ""
@@ -223,7 +224,7 @@ def get_catalog_astroquery(
         crd, width=f"{int(box_size_arcsec / 60)}m", catalog=catalog_str
     )
     if len(result) == 0:
-        return []
+        return SourceTable()
     table = result[0]
 
     n_cat = len(table)
@@ -238,18 +239,17 @@ def get_catalog_astroquery(
         & (np.abs(table[pm_dec_key]) < max_pm)
     )
     cat = table[mask]
-    cat_list = []
-
-    for src in cat:
-        cat_list.append(BaseSource(src[ra_col_key], src[dec_col_key], src[mag_col_key]))
-
-    cat_list.sort(key=compare_mag)
+    cat_list = SourceTable.from_columns(
+        np.asarray(cat[ra_col_key], dtype=float),
+        np.asarray(cat[dec_col_key], dtype=float),
+        np.asarray(cat[mag_col_key], dtype=float),
+    ).sort_by_mag()
     return cat_list
 
 
 def get_ref_sources_from_catalog_astroquery(
     catalog: str, center_ra: float, center_dec: float, box_size_arcsec: float
-) -> tuple[list[BaseSource], int, float]:
+) -> tuple[SourceTable, int, float]:
     """
     Get reference sources from an astropquery catalogue
 
@@ -259,7 +259,7 @@ def get_ref_sources_from_catalog_astroquery(
     :param box_size_arcsec: radius
     :return: ref catalog, n_cat, cat_density
     """
-    ref_src_list = []
+    ref_src_list = SourceTable()
     if catalog is None:
         try:
             trycats = ["sdss", "usno", "tmc"]
@@ -309,7 +309,7 @@ def get_ref_sources_from_catalog(
     center_ra: float,
     center_dec: float,
     box_size_arcsec: float,
-) -> tuple[list[BaseSource], int, float]:
+) -> tuple[SourceTable, int, float]:
     """
     Get reference sources from a catalogue
 
@@ -320,7 +320,7 @@ def get_ref_sources_from_catalog(
     :return: ref catalog, n_cat, cat_density
     """
     # If no catalog specified, check availability of SDSS
-    ref_src_list, n_cat, cat_density = [], 0, 0
+    ref_src_list, n_cat, cat_density = SourceTable(), 0, 0
     logger.debug(f"catalog is {catalog}")
     if catalog is None:
         trycats = ["ub2", "tmc", "sdss"]
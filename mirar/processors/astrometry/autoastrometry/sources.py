@@ -1,29 +1,186 @@
 """
-Module containing base Source classes used by autoastrometry
+Module containing the source table used by autoastrometry
 """
 
 import logging
+from pathlib import Path
+from typing import Optional
 
 import numpy as np
 
-logger = logging.getLogger(__name__)
+from mirar.utils.ldac_tools import get_table_from_ldac
 
+logger = logging.getLogger(__name__)
 
-class BaseSource:
+SOURCE_DTYPE = np.dtype(
+    [
+        ("x", float),
+        ("y", float),
+        ("ra_deg", float),
+        ("dec_deg", float),
+        ("mag", float),
+        ("mag_err", float),
+        ("ellip", float),
+        ("fwhm", float),
+        ("flag", int),
+    ]
+)
+
+# Mapping of sextractor catalog columns to source table columns
+SEXTRACTOR_COLUMNS = {
+    "X_IMAGE": "x",
+    "Y_IMAGE": "y",
+    "ALPHA_J2000": "ra_deg",
+    "DELTA_J2000": "dec_deg",
+    "MAG_AUTO": "mag",
+    "MAGERR_AUTO": "mag_err",
+    "ELLIPTICITY": "ellip",
+    "FWHM_IMAGE": "fwhm",
+    "FLAGS": "flag",
+}
+
+
+class SourceTable:
     """
-    A standard source object
+    A table of sources, stored as a numpy structured array with one row per source.
+
+    Indexing with an integer returns a single-row table, while indexing with
+    a slice, mask or index array returns a table of the selected sources.
+    Columns are accessed as attributes (e.g. `src_table.ra_deg`),
+    and are arrays with the same shape as the table.
     """
 
-    def __init__(self, ra_deg: float, dec_deg: float, in_mag: float):
-        self.ra_deg = float(ra_deg)
-        self.dec_deg = dec_deg
-        self.ra_rad = ra_deg * np.pi / 180
-        self.dec_rad = dec_deg * np.pi / 180
-        self.mag = in_mag
+    def __init__(self, data: Optional[np.ndarray] = None):
+        if data is None:
+            data = np.zeros(0, dtype=SOURCE_DTYPE)
+        self.data = np.asarray(data)
+
+    @classmethod
+    def from_columns(
+        cls,
+        ra_deg: np.ndarray,
+        dec_deg: np.ndarray,
+        mag: np.ndarray,
+        **kwargs,
+    ) -> "SourceTable":
+        """
+        Create a source table from column arrays.
+        Columns which are not given are left as zero.
+
+        :param ra_deg: ra of sources (degrees)
+        :param dec_deg: dec of sources (degrees)
+        :param mag: magnitudes of sources
+        :param kwargs: other columns of
+            :data:`~mirar.processors.astrometry.autoastrometry.sources.SOURCE_DTYPE`
+        :return: source table
+        """
+        ra_deg = np.atleast_1d(np.asarray(ra_deg, dtype=float))
+        data = np.zeros(len(ra_deg), dtype=SOURCE_DTYPE)
+        data["ra_deg"] = ra_deg
+        data["dec_deg"] = dec_deg
+        data["mag"] = mag
+        for key, value in kwargs.items():
+            data[key] = value
+        return cls(data)
+
+    @classmethod
+    def from_ldac(cls, catalog_path: str | Path) -> "SourceTable":
+        """
+        Read a source table directly from a sextractor FITS_LDAC catalog
+
+        :param catalog_path: path of catalog
+        :return: source table
+        """
+        catalog = get_table_from_ldac(catalog_path)
+
+        missing = [
+            x
+            for x in SEXTRACTOR_COLUMNS
+            if (x not in catalog.colnames) & (x != "FLAGS")
+        ]
+        if len(missing) > 0:
+            err = f"Sextractor catalog {catalog_path} is missing columns {missing}"
+            logger.error(err)
+            raise ValueError(err)
+
+        data = np.zeros(len(catalog), dtype=SOURCE_DTYPE)
+        for key, col in SEXTRACTOR_COLUMNS.items():
+            if key in catalog.colnames:
+                data[col] = np.asarray(catalog[key])
+        return cls(data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, item) -> "SourceTable":
+        return SourceTable(self.data[item])
+
+    @property
+    def x(self) -> np.ndarray:  # pylint: disable=invalid-name
+        """x pixel position"""
+        return self.data["x"]
+
+    @property
+    def y(self) -> np.ndarray:  # pylint: disable=invalid-name
+        """y pixel position"""
+        return self.data["y"]
+
+    @property
+    def ra_deg(self) -> np.ndarray:
+        """ra (degrees)"""
+        return self.data["ra_deg"]
+
+    @property
+    def dec_deg(self) -> np.ndarray:
+        """dec (degrees)"""
+        return self.data["dec_deg"]
+
+    @property
+    def ra_rad(self) -> np.ndarray:
+        """ra (radians)"""
+        return self.ra_deg * np.pi / 180
+
+    @property
+    def dec_rad(self) -> np.ndarray:
+        """dec (radians)"""
+        return self.dec_deg * np.pi / 180
+
+    @property
+    def mag(self) -> np.ndarray:
+        """magnitude"""
+        return self.data["mag"]
+
+    @property
+    def mag_err(self) -> np.ndarray:
+        """magnitude error"""
+        return self.data["mag_err"]
+
+    @property
+    def ellip(self) -> np.ndarray:
+        """ellipticity"""
+        return self.data["ellip"]
+
+    @property
+    def fwhm(self) -> np.ndarray:
+        """fwhm (pixels)"""
+        return self.data["fwhm"]
+
+    @property
+    def flag(self) -> np.ndarray:
+        """sextractor flags"""
+        return self.data["flag"]
+
+    def sort_by_mag(self) -> "SourceTable":
+        """
+        Sort sources by magnitude, preserving the order of equal magnitudes
+
+        :return: sorted source table
+        """
+        return self[np.argsort(self.mag, kind="stable")]
 
     def rotate(self, dpa_deg: float, ra0: float, dec0: float):
         """
-        Function to rotate a source by dpa around ra0/dec0?
+        Function to rotate all sources by dpa around ra0/dec0, in place
 
         :param dpa_deg: delta-pa (deg)
         :param ra0: ra
@@ -42,64 +199,36 @@ class BaseSource:
         x_rot = cos_dpa * source_x - sin_dpa * source_y
         y_rot = sin_dpa * source_x + cos_dpa * source_y
 
-        self.ra_deg = (x_rot / ra_scale) + ra0
-        self.dec_deg = y_rot + dec0
-        self.ra_rad = self.ra_deg * np.pi / 180
-        self.dec_rad = self.dec_deg * np.pi / 180
-
-
-class SextractorSource(BaseSource):
-    """Source from sextractor"""
-
-    def __init__(self, line: str):
-        inline_arg = [x.strip() for x in line.split(" ") if x not in [""]]
-
-        if len(inline_arg) < 8:
-            err = f"Expected 8 values in table, found {len(inline_arg)} ({inline_arg})"
-            logger.error(err)
-            raise ValueError(err)
-
-        self.x = float(inline_arg[0])
-        self.y = float(inline_arg[1])
-
-        super().__init__(*[float(x) for x in inline_arg[2:5]])
-
-        self.mag_err = float(inline_arg[5])
-        self.ellip = float(inline_arg[6])
-        self.fwhm = float(inline_arg[7])
-
-        if len(inline_arg) >= 9:
-            self.flag = int(inline_arg[8])
-        else:
-            self.flag = None
+        self.data["ra_deg"] = (x_rot / ra_scale) + ra0
+        self.data["dec_deg"] = y_rot + dec0
 
 
 # Pixel distance
-def pixel_distance(obj1: SextractorSource, obj2: SextractorSource) -> float:
+def pixel_distance(src_1: SourceTable, src_2: SourceTable) -> np.ndarray:
     """
-    Calculate pixel distance between obj1 and obj2
+    Calculate pixel distance between sources, broadcasting the two tables
 
-    :param obj1: Object 1
-    :param obj2: Object 2
-    :return: pixel distance
+    :param src_1: Sources 1
+    :param src_2: Sources 2
+    :return: pixel distances
     """
-    return ((obj1.x - obj2.x) ** 2 + (obj1.y - obj2.y) ** 2) ** 0.5
+    return ((src_1.x - src_2.x) ** 2 + (src_1.y - src_2.y) ** 2) ** 0.5
 
 
-def distance(obj1: BaseSource, obj2: BaseSource) -> float:
+def distance(src_1: SourceTable, src_2: SourceTable) -> np.ndarray:
     """
-    # Great circle distance between two points.
+    # Great circle distance between sources, broadcasting the two tables
 
-    :param obj1: object 1
-    :param obj2: object 2
-    :return: great circle distance
+    :param src_1: Sources 1
+    :param src_2: Sources 2
+    :return: great circle distances (arcsec)
     """
-    ddec = obj2.dec_rad - obj1.dec_rad
-    dra = obj2.ra_rad - obj1.ra_rad
+    ddec = src_2.dec_rad - src_1.dec_rad
+    dra = src_2.ra_rad - src_1.ra_rad
     dist_rad = 2 * np.arcsin(
         np.sqrt(
             (np.sin(ddec / 2.0)) ** 2
-            + np.cos(obj1.dec_rad) * np.cos(obj2.dec_rad) * (np.sin(dra / 2.0)) ** 2
+            + np.cos(src_1.dec_rad) * np.cos(src_2.dec_rad) * (np.sin(dra / 2.0)) ** 2
         )
     )
 
@@ -108,56 +237,54 @@ def distance(obj1: BaseSource, obj2: BaseSource) -> float:
     return dist_arc_sec
 
 
-def quickdistance(obj1: BaseSource, obj2: BaseSource, cosdec: float) -> float:
+def quickdistance(src_1: SourceTable, src_2: SourceTable, cosdec: float) -> np.ndarray:
     """
-    Cartestian-approximation distance between two objects
+    Cartestian-approximation distance between sources, broadcasting the two tables
     (Non-great-circle distance is much faster, but beware poles...)
 
-    :param obj1: object 1
-    :param obj2: object 2
+    :param src_1: Sources 1
+    :param src_2: Sources 2
     :param cosdec: cos(declination)
-    :return: approximate distance
+    :return: approximate distances (arcsec)
     """
-    ddec = obj2.dec_deg - obj1.dec_deg
-    dra = obj2.ra_deg - obj1.ra_deg
-    if dra > 180:
-        dra = 360 - dra
+    ddec = src_2.dec_deg - src_1.dec_deg
+    dra = src_2.ra_deg - src_1.ra_deg
+    dra = np.where(dra > 180, 360 - dra, dra)
     return 3600 * np.sqrt(ddec**2 + (cosdec * dra) ** 2)
 
 
-def position_angle(obj1: BaseSource, obj2: BaseSource) -> float:
+def normalise_position_angle(pa_deg: np.ndarray) -> np.ndarray:
     """
-    Calculate the (spherical) position angle between two objects.
+    Wrap position angles into the range [-160, 200] degrees
 
-    :param obj1: Object 1
-    :param obj2: Object 2
-    :return: angle (degrees)
+    :param pa_deg: position angles (degrees)
+    :return: wrapped position angles
     """
-    dra = obj2.ra_rad - obj1.ra_rad
-    pa_rad = np.arctan2(
-        np.cos(obj1.dec_rad) * np.tan(obj2.dec_rad)
-        - np.sin(obj1.dec_rad) * np.cos(dra),
-        np.sin(dra),
-    )
-    pa_deg = pa_rad * 180.0 / np.pi
-    pa_deg = 90.0 - pa_deg  # defined as degrees east of north
-    while pa_deg > 200:
-        pa_deg -= 360.0  # make single-valued
-    while pa_deg < -160:
-        pa_deg += (
-            360.0  # note there is a crossing point at PA=200, images at this exact PA
-        )
-    return (
-        pa_deg  # will have the number of matches cut by half at each comparison level
-    )
+    while np.any(pa_deg > 200.0):
+        pa_deg = np.where(pa_deg > 200.0, pa_deg - 360.0, pa_deg)
+    while np.any(pa_deg < -160.0):
+        pa_deg = np.where(pa_deg < -160.0, pa_deg + 360.0, pa_deg)
+    return pa_deg
 
 
-def compare_mag(source: SextractorSource) -> float:
+def position_angle(src_1: SourceTable, src_2: SourceTable) -> np.ndarray:
     """
-    # Compare objects using magnitude.
-    "useful for sorting; Altered by KD for compatibility with python 3
+    Calculate the (spherical) position angle between sources,
+    broadcasting the two tables
 
-    :param source: Source to compare
-    :return: magnitude of source
+    :param src_1: Sources 1
+    :param src_2: Sources 2
+    :return: angles (degrees)
     """
-    return source.mag
+    dra = src_2.ra_rad - src_1.ra_rad
+    pa_rad = np.arctan2(
+        np.cos(src_1.dec_rad) * np.tan(src_2.dec_rad)
+        - np.sin(src_1.dec_rad) * np.cos(dra),
+        np.sin(dra),
+    )
+    pa_deg = pa_rad * 180.0 / np.pi
+    pa_deg = 90.0 - pa_deg  # defined as degrees east of north
+    # make single-valued. Note there is a crossing point at PA=200,
+    # images at this exact PA will have the number of matches cut by half
+    # at each comparison level
+    return normalise_position_angle(pa_deg)
@@ -126,27 +126,28 @@ class BaseProcessorWithCrossMatch(BaseImageProcessor, ABC):
         Setup the reference catalog and image catalog
         """
         ref_catalog = self.ref_catalog_generator(image)
-        output_dir = get_output_dir(
-            dir_root=self.temp_output_sub_dir,
-            sub_dir=self.night_sub_dir,
-        )
-        ref_cat_path = ref_catalog.write_catalog(image, output_dir=output_dir)
-        temp_cat_path = copy_temp_file(
-            output_dir=Path(output_dir), file_path=image[SEXTRACTOR_HEADER_KEY]
-        )
 
-        ref_cat = get_table_from_ldac(ref_cat_path)
-        img_cat = get_table_from_ldac(temp_cat_path)
+        if self.cache:
+            # Keep copies of both catalogs
+            output_dir = get_output_dir(
+                dir_root=self.temp_output_sub_dir,
+                sub_dir=self.night_sub_dir,
+            )
+            ref_cat_path = ref_catalog.write_catalog(image, output_dir=output_dir)
+            temp_cat_path = copy_temp_file(
+                output_dir=Path(output_dir), file_path=image[SEXTRACTOR_HEADER_KEY]
+            )
+            ref_cat = get_table_from_ldac(ref_cat_path)
+            img_cat = get_table_from_ldac(temp_cat_path)
+        else:
+            ref_cat = get_table_from_ldac(ref_catalog.get_ldac_catalog(image))
+            img_cat = get_table_from_ldac(image[SEXTRACTOR_HEADER_KEY])
 
         if self.write_regions:
             self.write_regions_files(image=image, ref_cat=ref_cat, img_cat=img_cat)
 
         cleaned_img_cat, ref_cat = self.catalogs_purifier(img_cat, ref_cat, image)
 
-        if not self.cache:
-            temp_cat_path.unlink()
-            logger.debug(f"Deleted temporary file {temp_cat_path}")
-
         return ref_cat, img_cat, cleaned_img_cat
 
     def write_regions_files(self, image: Image, ref_cat: Table, img_cat: Table):
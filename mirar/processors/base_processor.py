@@ -6,9 +6,11 @@ import datetime
 import getpass
 import hashlib
 import logging
+import multiprocessing
 import socket
 import threading
 from abc import ABC
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from queue import Queue
 from threading import Thread
@@ -16,9 +18,13 @@ from typing import Callable
 
 import numpy as np
 import pandas as pd
+from astropy.io.fits import Header
 from tqdm.auto import tqdm
 
 from mirar.data import DataBatch, Dataset, Image, ImageBatch, SourceBatch
+from mirar.data.cache import USE_CACHE
+from mirar.data.calibration_store import CalibrationStore, get_header_mjd
+from mirar.data.image_data import prepare_handoffs, release_handoffs
 from mirar.errors import (
     ErrorReport,
     ErrorStack,
@@ -29,6 +35,7 @@ from mirar.io import MissingCoreFieldError, open_fits, save_fits
 from mirar.paths import (
     BASE_NAME_KEY,
     CAL_OUTPUT_SUB_DIR,
+    LATEST_SAVE_KEY,
     LATEST_WEIGHT_SAVE_KEY,
     PACKAGE_NAME,
     PROC_HISTORY_KEY,
@@ -41,6 +48,53 @@ from mirar.paths import (
 
 logger = logging.getLogger(__name__)
 
+THREAD_EXECUTOR = "thread"
+PROCESS_EXECUTOR = "process"
+SERIAL_EXECUTOR = "serial"
+executor_options = [THREAD_EXECUTOR, PROCESS_EXECUTOR, SERIAL_EXECUTOR]
+
+# Processor being applied by a forked worker process, inherited from the parent
+_forked_processor = None  # pylint: disable=invalid-name
+
+
+def _set_forked_processor(processor):
+    """
+    Set the processor to be applied by this worker process
+
+    :param processor: Processor
+    :return: None
+    """
+    global _forked_processor  # pylint: disable=global-statement
+    _forked_processor = processor
+
+
+def _apply_in_subprocess(
+    j: int, batch: DataBatch
+) -> tuple[int, DataBatch, Exception | None]:
+    """
+    Function run in a worker process, applying the processor to a batch.
+
+    Non-critical errors are returned alongside the batch, so that the batch
+    can still be passed on. Any other errors are raised in the parent process.
+    The cache files of the returned batch are handed over to the parent process.
+
+    :param j: Index of batch
+    :param batch: Batch to process
+    :return: Index of batch, processed batch, and any non-critical error
+    """
+    try:
+        res = j, _forked_processor.apply(batch), None
+    except NoncriticalProcessingError as exc:
+        res = j, batch, exc
+    prepare_handoffs(res[1], link=False)
+    return res
+
+
+class ExecutorError(ProcessorError):
+    """
+    An error raised if an invalid executor is selected for a processor
+    """
+
 
 class PrerequisiteError(ProcessorError):
     """
@@ -78,6 +132,8 @@ class BaseProcessor:
 
     max_n_cpu: int = max_n_cpu
 
+    executor: str = THREAD_EXECUTOR
+
     subclasses = {}
 
     def __init__(self):
@@ -173,6 +229,44 @@ class BaseProcessor:
         del self.passed_batches[cache_id]
         del self.err_stack[cache_id]
 
+    def set_executor(self, executor: str):
+        """
+        Sets how batches are processed in parallel by this processor.
+
+        * 'thread' (default): batches are processed by a pool of threads
+        * 'process': batches are sent to a pool of forked worker processes,
+          avoiding the GIL for CPU-bound processors. Pixel data is passed
+          through the image cache rather than pickled. Any changes to the
+          processor's own attributes in the worker processes are not kept.
+        * 'serial': batches are processed one after another in the calling thread
+
+        :param executor: Executor to use
+        :return: None
+        """
+        if executor not in executor_options:
+            err = (
+                f"Unrecognised executor '{executor}' for {self.__class__.__name__}. "
+                f"Please select one of {executor_options}."
+            )
+            logger.error(err)
+            raise ExecutorError(err)
+        self.executor = executor
+
+    def get_executor(self) -> str:
+        """
+        Gets the executor to use for this processor.
+        The process executor requires cache mode, and falls back to threads otherwise.
+
+        :return: Executor
+        """
+        if (self.executor == PROCESS_EXECUTOR) and not USE_CACHE:
+            logger.warning(
+                f"{self.__class__.__name__} is configured to use a process executor, "
+                f"but this requires cache mode. Using a thread executor instead."
+            )
+            return THREAD_EXECUTOR
+        return self.executor
+
     def base_apply(self, dataset: Dataset) -> tuple[Dataset, ErrorStack]:
         """
         Core function to act on a dataset, and return an updated dataset
@@ -189,34 +283,27 @@ class BaseProcessor:
         self.latest_n_input_blocks = sum(len(x) for x in dataset)
 
         if len(dataset) > 0:
-            n_cpu = min([self.max_n_cpu, len(dataset)])
+            executor = self.get_executor()
 
-            logger.info(f"Running {self.__class__.__name__} on {n_cpu} threads")
-
-            watchdog_queue = Queue()
-
-            workers = []
-
-            for _ in range(n_cpu):
-                # Set up a worker thread to process database load
-                worker = Thread(
-                    target=self.apply_to_batch, args=(watchdog_queue, cache_id)
-                )
-                worker.daemon = True
-                worker.start()
+            n_cpu = min([self.max_n_cpu, len(dataset)])
+            if executor == SERIAL_EXECUTOR:
+                n_cpu = 1
 
-                workers.append(worker)
+            logger.info(
+                f"Running {self.__class__.__name__} on {n_cpu} {executor} workers"
+            )
 
             with tqdm(total=len(dataset), position=0, leave=False) as progress:
                 # Set up progress bar
                 self.progress[cache_id] = progress
 
-                # Loop over batches to add to queue
-                for j, batch in enumerate(dataset):
-                    watchdog_queue.put(item=(j, batch))
-
-                # Wait for the queue to empty
-                watchdog_queue.join()
+                if executor == PROCESS_EXECUTOR:
+                    self.apply_with_processes(dataset, cache_id, n_cpu)
+                elif executor == SERIAL_EXECUTOR:
+                    for j, batch in enumerate(dataset):
+                        self.apply_to_single_batch(j, batch, cache_id)
+                else:
+                    self.apply_with_threads(dataset, cache_id, n_cpu)
 
                 self.progress[cache_id].refresh()
                 self.progress[cache_id].close()
@@ -237,6 +324,65 @@ class BaseProcessor:
 
         return dataset, err_stack
 
+    def apply_with_threads(self, dataset: Dataset, cache_id: int, n_cpu: int):
+        """
+        Function to apply the processor to each batch of a dataset,
+        using a pool of worker threads
+
+        :param dataset: Input dataset
+        :param cache_id: key for cache
+        :param n_cpu: Number of threads
+        :return: None
+        """
+        watchdog_queue = Queue()
+
+        for _ in range(n_cpu):
+            # Set up a worker thread to process database load
+            worker = Thread(target=self.apply_to_batch, args=(watchdog_queue, cache_id))
+            worker.daemon = True
+            worker.start()
+
+        # Loop over batches to add to queue
+        for j, batch in enumerate(dataset):
+            watchdog_queue.put(item=(j, batch))
+
+        # Wait for the queue to empty
+        watchdog_queue.join()
+
+    def apply_with_processes(self, dataset: Dataset, cache_id: int, n_cpu: int):
+        """
+        Function to apply the processor to each batch of a dataset,
+        using a pool of forked worker processes.
+
+        The batches are pickled, but in cache mode the images only carry
+        their headers and cache paths, so pixel data moves through the cache.
+        Cache files are linked on submission, and the links are always released.
+
+        :param dataset: Input dataset
+        :param cache_id: key for cache
+        :param n_cpu: Number of processes
+        :return: None
+        """
+        try:
+            with ProcessPoolExecutor(
+                max_workers=n_cpu,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_set_forked_processor,
+                initargs=(self,),
+            ) as executor:
+                futures = {}
+                for j, batch in enumerate(dataset):
+                    prepare_handoffs(batch)
+                    futures[executor.submit(_apply_in_subprocess, j, batch)] = j
+
+                for future in as_completed(futures):
+                    j = futures[future]
+                    self.apply_to_single_batch(j, dataset[j], cache_id, future=future)
+                    release_handoffs(dataset[j])  # Free the links as soon as possible
+        finally:
+            for batch in dataset:
+                release_handoffs(batch)
+
     def apply_to_batch(self, queue, cache_id: int):
         """
         Function to run self.apply on a batch in the queue, catch any errors, and then
@@ -248,24 +394,77 @@ class BaseProcessor:
         """
         while True:
             j, batch = queue.get()
-            try:
-                batch = self.apply(batch)
-                self.passed_batches[cache_id][j] = batch
-            except NoncriticalProcessingError as exc:
-                err = self.generate_error_report(exc, batch)
-                logger.error(err.generate_log_message())
-                self.err_stack[cache_id].add_report(err)
-                self.passed_batches[cache_id][j] = batch
-            except Exception as exc:  # pylint: disable=broad-except
-                err = self.generate_error_report(exc, batch)
-                logger.error(err.generate_log_message())
-                self.err_stack[cache_id].add_report(err)
-
-            self.progress[cache_id].update(1)
-            self.progress[cache_id].refresh()
-
+            self.apply_to_single_batch(j, batch, cache_id)
             queue.task_done()
 
+    def apply_to_single_batch(
+        self, j: int, batch: DataBatch, cache_id: int, future=None
+    ):
+        """
+        Function to run self.apply on a single batch, catch any errors, and then
+        update the internal cache with the results.
+
+        If a future is provided, the batch has instead already been processed in
+        a worker process, and the result (or error) is retrieved from the future.
+
+        :param j: Index of batch
+        :param batch: Batch to process
+        :param cache_id: key for cache
+        :param future: Optional future from a worker process
+        :return: None
+        """
+        batch, err = self.safe_apply(batch, future=future)
+
+        if err is not None:
+            self.err_stack[cache_id].add_report(err)
+
+        if batch is not None:
+            self.passed_batches[cache_id][j] = batch
+
+        self.progress[cache_id].update(1)
+        self.progress[cache_id].refresh()
+
+    def safe_apply(
+        self, batch: DataBatch, future=None
+    ) -> tuple[DataBatch | None, ErrorReport | None]:
+        """
+        Function to run self.apply on a single batch, and catch any errors.
+
+        Batches raising a non-critical error are still passed on,
+        while batches raising any other error are dropped.
+
+        :param batch: Batch to process
+        :param future: Optional future from a worker process
+        :return: Updated batch (or None), and error report (or None)
+        """
+        try:
+            if future is None:
+                batch = self.apply(batch)
+            else:
+                _, batch, exc = future.result()
+                if exc is not None:
+                    raise exc
+            return batch, None
+        except NoncriticalProcessingError as exc:
+            err = self.generate_error_report(exc, batch)
+            logger.error(err.generate_log_message())
+            return batch, err
+        except Exception as exc:  # pylint: disable=broad-except
+            err = self.generate_error_report(exc, batch)
+            logger.error(err.generate_log_message())
+            return None, err
+
+    def is_streamable(self) -> bool:
+        """
+        Whether batches can be streamed through this processor one at a time,
+        without waiting for the rest of the dataset.
+        This is not the case for processors which update the whole dataset,
+        e.g. by regrouping batches.
+
+        :return: boolean
+        """
+        return type(self).update_dataset is BaseProcessor.update_dataset
+
     def apply(self, batch: DataBatch):
         """
         Function applying the processor to a
@@ -334,6 +533,10 @@ class CleanupProcessor(BaseProcessor, ABC):
         new_dataset = Dataset([x for x in dataset.get_batches() if len(x) > 0])
         return new_dataset
 
+    def is_streamable(self) -> bool:
+        # Removing empty batches can be done one batch at a time
+        return type(self).update_dataset is CleanupProcessor.update_dataset
+
 
 class ImageHandler:
     """
@@ -400,7 +603,10 @@ class ImageHandler:
                 logger.warning(
                     f"Could not find weight file {image.header[LATEST_WEIGHT_SAVE_KEY]}"
                 )
-        self.save_fits(Image(mask.astype(float), header), mask_path, compress=compress)
+        mask_image = Image(
+            mask.astype(image.get_working_dtype()), header, dtype=image.dtype
+        )
+        self.save_fits(mask_image, mask_path, compress=compress)
 
         return mask_path
 
@@ -433,18 +639,23 @@ class BaseImageProcessor(BaseProcessor, ImageHandler, ABC):
         raise NotImplementedError
 
 
-class ProcessorWithCache(BaseImageProcessor, ABC):
+class ProcessorWithCache(
+    BaseImageProcessor, ABC
+):  # pylint: disable=too-many-instance-attributes
     """
     Image processor with cached images associated to it, e.g a master flat
     """
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
         self,
         try_load_cache: bool = True,
         write_to_cache: bool = True,
         overwrite: bool = True,
         cache_sub_dir: str = CAL_OUTPUT_SUB_DIR,
         cache_image_name_header_keys: str | list[str] | None = None,
+        calibration_store: CalibrationStore | None = None,
+        calibration_match_keys: list[str] | None = None,
+        calibration_validity_days: float = 30.0,
     ):
         super().__init__()
         self.try_load_cache = try_load_cache
@@ -452,6 +663,9 @@ class ProcessorWithCache(BaseImageProcessor, ABC):
         self.overwrite = overwrite
         self.cache_sub_dir = cache_sub_dir
         self.cache_image_name_header_keys = cache_image_name_header_keys
+        self.calibration_store = calibration_store
+        self.calibration_match_keys = calibration_match_keys
+        self.calibration_validity_days = calibration_validity_days
 
     def select_cache_images(self, images: ImageBatch) -> ImageBatch:
         """
@@ -518,14 +732,160 @@ class ProcessorWithCache(BaseImageProcessor, ABC):
             logger.debug(f"Loading cached file {path}")
             return self.open_fits(path)
 
+        input_hash = None
+        if self.calibration_store is not None:
+            cache_images = self.select_cache_images(images)
+            if len(cache_images) > 0:
+                input_hash = self.calibration_store.get_input_hash(cache_images)
+
+            # Stored masters are not written to the cache path, which is only
+            # unique to the input images when these are present in the batch
+            image = self.load_from_calibration_store(images, input_hash=input_hash)
+            if image is not None:
+                return image
+
         image = self.make_image(images)
 
         if self.write_to_cache:
             if np.sum([not exists, self.overwrite]) > 0:
                 self.save_fits(image, path)
 
+        if self.calibration_store is not None:
+            self.add_to_calibration_store(images, image, path, input_hash=input_hash)
+
+        return image
+
+    def get_calibration_match_keys(self) -> list[str]:
+        """
+        Get the header keys used to match stored master images to images,
+        defaulting to the keys used to name the cache image
+
+        :return: list of header keys
+        """
+        keys = self.calibration_match_keys
+        if keys is None:
+            keys = self.cache_image_name_header_keys
+        if keys is None:
+            return []
+        if isinstance(keys, str):
+            return [keys]
+        return keys
+
+    def get_calibration_match_values(self, header: Header) -> dict[str, str] | None:
+        """
+        Get the header values a stored master must have, to be used for an image.
+
+        These are the values of the calibration match keys, and the values of any
+        requirements registered with the store for this type of calibration
+        (e.g. by :class:`~mirar.processors.utils.cal_hunter.CalHunter`).
+        A requirement uses the value of the image if it is an accepted value,
+        or otherwise its only accepted value (e.g. an exposure time of 0 for biases).
+
+        :param header: header of image to process
+        :return: dictionary of header values, or None if these cannot be determined
+        """
+        match_keys = self.get_calibration_match_keys()
+        if not all(x in header for x in match_keys):
+            return None
+
+        match_values = {x: str(header[x]) for x in match_keys}
+
+        requirements = self.calibration_store.get_requirements(self.base_key)
+        for key, accepted_values in requirements.items():
+            if key in match_values:
+                continue
+            if (key in header) and (str(header[key]) in accepted_values):
+                match_values[key] = str(header[key])
+            elif len(accepted_values) == 1:
+                match_values[key] = accepted_values[0]
+            else:
+                return None
+
+        if len(match_values) == 0:
+            return None
+
+        return match_values
+
+    def load_from_calibration_store(
+        self, images: ImageBatch, input_hash: str | None = None
+    ) -> Image | None:
+        """
+        Try to load a master image from the calibration store.
+
+        If the batch contains input images for the master, only a master made
+        from exactly the same input images is used. Otherwise, the valid master
+        closest in time, from the same detector and with matching header values,
+        is used.
+
+        :param images: images to process
+        :param input_hash: hash of the input images, if already computed
+        :return: master image, or None if no suitable master is stored
+        """
+        cache_images = self.select_cache_images(images)
+
+        if len(cache_images) > 0:
+            if input_hash is None:
+                input_hash = self.calibration_store.get_input_hash(cache_images)
+            store_path = self.calibration_store.find_by_hash(self.base_key, input_hash)
+        else:
+            if len(images) == 0:
+                return None
+            header = images[0].get_header()
+            match_values = self.get_calibration_match_values(header)
+            if match_values is None:
+                return None
+            store_path = self.calibration_store.find_matching(
+                self.base_key,
+                match_values=match_values,
+                mjd=get_header_mjd(header),
+                detector=self.calibration_store.get_detector(header),
+            )
+
+        if store_path is None:
+            return None
+
+        logger.debug(f"Loading stored master {store_path}")
+        image = self.open_fits(store_path)
+        image[LATEST_SAVE_KEY] = store_path.as_posix()
         return image
 
+    def add_to_calibration_store(
+        self,
+        images: ImageBatch,
+        image: Image,
+        path: Path,
+        input_hash: str | None = None,
+    ):
+        """
+        Add a newly-made master image to the calibration store
+
+        :param images: images to process
+        :param image: master image
+        :param path: cache path of master image
+        :param input_hash: hash of the input images, if already computed
+        :return: None
+        """
+        cache_images = self.select_cache_images(images)
+
+        if len(cache_images) == 0:
+            return
+
+        if not path.exists():
+            path = self.calibration_store.get_store_path(self.base_key, path.name)
+            self.save_fits(image, path)
+
+        if input_hash is None:
+            input_hash = self.calibration_store.get_input_hash(cache_images)
+
+        self.calibration_store.add(
+            cal_type=self.base_key,
+            input_hash=input_hash,
+            master_path=path,
+            input_headers=[x.get_header() for x in cache_images],
+            match_keys=self.get_calibration_match_keys(),
+            validity_days=self.calibration_validity_days,
+        )
+
     def make_image(self, images: ImageBatch) -> Image:
         """
         Make a cached image (e.g master flat)
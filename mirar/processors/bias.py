@@ -8,6 +8,7 @@ from collections.abc import Callable
 import numpy as np
 
 from mirar.data import Image, ImageBatch
+from mirar.data.utils.stacking import FrameStacker, get_stack_source
 from mirar.errors import ImageNotFoundError
 from mirar.paths import BIAS_FRAME_KEY, LATEST_SAVE_KEY, SATURATE_KEY
 from mirar.processors.base_processor import ProcessorPremadeCache, ProcessorWithCache
@@ -39,10 +40,14 @@ class BiasCalibrator(ProcessorWithCache):
         self,
         *args,
         select_bias_images: Callable[[ImageBatch], ImageBatch] = default_select_bias,
+        stacker: FrameStacker | None = None,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
         self.select_cache_images = select_bias_images
+        if stacker is None:
+            stacker = FrameStacker()
+        self.stacker = stacker
 
     def description(self) -> str:
         return "Creates a bias image, and subtracts this from the other images."
@@ -75,15 +80,11 @@ class BiasCalibrator(ProcessorWithCache):
             logger.error(err)
             raise ImageNotFoundError(err)
 
-        nx, ny = images[0].get_data().shape
-
-        biases = np.zeros((nx, ny, n_frames))
-
-        for i, img in enumerate(images):
-            biases[:, :, i] = img.get_data()
-
-        logger.debug(f"Median combining {n_frames} biases")
-        master_bias = Image(np.nanmedian(biases, axis=2), header=images[0].get_header())
+        logger.debug(f"Combining {n_frames} biases with {self.stacker}")
+        master_bias_data = self.stacker.combine([get_stack_source(x) for x in images])
+        master_bias = Image(
+            master_bias_data, header=images[0].get_header(), dtype=images[0].dtype
+        )
 
         return master_bias
 
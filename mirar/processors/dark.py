@@ -9,6 +9,7 @@ from copy import copy
 import numpy as np
 
 from mirar.data import Image, ImageBatch
+from mirar.data.utils.stacking import FrameStacker, get_stack_source
 from mirar.errors import ImageNotFoundError
 from mirar.paths import (
     BASE_NAME_KEY,
@@ -56,10 +57,14 @@ class DarkCalibrator(ProcessorWithCache):
         self,
         *args,
         select_cache_images: Callable[[ImageBatch], ImageBatch] = default_select_dark,
+        stacker: FrameStacker | None = None,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
         self.select_cache_images = select_cache_images
+        if stacker is None:
+            stacker = FrameStacker()
+        self.stacker = stacker
 
     def description(self) -> str:
         return (
@@ -101,24 +106,26 @@ class DarkCalibrator(ProcessorWithCache):
             logger.error(err)
             raise MissingDarkError(err)
 
-        nx, ny = dark_images[0].get_data().shape
-
-        darks = np.zeros((nx, ny, n_frames))
+        frames, dark_exptimes = [], []
 
         individual_dark_exptimes, imagenames_key = [], []
-        for i, img in enumerate(dark_images):
+        for img in dark_images:
             dark_exptime = img[EXPTIME_KEY]
-            darks[:, :, i] = img.get_data() / dark_exptime
+            frames.append(get_stack_source(img))
+            dark_exptimes.append(dark_exptime)
             individual_dark_exptimes.append(str(dark_exptime))
             imagenames_key.append(img[BASE_NAME_KEY])
 
-        logger.debug(f"Median combining {n_frames} darks")
+        logger.debug(f"Combining {n_frames} darks with {self.stacker}")
+        master_dark_data = self.stacker.combine(frames, scales=dark_exptimes)
         master_dark_header = copy(dark_images[0].get_header())
         master_dark_header[EXPTIME_KEY] = 1.0
         master_dark_header[COADD_KEY] = n_frames
         master_dark_header["INDIVEXP"] = ",".join(individual_dark_exptimes)
         master_dark_header[STACKED_COMPONENT_IMAGES_KEY] = ",".join(imagenames_key)
-        master_dark = Image(np.nanmedian(darks, axis=2), header=master_dark_header)
+        master_dark = Image(
+            master_dark_data, header=master_dark_header, dtype=dark_images[0].dtype
+        )
 
         return master_dark
 
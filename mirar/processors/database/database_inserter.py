@@ -84,26 +84,60 @@ class DatabaseImageInserter(BaseDatabaseInserter, BaseImageProcessor):
 
 class DatabaseSourceInserter(BaseDatabaseInserter, BaseSourceProcessor):
     """
-    Processor for exporting sources to a database
+    Processor for exporting sources to a database.
+
+    By default, all sources in a source list are validated together and inserted
+    with a single statement
+    (see :meth:`~mirar.database.base_model.BaseDB.insert_entries`).
+    Set bulk_insert=False to insert sources one at a time.
     """
 
+    def __init__(self, *args, bulk_insert: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bulk_insert = bulk_insert
+
+    def insert_sources(
+        self, metadata: dict, source_table: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Insert all sources into the database
+
+        :param metadata: Metadata of the source list
+        :param source_table: Table of sources
+        :return: Dataframe of returned keys, with one row per source
+        """
+        super_dicts = [
+            self.generate_super_dict(metadata, source_row)
+            for _, source_row in source_table.iterrows()
+        ]
+
+        if self.bulk_insert:
+            return self.db_table.insert_entries(
+                super_dicts, duplicate_protocol=self.duplicate_protocol
+            )
+
+        primary_key_df_list = []
+        for super_dict in super_dicts:
+            new = self.db_table(**super_dict)
+            res = new.insert_entry(duplicate_protocol=self.duplicate_protocol)
+
+            assert len(res) == 1
+
+            primary_key_df_list.append(res.loc[0])
+
+        return pd.DataFrame(primary_key_df_list).reset_index(drop=True)
+
     def _apply_to_sources(self, batch: SourceBatch) -> SourceBatch:
         for source_list in batch:
             source_table = source_list.get_data()
             metadata = source_list.get_metadata()
 
-            primary_key_df_list = []
-            for _, source_row in source_table.iterrows():
-                super_dict = self.generate_super_dict(metadata, source_row)
-
-                new = self.db_table(**super_dict)
-                res = new.insert_entry(duplicate_protocol=self.duplicate_protocol)
-
-                assert len(res) == 1
+            if len(source_table) == 0:
+                continue
 
-                primary_key_df_list.append(res.loc[0])
+            primary_key_df = self.insert_sources(metadata, source_table)
+            assert len(primary_key_df) == len(source_table)
 
-            primary_key_df = pd.DataFrame(primary_key_df_list).reset_index(drop=True)
             for key in primary_key_df:
                 source_table[key] = primary_key_df[key]
 
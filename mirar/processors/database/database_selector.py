@@ -11,13 +11,15 @@ import pandas as pd
 
 from mirar.data import DataBlock, Image, ImageBatch, SourceBatch
 from mirar.database.constraints import DBQueryConstraints
-from mirar.database.transactions import select_from_table
+from mirar.database.transactions import select_from_table, select_from_table_batch
 from mirar.paths import SOURCE_HISTORY_KEY
 from mirar.processors.base_processor import BaseImageProcessor, BaseSourceProcessor
 from mirar.processors.database.base_database_processor import BaseDatabaseProcessor
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_QUERY_BATCH_SIZE = 500
+
 
 class BaseDatabaseSelector(BaseDatabaseProcessor, ABC):
     """Base Class for any database selector"""
@@ -155,11 +157,13 @@ class BaseDatabaseSourceSelector(BaseDatabaseSelector, BaseSourceProcessor, ABC)
         db_output_columns: str | list[str],
         max_num_results: Optional[int] = None,
         additional_query_constraints: DBQueryConstraints | None = None,
+        query_batch_size: Optional[int] = DEFAULT_QUERY_BATCH_SIZE,
         **kwargs,
     ):
         self.db_output_columns = db_output_columns
         self.max_num_results = max_num_results
         self.additional_query_constraints = additional_query_constraints
+        self.query_batch_size = query_batch_size
         super().__init__(**kwargs)
 
     def update_dataframe(
@@ -181,24 +185,22 @@ class BaseDatabaseSourceSelector(BaseDatabaseSelector, BaseSourceProcessor, ABC)
         for source_table in batch:
             metadata = source_table.get_metadata()
             candidate_table = source_table.get_data()
-            results = []
-            for _, source in candidate_table.iterrows():
-
-                res = self.query_for_source(source, metadata)
 
-                results.append(res)
+            results = self.query_for_sources(candidate_table, metadata)
 
             new_table = self.update_dataframe(candidate_table, results)
             source_table.set_data(new_table)
         return batch
 
-    def query_for_source(self, source: pd.Series, metadata: dict) -> pd.DataFrame:
+    def get_source_query_constraints(
+        self, source: pd.Series, metadata: dict
+    ) -> DBQueryConstraints:
         """
-        Query the database for a single source
+        Get the full query constraints for a single source
 
         :param source: Source data
         :param metadata: Source Batch metadata
-        :return: Results from the database
+        :return: Query constraints
         """
         super_dict = self.generate_super_dict(metadata, source)
         query_constraints = self.get_constraints(super_dict)
@@ -206,6 +208,17 @@ class BaseDatabaseSourceSelector(BaseDatabaseSelector, BaseSourceProcessor, ABC)
         if self.additional_query_constraints is not None:
             query_constraints = query_constraints + self.additional_query_constraints
         logger.debug(f"Query constraints: " f"{query_constraints.parse_constraints()}")
+        return query_constraints
+
+    def query_for_source(self, source: pd.Series, metadata: dict) -> pd.DataFrame:
+        """
+        Query the database for a single source
+
+        :param source: Source data
+        :param metadata: Source Batch metadata
+        :return: Results from the database
+        """
+        query_constraints = self.get_source_query_constraints(source, metadata)
         res = select_from_table(
             sql_table=self.db_table.sql_model,
             db_constraints=query_constraints,
@@ -214,6 +227,42 @@ class BaseDatabaseSourceSelector(BaseDatabaseSelector, BaseSourceProcessor, ABC)
         )
         return res
 
+    def query_for_sources(
+        self, candidate_table: pd.DataFrame, metadata: dict
+    ) -> list[pd.DataFrame]:
+        """
+        Query the database for every source in a table.
+
+        If query_batch_size is set, the sources are queried in batches,
+        with one round-trip to the database per batch. Otherwise, each source is
+        queried separately.
+
+        :param candidate_table: Table of sources
+        :param metadata: Source Batch metadata
+        :return: Results from the database, one per source
+        """
+        if self.query_batch_size is None:
+            return [
+                self.query_for_source(source, metadata)
+                for _, source in candidate_table.iterrows()
+            ]
+
+        all_constraints = [
+            self.get_source_query_constraints(source, metadata)
+            for _, source in candidate_table.iterrows()
+        ]
+
+        results = []
+        for i in range(0, len(all_constraints), self.query_batch_size):
+            results += select_from_table_batch(
+                db_constraints=all_constraints[i : i + self.query_batch_size],
+                sql_table=self.db_table.sql_model,
+                output_columns=self.db_output_columns,
+                max_num_results=self.max_num_results,
+            )
+
+        return results
+
 
 class DatabaseSingleMatchSelector(BaseDatabaseSourceSelector, ABC):
     """
@@ -11,6 +11,7 @@ from copy import copy
 import numpy as np
 
 from mirar.data import Image, ImageBatch
+from mirar.data.utils.stacking import FrameStacker, get_stack_source
 from mirar.errors import ImageNotFoundError
 from mirar.paths import (
     BASE_NAME_KEY,
@@ -61,6 +62,7 @@ class FlatCalibrator(ProcessorWithCache):
         flat_nan_threshold: float = 0.0,
         select_flat_images: Callable[[ImageBatch], ImageBatch] = default_select_flat,
         flat_mask_key: str = None,
+        stacker: FrameStacker | None = None,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
@@ -71,6 +73,9 @@ class FlatCalibrator(ProcessorWithCache):
         self.flat_nan_threshold = flat_nan_threshold
         self.select_cache_images = select_flat_images
         self.flat_mask_key = flat_mask_key
+        if stacker is None:
+            stacker = FrameStacker()
+        self.stacker = stacker
 
     def description(self) -> str:
         return "Creates a flat image, divides other images by this image."
@@ -109,13 +114,12 @@ class FlatCalibrator(ProcessorWithCache):
             logger.error(err)
             raise MissingFlatError(err)
 
-        nx, ny = images[0].get_data().shape
-
-        flats = np.zeros((nx, ny, n_frames))
+        frames, masks, mask_images, medians = [], [], [], []
 
         flat_exptimes = []
-        for i, img in enumerate(images):
-            data = img.get_data().copy()
+        for img in images:
+            data = get_stack_source(img)
+            mask = None
 
             if self.flat_mask_key is not None:
                 if self.flat_mask_key not in img.header.keys():
@@ -133,26 +137,33 @@ class FlatCalibrator(ProcessorWithCache):
                     logger.error(err)
                     raise FileNotFoundError(err)
 
-                mask_img = self.open_fits(mask_file)
-                pixels_to_keep = mask_img.get_data().astype(bool)
-                mask = ~pixels_to_keep
+                mask_images.append(self.open_fits(mask_file))
+                mask = get_stack_source(mask_images[-1])
                 logger.debug(
-                    f"Masking {np.sum(mask)} pixels in flat {img[BASE_NAME_KEY]}"
+                    f"Masking {np.sum(mask == 0)} pixels in flat {img[BASE_NAME_KEY]}"
                 )
-                data[mask] = np.nan
 
             flat_exptimes.append(img[EXPTIME_KEY])
 
-            median = np.nanmedian(
-                data[self.x_min : self.x_max, self.y_min : self.y_max]
+            region = np.array(
+                data[self.x_min : self.x_max, self.y_min : self.y_max], dtype=float
             )
-            flats[:, :, i] = data / median
+            if mask is not None:
+                region[mask[self.x_min : self.x_max, self.y_min : self.y_max] == 0] = (
+                    np.nan
+                )
 
-        logger.debug(f"Median combining {n_frames} flats")
+            frames.append(data)
+            masks.append(mask)
+            medians.append(np.nanmedian(region))
 
-        master_flat = np.nanmedian(flats, axis=2)
+        logger.debug(f"Combining {n_frames} flats with {self.stacker}")
 
-        master_flat_image = Image(master_flat, header=copy(images[0].get_header()))
+        master_flat = self.stacker.combine(frames, scales=medians, masks=masks)
+
+        master_flat_image = Image(
+            master_flat, header=copy(images[0].get_header()), dtype=images[0].dtype
+        )
         master_flat_image[COADD_KEY] = n_frames
 
         master_flat_image["INDIVEXP"] = ",".join(
@@ -13,7 +13,11 @@ from mirar.paths import (
     get_output_dir,
 )
 from mirar.processors.photometry.base_photometry import BasePhotometryProcessor
-from mirar.processors.photometry.utils import aper_photometry, get_mags_from_fluxes
+from mirar.processors.photometry.utils import (
+    aper_photometry,
+    aper_photometry_multi,
+    get_mags_from_fluxes,
+)
 
 
 class AperturePhotometry(BasePhotometryProcessor):
@@ -75,6 +79,38 @@ class AperturePhotometry(BasePhotometryProcessor):
             fluxuncs.append(fluxunc)
         return fluxes, fluxuncs
 
+    def perform_multi_photometry(
+        self,
+        image_data: np.ndarray,
+        unc_data: np.ndarray,
+        x_pos: np.ndarray,
+        y_pos: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Perform aperture photometry on all sources in an image at once
+
+        :param image_data: Image data
+        :param unc_data: Image uncertainty data
+        :param x_pos: x positions of sources
+        :param y_pos: y positions of sources
+        :return: Arrays of fluxes and flux uncertainties,
+            with shape (n_apertures, n_sources)
+        """
+        all_fluxes, all_fluxuncs = [], []
+        for ind, aper_diam in enumerate(self.aper_diameters):
+            fluxes, fluxuncs = aper_photometry_multi(
+                image_data,
+                unc_data,
+                x_pos,
+                y_pos,
+                aper_diam,
+                self.bkg_in_diameters[ind],
+                self.bkg_out_diameters[ind],
+            )
+            all_fluxes.append(fluxes)
+            all_fluxuncs.append(fluxuncs)
+        return np.array(all_fluxes), np.array(all_fluxuncs)
+
     def _apply_to_sources(
         self,
         batch: SourceBatch,
@@ -84,25 +120,20 @@ class AperturePhotometry(BasePhotometryProcessor):
 
             metadata = source_table.get_metadata()
 
-            all_fluxes, all_fluxuncs = [], []
-            temp_imagename, temp_unc_imagename = self.save_temp_image_uncimage(metadata)
+            image_data, unc_data = self.get_image_uncimage_data(metadata)
+            x_pos, y_pos = self.get_physical_coordinates_array(candidate_table)
 
-            for cand_ind in range(len(candidate_table)):
-                row = candidate_table.iloc[cand_ind]
-
-                image_cutout, unc_image_cutout = self.generate_cutouts(
-                    imagename=temp_imagename,
-                    unc_imagename=temp_unc_imagename,
-                    data_item=row,
-                )
+            all_fluxes, all_fluxuncs = self.perform_multi_photometry(
+                image_data=image_data, unc_data=unc_data, x_pos=x_pos, y_pos=y_pos
+            )
 
-                fluxes, fluxuncs = self.perform_photometry(
-                    image_cutout=image_cutout, unc_image_cutout=unc_image_cutout
+            if self.save_cutouts:
+                image_cutouts, unc_image_cutouts = self.generate_cutout_stacks(
+                    image_data=image_data, unc_data=unc_data, table=candidate_table
                 )
-                all_fluxes.append(fluxes)
-                all_fluxuncs.append(fluxuncs)
-
-                if self.save_cutouts:
+                for cand_ind, (image_cutout, unc_image_cutout) in enumerate(
+                    zip(image_cutouts, unc_image_cutouts)
+                ):
                     image_cutout_path = get_output_dir(
                         self.temp_output_sub_dir, self.night_sub_dir
                     ).joinpath(f"image_cutout_{cand_ind}.dat")
@@ -112,9 +143,6 @@ class AperturePhotometry(BasePhotometryProcessor):
                     ).joinpath(f"unc_image_cutout_{cand_ind}.dat")
                     np.savetxt(X=unc_image_cutout, fname=unc_image_cutout_path)
 
-            all_fluxes = np.array(all_fluxes).T
-            all_fluxuncs = np.array(all_fluxuncs).T
-
             for ind, suffix in enumerate(self.col_suffix_list):
                 flux, fluxunc = all_fluxes[ind], all_fluxuncs[ind]
                 candidate_table[f"{APFLUX_PREFIX_KEY}{suffix}"] = flux
@@ -129,8 +157,6 @@ class AperturePhotometry(BasePhotometryProcessor):
                 candidate_table[f"{APMAG_PREFIX_KEY}{suffix}"] = magnitudes
                 candidate_table[f"{APMAGUNC_PREFIX_KEY}{suffix}"] = magnitudes_unc
 
-            temp_imagename.unlink()
-            temp_unc_imagename.unlink()
             source_table.set_data(candidate_table)
 
         return batch
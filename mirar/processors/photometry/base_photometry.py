@@ -10,6 +10,7 @@ import numpy as np
 import pandas as pd
 
 from mirar.data import Image
+from mirar.data.utils.cutouts import CutoutExtractor
 from mirar.paths import (
     BASE_NAME_KEY,
     LATEST_SAVE_KEY,
@@ -116,6 +117,39 @@ class BasePhotometryProcessor(BaseSourceProcessor, ABC, ImageHandler):
 
         return image_cutout, unc_image_cutout
 
+    def generate_cutout_stacks(
+        self, image_data: np.ndarray, unc_data: np.ndarray, table: pd.DataFrame
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Generate image and uncertainty image cutouts for all sources in a table,
+        directly from the image data in memory
+
+        :param image_data: 2D numpy array of the image
+        :param unc_data: 2D numpy array of the uncertainty image
+        :param table: pandas DataFrame of sources
+
+        :returns tuple: 3D numpy arrays of the image and uncertainty image cutouts,
+            with shape (n_src, 2*half_size+1, 2*half_size+1)
+        """
+        x_pos, y_pos = self.get_physical_coordinates_array(table)
+        extractor = CutoutExtractor(
+            [image_data, unc_data], half_size=self.phot_cutout_half_size
+        )
+        image_cutouts, unc_image_cutouts = extractor.get_cutouts(x_pos, y_pos)
+        return image_cutouts, unc_image_cutouts
+
+    def get_image_uncimage_data(self, metadata: dict) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Function to load the image once, and calculate its uncertainty image,
+        without writing temporary files
+
+        :param metadata: Metadata dictionary
+        :return: Tuple of image data and uncertainty image data
+        """
+        image = self.open_fits(metadata[self.image_key])
+        rms_image = get_rms_image(image)
+        return image.get_data(), rms_image.get_data()
+
     def save_temp_image_uncimage(self, metadata: dict) -> tuple[Path, Path]:
         """
         Function to save the image and uncertainty image to temporary files
@@ -142,3 +176,16 @@ class BasePhotometryProcessor(BaseSourceProcessor, ABC, ImageHandler):
         row = data_item
         x, y = row[self.xpos_key], row[self.ypos_key]
         return int(x), int(y)
+
+    def get_physical_coordinates_array(
+        self, table: pd.DataFrame
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the physical coordinates of all sources in a table
+
+        :param table: pandas DataFrame of sources
+        :return: integer X and Y coordinates of the sources
+        """
+        x_pos = np.asarray(table[self.xpos_key], dtype=float).astype(int)
+        y_pos = np.asarray(table[self.ypos_key], dtype=float).astype(int)
+        return x_pos, y_pos
@@ -19,8 +19,9 @@ from mirar.processors.base_processor import PrerequisiteError
 from mirar.processors.photometry.base_photometry import BasePhotometryProcessor
 from mirar.processors.photometry.utils import (
     get_mags_from_fluxes,
-    make_psf_shifted_array,
+    get_psf_shifted_array,
     psf_photometry,
+    psf_photometry_batch,
 )
 
 logger = logging.getLogger(__name__)
@@ -49,10 +50,8 @@ class PSFPhotometry(BasePhotometryProcessor):
         :param psf_filename: filename of psf file
         :return: flux, fluxunc, minchi2, xshift, yshift
         """
-        if not isinstance(psf_filename, Path):
-            psf_filename = Path(psf_filename)
-        psfmodels = make_psf_shifted_array(
-            psf_filename=psf_filename.as_posix(),
+        psfmodels = get_psf_shifted_array(
+            psf_filename=psf_filename,
             cutout_size_psf_phot=int(image_cutout.shape[0] / 2),
         )
 
@@ -63,6 +62,29 @@ class PSFPhotometry(BasePhotometryProcessor):
         )
         return flux, fluxunc, minchi2, xshift, yshift
 
+    def perform_batch_photometry(
+        self,
+        image_cutouts: np.ndarray,
+        unc_image_cutouts: np.ndarray,
+        psf_filename: str | Path,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Function to perform PSF photometry on a stack of cutouts at once
+        :param image_cutouts: cutouts of image, with shape (n_src, h, w)
+        :param unc_image_cutouts: cutouts of uncertainty image, with the same shape
+        :param psf_filename: filename of psf file
+        :return: fluxes, fluxuncs, minchi2s, xshifts, yshifts
+        """
+        psfmodels = get_psf_shifted_array(
+            psf_filename=psf_filename,
+            cutout_size_psf_phot=int(image_cutouts.shape[1] / 2),
+        )
+        return psf_photometry_batch(
+            image_cutouts=image_cutouts,
+            image_unc_cutouts=unc_image_cutouts,
+            psfmodels=psfmodels,
+        )
+
     def get_psf_filename(self, row):
         """
         Function to get the name of psf file
@@ -75,7 +97,7 @@ class PSFPhotometry(BasePhotometryProcessor):
         psf_filename = row[self.psf_file_key]
         return psf_filename
 
-    def _apply_to_sources(
+    def _apply_to_sources(  # pylint: disable=too-many-locals
         self,
         batch: SourceBatch,
     ) -> SourceBatch:
@@ -84,8 +106,6 @@ class PSFPhotometry(BasePhotometryProcessor):
 
             metadata = source_table.get_metadata()
 
-            fluxes, fluxuncs, minchi2s, xshifts, yshifts = [], [], [], [], []
-
             if self.psf_file_key not in metadata:
                 raise PrerequisiteError(
                     f"PSF file key {self.psf_file_key} not in source table."
@@ -93,41 +113,33 @@ class PSFPhotometry(BasePhotometryProcessor):
                     f" the psf file name?"
                 )
             psf_filename = source_table[self.psf_file_key]
-            temp_imagename, temp_unc_imagename = self.save_temp_image_uncimage(metadata)
+            image_data, unc_data = self.get_image_uncimage_data(metadata)
 
-            for ind, row in candidate_table.iterrows():
-                image_cutout, unc_image_cutout = self.generate_cutouts(
-                    imagename=temp_imagename,
-                    unc_imagename=temp_unc_imagename,
-                    data_item=row,
-                )
-                (
-                    flux,
-                    fluxunc,
-                    minchi2,
-                    xshift,
-                    yshift,
-                ) = self.perform_photometry(
-                    image_cutout, unc_image_cutout, psf_filename=psf_filename
-                )
+            image_cutouts, unc_image_cutouts = self.generate_cutout_stacks(
+                image_data=image_data, unc_data=unc_data, table=candidate_table
+            )
+            (
+                fluxes,
+                fluxuncs,
+                minchi2s,
+                xshifts,
+                yshifts,
+            ) = self.perform_batch_photometry(
+                image_cutouts, unc_image_cutouts, psf_filename=psf_filename
+            )
 
-                if self.save_cutouts:
+            if self.save_cutouts:
+                for i, ind in enumerate(candidate_table.index):
                     image_cutout_path = get_output_dir(
                         self.temp_output_sub_dir, self.night_sub_dir
                     ).joinpath(f"image_cutout_{ind}.dat")
                     logger.debug(f"Writing cutout to {image_cutout_path}")
-                    np.savetxt(X=image_cutout, fname=image_cutout_path)
+                    np.savetxt(X=image_cutouts[i], fname=image_cutout_path)
                     unc_image_cutout_path = get_output_dir(
                         self.temp_output_sub_dir, self.night_sub_dir
                     ).joinpath(f"unc_image_cutout_{ind}.dat")
                     logger.debug(f"Writing cutout to {unc_image_cutout_path}")
-                    np.savetxt(X=unc_image_cutout, fname=unc_image_cutout_path)
-
-                fluxes.append(flux)
-                fluxuncs.append(fluxunc)
-                minchi2s.append(minchi2)
-                xshifts.append(xshift)
-                yshifts.append(yshift)
+                    np.savetxt(X=unc_image_cutouts[i], fname=unc_image_cutout_path)
 
             candidate_table[PSF_FLUX_KEY] = fluxes
             candidate_table[PSF_FLUXUNC_KEY] = fluxuncs
@@ -145,9 +157,6 @@ class PSFPhotometry(BasePhotometryProcessor):
             candidate_table[MAG_PSF_KEY] = magnitudes
             candidate_table[MAGERR_PSF_KEY] = magnitudes_unc
 
-            temp_imagename.unlink()
-            temp_unc_imagename.unlink()
-
             source_table.set_data(candidate_table)
 
         return batch
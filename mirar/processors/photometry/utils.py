@@ -3,6 +3,7 @@ Module with utis for photometry
 """
 
 import logging
+from functools import lru_cache
 from pathlib import Path
 
 import matplotlib.pyplot as plt
@@ -10,21 +11,24 @@ import numpy as np
 from astropy.io import fits
 from astropy.stats import sigma_clipped_stats
 from matplotlib.patches import Circle
-from photutils.aperture import CircularAnnulus, CircularAperture, aperture_photometry
+from photutils.aperture import (
+    ApertureMask,
+    CircularAnnulus,
+    CircularAperture,
+    aperture_photometry,
+)
 
 from mirar.data import Image
-from mirar.errors import ProcessorError
+from mirar.data.utils.cutouts import (  # pylint: disable=unused-import
+    CutoutError,
+    check_cutout_positions,
+    make_cutout_stack,
+)
 from mirar.paths import GAIN_KEY
 
 logger = logging.getLogger(__name__)
 
 
-class CutoutError(ProcessorError):
-    """
-    Error raised when cutout generation fails
-    """
-
-
 def make_cutouts(
     image_paths: Path | list[Path], position: tuple, half_size: int
 ) -> list[np.array]:
@@ -195,6 +199,171 @@ def make_psf_shifted_array(
     return psfmodels
 
 
+@lru_cache(maxsize=32)
+def _load_psf_shifted_array(
+    psf_filename: str, modified_time: int, cutout_size_psf_phot: int
+) -> np.ndarray:
+    """
+    Cached version of :func:`~mirar.processors.photometry.utils.make_psf_shifted_array`
+
+    :param psf_filename: PSF model path
+    :param modified_time: modification time of the PSF file,
+        so changed files are not served from the cache
+    :param cutout_size_psf_phot: half size of the PSF models
+    :return: read-only 3D numpy array of shifted PSF models
+    """
+    logger.debug(f"Making shifted PSF models for {psf_filename} ({modified_time})")
+    psfmodels = make_psf_shifted_array(
+        psf_filename=psf_filename, cutout_size_psf_phot=cutout_size_psf_phot
+    )
+    psfmodels.setflags(write=False)
+    return psfmodels
+
+
+def get_psf_shifted_array(
+    psf_filename: str | Path, cutout_size_psf_phot: int = 20
+) -> np.ndarray:
+    """
+    Function to get the shifted array from a PSF model, reusing the array if the
+    same PSF file has been used before
+
+    :param psf_filename: PSF model path
+    :param cutout_size_psf_phot: half size of the PSF models
+    :return: read-only 3D numpy array of shifted PSF models
+    """
+    psf_filename = Path(psf_filename)
+    return _load_psf_shifted_array(
+        psf_filename.as_posix(),
+        psf_filename.stat().st_mtime_ns,
+        int(cutout_size_psf_phot),
+    )
+
+
+PSF_PHOTOMETRY_CHUNK_SIZE = 500
+
+
+def _psf_photometry_chunk(  # pylint: disable=too-many-locals
+    image_cutouts: np.ndarray,
+    image_unc_cutouts: np.ndarray,
+    psfmodels: np.ndarray,
+    psf_sq: np.ndarray,
+    psf_norm: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fit every PSF model to every cutout of a chunk,
+    for :func:`~mirar.processors.photometry.utils.psf_photometry_batch`
+
+    :param image_cutouts: 3D numpy array of image cutouts, with shape (n_src, h, w)
+    :param image_unc_cutouts: 3D numpy array of uncertainty cutouts, same shape
+    :param psfmodels: 3D numpy array of the PSF models, with shape (h, w, n_models)
+    :param psf_sq: squared PSF models
+    :param psf_norm: sum of the squared PSF models, for each model
+    :return: psf_fluxes, psf_flux_uncs, chi2s for the best model, and its index
+    """
+    # NaN pixels are ignored, as with np.nansum
+    image_valid = ~np.isnan(image_cutouts)
+    image = np.where(image_valid, image_cutouts, 0.0)
+    unc_sq = np.square(image_unc_cutouts)
+    unc_sq_valid = ~np.isnan(unc_sq)
+    unc_sq = np.where(unc_sq_valid, unc_sq, 0.0)
+
+    psf_fluxes = np.einsum("nij,ijm->nm", image, psfmodels) / psf_norm[None, :]
+    psf_flux_uncs = (
+        np.sqrt(np.einsum("nij,ijm->nm", unc_sq, psf_sq)) / psf_norm[None, :]
+    )
+
+    # chi2 = sum((image - psf * flux)^2 / unc^2), expanded so that every
+    # sum is a contraction over pixels
+    valid = image_valid & unc_sq_valid
+    zero_unc = valid & (unc_sq == 0.0)
+    weight = np.zeros_like(unc_sq)
+    np.divide(1.0, unc_sq, out=weight, where=valid & ~zero_unc)
+    sum_image_sq = np.einsum("nij,nij->n", weight, np.square(image))
+    sum_image_psf = np.einsum("nij,ijm->nm", weight * image, psfmodels)
+    sum_psf_sq = np.einsum("nij,ijm->nm", weight, psf_sq)
+
+    deg_freedom = np.prod(image_cutouts.shape[1:]) - 1
+    chi2s = (
+        sum_image_sq[:, None]
+        - 2.0 * psf_fluxes * sum_image_psf
+        + np.square(psf_fluxes) * sum_psf_sq
+    ) / deg_freedom
+
+    # Pixels with zero uncertainty (e.g. padding beyond the image edge)
+    # give an infinite chi2, unless the residual there is exactly zero
+    zero_unc_image = np.any(zero_unc & (image != 0.0), axis=(1, 2))
+    zero_unc_psf = np.einsum(
+        "nij,ijm->nm", (zero_unc & (image == 0.0)).astype(float), psfmodels != 0.0
+    )
+    infinite = zero_unc_image[:, None] | ((zero_unc_psf > 0) & (psf_fluxes != 0.0))
+    chi2s[infinite] = np.inf
+
+    minchi2_ind = np.argmin(chi2s, axis=1)
+    src_ind = np.arange(len(minchi2_ind))
+
+    return (
+        psf_fluxes[src_ind, minchi2_ind],
+        psf_flux_uncs[src_ind, minchi2_ind],
+        chi2s[src_ind, minchi2_ind],
+        minchi2_ind,
+    )
+
+
+def psf_photometry_batch(  # pylint: disable=too-many-locals
+    image_cutouts: np.ndarray,
+    image_unc_cutouts: np.ndarray,
+    psfmodels: np.ndarray,
+    chunk_size: int = PSF_PHOTOMETRY_CHUNK_SIZE,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Function to perform PSF photometry on many cutouts at once. This gives the
+    same results as :func:`~mirar.processors.photometry.utils.psf_photometry`,
+    but fits every PSF model to every cutout with tensor contractions.
+    Cutouts are processed in chunks, to limit the size of the intermediate arrays.
+
+    :param image_cutouts: 3D numpy array of image cutouts, with shape (n_src, h, w)
+    :param image_unc_cutouts: 3D numpy array of uncertainty cutouts, same shape
+    :param psfmodels: 3D numpy array of the PSF models, with shape (h, w, n_models)
+    :param chunk_size: number of cutouts to process at once
+    :return: psf_fluxes, psf_flux_uncs, chi2s, xshifts, yshifts for each cutout
+    """
+    numpsfmodels = psfmodels.shape[2]
+
+    psf_sq = np.square(psfmodels)
+    psf_norm = np.nansum(psf_sq, axis=(0, 1))
+
+    results = [
+        _psf_photometry_chunk(
+            image_cutouts[i : i + chunk_size],
+            image_unc_cutouts[i : i + chunk_size],
+            psfmodels,
+            psf_sq,
+            psf_norm,
+        )
+        for i in range(0, max(len(image_cutouts), 1), chunk_size)
+    ]
+    psf_fluxes, psf_flux_uncs, chi2s, minchi2_ind = (
+        np.concatenate(x) for x in zip(*results)
+    )
+
+    # Position of the peak of each PSF model, relative to the unshifted model
+    peak = np.unravel_index(
+        np.argmax(psfmodels.reshape(-1, numpsfmodels), axis=0), psfmodels.shape[:2]
+    )
+    peak_y, peak_x = peak[0], peak[1]
+    unshifted_ind = numpsfmodels // 2 + 1
+    xshifts = peak_x - peak_x[unshifted_ind]
+    yshifts = peak_y - peak_y[unshifted_ind]
+
+    return (
+        psf_fluxes,
+        psf_flux_uncs,
+        chi2s,
+        xshifts[minchi2_ind],
+        yshifts[minchi2_ind],
+    )
+
+
 def aper_photometry(
     image_cutout: np.ndarray,
     image_unc_cutout: np.ndarray,
@@ -276,6 +445,87 @@ def aper_photometry(
     return counts, counts_err
 
 
+def get_mask_offsets(
+    mask: ApertureMask, x_crd: int, y_crd: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get the pixel offsets and weights of an aperture mask, relative to
+    the (integer) position of the aperture
+
+    :param mask: aperture mask
+    :param x_crd: x position of the aperture
+    :param y_crd: y position of the aperture
+    :return: y offsets, x offsets and weights of all pixels with non-zero weight
+    """
+    mask_y, mask_x = np.nonzero(mask.data)
+    return (
+        mask_y + mask.bbox.iymin - y_crd,
+        mask_x + mask.bbox.ixmin - x_crd,
+        mask.data[mask_y, mask_x],
+    )
+
+
+def aper_photometry_multi(  # pylint: disable=too-many-locals,too-many-arguments
+    image: np.ndarray,
+    image_unc: np.ndarray,
+    x_pos: np.ndarray,
+    y_pos: np.ndarray,
+    aper_diameter: float,
+    bkg_in_diameter: float,
+    bkg_out_diameter: float,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Perform aperture photometry for many sources in an image at once.
+    This gives the same results as
+    :func:`~mirar.processors.photometry.utils.aper_photometry` on cutouts centred
+    on each source, but the aperture masks are computed only once, and the
+    backgrounds and aperture sums of all sources are computed together.
+
+    :param image: 2D numpy array of the image
+    :param image_unc: 2D numpy array of the image uncertainty
+    :param x_pos: integer x coordinates of the sources
+    :param y_pos: integer y coordinates of the sources
+    :param aper_diameter: aperture diameter in pixels
+    :param bkg_in_diameter: inner background annulus diameter in pixels
+    :param bkg_out_diameter: outer background annulus diameter in pixels
+    :return: aperture fluxes, aperture flux uncertainties
+    """
+    x_pos = np.atleast_1d(np.asarray(x_pos, dtype=int))
+    y_pos = np.atleast_1d(np.asarray(y_pos, dtype=int))
+    check_cutout_positions(np.shape(image), x_pos, y_pos)
+
+    # All sources are at integer positions, so share the same masks
+    pad_size = int(np.ceil(max(aper_diameter, bkg_out_diameter) / 2)) + 2
+    annulus = CircularAnnulus(
+        (pad_size, pad_size), r_in=bkg_in_diameter / 2, r_out=bkg_out_diameter / 2
+    )
+    aperture = CircularAperture((pad_size, pad_size), r=aper_diameter / 2)
+
+    # Pixels beyond the image edge are zero, as for cutouts
+    padded_image = np.pad(image, pad_size)
+    padded_unc = np.pad(image_unc, pad_size)
+
+    def get_values(data: np.ndarray, mask: ApertureMask):
+        offset_y, offset_x, weights = get_mask_offsets(mask, pad_size, pad_size)
+        rows = y_pos[:, None] + pad_size + offset_y[None, :]
+        cols = x_pos[:, None] + pad_size + offset_x[None, :]
+        return data[rows, cols] * weights[None, :]
+
+    annulus_data = get_values(padded_image, annulus.to_mask(method="center"))
+    _, bkg_median, _ = sigma_clipped_stats(
+        annulus_data, sigma=2, mask_value=np.nan, axis=1
+    )
+
+    aperture_unc_data = get_values(padded_unc, aperture.to_mask(method="center"))
+    errors = np.sqrt(np.nansum(aperture_unc_data**2, axis=1))
+
+    exact_mask = aperture.to_mask(method="exact")
+    aperture_data = get_values(padded_image, exact_mask)
+    weights = get_mask_offsets(exact_mask, pad_size, pad_size)[2]
+    counts = np.nansum(aperture_data - bkg_median[:, None] * weights[None, :], axis=1)
+    return counts, errors
+
+
 def get_rms_image(image: Image) -> Image:
     """Get an RMS image from a regular image
 
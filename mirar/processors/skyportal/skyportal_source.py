@@ -3,6 +3,7 @@ Module for sending sources to Fritz.
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 from typing import Mapping, Optional
 
@@ -149,23 +150,36 @@ class SkyportalSourceUploader(BaseSourceProcessor):
     def skyportal_post_thumbnails(self, alert):
         """Post alert Science, Reference, and Subtraction thumbnails to SkyPortal
 
+        The thumbnails are all rendered at once on worker threads,
+        and then posted in turn.
+
         :param alert: dict of source/candidate information
         :return: None
         """
-        for ttype, instrument_type in [
+        thumbnail_types = [
             ("new", "science"),
             ("ref", "template"),
             ("sub", "difference"),
-        ]:
+        ]
+
+        def render(thumbnail_type: tuple[str, str]) -> Optional[dict]:
+            ttype, instrument_type = thumbnail_type
             logger.debug(
                 f"Making {instrument_type} thumbnail for {alert[SOURCE_NAME_KEY]} "
             )
             try:
-                thumb = self.make_thumbnail(alert, ttype, instrument_type)
+                return self.make_thumbnail(alert, ttype, instrument_type)
             except KeyError:
                 logger.error(
                     f"Missing {instrument_type} cutout for {alert[SOURCE_NAME_KEY]}"
                 )
+                return None
+
+        with ThreadPoolExecutor(max_workers=len(thumbnail_types)) as executor:
+            thumbs = list(executor.map(render, thumbnail_types))
+
+        for (_, instrument_type), thumb in zip(thumbnail_types, thumbs):
+            if thumb is None:
                 continue
 
             logger.debug(
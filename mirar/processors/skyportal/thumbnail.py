@@ -5,8 +5,6 @@ Function for converting a FITS image to a skyportal "thumbnail".
 import base64
 import io
 
-import matplotlib
-import matplotlib.pyplot as plt
 import numpy as np
 from astropy.visualization import (
     AsymmetricPercentileInterval,
@@ -14,8 +12,7 @@ from astropy.visualization import (
     LinearStretch,
     LogStretch,
 )
-
-matplotlib.use("agg")
+from matplotlib.figure import Figure
 
 
 def make_thumbnail(
@@ -30,16 +27,17 @@ def make_thumbnail(
         base64-encoded PNG image file contents.
         Image size must be between 16px and 500px on a side.
 
+    The figure is created without pyplot, so thumbnails can be made
+    from several threads at once.
+
     :param image_data: Image data
     :param linear_stretch: boolean whether to use a linear stretch (default is log)
     :return: Skyportal-compliant PNG image string
     """
     with io.BytesIO() as buff:
-        fig = plt.figure()
-        fig.set_size_inches(4, 4, forward=False)
-        ax_1 = plt.Axes(fig, [0.0, 0.0, 1.0, 1.0])
+        fig = Figure(figsize=(4, 4))
+        ax_1 = fig.add_axes((0.0, 0.0, 1.0, 1.0))
         ax_1.set_axis_off()
-        fig.add_axes(ax_1)
 
         # replace nans with median:
         img = np.array(image_data)
@@ -61,10 +59,9 @@ def make_thumbnail(
         )
         vmin, vmax = normalizer.get_limits(img_norm)
         ax_1.imshow(img_norm, cmap="bone", origin="lower", vmin=vmin, vmax=vmax)
-        plt.savefig(buff, dpi=42)
+        fig.savefig(buff, dpi=42)
 
         buff.seek(0)
-        plt.close()
 
         fritz_thumbnail = base64.b64encode(buff.read()).decode("utf-8")
 
@@ -144,7 +144,7 @@ class CandidateNamer(SingleSpatialCrossmatchSource):
         logger.debug(f"Assigning name: {name}")
         return name
 
-    def _apply_to_sources(
+    def _apply_to_sources(  # pylint: disable=too-many-locals
         self,
         batch: SourceBatch,
     ) -> SourceBatch:
@@ -157,9 +157,18 @@ class CandidateNamer(SingleSpatialCrossmatchSource):
 
             matches = []
 
-            for ind, source in sources.iterrows():
+            # Query all sources at once. A source without a match is only
+            # queried again once a new name has been inserted, in case it now
+            # matches that new entry.
+            prefetched = self.query_for_sources(sources, metadata)
+            has_inserted = False
 
-                match = self.query_for_source(source, metadata)
+            for i, (ind, source) in enumerate(sources.iterrows()):
+
+                match = prefetched[i]
+
+                if (len(match) == 0) & has_inserted:
+                    match = self.query_for_source(source, metadata)
 
                 if len(match) > 0:
                     source_name = match[self.name_key].iloc[0]
@@ -183,6 +192,7 @@ class CandidateNamer(SingleSpatialCrossmatchSource):
                         duplicate_protocol="fail",
                         returning_key_names=self.db_output_columns,
                     )
+                    has_inserted = True
                     matches.append(match)
 
             match_df = pd.concat(matches, ignore_index=True, axis=0)
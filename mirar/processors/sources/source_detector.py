@@ -13,7 +13,7 @@ from astropy.io import fits
 from astropy.wcs import WCS
 
 from mirar.data import Image, ImageBatch, SourceBatch, SourceTable
-from mirar.data.utils import encode_img, write_regions_file
+from mirar.data.utils import CutoutExtractor, write_regions_file
 from mirar.paths import (
     BASE_NAME_KEY,
     CAND_DEC_KEY,
@@ -31,7 +31,6 @@ from mirar.paths import (
 )
 from mirar.processors.astromatic.sextractor.sourceextractor import run_sextractor_dual
 from mirar.processors.base_processor import BaseSourceGenerator, PrerequisiteError
-from mirar.processors.photometry.utils import make_cutouts
 from mirar.processors.zogy.zogy import ZOGY
 from mirar.utils.ldac_tools import get_table_from_ldac
 
@@ -123,27 +122,15 @@ def generate_candidates_table(
 
     cutout_size_display = 40
 
-    display_sci_ims = []
-    display_ref_ims = []
-    display_diff_ims = []
-
-    # Cutouts
-    for _, row in det_srcs.iterrows():
-        xpeak, ypeak = int(row["xpeak"]), int(row["ypeak"])
-
-        display_sci_cutout, display_ref_cutout, display_diff_cutout = make_cutouts(
-            [sci_resamp_image_path, ref_resamp_image_path, diff_path],
-            (xpeak, ypeak),
-            cutout_size_display,
-        )
-
-        display_sci_bit = encode_img(display_sci_cutout)
-        display_ref_bit = encode_img(display_ref_cutout)
-        display_diff_bit = encode_img(display_diff_cutout)
-
-        display_sci_ims.append(display_sci_bit)
-        display_ref_ims.append(display_ref_bit)
-        display_diff_ims.append(display_diff_bit)
+    # Cutouts, with each image opened only once
+    extractor = CutoutExtractor(
+        [sci_resamp_image_path, ref_resamp_image_path, diff_path],
+        half_size=cutout_size_display,
+    )
+    display_sci_ims, display_ref_ims, display_diff_ims = extractor.get_encoded_cutouts(
+        det_srcs["xpeak"].to_numpy(dtype=int),
+        det_srcs["ypeak"].to_numpy(dtype=int),
+    )
 
     det_srcs["cutout_science"] = display_sci_ims
     det_srcs["cutout_template"] = display_ref_ims
@@ -9,11 +9,14 @@ from collections.abc import Callable
 from pathlib import Path
 
 import numpy as np
+from astropy.time import Time
 
 from mirar.data import Image, ImageBatch
+from mirar.data.calibration_store import CalibrationStore, get_header_mjd
 from mirar.errors import ImageNotFoundError
 from mirar.io import open_raw_image
 from mirar.paths import TARGET_KEY
+from mirar.processors.utils.header_index import HeaderIndex
 from mirar.processors.utils.image_loader import ImageLoader, load_from_dir
 from mirar.processors.utils.image_selector import select_from_images
 
@@ -43,6 +46,7 @@ class CalRequirement:
         self.required_values = required_values
         self.success = False
         self.data = {}
+        self.stored_masters = {}
 
     def check_images(self, images: ImageBatch):
         """
@@ -67,7 +71,57 @@ class CalRequirement:
                     if len(sub_images) > 0:
                         self.data[value] = sub_images
 
-        self.success = len(self.data) == len(self.required_values)
+        self.update_success()
+
+    def check_store(
+        self,
+        store: CalibrationStore,
+        cal_type: str,
+        mjd: float,
+        detectors: list[str | None] | None = None,
+    ):
+        """
+        Check a calibration store, to see whether valid master images already
+        exist for any of the required values. Required values with a stored master
+        for every detector do not need to be found in archival data.
+
+        :param store: Calibration store
+        :param cal_type: Type of calibration in the store (e.g. 'flat')
+        :param mjd: MJD at which the master must be valid
+        :param detectors: Detectors which need a master (default: [None])
+        :return: None
+        """
+        if detectors is None:
+            detectors = [None]
+
+        for value in self.required_values:
+            if (value not in self.data) and (value not in self.stored_masters):
+                paths = {}
+                for detector in detectors:
+                    path = store.find_matching(
+                        cal_type,
+                        match_values={self.required_field: value},
+                        mjd=mjd,
+                        detector=detector,
+                    )
+                    if path is None:
+                        break
+                    paths[detector] = path
+                else:
+                    logger.debug(f"Found stored masters {paths} for {self} ({value})")
+                    self.stored_masters[value] = paths
+
+        self.update_success()
+
+    def update_success(self):
+        """
+        Update self.success, based on the images and stored masters found
+
+        :return: None
+        """
+        self.success = all(
+            (x in self.data) or (x in self.stored_masters) for x in self.required_values
+        )
 
     def __str__(self):
         return (
@@ -96,13 +150,69 @@ def update_requirements(
     return requirements
 
 
-def find_required_cals(
+def get_missing_values(
+    requirements: list[CalRequirement],
+) -> list[dict[str, str | list[str]]]:
+    """
+    Get the header values of the images still needed to meet a list of
+    Cal Requirements
+
+    :param requirements: CalRequirements to check
+    :return: List of dictionaries of header keys and accepted values
+    """
+    match_values = []
+    for requirement in requirements:
+        if not requirement.success:
+            missing = [
+                x
+                for x in requirement.required_values
+                if (x not in requirement.data) and (x not in requirement.stored_masters)
+            ]
+            match_values.append(
+                {
+                    TARGET_KEY: requirement.target_name,
+                    requirement.required_field: missing,
+                }
+            )
+    return match_values
+
+
+def check_header_index(
+    header_index: HeaderIndex, requirements: list[CalRequirement]
+) -> bool:
+    """
+    Check whether a header index includes all the keys needed for a list of
+    Cal Requirements
+
+    :param header_index: Header index
+    :param requirements: CalRequirements to check
+    :return: Boolean whether the index can be used
+    """
+    missing_keys = [
+        x
+        for x in [TARGET_KEY] + [req.required_field for req in requirements]
+        if x not in header_index.header_keys
+    ]
+    if len(missing_keys) > 0:
+        logger.warning(
+            f"{header_index} does not include keys {missing_keys}, "
+            f"so all images will be loaded instead."
+        )
+        return False
+    return True
+
+
+def find_required_cals(  # pylint: disable=too-many-arguments,too-many-locals,too-many-branches
     latest_dir: str | Path,
     night: str,
     requirements: list[CalRequirement],
     open_f: Callable[[str], Image] = open_raw_image,
     images: ImageBatch = ImageBatch(),
     skip_latest_night: bool = False,
+    calibration_store: CalibrationStore | None = None,
+    mjd: float | None = None,
+    header_index: HeaderIndex | None = None,
+    n_workers: int = 1,
 ) -> ImageBatch:
     """
     Broad function to search for missing calibration files in previous nights
@@ -113,9 +223,34 @@ def find_required_cals(
     :param open_f: Function to open raw images
     :param images: Current image list (default: empty)
     :param skip_latest_night: Boolean to skip the directory of night being processed
+    :param calibration_store: Optional store of master images, checked before
+        searching previous nights. A requirement is only met by the store if
+        there is a master for the detector of each image.
+    :param mjd: MJD at which stored masters must be valid
+    :param header_index: Optional index of raw image headers. If provided, only
+        the images matching the outstanding requirements are loaded from each night
+    :param n_workers: Number of files to open concurrently
     :return: Updated image batch
     """
 
+    if calibration_store is not None:
+        detectors = sorted(
+            {calibration_store.get_detector(x.get_header()) for x in images},
+            key=str,
+        )
+        for requirement in requirements:
+            if not requirement.success:
+                requirement.check_store(
+                    calibration_store,
+                    cal_type=requirement.target_name,
+                    mjd=mjd if mjd is not None else Time.now().mjd,
+                    detectors=detectors if len(detectors) > 0 else None,
+                )
+
+    if header_index is not None:
+        if not check_header_index(header_index, requirements):
+            header_index = None
+
     path = Path(latest_dir)
 
     logger.debug(f"Searching for archival images for {path}")
@@ -165,7 +300,17 @@ def find_required_cals(
         ordered_nights = ordered_nights[1:]
 
         try:
-            new_images = load_from_dir(str(dir_to_load), open_f=open_f)
+            if header_index is not None:
+                new_images = header_index.load_matching(
+                    dir_to_load,
+                    match_values=get_missing_values(requirements),
+                    open_f=open_f,
+                    n_workers=n_workers,
+                )
+            else:
+                new_images = load_from_dir(
+                    str(dir_to_load), open_f=open_f, n_workers=n_workers
+                )
             requirements = update_requirements(requirements, new_images)
 
         except ImageNotFoundError:
@@ -198,7 +343,12 @@ class CalHunter(ImageLoader):
     base_key = "calhunt"
 
     def __init__(
-        self, requirements: CalRequirement | list[CalRequirement], *args, **kwargs
+        self,
+        requirements: CalRequirement | list[CalRequirement],
+        *args,
+        calibration_store: CalibrationStore | None = None,
+        header_index: HeaderIndex | None = None,
+        **kwargs,
     ):
         super().__init__(*args, **kwargs)
 
@@ -206,6 +356,18 @@ class CalHunter(ImageLoader):
             requirements = [requirements]
 
         self.requirements = requirements
+        self.calibration_store = calibration_store
+        self.header_index = header_index
+
+        if self.calibration_store is not None:
+            # Record the required fields with each new master, so calibrators
+            # sharing the store can match masters in the same way
+            for requirement in self.requirements:
+                self.calibration_store.register_requirement(
+                    requirement.target_name,
+                    requirement.required_field,
+                    requirement.required_values,
+                )
 
     def description(self):
         reqs = [f"{req.target_name.upper()} images" for req in self.requirements]
@@ -232,6 +394,10 @@ class CalHunter(ImageLoader):
             open_f=self.load_image,
             images=batch,
             skip_latest_night=True,
+            calibration_store=self.calibration_store,
+            mjd=get_header_mjd(batch[0].get_header()) if len(batch) > 0 else None,
+            header_index=self.header_index,
+            n_workers=self.n_workers,
         )
 
         return updated_batch
@@ -0,0 +1,271 @@
+"""
+Module for a persistent index of the headers of raw images in an archive.
+
+Searching an archive for images (e.g. with
+:func:`~mirar.processors.utils.cal_hunter.find_required_cals`) would otherwise
+require opening every image in every night directory, only to check a few header
+keys. A :class:`~mirar.processors.utils.header_index.HeaderIndex` instead records
+the values of selected header keys for each file in an SQLite database, along with
+the file modification time and size. The index is updated incrementally, so only
+new or modified files are opened, and only the files which match a query need to
+be fully loaded.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from collections.abc import Callable
+from contextlib import closing
+from pathlib import Path
+
+from mirar.data import Image, ImageBatch
+from mirar.io import MissingCoreFieldError, check_file_is_complete
+from mirar.paths import EXPTIME_KEY, FILTER_KEY, OBSCLASS_KEY, TARGET_KEY
+from mirar.processors.utils.image_loader import (
+    BadImageError,
+    InvalidImage,
+    get_image_list,
+    load_from_list,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_KEYS = [OBSCLASS_KEY, TARGET_KEY, FILTER_KEY, EXPTIME_KEY]
+
+
+class HeaderIndex:
+    """
+    Persistent index of selected header values for the images in an archive
+    """
+
+    def __init__(
+        self,
+        index_path: str | Path,
+        header_keys: list[str] | None = None,
+    ):
+        self.index_path = Path(index_path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+
+        if header_keys is None:
+            header_keys = DEFAULT_INDEX_KEYS
+        self.header_keys = sorted(set(header_keys))
+
+        self._lock = threading.Lock()
+        self.create_index()
+
+    def __str__(self):
+        return f"<A header index, with path {self.index_path}>"
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Open a new connection to the index.
+        A new connection is used for each operation, so the index is thread-safe.
+
+        :return: SQLite connection
+        """
+        return sqlite3.connect(self.index_path, timeout=60.0)
+
+    def create_index(self):
+        """
+        Create the index tables, if they do not already exist.
+        If the index was made with different header keys, it is reset.
+
+        :return: None
+        """
+        with closing(self.connect()) as conn:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+                )
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS headers (
+                        dir TEXT NOT NULL,
+                        path TEXT NOT NULL,
+                        ext INTEGER NOT NULL,
+                        mtime REAL NOT NULL,
+                        size INTEGER NOT NULL,
+                        header_values TEXT,
+                        PRIMARY KEY (path, ext)
+                    )
+                    """
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS headers_dir ON headers (dir)")
+
+                row = conn.execute(
+                    "SELECT value FROM meta WHERE key = 'header_keys'"
+                ).fetchone()
+                keys = json.dumps(self.header_keys)
+                if (row is not None) and (row[0] != keys):
+                    logger.info(f"Header keys have changed, so resetting {self}")
+                    conn.execute("DELETE FROM headers")
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('header_keys', ?)", (keys,)
+                )
+
+    def read_header_values(
+        self,
+        path: str | Path,
+        open_f: Callable[[str | Path], Image | list[Image]],
+    ) -> list[dict[str, str]]:
+        """
+        Open an image, and get the values of the indexed header keys
+        for each image in the file
+
+        :param path: Path of file
+        :param open_f: Function to open images
+        :return: List of header values, one per image in the file
+        """
+        try:
+            image_list = open_f(path)
+        except (InvalidImage, BadImageError, MissingCoreFieldError):
+            logger.debug(f"Image {path} is invalid, so it will not be indexed")
+            return []
+
+        if not isinstance(image_list, list):
+            image_list = [image_list]
+
+        return [
+            {key: str(image[key]) for key in self.header_keys if key in image.keys()}
+            for image in image_list
+        ]
+
+    def update_dir(
+        self,
+        input_dir: str | Path,
+        open_f: Callable[[str | Path], Image | list[Image]],
+    ):
+        """
+        Update the index for a directory, only opening files which are new or
+        have been modified since they were indexed
+
+        :param input_dir: Directory of images
+        :param open_f: Function to open images
+        :return: None
+        """
+        input_dir = Path(input_dir)
+
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT path, mtime, size FROM headers WHERE dir = ?",
+                (input_dir.as_posix(),),
+            ).fetchall()
+
+        indexed = {path: (mtime, size) for path, mtime, size in rows}
+
+        img_list = [Path(x) for x in get_image_list(input_dir)]
+
+        new_rows = []
+        to_remove = set(indexed) - {x.as_posix() for x in img_list}
+
+        for path in img_list:
+            stat = path.stat()
+            if indexed.get(path.as_posix()) == (stat.st_mtime, stat.st_size):
+                continue
+
+            if not check_file_is_complete(path):
+                logger.warning(f"File {path} is not complete, so it is not indexed")
+                continue
+
+            to_remove.add(path.as_posix())
+
+            values = self.read_header_values(path, open_f)
+
+            # Files without valid images are recorded, so are not opened again
+            if len(values) == 0:
+                values = [None]
+
+            for ext, header_values in enumerate(values):
+                new_rows.append(
+                    (
+                        input_dir.as_posix(),
+                        path.as_posix(),
+                        ext,
+                        stat.st_mtime,
+                        stat.st_size,
+                        json.dumps(header_values) if header_values else None,
+                    )
+                )
+
+        if (len(new_rows) == 0) & (len(to_remove) == 0):
+            return
+
+        logger.debug(
+            f"Updating {self} for {input_dir}: {len(to_remove)} files removed "
+            f"or modified, {len(new_rows)} entries added"
+        )
+
+        with self._lock, closing(self.connect()) as conn:
+            with conn:
+                conn.executemany(
+                    "DELETE FROM headers WHERE path = ?", [(x,) for x in to_remove]
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO headers VALUES (?,?,?,?,?,?)", new_rows
+                )
+
+    def query(
+        self, input_dir: str | Path, match_values: dict[str, str | list[str]]
+    ) -> list[Path]:
+        """
+        Find the files in a directory containing at least one image which
+        matches all the given header values
+
+        :param input_dir: Directory of images
+        :param match_values: Dictionary of header keys and accepted value(s)
+        :return: List of matching files
+        """
+        accepted = {}
+        for key, values in match_values.items():
+            if not isinstance(values, list):
+                values = [values]
+            accepted[key] = [str(x) for x in values]
+
+        with closing(self.connect()) as conn:
+            rows = conn.execute(
+                "SELECT path, header_values FROM headers "
+                "WHERE dir = ? AND header_values IS NOT NULL ORDER BY path",
+                (Path(input_dir).as_posix(),),
+            ).fetchall()
+
+        matches = []
+        for path, header_values in rows:
+            header_values = json.loads(header_values)
+            if all(header_values.get(key) in vals for key, vals in accepted.items()):
+                if path not in matches:
+                    matches.append(path)
+
+        return [Path(x) for x in matches]
+
+    def load_matching(
+        self,
+        input_dir: str | Path,
+        match_values: list[dict[str, str | list[str]]],
+        open_f: Callable[[str | Path], Image | list[Image]],
+        n_workers: int = 1,
+    ) -> ImageBatch:
+        """
+        Update the index for a directory, and then load only the files
+        which match any of the given sets of header values
+
+        :param input_dir: Directory of images
+        :param match_values: List of dictionaries of header keys and accepted values
+        :param open_f: Function to open images
+        :param n_workers: Number of files to open concurrently
+        :return: ImageBatch of matching images
+        """
+        self.update_dir(input_dir, open_f)
+
+        paths = []
+        for values in match_values:
+            for path in self.query(input_dir, values):
+                if path not in paths:
+                    paths.append(path)
+
+        if len(paths) == 0:
+            return ImageBatch()
+
+        logger.debug(f"Loading {len(paths)} matching images from {input_dir}")
+
+        return load_from_list(paths, open_f, n_workers=n_workers)
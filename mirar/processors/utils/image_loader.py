@@ -3,14 +3,17 @@ Module for loading images
 """
 
 import logging
+import multiprocessing
 import os
 from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from glob import glob
 from pathlib import Path
 
 from tqdm import tqdm
 
-from mirar.data import Image, ImageBatch
+from mirar.data import Image, ImageBatch, LazyImage
 from mirar.errors import ImageNotFoundError, NoncriticalProcessingError, ProcessorError
 from mirar.io import (
     MissingCoreFieldError,
@@ -20,7 +23,14 @@ from mirar.io import (
     open_raw_image,
 )
 from mirar.paths import RAW_IMG_KEY, RAW_IMG_SUB_DIR, base_raw_dir
-from mirar.processors.base_processor import BaseImageProcessor
+from mirar.processors.base_processor import (
+    PROCESS_EXECUTOR,
+    SERIAL_EXECUTOR,
+    THREAD_EXECUTOR,
+    BaseImageProcessor,
+    ExecutorError,
+    executor_options,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -47,53 +57,122 @@ def unzip(zipped_list: list[str]) -> list[str]:
     return unzipped_list
 
 
+def load_file(
+    path: str | Path,
+    open_f: Callable[[str | Path], Image | list[Image]],
+) -> list[Image]:
+    """
+    Load all images from a single file.
+
+    The file is opened directly, and is only checked for completeness if it
+    cannot be opened, so complete files are not opened twice.
+
+    :param path: Path of file
+    :param open_f: Function to open images
+    :return: List of images (empty if the file is incomplete or invalid)
+    """
+    try:
+        image_list = open_f(path)
+    except InvalidImage:
+        logger.warning(f"Image {path} is invalid. Skipping!")
+        return []
+    except BadImageError:
+        logger.error(f"Image {path} cannot be parsed. Skipping!")
+        return []
+    except Exception:  # pylint: disable=broad-exception-caught
+        if not check_file_is_complete(path):
+            logger.warning(f"File {path} is not complete. Skipping!")
+            return []
+        logger.error(f"Image {path} cannot be opened.")
+        raise
+
+    if not isinstance(image_list, list):
+        image_list = [image_list]
+
+    # Lazy images only read the header, so a truncated file could still open
+    if any(isinstance(x, LazyImage) for x in image_list):
+        if not check_file_is_complete(path):
+            logger.warning(f"File {path} is not complete. Skipping!")
+            return []
+
+    images = []
+
+    for image in image_list:
+        try:
+            check_image_has_core_fields(image)
+        except MissingCoreFieldError:
+            logger.error(f"Image {path} cannot be parsed. Skipping!")
+            break
+        images.append(image)
+
+    return images
+
+
 def load_from_list(
     img_list: list[str | Path],
     open_f: Callable[[str | Path], Image | list[Image]],
+    n_workers: int = 1,
+    executor: str = THREAD_EXECUTOR,
 ) -> ImageBatch:
     """
-    Load images from a list of files
+    Load images from a list of files.
+
+    With more than one worker, files are opened concurrently on a bounded
+    thread (or process) pool. The images are always returned in the order
+    of the input list.
 
     :param img_list: Image list
     :param open_f: Function to open images
+    :param n_workers: Number of files to open concurrently
+    :param executor: Executor to use ('thread', 'process' or 'serial')
     :return: ImageBatch object
     """
+    if executor not in executor_options:
+        err = (
+            f"Unrecognised executor '{executor}'. "
+            f"Please select one of {executor_options}."
+        )
+        logger.error(err)
+        raise ExecutorError(err)
+
+    load_f = partial(load_file, open_f=open_f)
+
+    n_workers = max(1, min(n_workers, len(img_list)))
+
+    if (n_workers == 1) or (executor == SERIAL_EXECUTOR):
+        results = map(load_f, img_list)
+        images = ImageBatch()
+        for image_list in tqdm(results, total=len(img_list)):
+            for image in image_list:
+                images.append(image)
+        return images
+
+    logger.debug(f"Loading {len(img_list)} files with {n_workers} {executor}s")
+
+    if executor == PROCESS_EXECUTOR:
+        pool = ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=multiprocessing.get_context("fork")
+        )
+    else:
+        pool = ThreadPoolExecutor(max_workers=n_workers)
+
     images = ImageBatch()
 
-    for path in tqdm(img_list):
-        if check_file_is_complete(path):
-            try:
-                image_list = open_f(path)
-
-                if not isinstance(image_list, list):
-                    image_list = [image_list]
-
-                for image in image_list:
-                    try:
-                        check_image_has_core_fields(image)
-                    except MissingCoreFieldError as err:
-                        raise BadImageError(err) from err
-                    images.append(image)
-            except InvalidImage:
-                logger.warning(f"Image {path} is invalid. Skipping!")
-            except BadImageError:
-                logger.error(f"Image {path} cannot be parsed. Skipping!")
-        else:
-            logger.warning(f"File {path} is not complete. Skipping!")
+    with pool:
+        # map returns results in the order of the input list
+        for image_list in tqdm(pool.map(load_f, img_list), total=len(img_list)):
+            for image in image_list:
+                images.append(image)
 
     return images
 
 
-def load_from_dir(
-    input_dir: str | Path,
-    open_f: Callable[[str | Path], Image | list[Image]],
-) -> ImageBatch:
+def get_image_list(input_dir: str | Path) -> list[str]:
     """
-    Function to load all images in a directory
+    Function to list all images in a directory, unzipping any zipped files
 
     :param input_dir: Input directory
-    :param open_f: Function to open images
-    :return: ImageBatch object
+    :return: List of image paths
     """
     img_list = sorted(glob(f"{input_dir}/*.fits"))
 
@@ -104,12 +183,32 @@ def load_from_dir(
         for file in unzipped_list:
             img_list.append(file)
 
+    return img_list
+
+
+def load_from_dir(
+    input_dir: str | Path,
+    open_f: Callable[[str | Path], Image | list[Image]],
+    n_workers: int = 1,
+    executor: str = THREAD_EXECUTOR,
+) -> ImageBatch:
+    """
+    Function to load all images in a directory
+
+    :param input_dir: Input directory
+    :param open_f: Function to open images
+    :param n_workers: Number of files to open concurrently
+    :param executor: Executor to use ('thread', 'process' or 'serial')
+    :return: ImageBatch object
+    """
+    img_list = get_image_list(input_dir)
+
     if len(img_list) < 1:
         err = f"No images found in {input_dir}. Please check path is correct!"
         logger.error(err)
         raise ImageNotFoundError(err)
 
-    return load_from_list(img_list, open_f)
+    return load_from_list(img_list, open_f, n_workers=n_workers, executor=executor)
 
 
 class ImageLoader(BaseImageProcessor):
@@ -120,11 +219,13 @@ class ImageLoader(BaseImageProcessor):
     image_type = Image
     default_load_image = staticmethod(open_raw_image)
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
         self,
         input_sub_dir: str = RAW_IMG_SUB_DIR,
         input_img_dir: str | Path = base_raw_dir,
         load_image: Callable[[str], Image | list[Image]] = None,
+        n_workers: int = 1,
+        load_executor: str = THREAD_EXECUTOR,
     ):
         super().__init__()
         self.input_sub_dir = input_sub_dir
@@ -132,6 +233,8 @@ class ImageLoader(BaseImageProcessor):
         if load_image is None:
             load_image = self.default_load_image
         self.load_image = load_image
+        self.n_workers = n_workers
+        self.load_executor = load_executor
 
     def description(self):
         return (
@@ -147,6 +250,8 @@ class ImageLoader(BaseImageProcessor):
         return load_from_dir(
             input_dir,
             open_f=self.load_image,
+            n_workers=self.n_workers,
+            executor=self.load_executor,
         )
 
 
@@ -208,9 +313,13 @@ class ImageListLoader(BaseImageProcessor):
         self,
         img_list: list[Path],
         load_image: Callable[[str], Image | list[Image]] = None,
+        n_workers: int = 1,
+        load_executor: str = THREAD_EXECUTOR,
     ):
         super().__init__()
         self.img_list = img_list
+        self.n_workers = n_workers
+        self.load_executor = load_executor
         if len(self.img_list) < 1:
             err = "No images found in list. Please check path is correct!"
             logger.error(err)
@@ -239,6 +348,8 @@ class ImageListLoader(BaseImageProcessor):
         return load_from_list(
             self.img_list,
             open_f=self.load_image,
+            n_workers=self.n_workers,
+            executor=self.load_executor,
         )
 
 
@@ -12,16 +12,110 @@ Core ZOGY algorithm implementation in Python.
 """
 
 import logging
+import threading
+from typing import Optional
 
 import numpy as np
 import pyfftw
-import pyfftw.interfaces.numpy_fft as fft
+import pyfftw.builders
 from astropy.stats import sigma_clipped_stats
 
+from mirar.data.precision import upcast
+from mirar.paths import max_n_cpu
+
 logger = logging.getLogger(__name__)
 
-pyfftw.interfaces.cache.enable()
-pyfftw.interfaces.cache.set_keepalive_time(1.0)
+
+class ZOGYEngine:
+    """
+    Class to run the FFTs of ZOGY, reusing FFTW plans between subtractions.
+
+    FFTW plans are created once per image shape and thread, and then reused.
+    They are planned with FFTW_ESTIMATE, so the same plan (and the same output)
+    is obtained on every run. All images are real, so real-to-complex
+    transforms are used throughout.
+
+    The FFTW planner is not thread-safe, so plans are only created while holding
+    a lock. Each thread executes its own plans, so transforms from concurrent
+    ZOGY runs are not serialized.
+    """
+
+    def __init__(self, threads: int = max_n_cpu):
+        self.threads = max(int(threads), 1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def get_plans(self, shape: tuple[int, int]) -> tuple:
+        """
+        Get the forward and inverse FFTW plans of this thread for an image shape,
+        creating them on first use
+
+        :param shape: shape of the (real) image
+        :return: forward (real-to-complex) plan, inverse (complex-to-real) plan
+        """
+        shape = tuple(shape)
+        plans = self._local.__dict__.setdefault("plans", {})
+        if shape not in plans:
+            logger.debug(f"Planning FFTs for shape {shape}")
+            with self._lock:
+                forward = pyfftw.builders.rfft2(
+                    pyfftw.empty_aligned(shape, dtype="float64"),
+                    planner_effort="FFTW_ESTIMATE",
+                    threads=self.threads,
+                )
+                inverse = pyfftw.builders.irfft2(
+                    pyfftw.empty_aligned(forward.output_shape, dtype="complex128"),
+                    s=shape,
+                    planner_effort="FFTW_ESTIMATE",
+                    threads=self.threads,
+                )
+            plans[shape] = (forward, inverse)
+        return plans[shape]
+
+    def rfft2(self, data: np.ndarray) -> np.ndarray:
+        """
+        Real-to-complex 2D FFT of an image
+
+        :param data: real image
+        :return: half-plane transform
+        """
+        forward, _ = self.get_plans(data.shape)
+        forward.input_array[:] = data
+        return forward().copy()
+
+    def irfft2(self, data_hat: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+        """
+        Inverse of :meth:`rfft2`
+
+        :param data_hat: half-plane transform
+        :param shape: shape of the real image
+        :return: real image
+        """
+        _, inverse = self.get_plans(shape)
+        # Complex-to-real transforms overwrite their input,
+        # so always work on the plan's own input array
+        inverse.input_array[:] = data_hat
+        return inverse().copy()
+
+    def clear(self):
+        """
+        Clear the plans of this thread
+
+        :return: None
+        """
+        self._local.__dict__.pop("plans", None)
+
+
+_default_engine = ZOGYEngine()
+
+
+def get_zogy_engine() -> ZOGYEngine:
+    """
+    Get the shared ZOGY engine, which keeps FFT plans between subtractions
+
+    :return: ZOGY engine
+    """
+    return _default_engine
 
 
 def pyzogy(
@@ -35,6 +129,7 @@ def pyzogy(
     ref_avg_unc: float,
     dx: float = 0.25,
     dy: float = 0.25,
+    engine: Optional[ZOGYEngine] = None,
 ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
     Python implementation of ZOGY image subtraction algorithm.
@@ -52,6 +147,7 @@ def pyzogy(
     :param ref_avg_unc: Average uncertainty (sigma) of Reference image
     :param dx: Astrometric uncertainty (sigma) in x coordinate
     :param dy: Astrometric uncertainty (sigma) in y coordinate
+    :param engine: ZOGY engine for the FFTs (default is the shared engine)
 
     Returns:
     diff: Subtracted image
@@ -66,6 +162,15 @@ def pyzogy(
     assert ref_data.shape[0] % 2 == 0, "Ref image has odd number of rows"
     assert ref_data.shape[1] % 2 == 0, "Ref image has odd number of columns"
 
+    if engine is None:
+        engine = get_zogy_engine()
+
+    shape = new_data.shape
+
+    # ZOGY is always run in float64, whatever the working dtype of the images
+    new_data, ref_data = upcast(new_data), upcast(ref_data)
+    new_sigma, ref_sigma = upcast(new_sigma), upcast(ref_sigma)
+
     # Set nans to zero in new and ref images
     new_nanmask = np.isnan(new_data)
     ref_nanmask = np.isnan(ref_data)
@@ -80,12 +185,6 @@ def pyzogy(
         f"{np.unravel_index(np.argmax(new_psf, axis=None), new_psf.shape)}"
     )
 
-    # Match the backgrounds of the new and reference images
-    _, sci_median, _ = sigma_clipped_stats(new_data, sigma=3.0, maxiters=5)
-    _, ref_median, _ = sigma_clipped_stats(ref_data, sigma=3.0, maxiters=5)
-
-    new_data = new_data - sci_median + ref_median
-
     # Place PSF at center of image with same size as new / reference
     new_psf_big = np.zeros(new_data.shape)
     ref_psf_big = np.zeros(ref_data.shape)
@@ -104,8 +203,8 @@ def pyzogy(
     )
 
     # Shift the PSF to the origin, so that it will not introduce a shift
-    new_psf_big = fft.fftshift(new_psf_big)
-    ref_psf_big = fft.fftshift(ref_psf_big)
+    new_psf_big = np.fft.fftshift(new_psf_big)
+    ref_psf_big = np.fft.fftshift(ref_psf_big)
 
     logger.debug(
         f"Max of big PSF shift is "
@@ -113,12 +212,18 @@ def pyzogy(
         f"PSF shape {new_data.shape} and ref data shape {ref_data.shape}"
     )
 
+    # Match the backgrounds of the new and reference images
+    _, sci_median, _ = sigma_clipped_stats(new_data, sigma=3.0, maxiters=5)
+    _, ref_median, _ = sigma_clipped_stats(ref_data, sigma=3.0, maxiters=5)
+
+    new_data = new_data - sci_median + ref_median
+
     # Take all the Fourier Transforms
-    new_hat = fft.fft2(new_data)
-    ref_hat = fft.fft2(ref_data)
+    new_hat = engine.rfft2(new_data)
+    ref_hat = engine.rfft2(ref_data)
 
-    new_psf_hat = fft.fft2(new_psf_big)
-    ref_psf_hat = fft.fft2(ref_psf_big)
+    new_psf_hat = engine.rfft2(new_psf_big)
+    ref_psf_hat = engine.rfft2(ref_psf_big)
 
     # Fourier Transform of Difference Image (Equation 13)
     diff_hat_numerator = ref_psf_hat * new_hat - new_psf_hat * ref_hat
@@ -132,13 +237,13 @@ def pyzogy(
     logger.debug(f"Calculated flux_zero_point {flux_zero_point} ")
 
     # Difference Image
-    diff = np.real(fft.ifft2(diff_hat)) / flux_zero_point
+    diff = engine.irfft2(diff_hat, shape) / flux_zero_point
     # Fourier Transform of PSF of Subtraction Image (Equation 14)
     diff_hat_psf = ref_psf_hat * new_psf_hat / flux_zero_point / diff_hat_denominator
 
     # PSF of Subtraction Image
-    diff_psf = np.real(fft.ifft2(diff_hat_psf))
-    diff_psf = fft.ifftshift(diff_psf)
+    diff_psf = engine.irfft2(diff_hat_psf, shape)
+    diff_psf = np.fft.ifftshift(diff_psf)
     diff_psf = diff_psf[y_min:y_max, x_min:x_max]
     logger.debug(
         f"Max of diff PSF is "
@@ -151,7 +256,7 @@ def pyzogy(
     score_hat = flux_zero_point * diff_hat * np.conj(diff_hat_psf)
 
     # Score Image
-    score = np.real(fft.ifft2(score_hat))
+    score = engine.irfft2(score_hat, shape)
 
     # Now start calculating Scorr matrix (including all noise terms)
 
@@ -163,24 +268,24 @@ def pyzogy(
     ref_variance = ref_sigma**2
 
     # Fourier Transform of variance images
-    new_variance_hat = fft.fft2(new_variance)
-    ref_variance_hat = fft.fft2(ref_variance)
+    new_variance_hat = engine.rfft2(new_variance)
+    ref_variance_hat = engine.rfft2(ref_variance)
 
     # Equation 28
     k_r_hat = np.conj(ref_psf_hat) * np.abs(new_psf_hat**2) / (diff_hat_denominator**2)
-    k_r = np.real(fft.ifft2(k_r_hat))
+    k_r = engine.irfft2(k_r_hat, shape)
 
     # Equation 29
     k_n_hat = np.conj(new_psf_hat) * np.abs(ref_psf_hat**2) / (diff_hat_denominator**2)
-    k_n = np.real(fft.ifft2(k_n_hat))
+    k_n = engine.irfft2(k_n_hat, shape)
 
     # Noise in New Image: Equation 26
-    new_noise = np.real(fft.ifft2(new_variance_hat * fft.fft2(k_n**2)))
+    new_noise = engine.irfft2(new_variance_hat * engine.rfft2(k_n**2), shape)
     # Noise in Reference Image: Equation 27
-    ref_noise = np.real(fft.ifft2(ref_variance_hat * fft.fft2(k_r**2)))
+    ref_noise = engine.irfft2(ref_variance_hat * engine.rfft2(k_r**2), shape)
     # Astrometric Noise
     # Equation 31
-    new_sigma = np.real(fft.ifft2(k_n_hat * new_hat))
+    new_sigma = engine.irfft2(k_n_hat * new_hat, shape)
     dsn_dx = new_sigma - np.roll(new_sigma, 1, axis=1)
     dsn_dy = new_sigma - np.roll(new_sigma, 1, axis=0)
 
@@ -188,7 +293,7 @@ def pyzogy(
     v_ast_s_n = dx**2 * dsn_dx**2 + dy**2 * dsn_dy**2
 
     # Equation 33
-    ref_sigma = np.real(fft.ifft2(k_r_hat * ref_hat))
+    ref_sigma = engine.irfft2(k_r_hat * ref_hat, shape)
     dsr_dx = ref_sigma - np.roll(ref_sigma, 1, axis=1)
     dsr_dy = ref_sigma - np.roll(ref_sigma, 1, axis=0)
 
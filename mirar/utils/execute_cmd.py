@@ -4,6 +4,7 @@ Module for executing bash commands
 
 import logging
 import os
+import shlex
 import subprocess
 from pathlib import Path
 from subprocess import TimeoutExpired
@@ -31,7 +32,7 @@ class TimeoutExecutionError(Exception):
 DEFAULT_TIMEOUT = 300.0
 
 
-def run_local(cmd: str, timeout: float = DEFAULT_TIMEOUT):
+def run_local(cmd: str, timeout: float = DEFAULT_TIMEOUT, shell: bool = True):
     """
     Function to run on local machine using subprocess, with error handling.
 
@@ -44,6 +45,8 @@ def run_local(cmd: str, timeout: float = DEFAULT_TIMEOUT):
     An example would be:
         cmd = '/usr/bin/source-extractor image0001.fits -c sex.config'
     timeout: Time to timeout in seconds
+    shell: Whether to run the command via a shell. Otherwise, the command is
+    split into arguments and run directly, which avoids starting a shell process.
 
     Returns
     -------
@@ -53,8 +56,11 @@ def run_local(cmd: str, timeout: float = DEFAULT_TIMEOUT):
     try:
         # Run command
 
+        if not shell:
+            cmd = shlex.split(cmd)
+
         rval = subprocess.run(
-            cmd, check=True, capture_output=True, shell=True, timeout=timeout
+            cmd, check=True, capture_output=True, shell=shell, timeout=timeout
         )
 
         msg = "Successfully executed command. "
@@ -250,6 +256,7 @@ def execute(
     output_dir: Path | str = ".",
     local: bool = True,
     timeout: float = DEFAULT_TIMEOUT,
+    shell: bool = True,
 ):
     """
     Generically execute a command either via bash or a docker container
@@ -258,12 +265,13 @@ def execute(
     :param output_dir: output directory for command
     :param local: boolean whether use local or docker
     :param timeout: timeout for local execution
+    :param shell: whether to run local commands via a shell
     :return: None
     """
     logger.debug(
         f"Using '{['docker', 'local'][local]}' " f" installation to run `{cmd}`"
     )
     if local:
-        run_local(cmd, timeout=timeout)
+        run_local(cmd, timeout=timeout, shell=shell)
     else:
         run_docker(cmd, output_dir=output_dir)
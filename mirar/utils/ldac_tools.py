@@ -3,17 +3,28 @@
 """
 Functions to convert FITS files or astropy Tables to FITS_LDAC files and
 vice versa.
+
+All conversions are done in memory. FITS_LDAC HDU lists can be built directly from
+numpy structured arrays or pandas DataFrames (:func:`convert_array_to_ldac`), and
+parsed back the same way (:func:`get_array_from_ldac`,
+:func:`get_dataframe_from_ldac`), so files only need to be written when they are
+passed to external software such as scamp.
 """
-import tempfile
+import io
 import warnings
 from pathlib import Path
+from typing import Optional
 
 import astropy.io
 import numpy as np
+import pandas as pd
 from astropy.io import fits
 from astropy.table import Table
 from astropy.utils.exceptions import AstropyWarning
 
+LDAC_IMHEAD_EXTNAME = "LDAC_IMHEAD"
+LDAC_OBJECTS_EXTNAME = "LDAC_OBJECTS"
+
 
 def convert_hdu_to_ldac(
     hdu: astropy.io.fits.BinTableHDU | astropy.io.fits.TableHDU,
@@ -38,12 +49,39 @@ def convert_hdu_to_ldac(
     cols = fits.ColDefs([col1])
     tbl1 = fits.BinTableHDU.from_columns(cols)
     tbl1.header["TDIM1"] = f"(80, {len(hdu.header)})"
-    tbl1.header["EXTNAME"] = "LDAC_IMHEAD"
+    tbl1.header["EXTNAME"] = LDAC_IMHEAD_EXTNAME
     tbl2 = fits.BinTableHDU(hdu.data)
-    tbl2.header["EXTNAME"] = "LDAC_OBJECTS"
+    tbl2.header["EXTNAME"] = LDAC_OBJECTS_EXTNAME
     return tbl1, tbl2
 
 
+def _get_table_hdu(table: astropy.table.Table) -> astropy.io.fits.BinTableHDU:
+    """
+    Convert an astropy table to a binary table HDU, as when writing it to a file
+
+    Parameters
+    ----------
+    table: `astropy.table.Table`
+        Table to convert
+
+    Returns
+    -------
+    table_hdu: `astropy.io.fits.BinTableHDU`
+        Binary table HDU
+    """
+    try:
+        table_hdu = fits.table_to_hdu(table, character_as_bytes=True)
+    except ValueError:
+        # Mixin columns (e.g. SkyCoord) must be serialised as when writing a file
+        buffer = io.BytesIO()
+        table.write(buffer, format="fits")
+        buffer.seek(0)
+        with fits.open(buffer) as hdulist:
+            return hdulist[1].copy()
+    # Copying orders the header as for a table which is read from a file
+    return table_hdu.copy()
+
+
 def convert_table_to_ldac(tbl: astropy.table.Table) -> astropy.io.fits.HDUList:
     """
     Convert an astropy table to a fits_ldac
@@ -57,20 +95,153 @@ def convert_table_to_ldac(tbl: astropy.table.Table) -> astropy.io.fits.HDUList:
     hdulist: `astropy.io.fits.HDUList`
         FITS_LDAC hdulist that can be read by astromatic software
     """
-    table = tbl.copy()
     # Cannot save "object"-type fields via fits
-    del_list = [x for x in table.dtype.names if table.dtype[x].kind == "O"]
-    table.remove_columns(del_list)
+    del_list = [x for x in tbl.dtype.names if tbl.dtype[x].kind == "O"]
+    table = tbl[[x for x in tbl.colnames if x not in del_list]]
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", AstropyWarning)
-        with tempfile.NamedTemporaryFile(suffix=".fits", mode="rb+") as temp_file:
-            table.write(temp_file, format="fits")
-            temp_file.seek(0)
-            with fits.open(temp_file, mode="update") as hdulist:
-                tbl1, tbl2 = convert_hdu_to_ldac(hdulist[1].copy())
-                new_hdulist = [hdulist[0].copy(), tbl1, tbl2]
-                new_hdulist = fits.HDUList(new_hdulist)
-    return new_hdulist
+        tbl1, tbl2 = convert_hdu_to_ldac(_get_table_hdu(table))
+    return fits.HDUList([fits.PrimaryHDU(), tbl1, tbl2])
+
+
+def get_structured_array(data: np.ndarray | pd.DataFrame) -> np.ndarray:
+    """
+    Get a numpy structured array which can be saved via fits, from a structured
+    array or a pandas DataFrame. "object"-type fields are dropped, except for
+    DataFrame columns of strings, which are converted to fixed-width strings.
+
+    Parameters
+    ----------
+    data: `numpy.ndarray` or `pandas.DataFrame`
+        Structured array or DataFrame
+
+    Returns
+    -------
+    array: `numpy.ndarray`
+        Structured array
+    """
+    if isinstance(data, pd.DataFrame):
+        names, arrays = [], []
+        for name in data.columns:
+            values = data[name].to_numpy()
+            if values.dtype.kind == "O":
+                if not all(isinstance(x, str) for x in values):
+                    continue
+                values = values.astype(str)
+            names.append(str(name))
+            arrays.append(values)
+        if len(arrays) == 0:
+            return np.zeros(len(data), dtype=[])
+        return np.rec.fromarrays(arrays, names=names).view(np.ndarray)
+
+    names = [x for x in data.dtype.names if data.dtype[x].kind != "O"]
+    return data[names]
+
+
+def convert_array_to_ldac(
+    data: np.ndarray | pd.DataFrame, header: Optional[fits.Header] = None
+) -> astropy.io.fits.HDUList:
+    """
+    Convert a numpy structured array or a pandas DataFrame to a fits_ldac,
+    without an intermediate astropy Table
+
+    Parameters
+    ----------
+    data: `numpy.ndarray` or `pandas.DataFrame`
+        Structured array or DataFrame to convert to ldac format
+    header: `astropy.io.fits.Header`, optional
+        Additional keywords (e.g. of an image) for the LDAC_IMHEAD table
+
+    Returns
+    -------
+    hdulist: `astropy.io.fits.HDUList`
+        FITS_LDAC hdulist that can be read by astromatic software
+    """
+    table_hdu = fits.BinTableHDU.from_columns(get_structured_array(data))
+    if header is not None:
+        table_hdu.header.extend(
+            [x for x in header.cards if x.keyword not in table_hdu.header],
+            strip=True,
+        )
+    tbl1, tbl2 = convert_hdu_to_ldac(table_hdu)
+    return fits.HDUList([fits.PrimaryHDU(), tbl1, tbl2])
+
+
+def _open_ldac(
+    source: str | Path | astropy.io.fits.HDUList,
+) -> astropy.io.fits.HDUList:
+    if isinstance(source, fits.HDUList):
+        return source
+    return fits.open(source, memmap=False)
+
+
+def get_array_from_ldac(
+    source: str | Path | astropy.io.fits.HDUList, frame: int = 1
+) -> np.ndarray:
+    """
+    Load a numpy structured array from a fits_ldac by frame
+    (see :func:`get_table_from_ldac`)
+
+    Parameters
+    ----------
+    source: str or `astropy.io.fits.HDUList`
+        Name of the file to open, or an in-memory fits_ldac HDUList
+    frame: int
+        Number of the frame in a regular fits file
+
+    Returns
+    -------
+    array: `numpy.ndarray`
+        Structured array, with native byte order
+    """
+    if frame > 0:
+        frame = frame * 2
+    hdulist = _open_ldac(source)
+    try:
+        data = hdulist[frame].data
+        columns = [np.asarray(data[name]) for name in data.dtype.names]
+        dtype = np.dtype(
+            [
+                (name, x.dtype.newbyteorder("="), x.shape[1:])
+                for name, x in zip(data.dtype.names, columns)
+            ]
+        )
+        array = np.empty(len(data), dtype=dtype)
+        for name, column in zip(data.dtype.names, columns):
+            array[name] = column
+    finally:
+        if hdulist is not source:
+            hdulist.close()
+    return array
+
+
+def get_dataframe_from_ldac(
+    source: str | Path | astropy.io.fits.HDUList, frame: int = 1
+) -> pd.DataFrame:
+    """
+    Load a pandas DataFrame from a fits_ldac by frame
+    (see :func:`get_table_from_ldac`).
+    Multi-dimensional columns cannot be stored in a DataFrame, so are dropped.
+
+    Parameters
+    ----------
+    source: str or `astropy.io.fits.HDUList`
+        Name of the file to open, or an in-memory fits_ldac HDUList
+    frame: int
+        Number of the frame in a regular fits file
+
+    Returns
+    -------
+    dataframe: `pandas.DataFrame`
+        DataFrame of the table
+    """
+    array = get_array_from_ldac(source, frame=frame)
+    columns = {}
+    for name in array.dtype.names:
+        if array[name].ndim > 1:
+            continue
+        columns[name] = array[name]
+    return pd.DataFrame(columns)
 
 
 def save_table_as_ldac(tbl: astropy.table.Table, file_path: str | Path, **kwargs):
@@ -90,7 +261,9 @@ def save_table_as_ldac(tbl: astropy.table.Table, file_path: str | Path, **kwargs
     hdulist.writeto(file_path, overwrite=True, **kwargs)
 
 
-def get_table_from_ldac(file_path: str | Path, frame: int = 1) -> astropy.table.Table:
+def get_table_from_ldac(
+    file_path: str | Path | astropy.io.fits.HDUList, frame: int = 1
+) -> astropy.table.Table:
     """
     Load an astropy table from a fits_ldac by frame (Since the ldac format has column
     info for odd tables, giving it twce as many tables as a regular fits BinTableHDU,
@@ -98,8 +271,8 @@ def get_table_from_ldac(file_path: str | Path, frame: int = 1) -> astropy.table.
 
     Parameters
     ----------
-    file_path: str
-        Name of the file to open
+    file_path: str or `astropy.io.fits.HDUList`
+        Name of the file to open, or an in-memory fits_ldac HDUList
     frame: int
         Number of the frame in a regular fits file
     """
@@ -0,0 +1,165 @@
+"""
+Tests for the vectorised crossmatching of
+..module::mirar.processors.astrometry.autoastrometry.crossmatch
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+from astropy.table import Table
+
+from mirar.paths import SEXTRACTOR_HEADER_KEY
+from mirar.processors.astrometry.autoastrometry.crossmatch import (
+    distance_match,
+    get_pair_distances,
+    remove_close_pairs,
+)
+from mirar.processors.astrometry.autoastrometry.detect import get_img_src_list
+from mirar.processors.astrometry.autoastrometry.sources import (
+    SourceTable,
+    distance,
+    quickdistance,
+)
+from mirar.testing import BaseTestCase
+from mirar.utils.ldac_tools import save_table_as_ldac
+
+logger = logging.getLogger(__name__)
+
+
+def make_sources(
+    n_src: int, ra_deg: float, dec_deg: float, seed: int = 0
+) -> SourceTable:
+    """
+    Make a table of random sources in a small field
+
+    :param n_src: Number of sources
+    :param ra_deg: RA of field centre
+    :param dec_deg: Dec of field centre
+    :param seed: Random seed
+    :return: Table of sources
+    """
+    rng = np.random.default_rng(seed)
+    ras = np.mod(
+        ra_deg + rng.uniform(-0.05, 0.05, n_src) / np.cos(np.radians(dec_deg)), 360.0
+    )
+    decs = dec_deg + rng.uniform(-0.05, 0.05, n_src)
+    mags = rng.uniform(10.0, 18.0, n_src)
+    return SourceTable.from_columns(ras, decs, mags)
+
+
+class TestCrossmatch(BaseTestCase):
+    """Class for testing autoastrometry crossmatching"""
+
+    def test_pair_distances(self):
+        """
+        Test that KD-tree pair distances match a direct comparison of all pairs,
+        including for fields crossing ra=0
+        """
+        for ra_deg in [150.0, 0.01]:
+            src_list = make_sources(80, ra_deg, 40.0)
+            ra_scale = np.cos(np.radians(40.0))
+
+            dists, ids = get_pair_distances(
+                src_list.ra_deg,
+                src_list.dec_deg,
+                ra_scale=ra_scale,
+                min_rad=10.0,
+                max_rad=120.0,
+            )
+
+            all_dists = quickdistance(src_list[:, None], src_list[None, :], ra_scale)
+
+            for i in range(len(src_list)):
+                mask = (
+                    (10.0 < all_dists[i])
+                    & (all_dists[i] < 120.0)
+                    & (np.abs(src_list.dec_deg - src_list.dec_deg[i]) <= 120.0)
+                    & (ra_scale * np.abs(src_list.ra_deg - src_list.ra_deg[i]) <= 120.0)
+                )
+                mask[i] = False
+
+                self.assertEqual(list(ids[i]), list(np.nonzero(mask)[0]))
+                self.assertEqual(list(dists[i]), list(all_dists[i][mask]))
+
+    def test_distance_match(self):
+        """
+        Test that a rotated subset of reference sources is matched
+        """
+        ref_list = make_sources(60, 150.0, 20.0, seed=1)
+
+        img_list = SourceTable(ref_list.data[:45].copy())
+        img_list.data["x"] = np.arange(45)
+        img_list.data["y"] = np.arange(45)
+        img_list.rotate(5.0, 150.0, 20.0)
+
+        img_match, ref_match, mpa = distance_match(
+            img_list, ref_list, base_output_path="", max_rad=180.0, req_match=3
+        )
+
+        self.assertGreater(len(img_match), 10)
+        self.assertEqual(list(img_match), list(ref_match))
+        self.assertAlmostEqual(float(np.median(mpa)), -5.0, delta=0.5)
+
+    def test_remove_close_pairs(self):
+        """
+        Test that only the fainter source of each close pair is removed
+        """
+        src_list = make_sources(50, 150.0, 20.0, seed=2)
+        close = SourceTable.from_columns(
+            src_list.ra_deg[:5], src_list.dec_deg[:5] + 1.0 / 3600.0, 20.0
+        )
+        combined = SourceTable(np.concatenate([src_list.data, close.data]))
+
+        trimmed = remove_close_pairs(combined, min_sep=3.0)
+
+        self.assertEqual(len(trimmed), 50)
+        self.assertTrue(np.all(trimmed.mag < 20.0))
+        dists = distance(trimmed[:, None], trimmed[None, :])
+        np.fill_diagonal(dists, np.inf)
+        self.assertGreater(np.min(dists), 3.0)
+
+    def test_img_src_list(self):
+        """
+        Test that image sources are read from an LDAC catalog, filtered and sorted
+        """
+        rng = np.random.default_rng(3)
+        n_src = 40
+        catalog = Table(
+            {
+                "X_IMAGE": rng.uniform(20.0, 980.0, n_src),
+                "Y_IMAGE": rng.uniform(20.0, 980.0, n_src),
+                "ALPHA_J2000": rng.uniform(149.9, 150.1, n_src),
+                "DELTA_J2000": rng.uniform(19.9, 20.1, n_src),
+                "MAG_AUTO": rng.uniform(10.0, 18.0, n_src),
+                "MAGERR_AUTO": np.full(n_src, 0.01),
+                "ELLIPTICITY": np.full(n_src, 0.1),
+                "FWHM_IMAGE": rng.uniform(3.0, 4.0, n_src),
+                "FLAGS": np.zeros(n_src, dtype=int),
+            }
+        )
+        catalog["ELLIPTICITY"][0] = 0.9
+        catalog["FLAGS"][1] = 4
+        catalog["X_IMAGE"][2] = 1.0
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cat_path = Path(temp_dir) / "sextractor.cat"
+            save_table_as_ldac(catalog, cat_path)
+
+            img_path = Path(temp_dir) / "image.fits"
+            header = fits.Header()
+            header[SEXTRACTOR_HEADER_KEY] = str(cat_path)
+            fits.PrimaryHDU(np.zeros((10, 10)), header=header).writeto(img_path)
+
+            src_list = get_img_src_list(
+                img_path=str(img_path),
+                base_output_path=str(Path(temp_dir) / "image"),
+                nx_pix=1000,
+                ny_pix=1000,
+            )
+
+        self.assertEqual(len(src_list), n_src - 3)
+        self.assertTrue(np.all(np.diff(src_list.mag) >= 0.0))
+        self.assertEqual(sorted(src_list.ra_deg), sorted(catalog["ALPHA_J2000"][3:]))
@@ -0,0 +1,89 @@
+"""
+Tests for the shared calibration images in
+..module::mirar.monitor.calibration_registry
+"""
+
+import copy
+import logging
+import pickle
+from unittest import mock
+
+import numpy as np
+from astropy.io.fits import Header
+
+from mirar.data import Image, SharedImage
+from mirar.data.cache import MEMMAP_CACHE_BACKEND
+from mirar.monitor.calibration_registry import CalibrationRegistry
+from mirar.paths import BASE_NAME_KEY, RAW_IMG_KEY
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+def make_test_image(name: str = "test.fits", offset: float = 0.0) -> Image:
+    """
+    Make a small image for testing
+
+    :param name: name of the image
+    :param offset: value added to the data
+    :return: Image
+    """
+    header = Header()
+    header[RAW_IMG_KEY] = name
+    header[BASE_NAME_KEY] = name
+    data = np.arange(100, dtype=float).reshape(10, 10) + offset
+    return Image(data=data, header=header)
+
+
+@mock.patch("mirar.data.image_data.CACHE_BACKEND", MEMMAP_CACHE_BACKEND)
+class TestCalibrationRegistry(BaseTestCase):
+    """Class for testing shared calibration images"""
+
+    def test_shared_image(self):
+        """
+        Test that shared images read the source data, and never modify it
+        """
+        source = make_test_image()
+        view = SharedImage(source)
+        self.assertTrue(view.is_shared())
+        np.testing.assert_array_equal(view.get_data(), source.get_data())
+
+        view[BASE_NAME_KEY] = "other.fits"
+        self.assertEqual(source[BASE_NAME_KEY], "test.fits")
+
+        data = view.get_data()
+        data[0, 0] = -1.0
+        view.set_data(data)
+        self.assertFalse(view.is_shared())
+        self.assertEqual(view.get_data()[0, 0], -1.0)
+        self.assertEqual(source.get_data()[0, 0], 0.0)
+
+        view_copy = copy.deepcopy(SharedImage(source))
+        self.assertIsInstance(view_copy, SharedImage)
+        self.assertIs(view_copy.source, source)
+
+        unpickled = pickle.loads(pickle.dumps(SharedImage(source)))
+        np.testing.assert_array_equal(unpickled.get_data(), source.get_data())
+
+    def test_registry(self):
+        """
+        Test that updates to the registry do not change existing views
+        """
+        registry = CalibrationRegistry()
+        bias = make_test_image("bias.fits")
+        registry.replace([], [bias])
+
+        views = registry.get_views()
+        self.assertEqual(len(views), 1)
+        self.assertIs(views[0].source, bias)
+
+        flat = make_test_image("flat.fits", offset=1.0)
+        registry.update(lambda new_cals, archival_cals: ([flat], []))
+        self.assertEqual(len(registry), 1)
+        self.assertEqual(registry.get_new_cals()[0], flat)
+        self.assertEqual(len(registry.get_archival_cals()), 0)
+
+        # Old views still point to the old calibration images
+        self.assertIs(views[0].source, bias)
+        np.testing.assert_array_equal(views[0].get_data(), bias.get_data())
+        self.assertIs(registry.get_views()[0].source, flat)
@@ -0,0 +1,301 @@
+"""
+Tests for the persistent master calibration store in
+..module::mirar.data.calibration_store
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from astropy.io.fits import Header
+
+from mirar.data import Image, ImageBatch
+from mirar.data.calibration_store import DEFAULT_DETECTOR_KEY, CalibrationStore
+from mirar.paths import (
+    BASE_NAME_KEY,
+    COADD_KEY,
+    EXPTIME_KEY,
+    FILTER_KEY,
+    FLAT_FRAME_KEY,
+    GAIN_KEY,
+    OBSCLASS_KEY,
+    PROC_FAIL_KEY,
+    PROC_HISTORY_KEY,
+    RAW_IMG_KEY,
+    TARGET_KEY,
+    TIME_KEY,
+)
+from mirar.processors.flat import FlatCalibrator
+from mirar.processors.utils.cal_hunter import CalHunter, CalRequirement
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+def make_header(filter_name: str, date: str) -> Header:
+    """
+    Make a header for a calibration image
+
+    :param filter_name: Filter
+    :param date: Observation time
+    :return: Header
+    """
+    header = Header()
+    header[FILTER_KEY] = filter_name
+    header[EXPTIME_KEY] = 30.0
+    header[TIME_KEY] = date
+    return header
+
+
+def make_image(  # pylint: disable=too-many-arguments
+    obsclass: str,
+    filter_name: str,
+    data: np.ndarray,
+    name: str,
+    date: str,
+    filter_id: str | None = None,
+) -> Image:
+    """
+    Make a raw image for calibration
+
+    :param obsclass: Observation class ('flat' or 'science')
+    :param filter_name: Filter
+    :param data: Image data
+    :param name: Image name
+    :param date: Observation time
+    :param filter_id: Optional filter ID
+    :return: Image
+    """
+    header = make_header(filter_name, date)
+    header[OBSCLASS_KEY] = obsclass
+    header[TARGET_KEY] = obsclass
+    header[COADD_KEY] = 1
+    header[GAIN_KEY] = 1.0
+    header[PROC_HISTORY_KEY] = ""
+    header[PROC_FAIL_KEY] = False
+    header[RAW_IMG_KEY] = name
+    header[BASE_NAME_KEY] = name
+    if filter_id is not None:
+        header["FILTERID"] = filter_id
+    return Image(data=np.array(data, dtype=float), header=header)
+
+
+def make_flat_data(filter_name: str) -> np.ndarray:
+    """
+    Make flat data with a different pattern for each filter
+
+    :param filter_name: Filter
+    :return: Flat data
+    """
+    data = np.ones((4, 4))
+    if filter_name == "J":
+        data[:, 2:] = 2.0
+    else:
+        data[2:, :] = 3.0
+    return data
+
+
+class TestCalibrationStore(BaseTestCase):
+    """Class for testing the calibration store"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.store = CalibrationStore("test", output_dir=Path(self.tmp_dir.name))
+
+        master_path = Path(self.tmp_dir.name).joinpath("flat_J_abc.fits")
+        master_path.write_bytes(b"")
+        self.store.add(
+            "flat",
+            "abc",
+            master_path,
+            [make_header("J", "2023-01-01T00:00:00")],
+            validity_days=10.0,
+        )
+
+    def test_find(self):
+        """
+        Test finding stored masters by hash, and by matching values in time
+        """
+        path = self.store.find_by_hash("flat", "abc")
+        self.assertIsNotNone(path)
+        self.assertTrue(path.is_relative_to(self.store.store_dir))
+        self.assertIsNone(self.store.find_by_hash("flat", "def"))
+
+        mjd = 59945.0  # 2023-01-01
+        self.assertEqual(
+            self.store.find_matching("flat", {FILTER_KEY: "J"}, mjd + 5.0), path
+        )
+        self.assertIsNone(self.store.find_matching("flat", {FILTER_KEY: "H"}, mjd))
+        self.assertIsNone(
+            self.store.find_matching("flat", {FILTER_KEY: "J"}, mjd + 20.0)
+        )
+        self.assertIsNone(self.store.find_matching("dark", {FILTER_KEY: "J"}, mjd))
+
+    def test_requirement(self):
+        """
+        Test that stored masters satisfy calibration requirements
+        """
+        requirement = CalRequirement("flat", FILTER_KEY, ["J", "H"])
+        requirement.check_store(self.store, "flat", 59945.0)
+        self.assertFalse(requirement.success)
+        self.assertIn("J", requirement.stored_masters)
+
+        requirement = CalRequirement("flat", FILTER_KEY, ["J"])
+        requirement.check_store(self.store, "flat", 59945.0)
+        self.assertTrue(requirement.success)
+
+    def test_detector(self):
+        """
+        Test that masters are only matched to images from the same detector
+        """
+        master_path = Path(self.tmp_dir.name).joinpath("flat_J_board.fits")
+        master_path.write_bytes(b"")
+        header = make_header("H", "2023-01-01T00:00:00")
+        header[DEFAULT_DETECTOR_KEY] = 1
+        self.store.add("flat", "board", master_path, [header])
+
+        mjd = 59945.0
+        self.assertEqual(self.store.get_detector(header), "1")
+        self.assertIsNotNone(
+            self.store.find_matching("flat", {FILTER_KEY: "H"}, mjd, detector="1")
+        )
+        self.assertIsNone(
+            self.store.find_matching("flat", {FILTER_KEY: "H"}, mjd, detector="2")
+        )
+        self.assertIsNone(self.store.find_matching("flat", {FILTER_KEY: "H"}, mjd))
+
+        requirement = CalRequirement("flat", FILTER_KEY, ["H"])
+        requirement.check_store(self.store, "flat", mjd, detectors=["1", "2"])
+        self.assertFalse(requirement.success)
+        requirement.check_store(self.store, "flat", mjd, detectors=["1"])
+        self.assertTrue(requirement.success)
+
+    def test_input_hash(self):
+        """
+        Test that the input hash depends on the raw files of images, not only
+        their names
+        """
+        date = "2023-01-01T00:00:00"
+        raw_path = Path(self.tmp_dir.name).joinpath("a.fits")
+        raw_path.write_bytes(b"first")
+
+        def make_raw_image() -> Image:
+            image = make_image("flat", "J", make_flat_data("J"), "a.fits", date)
+            image[RAW_IMG_KEY] = raw_path.as_posix()
+            return image
+
+        input_hash = self.store.get_input_hash([make_raw_image()])
+        self.assertEqual(input_hash, self.store.get_input_hash([make_raw_image()]))
+
+        raw_path.write_bytes(b"retransferred")
+        self.assertNotEqual(input_hash, self.store.get_input_hash([make_raw_image()]))
+
+        # Without a raw file, the image data is used instead
+        images = [make_image("flat", "J", make_flat_data("J"), "b.fits", date)]
+        reprocessed = [make_image("flat", "J", make_flat_data("H"), "b.fits", date)]
+        self.assertNotEqual(
+            self.store.get_input_hash(images), self.store.get_input_hash(reprocessed)
+        )
+
+    def make_flat_masters(self, calibrator: FlatCalibrator, filter_id: bool = False):
+        """
+        Make and store J and H master flats, returning the reduced science data
+
+        :param calibrator: Flat calibrator
+        :param filter_id: Whether to give the images a filter ID
+        :return: Dictionary of reduced science data for each filter
+        """
+        calibrator.set_night(str(Path(self.tmp_dir.name).joinpath("20230101")))
+        date = "2023-01-01T00:00:00"
+        reduced = {}
+        for filter_name in ["J", "H"]:
+            batch = ImageBatch(
+                [
+                    make_image(
+                        "flat",
+                        filter_name,
+                        make_flat_data(filter_name) * (i + 1),
+                        f"flat_{filter_name}_{i}.fits",
+                        date,
+                        filter_id=filter_name if filter_id else None,
+                    )
+                    for i in range(3)
+                ]
+                + [
+                    make_image(
+                        "science",
+                        filter_name,
+                        np.full((4, 4), 10.0),
+                        f"sci_{filter_name}.fits",
+                        date,
+                        filter_id=filter_name if filter_id else None,
+                    )
+                ]
+            )
+            reduced[filter_name] = calibrator.apply(batch)[-1].get_data()
+        return reduced
+
+    def test_flats_without_raw_frames(self):
+        """
+        Test that each filter gets its own stored master flat, when the batches of
+        a later night do not include any raw flats
+        """
+        calibrator = FlatCalibrator(
+            calibration_store=self.store, calibration_match_keys=[FILTER_KEY]
+        )
+        with mock.patch.object(
+            self.store, "get_input_hash", wraps=self.store.get_input_hash
+        ) as get_input_hash:
+            expected = self.make_flat_masters(calibrator)
+        self.assertEqual(get_input_hash.call_count, 2)
+        self.assertFalse(np.allclose(expected["J"], expected["H"]))
+
+        calibrator.set_night(str(Path(self.tmp_dir.name).joinpath("20230102")))
+        for filter_name in ["J", "H"]:
+            science = make_image(
+                "science",
+                filter_name,
+                np.full((4, 4), 10.0),
+                f"sci_{filter_name}_night2.fits",
+                "2023-01-02T00:00:00",
+            )
+            res = calibrator.apply(ImageBatch([science]))
+            self.assertTrue(np.allclose(res[0].get_data(), expected[filter_name]))
+            self.assertTrue(
+                Path(res[0][FLAT_FRAME_KEY]).is_relative_to(self.store.store_dir)
+            )
+
+    def test_cal_hunter_with_calibrator(self):
+        """
+        Test that a calibrator uses the stored masters which satisfied a CalHunter
+        """
+        raw_dir = Path(self.tmp_dir.name).joinpath("raw_root")
+        raw_dir.joinpath("20230102", "raw").mkdir(parents=True)
+
+        cal_hunter = CalHunter(
+            requirements=CalRequirement("flat", "FILTERID", ["J", "H"]),
+            input_img_dir=raw_dir,
+            calibration_store=self.store,
+        )
+        cal_hunter.set_night("20230102")
+
+        calibrator = FlatCalibrator(calibration_store=self.store)
+        expected = self.make_flat_masters(calibrator, filter_id=True)
+
+        science = make_image(
+            "science",
+            "J",
+            np.full((4, 4), 10.0),
+            "sci_J_night2.fits",
+            "2023-01-02T00:00:00",
+            filter_id="J",
+        )
+        batch = cal_hunter.apply(ImageBatch([science]))
+        self.assertEqual(len(batch), 1)
+
+        calibrator.set_night(str(Path(self.tmp_dir.name).joinpath("20230102")))
+        res = calibrator.apply(batch)
+        self.assertTrue(np.allclose(res[0].get_data(), expected["J"]))
@@ -0,0 +1,115 @@
+"""
+Tests for the HEALPix tile cache of ..module::mirar.catalog.base.catalog_cache
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from astropy.table import Table
+
+from mirar.catalog.base import BaseCatalog
+from mirar.catalog.base.catalog_cache import ang2pix_nest, angular_distance_deg
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+rng = np.random.default_rng(42)
+N_STARS = 20000
+STAR_RA = rng.uniform(148.0, 152.0, N_STARS)
+STAR_DEC = rng.uniform(0.0, 4.0, N_STARS)
+STAR_MAG = rng.uniform(10.0, 18.0, N_STARS)
+
+
+class MockCatalog(BaseCatalog):
+    """
+    Catalog which returns sources from a fixed list, and counts queries
+    """
+
+    abbreviation = "mock"
+    tile_cache_ignore_keys = BaseCatalog.tile_cache_ignore_keys + ["queries"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queries = []
+
+    def get_catalog(self, ra_deg: float, dec_deg: float) -> Table:
+        self.queries.append(self.search_radius_arcmin)
+        dist = angular_distance_deg(ra_deg, dec_deg, STAR_RA, STAR_DEC)
+        mask = (
+            (dist <= self.search_radius_arcmin / 60.0)
+            & (STAR_MAG > self.min_mag)
+            & (STAR_MAG < self.max_mag)
+        )
+        return Table(
+            {"ra": STAR_RA[mask], "dec": STAR_DEC[mask], "magnitude": STAR_MAG[mask]}
+        )
+
+
+class TestCatalogCache(BaseTestCase):
+    """Class for testing the catalog tile cache"""
+
+    def test_ang2pix(self):
+        """
+        Test HEALPix nested pixel indices
+        """
+        self.assertEqual(
+            list(ang2pix_nest(1, [0.0, 90.0, 45.0], [0.0, 0.0, 60.0])), [4, 5, 0]
+        )
+        self.assertEqual(ang2pix_nest(1, 45.0, -60.0)[0], 8)
+
+        # Pixels have equal areas
+        n_points = 200000
+        ra = rng.uniform(0.0, 360.0, n_points)
+        dec = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, n_points)))
+        counts = np.bincount(ang2pix_nest(4, ra, dec), minlength=192)
+        self.assertEqual(len(counts), 192)
+        expected = n_points / 192.0
+        self.assertLess(np.max(np.abs(counts - expected)), 5.0 * np.sqrt(expected))
+
+    def test_tile_cache(self):
+        """
+        Test that cached queries give the same rows, and only missing tiles are fetched
+        """
+        with tempfile.TemporaryDirectory() as cache_dir:
+            catalog = MockCatalog(
+                search_radius_arcmin=15.0,
+                min_mag=11.0,
+                max_mag=17.0,
+                filter_name="j",
+                tile_cache_dir=cache_dir,
+                tile_cache_nside=256,
+            )
+
+            direct = catalog.get_catalog(150.0, 2.0)
+            cached = catalog.get_cached_catalog(150.0, 2.0)
+            self.assertEqual(len(catalog.queries), 2)
+            self.assertGreater(catalog.queries[1], 15.0)
+            self.assertEqual(sorted(direct["ra"]), sorted(cached["ra"]))
+
+            # Fully cached
+            cached = catalog.get_cached_catalog(150.0, 2.0)
+            self.assertEqual(len(catalog.queries), 2)
+            self.assertEqual(sorted(direct["ra"]), sorted(cached["ra"]))
+
+            # Partially cached, where only the missing tiles are saved
+            tiles = {
+                x: x.stat().st_mtime_ns for x in Path(cache_dir).glob("**/*.parquet")
+            }
+            direct = catalog.get_catalog(150.3, 2.0)
+            cached = catalog.get_cached_catalog(150.3, 2.0)
+            self.assertEqual(len(catalog.queries), 4)
+            self.assertEqual(sorted(direct["ra"]), sorted(cached["ra"]))
+            new_tiles = {
+                x: x.stat().st_mtime_ns for x in Path(cache_dir).glob("**/*.parquet")
+            }
+            self.assertGreater(len(new_tiles), len(tiles))
+            self.assertTrue(all(new_tiles[x] == val for x, val in tiles.items()))
+
+            # Different settings do not share tiles
+            catalog.max_mag = 16.0
+            direct = catalog.get_catalog(150.0, 2.0)
+            cached = catalog.get_cached_catalog(150.0, 2.0)
+            self.assertEqual(len(catalog.queries), 6)
+            self.assertEqual(sorted(direct["ra"]), sorted(cached["ra"]))
@@ -0,0 +1,92 @@
+"""
+Tests for the cutout extraction in
+..module::mirar.data.utils.cutouts
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+from mirar.data import Image
+from mirar.data.utils import CutoutError, CutoutExtractor, decode_img, encode_img
+from mirar.paths import BASE_NAME_KEY, RAW_IMG_KEY
+from mirar.processors.photometry.utils import make_cutouts
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+HALF_SIZE = 40
+
+
+def make_image(data: np.ndarray, index: int) -> Image:
+    """
+    Make an image with a minimal header
+
+    :param data: image data
+    :param index: index of image
+    :return: image
+    """
+    header = fits.Header()
+    header[RAW_IMG_KEY] = f"image_{index}.fits"
+    header[BASE_NAME_KEY] = f"image_{index}.fits"
+    return Image(data, header)
+
+
+class TestCutouts(BaseTestCase):
+    """Class for testing cutout extraction"""
+
+    def test_cutout_extractor(self):  # pylint: disable=too-many-locals
+        """
+        Test that cutouts from each image source match single-source cutouts,
+        including for sources at the image edges
+        """
+        rng = np.random.default_rng(0)
+        images = [
+            rng.normal(0.0, 1.0, (150, 200)).astype(dtype)
+            for dtype in [np.float32, np.float64]
+        ]
+        x_pos = np.concatenate([[0, 200, 10, 199], rng.integers(0, 201, 20)])
+        y_pos = np.concatenate([[0, 150, 140, 3], rng.integers(0, 151, 20)])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = [Path(temp_dir) / f"image_{i}.fits" for i in range(len(images))]
+            for path, data in zip(paths, images):
+                fits.writeto(path, data)
+
+            sources = [
+                paths,
+                images,
+                [make_image(data, i) for i, data in enumerate(images)],
+            ]
+            for image_sources in sources:
+                extractor = CutoutExtractor(
+                    image_sources, half_size=HALF_SIZE, max_workers=4
+                )
+                cutouts = extractor.get_cutouts(x_pos, y_pos)
+                encoded = extractor.get_encoded_cutouts(x_pos, y_pos)
+
+                for i, (x, y) in enumerate(zip(x_pos, y_pos)):
+                    expected = make_cutouts(paths, (int(x), int(y)), HALF_SIZE)
+                    for j, expected_cutout in enumerate(expected):
+                        np.testing.assert_array_equal(cutouts[j][i], expected_cutout)
+                        self.assertEqual(
+                            cutouts[j][i].dtype.kind, expected_cutout.dtype.kind
+                        )
+                        np.testing.assert_array_equal(
+                            decode_img(encoded[j][i]), expected_cutout
+                        )
+                        self.assertEqual(
+                            decode_img(encoded[j][i]).dtype.itemsize,
+                            decode_img(encode_img(expected_cutout)).dtype.itemsize,
+                        )
+
+            with self.assertRaises(CutoutError):
+                CutoutExtractor(paths, half_size=HALF_SIZE).get_cutouts([201], [10])
+
+        empty = CutoutExtractor(images, half_size=HALF_SIZE).get_encoded_cutouts(
+            np.array([], dtype=int), np.array([], dtype=int)
+        )
+        self.assertEqual(empty, [[], []])
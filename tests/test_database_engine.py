@@ -0,0 +1,41 @@
+"""
+Tests for the engine registry in ..module::mirar.database.engine
+"""
+
+import logging
+
+from mirar.database.engine import dispose_engines, get_engine, get_pool_stats
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TestEngineRegistry(BaseTestCase):
+    """Class for testing the engine registry"""
+
+    def setUp(self):
+        self.addCleanup(dispose_engines)
+
+    def test_registry(self):
+        """
+        Test that engines are reused, and can be disposed
+        """
+        kwargs = {
+            "db_user": "user",
+            "db_password": "pwd",
+            "db_hostname": "localhost",
+            "db_port": 5432,
+            "db_schema": "public",
+        }
+        engine = get_engine(db_name="test", **kwargs)
+        self.assertIs(get_engine(db_name="test", **kwargs), engine)
+        self.assertIsNot(get_engine(db_name="other", **kwargs), engine)
+
+        stats = get_pool_stats()
+        self.assertEqual(len(stats), 2)
+        self.assertNotIn("pwd", "".join(stats.keys()))
+        self.assertEqual(stats["user@localhost:5432/test (public)"]["checked_out"], 0)
+
+        dispose_engines()
+        self.assertEqual(len(get_pool_stats()), 0)
+        self.assertIsNot(get_engine(db_name="test", **kwargs), engine)
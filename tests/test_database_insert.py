@@ -0,0 +1,155 @@
+"""
+Tests for bulk insertion in ..module::mirar.database.base_model
+"""
+
+import logging
+from typing import ClassVar
+from unittest import mock
+
+import pandas as pd
+from psycopg import errors
+from sqlalchemy import VARCHAR, Column, Float, Integer
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError, ProgrammingError
+from sqlalchemy.orm import DeclarativeBase
+
+from mirar.database.base_model import BaseDB
+from mirar.database.base_table import BaseTable
+from mirar.database.transactions.insert import _bulk_insert_in_table
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class ModelBase(DeclarativeBase):  # pylint: disable=too-few-public-methods
+    """Declarative base for test tables"""
+
+
+class SourcesTable(ModelBase, BaseTable):  # pylint: disable=too-few-public-methods
+    """Test table of sources"""
+
+    __tablename__ = "sources"
+    db_name = "test"
+
+    sourceid = Column(Integer, primary_key=True)
+    name = Column(VARCHAR(20), unique=True)
+    ra = Column(Float)
+
+
+class Source(BaseDB):
+    """Test pydantic model of sources"""
+
+    sql_model: ClassVar = SourcesTable
+
+    name: str
+    ra: float
+
+
+class CheckedSource(Source):
+    """Test model with per-entry insertion logic"""
+
+    sql_model: ClassVar = SourcesTable
+
+    def insert_entry(self, duplicate_protocol, returning_key_names=None):
+        return self._insert_entry(
+            duplicate_protocol=duplicate_protocol,
+            returning_key_names=returning_key_names,
+        )
+
+
+ENTRIES = [{"name": f"source_{i}", "ra": float(i)} for i in range(4)]
+
+
+class TestBulkInsert(BaseTestCase):
+    """Class for testing bulk insertion"""
+
+    def test_bulk_statement(self):
+        """
+        Test that a single upsert statement is executed for all entries
+        """
+        engine = mock.MagicMock()
+        conn = engine.begin.return_value.__enter__.return_value
+        conn.execute.return_value.fetchall.return_value = [(1, "source_0")]
+
+        with mock.patch(
+            "mirar.database.transactions.insert.get_engine", return_value=engine
+        ):
+            res = _bulk_insert_in_table(
+                ENTRIES,
+                SourcesTable,
+                returning_keys=["sourceid"],
+                duplicate_protocol="replace",
+                conflict_key="name",
+            )
+
+        self.assertEqual(conn.execute.call_count, 1)
+        stmt, params = conn.execute.call_args.args
+        self.assertEqual(params, ENTRIES)
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        self.assertIn("ON CONFLICT (name) DO UPDATE", sql)
+        self.assertIn("RETURNING sourceid, name", sql)
+        self.assertEqual(list(res.columns), ["sourceid", "name"])
+
+    def test_ignore_order(self):
+        """
+        Test that existing entries are selected, and results are in entry order
+        """
+        self.assertTrue(Source.supports_bulk_insert())
+
+        inserted = pd.DataFrame(
+            {"sourceid": [12, 10], "name": ["source_2", "source_0"]}
+        )
+        existing = pd.DataFrame({"sourceid": [3, 1], "name": ["source_3", "source_1"]})
+
+        with mock.patch(
+            "mirar.database.base_model._bulk_insert_in_table", return_value=inserted
+        ) as bulk_insert, mock.patch(
+            "mirar.database.base_model.select_from_table", return_value=existing
+        ) as select:
+            res = Source.insert_entries(ENTRIES, duplicate_protocol="ignore")
+
+        self.assertEqual(bulk_insert.call_count, 1)
+        self.assertEqual(bulk_insert.call_args.kwargs["conflict_key"], "name")
+        self.assertEqual(select.call_count, 1)
+        self.assertEqual(list(res.columns), ["sourceid"])
+        self.assertEqual(list(res["sourceid"]), [10, 1, 12, 3])
+
+    def test_fail_duplicate(self):
+        """
+        Test that duplicates raise an error with the 'fail' protocol
+        """
+        exc = IntegrityError("INSERT", {}, errors.UniqueViolation())
+
+        with mock.patch(
+            "mirar.database.base_model._bulk_insert_in_table", side_effect=exc
+        ):
+            with self.assertRaises(errors.UniqueViolation):
+                Source.insert_entries(ENTRIES, duplicate_protocol="fail")
+
+    def test_fallback(self):
+        """
+        Test that entries are inserted one by one if bulk insertion is not possible
+        """
+        self.assertFalse(CheckedSource.supports_bulk_insert())
+
+        with mock.patch(
+            "mirar.database.base_model._insert_in_table",
+            side_effect=[pd.DataFrame({"sourceid": [i]}) for i in range(4)],
+        ) as insert:
+            res = CheckedSource.insert_entries(ENTRIES, duplicate_protocol="fail")
+
+        self.assertEqual(insert.call_count, 4)
+        self.assertEqual(list(res["sourceid"]), [0, 1, 2, 3])
+
+        exc = ProgrammingError("INSERT", {}, errors.CardinalityViolation())
+
+        with mock.patch(
+            "mirar.database.base_model._bulk_insert_in_table", side_effect=exc
+        ), mock.patch(
+            "mirar.database.base_model._insert_in_table",
+            side_effect=[pd.DataFrame({"sourceid": [i]}) for i in range(4)],
+        ) as insert:
+            res = Source.insert_entries(ENTRIES, duplicate_protocol="replace")
+
+        self.assertEqual(insert.call_count, 4)
+        self.assertEqual(list(res["sourceid"]), [0, 1, 2, 3])
@@ -0,0 +1,80 @@
+"""
+Tests for batched selection in ..module::mirar.database.transactions.select
+"""
+
+import logging
+from unittest import mock
+
+import pandas as pd
+from sqlalchemy import Column, Float, Integer
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import DeclarativeBase
+
+from mirar.database.base_table import BaseTable
+from mirar.database.constraints import DBQueryConstraints
+from mirar.database.transactions.select import (
+    BATCH_INDEX_COLUMN,
+    select_from_table_batch,
+)
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class ModelBase(DeclarativeBase):  # pylint: disable=too-few-public-methods
+    """Declarative base for test tables"""
+
+
+class SourcesTable(ModelBase, BaseTable):  # pylint: disable=too-few-public-methods
+    """Test table of sources"""
+
+    __tablename__ = "sources"
+    db_name = "test"
+
+    sourceid = Column(Integer, primary_key=True)
+    ra = Column(Float)
+    dec = Column(Float)
+
+
+class TestSelectBatch(BaseTestCase):
+    """Class for testing batched selection"""
+
+    def test_select_batch(self):
+        """
+        Test that one query is run, and results are split back per constraint
+        """
+        constraints = []
+        for ra in [10.0, 20.0, 30.0]:
+            constraint = DBQueryConstraints()
+            constraint.add_q3c_constraint(ra=ra, dec=0.0, crossmatch_radius_arcsec=2.0)
+            constraints.append(constraint)
+
+        db_res = pd.DataFrame(
+            {
+                "sourceid": [5, 6, 7],
+                "ra": [30.0, 10.0, 10.0],
+                "dec": [0.0, 0.0, 0.0],
+                BATCH_INDEX_COLUMN: [2, 0, 0],
+            }
+        )
+
+        with mock.patch(
+            "mirar.database.transactions.select.run_select", return_value=db_res
+        ) as run_select:
+            results = select_from_table_batch(
+                constraints, SourcesTable, output_columns=["sourceid"]
+            )
+
+        self.assertEqual(run_select.call_count, 1)
+        sql = str(
+            run_select.call_args.kwargs["query"].compile(dialect=postgresql.dialect())
+        )
+        self.assertEqual(sql.count("q3c_radial_query"), 3)
+        self.assertIn("UNION ALL", sql)
+
+        self.assertEqual([len(x) for x in results], [2, 0, 1])
+        self.assertEqual(list(results[0]["sourceid"]), [6, 7])
+        self.assertEqual(list(results[0].index), [0, 1])
+        self.assertEqual(list(results[0].columns), ["sourceid"])
+        self.assertEqual(results[2]["sourceid"].iloc[0], 5)
+        self.assertNotIn(BATCH_INDEX_COLUMN, results[1].columns)
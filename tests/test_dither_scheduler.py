@@ -0,0 +1,99 @@
+"""
+Tests for the scheduling of dither sets in
+..module::mirar.monitor.dither_scheduler
+"""
+
+import logging
+import time
+
+import numpy as np
+from astropy.io.fits import Header
+
+from mirar.data import Image, ImageBatch
+from mirar.monitor.dither_scheduler import DitherSetScheduler, has_dither_keys
+from mirar.paths import (
+    BASE_NAME_KEY,
+    DITHER_N_KEY,
+    MAX_DITHER_KEY,
+    OBSCLASS_KEY,
+    RAW_IMG_KEY,
+    TARGET_KEY,
+)
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+def make_dither_batch(
+    target: str, dither_n: int, n_dithers: int = 3
+) -> tuple[str, ImageBatch]:
+    """
+    Make a batch with a single dither image
+
+    :param target: name of the target
+    :param dither_n: dither number
+    :param n_dithers: number of dithers in the set
+    :return: path of the raw file, batch of images
+    """
+    path = f"{target}_{dither_n}.fits"
+    header = Header()
+    header[RAW_IMG_KEY] = path
+    header[BASE_NAME_KEY] = path
+    header[OBSCLASS_KEY] = "science"
+    header[TARGET_KEY] = target
+    header[DITHER_N_KEY] = dither_n
+    header[MAX_DITHER_KEY] = n_dithers
+    return path, ImageBatch([Image(data=np.zeros((4, 4)), header=header)])
+
+
+class TestDitherScheduler(BaseTestCase):
+    """Class for testing the dither set scheduler"""
+
+    def test_complete_sets(self):
+        """
+        Test that interleaved sets are dispatched once all their dithers arrive,
+        in any order
+        """
+        scheduler = DitherSetScheduler()
+        self.assertTrue(has_dither_keys(make_dither_batch("a", 1)[1][0]))
+
+        for target, dither_n in [("a", 2), ("b", 1), ("a", 1), ("b", 2)]:
+            self.assertEqual(
+                scheduler.add_images(*make_dither_batch(target, dither_n)), []
+            )
+        self.assertEqual(len(scheduler), 2)
+
+        ready = scheduler.add_images(*make_dither_batch("a", 3))
+        self.assertEqual(len(ready), 1)
+        self.assertTrue(ready[0].is_complete())
+        self.assertTrue(ready[0].is_science())
+        self.assertEqual(ready[0].paths, ["a_2.fits", "a_1.fits", "a_3.fits"])
+        self.assertEqual(len(ready[0].images), 3)
+        self.assertEqual(len(scheduler), 1)
+
+        single = scheduler.add_images(*make_dither_batch("c", 1, n_dithers=1))
+        self.assertEqual(len(single), 1)
+
+    def test_incomplete_sets(self):
+        """
+        Test that incomplete sets are dispatched when superseded, timed out,
+        or when the scheduler is flushed
+        """
+        scheduler = DitherSetScheduler(timeout_hours=0.2 / 3600.0)
+        scheduler.add_images(*make_dither_batch("a", 1))
+        scheduler.add_images(*make_dither_batch("a", 2))
+
+        ready = scheduler.add_images(*make_dither_batch("a", 1))
+        self.assertEqual(len(ready), 1)
+        self.assertFalse(ready[0].is_complete())
+        self.assertEqual(len(ready[0]), 2)
+
+        self.assertEqual(scheduler.pop_expired(), [])
+        time.sleep(0.3)
+        expired = scheduler.pop_expired()
+        self.assertEqual(len(expired), 1)
+        self.assertEqual(expired[0].paths, ["a_1.fits"])
+
+        scheduler.add_images(*make_dither_batch("b", 1))
+        self.assertEqual(len(scheduler.pop_all()), 1)
+        self.assertEqual(len(scheduler), 0)
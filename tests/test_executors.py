@@ -0,0 +1,184 @@
+"""
+Tests for the different executors of ..module::mirar.processors.base_processor,
+and for streaming batches through a pipeline
+"""
+
+import logging
+import pickle
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from astropy.io.fits import Header
+
+from mirar.data import Dataset, Image, ImageBatch, cache
+from mirar.data.cache import USE_CACHE
+from mirar.errors import ProcessorError
+from mirar.paths import BASE_NAME_KEY, PROC_HISTORY_KEY, RAW_IMG_KEY
+from mirar.pipelines import Pipeline
+from mirar.processors.base_processor import (
+    BaseImageProcessor,
+    ExecutorError,
+    executor_options,
+)
+from mirar.processors.utils.image_selector import ImageDebatcher
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+BAD_NAME = "bad.fits"
+
+
+class ImageDoubler(BaseImageProcessor):
+    """
+    Processor which doubles the image data, and fails for one image
+    """
+
+    base_key = "testdoubler"
+
+    def description(self) -> str:
+        return "Processor to double image data"
+
+    def _apply_to_images(self, batch: ImageBatch) -> ImageBatch:
+        for image in batch:
+            if image[BASE_NAME_KEY] == BAD_NAME:
+                raise ProcessorError("Bad image")
+            image.set_data(image.get_data() * 2.0)
+        return batch
+
+
+def make_dataset(n_batches: int = 6) -> Dataset:
+    """
+    Make a dataset of single-image batches, with one bad image
+
+    :param n_batches: Number of batches
+    :return: Dataset
+    """
+    batches = []
+    for i in range(n_batches):
+        header = Header()
+        header[RAW_IMG_KEY] = f"image_{i}.fits"
+        header[BASE_NAME_KEY] = BAD_NAME if i == 2 else f"image_{i}.fits"
+        header[PROC_HISTORY_KEY] = ""
+        batches.append(ImageBatch(Image(np.full((5, 5), float(i)), header)))
+    return Dataset(batches)
+
+
+class TestExecutors(BaseTestCase):
+    """Class for testing processor executors"""
+
+    def test_executors(self):
+        """
+        Test that all executors give the same ordered output and errors
+        """
+        for executor in executor_options:
+            processor = ImageDoubler()
+            processor.max_n_cpu = 3
+            processor.set_executor(executor)
+
+            dataset, err_stack = processor.base_apply(make_dataset())
+
+            values = [batch[0].get_data()[0, 0] for batch in dataset]
+            self.assertEqual(values, [0.0, 2.0, 6.0, 8.0, 10.0], msg=executor)
+            self.assertEqual(len(err_stack.reports), 1, msg=executor)
+            self.assertEqual(
+                err_stack.reports[0].get_error_name(), "ProcessorError", msg=executor
+            )
+            self.assertTrue(
+                all(batch[0][PROC_HISTORY_KEY] == "testdoubler," for batch in dataset)
+            )
+
+    def test_no_orphan_cache_files(self):
+        """
+        Test that the process executor does not leave linked cache files behind
+        """
+        if not USE_CACHE:
+            return
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.addCleanup(cache.set_cache_dir, cache.get_cache_dir())
+            cache.set_cache_dir(cache_dir)
+
+            processor = ImageDoubler()
+            processor.max_n_cpu = 3
+            processor.set_executor("process")
+
+            inputs = make_dataset()
+            dataset, _ = processor.base_apply(inputs)
+
+            owned = {x.cache_path for batch in inputs for x in batch}
+            owned |= {x.cache_path for batch in dataset for x in batch}
+            self.assertEqual(len(owned), 11)
+            self.assertEqual(set(Path(cache_dir).iterdir()), owned)
+
+    def test_image_handoff(self):
+        """
+        Test that pickling only creates cache files for prepared handoffs,
+        and that unused handoffs are released
+        """
+        if not USE_CACHE:
+            return
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            self.addCleanup(cache.set_cache_dir, cache.get_cache_dir())
+            cache.set_cache_dir(cache_dir)
+            image = make_dataset(n_batches=1)[0][0]
+
+            # Without a handoff, the data is pickled and no files are created
+            files = set(Path(cache_dir).iterdir())
+            pickled = pickle.dumps(image)
+            self.assertEqual(set(Path(cache_dir).iterdir()), files)
+            new = pickle.loads(pickled)
+            self.assertNotEqual(new.cache_path, image.cache_path)
+            np.testing.assert_array_equal(new.get_data(), image.get_data())
+            del new
+
+            # A handoff which is never unpickled is deleted when released
+            link = image.prepare_handoff()
+            pickled = pickle.dumps(image)
+            self.assertTrue(link.exists())
+            image.release_handoff()
+            self.assertFalse(link.exists())
+
+            # A handoff owned by an unpickled image is kept
+            link = image.prepare_handoff()
+            new = pickle.loads(pickle.dumps(image))
+            image.release_handoff()
+            self.assertEqual(new.cache_path, link)
+            self.assertTrue(link.exists())
+            np.testing.assert_array_equal(new.get_data(), image.get_data())
+            del new
+
+            self.assertEqual(list(Path(cache_dir).iterdir()), [image.cache_path])
+
+    def test_invalid_executor(self):
+        """
+        Test that an invalid executor raises an error
+        """
+        with self.assertRaises(ExecutorError):
+            ImageDoubler().set_executor("gpu")
+
+
+class TestStreaming(BaseTestCase):
+    """Class for testing streaming of batches through processors"""
+
+    def test_streaming(self):
+        """
+        Test that streaming gives the same output as applying each step in turn
+        """
+        processors = [ImageDoubler(), ImageDoubler(), ImageDebatcher(), ImageDoubler()]
+
+        segments = Pipeline.get_streaming_segments(processors)
+        self.assertEqual([len(x) for x in segments], [2, 1, 1])
+
+        dataset, err_stack = Pipeline.stream_images(make_dataset(), processors)
+
+        self.assertEqual(len(dataset), 1)
+        values = [image.get_data()[0, 0] for image in dataset[0]]
+        self.assertEqual(values, [0.0, 8.0, 24.0, 32.0, 40.0])
+        self.assertEqual(len(err_stack.reports), 1)
+
+        self.assertEqual(processors[0].latest_n_input_batches, 6)
+        self.assertEqual(processors[0].latest_n_output_batches, 5)
+        self.assertEqual(processors[1].latest_n_input_batches, 5)
+        self.assertEqual(len(processors[0].latest_error_stack.reports), 1)
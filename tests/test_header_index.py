@@ -0,0 +1,170 @@
+"""
+Tests for loading raw images in ..module::mirar.processors.utils.image_loader,
+and for the raw image header index in ..module::mirar.processors.utils.header_index
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+from mirar.io import open_raw_image
+from mirar.paths import (
+    BASE_NAME_KEY,
+    COADD_KEY,
+    EXPTIME_KEY,
+    GAIN_KEY,
+    OBSCLASS_KEY,
+    PROC_FAIL_KEY,
+    PROC_HISTORY_KEY,
+    RAW_IMG_KEY,
+    TARGET_KEY,
+    TIME_KEY,
+)
+from mirar.processors.base_processor import executor_options
+from mirar.processors.utils.cal_hunter import CalRequirement, find_required_cals
+from mirar.processors.utils.header_index import HeaderIndex
+from mirar.processors.utils.image_loader import load_from_list
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+def write_raw_image(path: Path, target: str, exptime: float):
+    """
+    Write a small raw image with all core fields
+
+    :param path: Path to write to
+    :param target: Target name
+    :param exptime: Exposure time
+    :return: None
+    """
+    header = fits.Header()
+    header[OBSCLASS_KEY] = "calibration" if target != "science" else "science"
+    header[TARGET_KEY] = target
+    header[TIME_KEY] = "2023-01-01T00:00:00"
+    header[COADD_KEY] = 1
+    header[GAIN_KEY] = 1.0
+    header[PROC_HISTORY_KEY] = ""
+    header[PROC_FAIL_KEY] = False
+    header[RAW_IMG_KEY] = path.as_posix()
+    header[BASE_NAME_KEY] = path.name
+    header[EXPTIME_KEY] = exptime
+    fits.PrimaryHDU(np.zeros((4, 4)), header).writeto(path)
+
+
+class TestHeaderIndex(BaseTestCase):
+    """Class for testing the header index"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.root = Path(self.tmp_dir.name)
+
+        for night in ["20230101", "20230102", "20230103"]:
+            raw_dir = self.root.joinpath(night, "raw")
+            raw_dir.mkdir(parents=True)
+            for i in range(3):
+                write_raw_image(raw_dir.joinpath(f"sci_{i}.fits"), "science", 60.0)
+
+        write_raw_image(self.root.joinpath("20230101/raw/dark_0.fits"), "dark", 120.0)
+        write_raw_image(self.root.joinpath("20230102/raw/dark_1.fits"), "dark", 60.0)
+
+        self.opened = []
+
+        def open_f(path):
+            self.opened.append(Path(path).name)
+            return open_raw_image(path)
+
+        self.open_f = open_f
+        self.index = HeaderIndex(self.root.joinpath("index.sqlite"))
+
+    def test_incremental(self):
+        """
+        Test that only new or modified files are opened to update the index
+        """
+        raw_dir = self.root.joinpath("20230102/raw")
+
+        images = self.index.load_matching(
+            raw_dir, [{TARGET_KEY: "dark", EXPTIME_KEY: ["60.0"]}], self.open_f
+        )
+        self.assertEqual(len(images), 1)
+        self.assertEqual(len(self.opened), 5)
+
+        self.opened.clear()
+        images = self.index.load_matching(
+            raw_dir, [{TARGET_KEY: "dark", EXPTIME_KEY: ["60.0"]}], self.open_f
+        )
+        self.assertEqual(len(images), 1)
+        self.assertEqual(self.opened, ["dark_1.fits"])
+
+        self.opened.clear()
+        write_raw_image(raw_dir.joinpath("dark_2.fits"), "dark", 60.0)
+        raw_dir.joinpath("dark_1.fits").unlink()
+        images = self.index.load_matching(
+            raw_dir, [{TARGET_KEY: "dark", EXPTIME_KEY: ["60.0"]}], self.open_f
+        )
+        self.assertEqual([x[BASE_NAME_KEY] for x in images], ["dark_2.fits"])
+        self.assertEqual(self.opened, ["dark_2.fits", "dark_2.fits"])
+
+    def test_cal_hunter(self):
+        """
+        Test that find_required_cals only loads the required images from the index
+        """
+        requirement = CalRequirement("dark", EXPTIME_KEY, ["120.0", "60.0"])
+        images = find_required_cals(
+            latest_dir=self.root.joinpath("20230103/raw").as_posix(),
+            night="20230103",
+            requirements=[requirement],
+            open_f=self.open_f,
+            header_index=self.index,
+        )
+        self.assertTrue(requirement.success)
+        self.assertEqual(
+            sorted(x[BASE_NAME_KEY] for x in images), ["dark_0.fits", "dark_1.fits"]
+        )
+        n_opened = len(self.opened)
+
+        self.opened.clear()
+        requirement = CalRequirement("dark", EXPTIME_KEY, ["120.0", "60.0"])
+        find_required_cals(
+            latest_dir=self.root.joinpath("20230103/raw").as_posix(),
+            night="20230103",
+            requirements=[requirement],
+            open_f=self.open_f,
+            header_index=self.index,
+        )
+        self.assertEqual(sorted(self.opened), ["dark_0.fits", "dark_1.fits"])
+        self.assertLess(len(self.opened), n_opened)
+
+
+class TestImageLoading(BaseTestCase):
+    """Class for testing concurrent loading of images"""
+
+    def test_load_from_list(self):
+        """
+        Test that all executors load the same images, in the same order,
+        skipping incomplete files
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            paths = []
+            for i in range(8):
+                path = Path(tmp_dir).joinpath(f"image_{7 - i}.fits")
+                write_raw_image(path, "science", float(i))
+                paths.append(path)
+
+            data = paths[3].read_bytes()
+            paths[3].write_bytes(data[: len(data) // 2])
+
+            expected = [x.name for i, x in enumerate(paths) if i != 3]
+
+            for executor in executor_options:
+                images = load_from_list(
+                    paths, open_raw_image, n_workers=3, executor=executor
+                )
+                self.assertEqual(
+                    [x[BASE_NAME_KEY] for x in images], expected, msg=executor
+                )
+                self.assertEqual(images[4][EXPTIME_KEY], 5.0, msg=executor)
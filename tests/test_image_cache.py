@@ -0,0 +1,170 @@
+"""
+Tests for the image cache backends and lazy images in ..module::mirar.data.image_data
+"""
+
+import copy
+import logging
+import pickle
+from functools import partial
+from unittest import mock
+
+import numpy as np
+from astropy.io.fits import Header
+
+from mirar.data import Image, LazyImage
+from mirar.data.cache import MEMMAP_CACHE_BACKEND, MemoryCache
+from mirar.paths import BASE_NAME_KEY, RAW_IMG_KEY
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+def make_test_image() -> Image:
+    """
+    Make a small image for testing
+
+    :return: Image
+    """
+    header = Header()
+    header[RAW_IMG_KEY] = "test.fits"
+    header[BASE_NAME_KEY] = "test.fits"
+    return Image(data=np.arange(100, dtype=float).reshape(10, 10), header=header)
+
+
+@mock.patch("mirar.data.image_data.CACHE_BACKEND", MEMMAP_CACHE_BACKEND)
+class TestMemmapCache(BaseTestCase):
+    """Class for testing the memmap cache backend"""
+
+    def test_copy_on_write(self):
+        """
+        Test that modifying the returned array does not change the cache
+        """
+        image = make_test_image()
+
+        data = image.get_data()
+        self.assertIsInstance(data, np.memmap)
+        data[0, 0] = -1.0
+
+        self.assertEqual(image.get_data()[0, 0], 0.0)
+
+        image.set_data(data)
+        self.assertEqual(image.get_data()[0, 0], -1.0)
+        # Views taken before the update still see the old data
+        self.assertEqual(data[0, 1], 1.0)
+
+    def test_read_only(self):
+        """
+        Test that read-only views cannot be modified
+        """
+        image = make_test_image()
+        view = image.get_memmap_data(read_only=True)
+        with self.assertRaises(ValueError):
+            view[0, 0] = -1.0
+
+    def test_deepcopy(self):
+        """
+        Test that deepcopies have independent caches
+        """
+        image = make_test_image()
+        new = copy.deepcopy(image)
+        self.assertNotEqual(image.cache_path, new.cache_path)
+
+        new.set_data(np.zeros((10, 10)))
+        self.assertEqual(image.get_data()[9, 9], 99.0)
+        self.assertEqual(new.get_data()[9, 9], 0.0)
+
+
+class TestMemoryCache(BaseTestCase):
+    """Class for testing the in-RAM LRU cache tier"""
+
+    def setUp(self):
+        self.ram_cache = MemoryCache(max_bytes=1000)
+        patcher = mock.patch("mirar.data.image_data.ram_cache", self.ram_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_eviction(self):
+        """
+        Test that images spill to disk once the RAM limit is reached
+        """
+        ram_cache = self.ram_cache
+
+        image = make_test_image()
+        self.assertFalse(image.cache_path.exists())
+        self.assertEqual(ram_cache.get_stats()["n_bytes"], 800)
+
+        new = make_test_image()
+        self.assertEqual(ram_cache.evictions, 1)
+        self.assertTrue(image.cache_path.exists())
+        self.assertFalse(new.cache_path.exists())
+
+        # Reading the older image pulls it back into RAM, evicting the newer one
+        self.assertEqual(image.get_data()[9, 9], 99.0)
+        self.assertTrue(new.cache_path.exists())
+        self.assertEqual(image.get_data()[9, 9], 99.0)
+
+        stats = ram_cache.get_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["evictions"], 2)
+
+    def test_copy_on_get(self):
+        """
+        Test that modifying the returned array does not change the cache
+        """
+        image = make_test_image()
+        data = image.get_data()
+        data[0, 0] = -1.0
+        self.assertEqual(image.get_data()[0, 0], 0.0)
+
+
+def make_test_data(loads: list) -> np.ndarray:
+    """
+    Make test data, recording each call
+
+    :param loads: list of calls
+    :return: test data
+    """
+    loads.append(1)
+    return np.arange(100, dtype=float).reshape(10, 10)
+
+
+class TestLazyImage(BaseTestCase):
+    """Class for testing lazy images"""
+
+    def test_lazy_load(self):
+        """
+        Test that the data is only loaded once, when first needed
+        """
+        loads = []
+        header = make_test_image().get_header()
+        image = LazyImage(header=header, loader=partial(make_test_data, loads))
+        self.assertEqual(image.get_name(), "test.fits")
+        self.assertFalse(image.is_loaded())
+
+        new = copy.deepcopy(image)
+        self.assertIsInstance(new, LazyImage)
+        new = pickle.loads(pickle.dumps(image))
+        self.assertFalse(new.is_loaded())
+        self.assertEqual(len(loads), 0)
+
+        self.assertEqual(image.get_data()[9, 9], 99.0)
+        self.assertEqual(image.get_data()[9, 9], 99.0)
+        self.assertTrue(image.is_loaded())
+        self.assertEqual(len(loads), 1)
+
+        copied = copy.deepcopy(image)
+        self.assertIsInstance(copied, Image)
+        self.assertEqual(copied.get_data()[0, 1], 1.0)
+        self.assertEqual(len(loads), 1)
+
+    def test_set_data(self):
+        """
+        Test that setting data replaces the loader
+        """
+        loads = []
+        header = make_test_image().get_header()
+        image = LazyImage(header=header, loader=partial(make_test_data, loads))
+        image.set_data(np.zeros((10, 10)))
+        self.assertEqual(image.get_data()[9, 9], 0.0)
+        self.assertEqual(len(loads), 0)
@@ -0,0 +1,92 @@
+"""
+Tests for the in-memory FITS_LDAC conversions in ..module::mirar.utils.ldac_tools
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from astropy import units as u
+from astropy.table import MaskedColumn, Table
+
+from mirar.testing import BaseTestCase
+from mirar.utils.ldac_tools import (
+    convert_array_to_ldac,
+    convert_table_to_ldac,
+    get_array_from_ldac,
+    get_dataframe_from_ldac,
+    get_table_from_ldac,
+    save_table_as_ldac,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def make_test_table() -> Table:
+    """
+    Make a catalog table for testing
+
+    :return: Table
+    """
+    return Table(
+        {
+            "ra": np.linspace(10.0, 11.0, 5) * u.deg,
+            "FLAGS": np.arange(5, dtype=np.int16),
+            "NAME": ["a", "bb", "c", "d", "eeee"],
+            "MAG": MaskedColumn([15.0, 16.0, 17.0, 18.0, 19.0], mask=[0, 1, 0, 0, 0]),
+            "FLUX_APER": np.ones((5, 3)),
+            "extra": np.array([None] * 5, dtype=object),
+        }
+    )
+
+
+class TestLDACTools(BaseTestCase):
+    """Class for testing FITS_LDAC conversions"""
+
+    def test_table_round_trip(self):
+        """
+        Test that in-memory catalogs are read back as from a file
+        """
+        table = make_test_table()
+        hdulist = convert_table_to_ldac(table)
+        self.assertEqual([x.name for x in hdulist[1:]], ["LDAC_IMHEAD", "LDAC_OBJECTS"])
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "test.ldac"
+            save_table_as_ldac(table, path)
+            from_file = get_table_from_ldac(path)
+
+        in_memory = get_table_from_ldac(hdulist)
+        self.assertEqual(
+            in_memory.colnames, ["ra", "FLAGS", "NAME", "MAG", "FLUX_APER"]
+        )
+        self.assertEqual(in_memory.colnames, from_file.colnames)
+        for name in in_memory.colnames:
+            np.testing.assert_array_equal(in_memory[name], from_file[name])
+        self.assertTrue(in_memory["MAG"].mask[1])
+
+    def test_array_round_trip(self):
+        """
+        Test conversions from and to structured arrays and DataFrames
+        """
+        table = make_test_table()
+        table.remove_columns(["MAG", "extra"])
+        array = np.asarray(table.as_array())
+
+        hdulist = convert_array_to_ldac(array)
+        new_array = get_array_from_ldac(hdulist)
+        self.assertEqual(new_array.dtype.names, array.dtype.names)
+        for name in array.dtype.names:
+            np.testing.assert_array_equal(new_array[name], array[name])
+
+        dataframe = pd.DataFrame(
+            {
+                "X_IMAGE": [1.0, 2.0],
+                "NAME": ["a", "b"],
+                "extra": ["x", 1],
+            }
+        )
+        new_dataframe = get_dataframe_from_ldac(convert_array_to_ldac(dataframe))
+        pd.testing.assert_frame_equal(new_dataframe, dataframe[["X_IMAGE", "NAME"]])
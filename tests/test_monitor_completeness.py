@@ -0,0 +1,130 @@
+"""
+Tests for the detection of complete files in
+..module::mirar.monitor.completeness
+"""
+
+import logging
+import tempfile
+import threading
+import time
+from pathlib import Path
+from queue import Queue
+
+import numpy as np
+from astropy.io import fits
+from watchdog.events import FileClosedEvent, FileCreatedEvent, FileMovedEvent
+
+from mirar.monitor.base_monitor import NewImageHandler
+from mirar.monitor.completeness import (
+    FileCompletenessChecker,
+    check_fits_complete,
+    get_expected_fits_size,
+)
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+def make_fits_bytes(n_extensions: int = 0) -> bytes:
+    """
+    Make the bytes of a FITS file, optionally with image extensions
+
+    :param n_extensions: number of image extensions
+    :return: bytes of the file
+    """
+    data = np.arange(200 * 150, dtype=np.int16).reshape(200, 150)
+    if n_extensions == 0:
+        hdul = fits.HDUList([fits.PrimaryHDU(data)])
+    else:
+        primary = fits.PrimaryHDU()
+        primary.header["NEXTEND"] = n_extensions
+        hdul = fits.HDUList(
+            [primary] + [fits.ImageHDU(data + i) for i in range(n_extensions)]
+        )
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "temp.fits"
+        hdul.writeto(path)
+        return path.read_bytes()
+
+
+class TestCompleteness(BaseTestCase):
+    """Class for testing file completeness detection"""
+
+    def test_expected_size(self):
+        """
+        Test that partially-written files are detected from their headers
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "image.fits"
+            for n_extensions in [0, 3]:
+                contents = make_fits_bytes(n_extensions)
+                path.write_bytes(contents)
+                # The final block does not need to be padded
+                expected_size = get_expected_fits_size(path)
+                self.assertLessEqual(expected_size, len(contents))
+                self.assertGreater(expected_size, len(contents) - 2880)
+                self.assertTrue(check_fits_complete(path))
+
+                for n_bytes in [0, 100, 2880, 2880 * 3, len(contents) - 2880]:
+                    path.write_bytes(contents[:n_bytes])
+                    self.assertFalse(check_fits_complete(path), n_bytes)
+
+            path.write_bytes(b"not a fits file" * 300)
+            self.assertFalse(check_fits_complete(path))
+            self.assertFalse(check_fits_complete(Path(temp_dir) / "missing.fits"))
+
+    def test_wait_until_complete(self):
+        """
+        Test that close events end the wait immediately, that size-stable files
+        are accepted without them, and that incomplete files time out
+        """
+        contents = make_fits_bytes()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = str(Path(temp_dir) / "image.fits")
+            checker = FileCompletenessChecker(timeout=5.0)
+
+            # Writer finishes the file and closes it while a worker waits
+            Path(path).write_bytes(contents[:5000])
+
+            def finish_writing():
+                time.sleep(0.2)
+                Path(path).write_bytes(contents)
+                checker.mark_closed(path)
+
+            writer = threading.Thread(target=finish_writing)
+            t_start = time.monotonic()
+            writer.start()
+            self.assertTrue(checker.wait_until_complete(path))
+            self.assertLess(time.monotonic() - t_start, 1.0)
+            writer.join()
+            checker.finish(path)
+
+            # No close events: accepted once the size is stable
+            other_path = str(Path(temp_dir) / "other.fits")
+            Path(other_path).write_bytes(contents)
+            self.assertTrue(checker.wait_until_complete(other_path))
+
+            # Truncated file never becomes complete
+            truncated_path = str(Path(temp_dir) / "truncated.fits")
+            Path(truncated_path).write_bytes(contents[:5000])
+            checker = FileCompletenessChecker(timeout=0.3)
+            self.assertFalse(checker.wait_until_complete(truncated_path))
+
+    def test_handler_queues_once(self):
+        """
+        Test that each file is only queued once, whichever events arrive
+        """
+        queue = Queue()
+        handler = NewImageHandler(queue)
+
+        handler.on_created(FileCreatedEvent("a.fits"))
+        handler.on_closed(FileClosedEvent("a.fits"))
+        handler.on_moved(FileMovedEvent(".b.fits.tmp", "b.fits"))
+        handler.on_closed(FileClosedEvent("b.fits"))
+
+        paths = []
+        while not queue.empty():
+            paths.append(queue.get().src_path)
+        self.assertEqual(paths, ["a.fits", "b.fits"])
+        # pylint: disable=protected-access
+        self.assertTrue(handler.completeness._closed["b.fits"].is_set())
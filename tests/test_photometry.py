@@ -0,0 +1,139 @@
+"""
+Tests for the batched photometry utilities in
+..module::mirar.processors.photometry.utils
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from astropy.io import fits
+
+from mirar.processors.photometry.utils import (
+    CutoutError,
+    aper_photometry,
+    aper_photometry_multi,
+    get_psf_shifted_array,
+    make_cutout_stack,
+    make_cutouts,
+    make_psf_shifted_array,
+    psf_photometry,
+    psf_photometry_batch,
+)
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+HALF_SIZE = 20
+
+
+def make_test_image(
+    x_pos: np.ndarray, y_pos: np.ndarray, seed: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Make a noisy image with gaussian sources, and its uncertainty image
+
+    :param x_pos: x positions of sources
+    :param y_pos: y positions of sources
+    :param seed: random seed
+    :return: image, uncertainty image
+    """
+    rng = np.random.default_rng(seed)
+    grid_y, grid_x = np.mgrid[:300, :400]
+    image = rng.normal(0.0, 1.0, grid_x.shape)
+    for x, y in zip(x_pos, y_pos):
+        image += 5000.0 * np.exp(
+            -((grid_x - x - 1.3) ** 2 + (grid_y - y + 0.7) ** 2) / 8
+        )
+    image[50:60, 100] = np.nan
+    unc = 1.0 + rng.uniform(0.0, 0.5, image.shape)
+    return image, unc
+
+
+class TestPhotometry(BaseTestCase):
+    """Class for testing batched photometry"""
+
+    def test_batch_psf_photometry(self):  # pylint: disable=too-many-locals
+        """
+        Test that batched cutouts and PSF photometry match the single-source versions,
+        including for sources at the image edges
+        """
+        rng = np.random.default_rng(1)
+        x_pos = np.concatenate([[0, 400, 10], rng.integers(0, 401, 30)])
+        y_pos = np.concatenate([[0, 300, 55], rng.integers(0, 301, 30)])
+        image, unc = make_test_image(x_pos, y_pos)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            grid_y, grid_x = np.mgrid[-12:13, -12:13]
+            psf_path = Path(temp_dir) / "psf.fits"
+            fits.writeto(psf_path, np.exp(-(grid_x**2 + grid_y**2) / 8.0))
+
+            image_path = Path(temp_dir) / "image.fits"
+            unc_path = Path(temp_dir) / "unc.fits"
+            fits.writeto(image_path, image)
+            fits.writeto(unc_path, unc)
+
+            psfmodels = get_psf_shifted_array(psf_path, HALF_SIZE)
+            self.assertIs(get_psf_shifted_array(psf_path, HALF_SIZE), psfmodels)
+            self.assertTrue(
+                np.array_equal(
+                    psfmodels, make_psf_shifted_array(psf_path.as_posix(), HALF_SIZE)
+                )
+            )
+
+            image_cutouts = make_cutout_stack(image, x_pos, y_pos, HALF_SIZE)
+            unc_cutouts = make_cutout_stack(unc, x_pos, y_pos, HALF_SIZE)
+            results = psf_photometry_batch(image_cutouts, unc_cutouts, psfmodels)
+
+            # Processing in chunks gives the same results
+            for x, y in zip(
+                psf_photometry_batch(
+                    image_cutouts, unc_cutouts, psfmodels, chunk_size=7
+                ),
+                results,
+            ):
+                np.testing.assert_array_equal(x, y)
+
+            for i, (x, y) in enumerate(zip(x_pos, y_pos)):
+                cutouts = make_cutouts(
+                    [image_path, unc_path], (int(x), int(y)), HALF_SIZE
+                )
+                image_cutout, unc_cutout = cutouts[0], cutouts[1]
+                np.testing.assert_array_equal(image_cutout, image_cutouts[i])
+                np.testing.assert_array_equal(unc_cutout, unc_cutouts[i])
+
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    expected = psf_photometry(image_cutout, unc_cutout, psfmodels)[:5]
+                np.testing.assert_allclose(
+                    [x[i] for x in results], expected, rtol=1e-9, atol=1e-9
+                )
+
+    def test_multi_aper_photometry(self):  # pylint: disable=too-many-locals
+        """
+        Test that multi-source aperture photometry matches photometry of each cutout
+        """
+        rng = np.random.default_rng(2)
+        x_pos = np.concatenate([[0, 400, 100], rng.integers(0, 401, 30)])
+        y_pos = np.concatenate([[0, 300, 55], rng.integers(0, 301, 30)])
+        image, unc = make_test_image(x_pos, y_pos, seed=2)
+
+        image_cutouts = make_cutout_stack(image, x_pos, y_pos, HALF_SIZE)
+        unc_cutouts = make_cutout_stack(unc, x_pos, y_pos, HALF_SIZE)
+
+        for aper_diameter, bkg_in, bkg_out in [(10.0, 25.0, 40.0), (6.5, 17.0, 30.0)]:
+            fluxes, fluxuncs = aper_photometry_multi(
+                image, unc, x_pos, y_pos, aper_diameter, bkg_in, bkg_out
+            )
+            for i, (image_cutout, unc_cutout) in enumerate(
+                zip(image_cutouts, unc_cutouts)
+            ):
+                expected = aper_photometry(
+                    image_cutout, unc_cutout, aper_diameter, bkg_in, bkg_out
+                )
+                np.testing.assert_allclose(
+                    [fluxes[i], fluxuncs[i]], expected, rtol=1e-10, atol=1e-8
+                )
+
+        with self.assertRaises(CutoutError):
+            aper_photometry_multi(image, unc, [401], [10], 10.0, 25.0, 40.0)
@@ -0,0 +1,128 @@
+"""
+Tests for the working dtype of image data, in ..module::mirar.data.precision
+"""
+
+import copy
+import logging
+import pickle
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from astropy.io import fits
+
+from mirar.data import Image, ImageBatch
+from mirar.data.precision import (
+    PrecisionError,
+    get_working_dtype,
+    limit_precision,
+    upcast,
+)
+from mirar.data.utils import FrameStacker
+from mirar.io import open_lazy_raw_image, open_raw_image, save_fits
+from mirar.paths import BASE_NAME_KEY, RAW_IMG_KEY, TARGET_KEY, core_fields
+from mirar.processors.bias import BiasCalibrator
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+def make_raw_file(path: Path, seed: int = 0):
+    """
+    Write a raw integer image with all core fields
+
+    :param path: output path
+    :param seed: random seed
+    :return: None
+    """
+    data = np.random.default_rng(seed).integers(0, 60000, (20, 30), dtype=np.uint16)
+    header = fits.Header()
+    for key in core_fields:
+        header[key] = 1.0
+    header[RAW_IMG_KEY] = path.as_posix()
+    header[BASE_NAME_KEY] = path.name
+    fits.writeto(path, data.astype(np.int32), header)
+
+
+class TestPrecision(BaseTestCase):
+    """Class for testing reduced-precision processing"""
+
+    def test_dtype_helpers(self):
+        """
+        Test resolving and applying working dtypes
+        """
+        self.assertEqual(get_working_dtype(), np.float64)
+        self.assertEqual(get_working_dtype("float32"), np.float32)
+        with self.assertRaises(PrecisionError):
+            get_working_dtype(np.int16)
+        with mock.patch.dict("os.environ", {"WINTER_WORKING_DTYPE": "float32"}):
+            self.assertEqual(get_working_dtype(), np.float32)
+
+        data = np.arange(4.0)
+        self.assertEqual(limit_precision(data, np.float32).dtype, np.float32)
+        self.assertIs(limit_precision(data), data)
+        ints = np.arange(4)
+        self.assertIs(limit_precision(ints, np.float32), ints)
+        self.assertIs(upcast(data), data)
+        self.assertEqual(upcast(data.astype(np.float32)).dtype, np.float64)
+
+    def test_float32_images(self):
+        """
+        Test that float32 images keep their working dtype when opened,
+        updated, copied, pickled and saved
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            raw_path = Path(temp_dir) / "raw.fits"
+            make_raw_file(raw_path)
+            raw_data = fits.getdata(raw_path)
+
+            default_image = open_raw_image(raw_path)
+            self.assertEqual(default_image.get_data().dtype, np.float64)
+
+            image = open_raw_image(raw_path, dtype=np.float32)
+            self.assertEqual(image.get_data().dtype, np.float32)
+            np.testing.assert_array_equal(image.get_data(), raw_data)
+
+            lazy_image = open_lazy_raw_image(raw_path, dtype="float32")
+            self.assertEqual(lazy_image.get_data().dtype, np.float32)
+
+            # Processor output is converted back to the working dtype
+            image.set_data(image.get_data() - np.ones(raw_data.shape))
+            self.assertEqual(image.get_data().dtype, np.float32)
+
+            for new in [copy.copy(image), copy.deepcopy(image)]:
+                self.assertEqual(new.dtype, np.float32)
+                self.assertEqual(new.get_data().dtype, np.float32)
+            self.assertEqual(pickle.loads(pickle.dumps(image)).dtype, np.float32)
+
+            out_path = Path(temp_dir) / "out.fits"
+            save_fits(image, out_path)
+            self.assertEqual(fits.getheader(out_path)["BITPIX"], -32)
+
+            # Integer data is not changed
+            int_image = Image(
+                np.arange(4), default_image.get_header(), dtype=np.float32
+            )
+            self.assertEqual(int_image.get_data().dtype, np.arange(4).dtype)
+
+    def test_master_frames(self):
+        """
+        Test that master frames have the working dtype of their inputs,
+        while stacking is done in float64
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            images = []
+            for i in range(3):
+                raw_path = Path(temp_dir) / f"bias_{i}.fits"
+                make_raw_file(raw_path, seed=i)
+                images.append(open_raw_image(raw_path, dtype=np.float32))
+                images[-1][TARGET_KEY] = "bias"
+
+        calibrator = BiasCalibrator(stacker=FrameStacker())
+        master = calibrator.make_image(ImageBatch(images))
+
+        self.assertEqual(master.dtype, np.float32)
+        self.assertEqual(master.get_data().dtype, np.float32)
+        expected = np.median([upcast(x.get_data()) for x in images], axis=0)
+        np.testing.assert_array_equal(master.get_data(), expected.astype(np.float32))
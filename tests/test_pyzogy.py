@@ -0,0 +1,103 @@
+"""
+Tests for the FFT engine of
+..module::mirar.processors.zogy.pyzogy
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from mirar.processors.zogy.pyzogy import ZOGYEngine, pyzogy
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+SHAPE = (128, 160)
+
+
+def make_psf(width: float) -> np.ndarray:
+    """
+    Make a normalised gaussian PSF
+
+    :param width: gaussian width (pixels)
+    :return: PSF
+    """
+    grid_y, grid_x = np.mgrid[-7:8, -7:8]
+    psf = np.exp(-(grid_x**2 + grid_y**2) / (2 * width**2))
+    return psf / np.sum(psf)
+
+
+def run_pyzogy(engine: ZOGYEngine, seed: int = 0, **kwargs):
+    """
+    Run pyzogy on a simulated pair of images, with a transient in the new image
+
+    :param engine: ZOGY engine
+    :param seed: random seed
+    :param kwargs: extra arguments for pyzogy
+    :return: diff, diff_psf, scorr
+    """
+    rng = np.random.default_rng(seed)
+    new_data = rng.normal(100.0, 5.0, SHAPE)
+    ref_data = np.random.default_rng(100).normal(80.0, 3.0, SHAPE)
+    new_data[60, 70] += 3000.0
+    new_data[5, 5] = np.nan
+    ref_data[100, 7] = np.nan
+    return pyzogy(
+        new_data=new_data,
+        ref_data=ref_data,
+        new_psf=make_psf(1.5),
+        ref_psf=make_psf(2.0),
+        new_sigma=np.full(SHAPE, 5.0),
+        ref_sigma=np.full(SHAPE, 3.0),
+        new_avg_unc=5.0,
+        ref_avg_unc=3.0,
+        engine=engine,
+        **kwargs,
+    )
+
+
+class TestPyZOGY(BaseTestCase):
+    """Class for testing the ZOGY engine"""
+
+    def test_fft_engine(self):
+        """
+        Test that the real-to-complex transforms match numpy
+        """
+        engine = ZOGYEngine(threads=2)
+        data = np.random.default_rng(0).normal(0.0, 1.0, SHAPE)
+        data_hat = engine.rfft2(data)
+        np.testing.assert_allclose(data_hat, np.fft.rfft2(data), atol=1e-10)
+        np.testing.assert_allclose(engine.irfft2(data_hat, SHAPE), data, atol=1e-12)
+        # Inverse transforms must not modify their input
+        np.testing.assert_allclose(data_hat, np.fft.rfft2(data), atol=1e-10)
+        # Plans are reused within a thread, but not shared between threads
+        plans = engine.get_plans(SHAPE)
+        self.assertIs(engine.get_plans(SHAPE), plans)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            other_plans = executor.submit(engine.get_plans, SHAPE).result()
+        self.assertIsNot(other_plans, plans)
+
+    def test_pyzogy(self):
+        """
+        Test that repeated and concurrent runs give identical output,
+        and that the transient is detected
+        """
+        engine = ZOGYEngine(threads=2)
+        expected = [run_pyzogy(engine, seed=seed) for seed in range(4)]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(
+                executor.map(lambda seed: run_pyzogy(engine, seed=seed), range(4))
+            )
+
+        for res, exp in zip(results, expected):
+            for x, y in zip(res, exp):
+                np.testing.assert_array_equal(x, y)
+
+        expected = expected[0]
+
+        diff, _, scorr = expected
+        self.assertTrue(np.isnan(diff[5, 5]) & np.isnan(scorr[100, 7]))
+        self.assertEqual(np.unravel_index(np.nanargmax(scorr), SHAPE), (60, 70))
+        self.assertGreater(np.nanmax(scorr), 10.0)
@@ -0,0 +1,72 @@
+"""
+Tests for running sextractor on batches of images, in
+..module::mirar.processors.astromatic.sextractor.sourceextractor
+"""
+
+import logging
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from mirar.processors.astromatic.sextractor.sourceextractor import (
+    SextractorError,
+    default_param_path,
+    get_sextractor_params,
+    run_sextractor_batch,
+    validate_sextractor_files,
+)
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+class TestSextractorBatch(BaseTestCase):
+    """Class for testing batched sextractor utilities"""
+
+    def test_run_batch(self):
+        """
+        Test that batch jobs run concurrently, up to the limit, and keep their order
+        """
+        lock = threading.Lock()
+        running = []
+        max_running = []
+
+        def make_job(i: int):
+            def job():
+                with lock:
+                    running.append(i)
+                    max_running.append(len(running))
+                time.sleep(0.05)
+                with lock:
+                    running.remove(i)
+                return i
+
+            return job
+
+        results = run_sextractor_batch([make_job(i) for i in range(8)], max_workers=3)
+        self.assertEqual(results, list(range(8)))
+        self.assertLessEqual(max(max_running), 3)
+
+        results = run_sextractor_batch([make_job(i) for i in range(3)], max_workers=1)
+        self.assertEqual(results, list(range(3)))
+        self.assertEqual(max(max_running[-3:]), 1)
+
+    def test_config_files(self):
+        """
+        Test the validation and parsing of sextractor configuration files
+        """
+        params = get_sextractor_params(default_param_path)
+        self.assertGreater(len(params), 0)
+        self.assertIs(get_sextractor_params(default_param_path), params)
+        validate_sextractor_files(default_param_path, None)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            param_path = Path(temp_dir) / "test.param"
+            param_path.write_text("# Comment\nX_IMAGE\nFLUX_APER(2)\n\n")
+            self.assertEqual(
+                get_sextractor_params(param_path), ("X_IMAGE", "FLUX_APER")
+            )
+
+            with self.assertRaises(SextractorError):
+                validate_sextractor_files(Path(temp_dir) / "missing.sex")
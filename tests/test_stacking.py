@@ -0,0 +1,99 @@
+"""
+Tests for combining frames in ..module::mirar.data.utils.stacking
+"""
+
+import logging
+
+import numpy as np
+from astropy.io.fits import Header
+
+from mirar.data import Image
+from mirar.data.utils.stacking import (
+    MINMAX_REJECTION_COMBINE,
+    SIGMA_CLIPPED_MEAN_COMBINE,
+    FrameStacker,
+    StackingError,
+    get_stack_source,
+)
+from mirar.paths import BASE_NAME_KEY, RAW_IMG_KEY
+from mirar.testing import BaseTestCase
+
+logger = logging.getLogger(__name__)
+
+
+def make_frames(n_frames: int = 7, shape: tuple[int, int] = (23, 11)) -> list[Image]:
+    """
+    Make random frames, with some nan pixels
+
+    :param n_frames: Number of frames
+    :param shape: Shape of each frame
+    :return: list of images
+    """
+    rng = np.random.default_rng(42)
+    images = []
+    for i in range(n_frames):
+        data = rng.normal(100.0, 5.0, size=shape)
+        data[i, :] = np.nan
+        header = Header()
+        header[RAW_IMG_KEY] = f"frame_{i}.fits"
+        header[BASE_NAME_KEY] = f"frame_{i}.fits"
+        images.append(Image(data, header))
+    return images
+
+
+class TestStacking(BaseTestCase):
+    """Class for testing frame combination"""
+
+    def test_median(self):
+        """
+        Test that tiled median combination matches a full cube median
+        """
+        images = make_frames()
+        scales = [1.0 + i for i in range(len(images))]
+
+        cube = np.stack([x.get_data() / y for x, y in zip(images, scales)], axis=2)
+        expected = np.nanmedian(cube, axis=2)
+
+        stacker = FrameStacker(max_tile_bytes=1000, n_threads=3)
+        self.assertEqual(stacker.get_tile_rows((23, 11), 7), 1)
+
+        frames = [get_stack_source(x) for x in images]
+        combined = stacker.combine(frames, scales=scales)
+        np.testing.assert_allclose(combined, expected)
+
+        stacker = FrameStacker(dtype=np.float32)
+        combined = stacker.combine(frames, scales=scales)
+        self.assertEqual(combined.dtype, np.float32)
+        np.testing.assert_allclose(combined, expected, rtol=1e-6)
+
+    def test_masks(self):
+        """
+        Test that masked pixels are ignored
+        """
+        images = make_frames(n_frames=3)
+        masks = [np.ones((23, 11)) for _ in images]
+        masks[0][:, 0] = 0.0
+        masks[1][:, 0] = 0.0
+
+        combined = FrameStacker().combine(
+            [get_stack_source(x) for x in images], masks=masks
+        )
+        np.testing.assert_allclose(combined[3:, 0], images[2].get_data()[3:, 0])
+
+    def test_rejection(self):
+        """
+        Test the combine methods with rejection of outliers
+        """
+        frames = [np.full((4, 4), x) for x in [1.0, 2.0, 3.0, 4.0, 100.0]]
+
+        combined = FrameStacker(combine_method=MINMAX_REJECTION_COMBINE).combine(frames)
+        np.testing.assert_allclose(combined, 3.0)
+
+        frames = [np.full((4, 4), x) for x in [10.0, 10.1, 9.9, 10.0, 10.0, 1000.0]]
+        combined = FrameStacker(
+            combine_method=SIGMA_CLIPPED_MEAN_COMBINE, sigma=2.0
+        ).combine(frames)
+        np.testing.assert_allclose(combined, 10.0)
+
+        with self.assertRaises(StackingError):
+            FrameStacker(combine_method="mode")